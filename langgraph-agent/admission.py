@@ -0,0 +1,185 @@
+# admission.py
+
+import os
+import math
+import time
+import asyncio
+import collections
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+# ----------------------------------------------------
+# /invoke 승인 제어: 전역 동시 실행 상한 + 제한된 대기열 + 사용자별 토큰 버킷
+# ----------------------------------------------------
+# 그래프 실행 한 번이 GPT-4 호출 여러 번으로 이어지므로 동시 실행 수를 제한하고, 상한을 넘는 요청은
+# 크기가 제한된 대기열에서 기다리게 합니다. 대기열이 가득 찼거나 사용자별 요청 속도를 넘으면 바로
+# AdmissionRejected(→ 429 + Retry-After)로 거절하여 모든 사용자의 지연이 함께 늘어나지 않게 합니다.
+#
+# 환경 변수
+#   - AGENT_MAX_CONCURRENT_RUNS : 동시에 실행할 그래프 수
+#   - AGENT_MAX_QUEUE           : 실행 슬롯을 기다릴 수 있는 요청 수 (0이면 대기 없이 거절)
+#   - AGENT_QUEUE_TIMEOUT       : 대기열에서 기다릴 최대 시간(초). 초과 시 거절
+#   - AGENT_USER_RATE_PER_MIN   : 사용자별 분당 요청 수 (0이면 사용자별 제한 없음)
+#   - AGENT_USER_BURST          : 사용자별로 연속 허용할 요청 수 (토큰 버킷 크기)
+
+MAX_CONCURRENT_RUNS = int(os.getenv("AGENT_MAX_CONCURRENT_RUNS", "8"))
+MAX_QUEUE = int(os.getenv("AGENT_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.getenv("AGENT_QUEUE_TIMEOUT", "15"))
+USER_RATE_PER_MIN = float(os.getenv("AGENT_USER_RATE_PER_MIN", "20"))
+USER_BURST = int(os.getenv("AGENT_USER_BURST", "5"))
+
+# 대기 시간 분위수 계산에 사용할 최근 승인 건수
+WAIT_SAMPLE_SIZE = 1000
+# 사용자 버킷 수가 이 값을 넘으면 가득 찬(오래 요청이 없던) 버킷을 정리
+MAX_TRACKED_USERS = 10000
+
+class AdmissionRejected(Exception):
+    """요청을 승인하지 않음. reason: rate_limited / queue_full / queue_timeout, retry_after: 재시도까지 권장 대기(초)."""
+
+    def __init__(self, reason: str, retry_after: float):
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f"{reason} (retry after {self.retry_after}s)")
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 capacity개까지 쌓이는 토큰 버킷."""
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """토큰 하나를 사용합니다. 성공하면 0, 부족하면 다음 토큰까지 남은 시간(초)을 반환합니다."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class AdmissionController:
+    """
+    그래프 실행 승인 제어. 이벤트 루프 안에서만 사용합니다.
+
+    - admit(user_key) : 요청 도착 시 호출. 대기열이 가득 찼거나 사용자 토큰이 없으면 즉시 AdmissionRejected
+    - slot()          : 그래프 실행 구간을 감싸는 async context manager. 상한을 넘으면 대기열에서 기다림
+    - stats()         : 진행 중/대기 중 요청 수, 승인·거절 수, 대기 시간(평균/p50/p99)
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_RUNS, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT, user_rate_per_min: float = USER_RATE_PER_MIN,
+                 user_burst: int = USER_BURST, clock: Callable[[], float] = time.monotonic):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.user_rate = user_rate_per_min / 60.0
+        self.user_burst = max(1, user_burst)
+        self._clock = clock
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._waits: Deque[float] = collections.deque(maxlen=WAIT_SAMPLE_SIZE)
+        # 실행 한 번의 평균 소요 시간(지수 이동 평균). 대기열 거절 시 Retry-After 추정에 사용
+        self._avg_run_seconds = 1.0
+        self._counters = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "queue_timeout": 0, "peak_queue_depth": 0}
+
+    # --- 요청 도착 ---
+
+    def _queue_retry_after(self) -> float:
+        return self._avg_run_seconds * (len(self._waiters) + 1) / self.max_concurrency
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self._counters[reason] += 1
+        return AdmissionRejected(reason, retry_after)
+
+    def admit(self, user_key: Optional[Hashable]) -> None:
+        """대기열 여유와 사용자별 요청 속도를 확인합니다. 거절된 요청은 토큰을 소모하지 않습니다."""
+        if self._in_flight >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", self._queue_retry_after())
+        if user_key is None or self.user_rate <= 0:
+            return
+        now = self._clock()
+        bucket = self._buckets.get(user_key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_USERS:
+                self._buckets = {key: b for key, b in self._buckets.items() if not b.is_full(now)}
+            bucket = self._buckets[user_key] = TokenBucket(self.user_rate, self.user_burst, now)
+        wait = bucket.take(now)
+        if wait > 0:
+            raise self._reject("rate_limited", wait)
+
+    # --- 실행 슬롯 ---
+
+    async def acquire(self) -> None:
+        started = self._clock()
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+        else:
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject("queue_full", self._queue_retry_after())
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._counters["peak_queue_depth"] = max(self._counters["peak_queue_depth"], len(self._waiters))
+            try:
+                # release()가 슬롯을 넘겨주면(in_flight 유지) waiter가 완료됩니다.
+                await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+            except BaseException as e:
+                if waiter.done() and not waiter.cancelled():
+                    # 슬롯을 넘겨받은 직후 취소/시간 초과된 경우 슬롯을 반납
+                    self.release()
+                else:
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._reject("queue_timeout", self._queue_retry_after()) from None
+                raise
+        self._counters["admitted"] += 1
+        self._waits.append(self._clock() - started)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._avg_run_seconds = 0.8 * self._avg_run_seconds + 0.2 * (self._clock() - started)
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def percentile(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            **self._counters,
+            "tracked_users": len(self._buckets),
+            "wait_ms": {
+                "avg": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+            },
+            "avg_run_seconds": round(self._avg_run_seconds, 3),
+        }
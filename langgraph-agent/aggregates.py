@@ -0,0 +1,243 @@
+# aggregates.py
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from result_shaping import exercise_volume, parse_exercises
+from analytics import parse_created_at
+
+# ----------------------------------------------------
+# 사용자별 구체화(materialized) 집계: INSERT 시 새 행만 반영하고, 로컬 파일에 저장
+# ----------------------------------------------------
+# 분석 질문마다 전체 기록을 다시 읽는 대신, add_workout_session(s)가 저장한 행을 O(행의 운동 수)로
+# 누적 집계에 반영합니다. 집계는 사용자별 JSON 파일로 저장되어 프로세스 재시작 후에도 유지되며,
+# 최신 행(created_at, id) 워터마크가 DB와 다르거나 순서가 어긋난 행이 들어오면 전체 기록으로 다시 계산합니다.
+
+# 집계 파일 저장 위치
+AGGREGATE_DIR = os.getenv("AGENT_AGGREGATE_DIR", os.path.join(".agent_data", "aggregates"))
+# 유지할 최근 주간 버킷 수 (오래된 주부터 제거하여 집계 크기를 일정하게 유지)
+MAX_WEEKLY_BUCKETS = int(os.getenv("AGGREGATE_MAX_WEEKS", "104"))
+
+_ONE_DAY = np.timedelta64(1, "D")
+_ONE_WEEK = np.timedelta64(7, "D")
+_WEEK_ORIGIN = np.datetime64("1969-12-29", "D") # 월요일
+
+
+def _watermark(row: Dict[str, Any]) -> Tuple[str, str]:
+    """행 순서 비교용 (created_at, id). created_at은 UTC로 정규화합니다."""
+    return str(parse_created_at(row.get("created_at"))), str(row.get("id"))
+
+def _advance_streak(streak: Dict[str, Any], period: np.datetime64, step: np.timedelta64) -> None:
+    """연속 기록(일/주) 갱신: 같은 기간이면 유지, 바로 다음 기간이면 +1, 그 외에는 1부터 다시 시작."""
+    last = streak["last"]
+    if last is not None:
+        last = np.datetime64(last, "D")
+        if period == last:
+            return
+    streak["current"] = streak["current"] + 1 if last is not None and period - last == step else 1
+    streak["longest"] = max(streak["longest"], streak["current"])
+    streak["last"] = str(period)
+
+
+class UserAggregates:
+    """
+    한 사용자의 누적 집계. apply(row)는 행 하나를 반영하며, 이미 반영한 행 이후의 행만 받아야 합니다.
+    (순서가 어긋나면 False를 반환하고, 호출자가 전체 재계산을 수행합니다.)
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        self.data = data or {
+            "session_count": 0,
+            "total_volume": 0.0,
+            "max_session_volume": 0.0,
+            "first_session": None,
+            "watermark": None,            # 마지막으로 반영한 행의 [created_at(UTC), id]
+            "exercises": {},              # 이름 → {sessions, total_volume, max_weight, max_volume}
+            "weekly": {},                 # 주 시작일(월) → {sessions, total_volume}
+            "day_streak": {"current": 0, "longest": 0, "last": None},
+            "week_streak": {"current": 0, "longest": 0, "last": None},
+        }
+
+    @property
+    def watermark(self) -> Optional[Tuple[str, str]]:
+        return tuple(self.data["watermark"]) if self.data["watermark"] else None
+
+    def apply(self, row: Dict[str, Any]) -> bool:
+        """새 행 하나를 집계에 반영합니다. 이미 반영된 행은 건너뛰고, 워터마크보다 이전 행이면 False."""
+        if row.get("created_at") is None or row.get("id") is None:
+            return False
+        mark = _watermark(row)
+        if self.watermark is not None and mark <= self.watermark:
+            return mark == self.watermark  # 같은 행의 중복 반영은 무시, 과거 행은 재계산 필요
+
+        data = self.data
+        volume = float(row.get("total_volume") or 0)
+        data["session_count"] += 1
+        data["total_volume"] += volume
+        data["max_session_volume"] = max(data["max_session_volume"], volume)
+        data["first_session"] = data["first_session"] or mark[0]
+        data["watermark"] = list(mark)
+
+        session_volumes: Dict[str, float] = {}
+        for exercise in parse_exercises(row.get("exercises")):
+            stats = data["exercises"].setdefault(
+                exercise["name"], {"sessions": 0, "total_volume": 0.0, "max_weight": 0.0, "max_volume": 0.0}
+            )
+            stats["max_weight"] = max(stats["max_weight"], exercise["weight"])
+            session_volumes[exercise["name"]] = session_volumes.get(exercise["name"], 0.0) + exercise_volume(exercise)
+        for name, exercise_total in session_volumes.items():
+            stats = data["exercises"][name]
+            stats["sessions"] += 1
+            stats["total_volume"] += exercise_total
+            stats["max_volume"] = max(stats["max_volume"], exercise_total)
+
+        day = parse_created_at(row["created_at"]).astype("datetime64[D]")
+        week = _WEEK_ORIGIN + ((day - _WEEK_ORIGIN) // _ONE_WEEK) * _ONE_WEEK
+        bucket = data["weekly"].setdefault(str(week), {"sessions": 0, "total_volume": 0.0})
+        bucket["sessions"] += 1
+        bucket["total_volume"] += volume
+        if len(data["weekly"]) > MAX_WEEKLY_BUCKETS:
+            for stale in sorted(data["weekly"])[:len(data["weekly"]) - MAX_WEEKLY_BUCKETS]:
+                del data["weekly"][stale]
+        _advance_streak(data["day_streak"], day, _ONE_DAY)
+        _advance_streak(data["week_streak"], week, _ONE_WEEK)
+        return True
+
+    def snapshot(self, weeks: int = 12) -> Dict[str, Any]:
+        """도구/API 응답용 요약. (주간 버킷은 최근 weeks개만)"""
+        data = self.data
+        weekly = sorted(data["weekly"].items())[-weeks:] if weeks else []
+        return {
+            "session_count": data["session_count"],
+            "total_volume": round(data["total_volume"], 1),
+            "average_session_volume": round(data["total_volume"] / data["session_count"], 1) if data["session_count"] else 0,
+            "max_session_volume": round(data["max_session_volume"], 1),
+            "first_session": data["first_session"],
+            "last_session": data["watermark"][0] if data["watermark"] else None,
+            "exercises": {
+                name: {key: round(value, 1) if isinstance(value, float) else value for key, value in stats.items()}
+                for name, stats in sorted(data["exercises"].items(), key=lambda item: -item[1]["total_volume"])
+            },
+            "weekly": [{"week_start": week, "sessions": b["sessions"], "total_volume": round(b["total_volume"], 1)} for week, b in weekly],
+            "day_streak": dict(data["day_streak"]),
+            "week_streak": dict(data["week_streak"]),
+        }
+
+
+class AggregateStore:
+    """
+    사용자별 UserAggregates를 메모리와 로컬 JSON 파일에 보관합니다.
+
+    - record(rows): INSERT된 행을 해당 사용자의 집계에 바로 반영 (집계가 아직 없는 사용자는 건너뜀)
+    - get(user_id, load_head, load_rows) / aget(...): load_head()로 조회한 DB 최신 행과 워터마크가 같으면 저장된 집계를
+      그대로 사용하고, 다르거나 어긋난 것으로 표시된 경우에만 load_rows()로 전체 기록을 읽어 다시 계산
+      (load_head는 캐시를 거치지 않고 DB를 조회해야 다른 프로세스의 INSERT도 감지합니다.)
+    """
+
+    def __init__(self, directory: str = AGGREGATE_DIR):
+        self.directory = directory
+        self._aggregates: Dict[str, UserAggregates] = {}
+        self._dirty: set = set()
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "incremental_rows": 0, "reconciles": 0}
+
+    def _path(self, user_id: str) -> str:
+        # user_id를 파일명으로 직접 쓰지 않도록 해시 사용
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode()).hexdigest()[:32] + ".json")
+
+    def _load(self, user_id: str) -> Optional[UserAggregates]:
+        aggregates = self._aggregates.get(user_id)
+        if aggregates is None:
+            try:
+                with open(self._path(user_id), encoding="utf-8") as f:
+                    aggregates = UserAggregates(json.load(f))
+            except (OSError, ValueError):
+                return None
+            self._aggregates[user_id] = aggregates
+        return aggregates
+
+    def _save(self, user_id: str, aggregates: UserAggregates) -> None:
+        self._aggregates[user_id] = aggregates
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(user_id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(aggregates.data, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def record(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """INSERT 응답으로 받은 저장된 행(id, created_at 포함)을 사용자 집계에 반영합니다."""
+        with self._lock:
+            changed = set()
+            for row in rows:
+                user_id = row.get("user_id")
+                if not user_id or user_id in self._dirty:
+                    continue
+                aggregates = self._load(user_id)
+                if aggregates is None:
+                    continue  # 아직 집계가 없는 사용자: 첫 조회 시 전체 계산
+                if aggregates.apply(row):
+                    self._counters["incremental_rows"] += 1
+                    changed.add(user_id)
+                else:
+                    self._dirty.add(user_id)
+            for user_id in changed - self._dirty:
+                self._save(user_id, self._aggregates[user_id])
+
+    def mark_dirty(self, user_id: str) -> None:
+        """다음 조회 시 전체 기록으로 다시 계산하도록 표시합니다. (저장된 행을 알 수 없는 쓰기 등)"""
+        with self._lock:
+            self._dirty.add(user_id)
+
+    def is_in_sync(self, user_id: str, head: Optional[Dict[str, Any]]) -> bool:
+        """
+        저장된 집계가 DB 최신 행(head, 없으면 기록 없음)과 일치하는지 확인합니다.
+        head에 전체 행 수(session_count)가 있으면 집계한 세션 수와도 비교합니다. 다른 프로세스가 저장한 행 W 뒤에
+        이 프로세스가 더 최신 행 A를 저장하면 워터마크는 A로 DB 최신 행과 같아지지만 W가 빠져 있기 때문입니다.
+        """
+        with self._lock:
+            aggregates = self._load(user_id)
+            if aggregates is None or user_id in self._dirty:
+                return False
+            if aggregates.watermark != (_watermark(head) if head else None):
+                return False
+            count = head.get("session_count") if head else 0
+            return count is None or aggregates.data["session_count"] == count
+
+    def cached(self, user_id: str) -> UserAggregates:
+        with self._lock:
+            self._counters["hits"] += 1
+            return self._aggregates[user_id]
+
+    def rebuild(self, user_id: str, rows: Iterable[Dict[str, Any]]) -> UserAggregates:
+        """전체 기록(순서 무관)으로 집계를 다시 계산하여 저장합니다."""
+        aggregates = UserAggregates()
+        for row in sorted(rows, key=_watermark):
+            aggregates.apply(row)
+        with self._lock:
+            self._counters["reconciles"] += 1
+            self._dirty.discard(user_id)
+            self._save(user_id, aggregates)
+        return aggregates
+
+    def _current(self, user_id: str, head: Optional[Dict[str, Any]]) -> Optional[UserAggregates]:
+        """head와 동기화된 저장된 집계. 다시 계산해야 하면 None."""
+        with self._lock:
+            return self.cached(user_id) if self.is_in_sync(user_id, head) else None
+
+    def get(self, user_id: str, load_head: Callable[[], Optional[Dict[str, Any]]],
+            load_rows: Callable[[], List[Dict[str, Any]]]) -> UserAggregates:
+        aggregates = self._current(user_id, load_head())
+        return aggregates if aggregates is not None else self.rebuild(user_id, load_rows())
+
+    async def aget(self, user_id: str, load_head: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+                   load_rows: Callable[[], Awaitable[List[Dict[str, Any]]]]) -> UserAggregates:
+        """get의 비동기 버전. (load_head, load_rows는 코루틴 함수)"""
+        aggregates = self._current(user_id, await load_head())
+        return aggregates if aggregates is not None else self.rebuild(user_id, await load_rows())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "users": len(self._aggregates), "dirty": len(self._dirty), "directory": self.directory}
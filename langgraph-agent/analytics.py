@@ -0,0 +1,284 @@
+# analytics.py
+
+import numpy as np
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from result_shaping import parse_exercises
+
+# ----------------------------------------------------
+# 훈련 분석 엔진: exercises jsonb를 한 번만 평탄화하여 열(column) 배열로 만들고 NumPy로 벡터 연산
+# ----------------------------------------------------
+# 웹 클라이언트(index.html)의 updateChart / updateComparisonCard / updatePersonalBest가 렌더링마다
+# 전체 sessions로 다시 계산하던 지표(운동별 볼륨 추이, 최신/이전 비교, 개인 최고 기록)와
+# 추정 1RM, 주간 집계, PR/정체 구간 탐지를 서버에서 한 번에 계산합니다.
+
+# 정체 판단: 최근 PLATEAU_WINDOW 세션의 최고 추정 1RM이 이전 최고 대비 PLATEAU_MIN_GAIN_PCT(%) 미만으로 늘었으면 정체
+PLATEAU_WINDOW = 4
+PLATEAU_MIN_GAIN_PCT = 1.0
+# 응답에 포함할 최근 PR 개수
+RECENT_PR_COUNT = 10
+
+_WEEK = np.timedelta64(7, "D")
+# ISO 주 시작(월요일) 기준점. 1970-01-01은 목요일이므로 1969-12-29(월)부터 주 단위로 나눕니다.
+_WEEK_ORIGIN = np.datetime64("1969-12-29", "D")
+
+
+class TrainingFrame(NamedTuple):
+    """
+    세션/운동 기록의 열 배열 표현.
+
+    세션 열 (길이 = 세션 수, created_at 오름차순):
+        session_time, session_volume
+    운동 열 (길이 = 세트 묶음 수, exercises 항목 하나당 한 행):
+        session_index (session_* 배열 인덱스), exercise_code (exercise_names 인덱스), weight, reps, sets
+    """
+    session_time: np.ndarray    # datetime64[s]
+    session_volume: np.ndarray  # float64, sessions.total_volume
+    session_index: np.ndarray   # int64
+    exercise_code: np.ndarray   # int64
+    exercise_names: List[str]
+    weight: np.ndarray          # float64
+    reps: np.ndarray            # float64
+    sets: np.ndarray            # float64
+
+    @property
+    def session_count(self) -> int:
+        return len(self.session_time)
+
+    @property
+    def volume(self) -> np.ndarray:
+        """행별 볼륨 (weight x reps x sets)."""
+        return self.weight * self.reps * self.sets
+
+    def exercise_code_of(self, name: str) -> Optional[int]:
+        try:
+            return self.exercise_names.index(name)
+        except ValueError:
+            return None
+
+
+def parse_created_at(value: Any, unit: str = "s") -> np.datetime64:
+    """Supabase created_at(ISO 8601, 시간대 포함 가능)을 UTC 기준 datetime64[unit]로 변환합니다."""
+    if not value:
+        return np.datetime64("NaT", unit)
+    text = str(value).replace("Z", "+00:00")
+    # numpy는 시간대 오프셋을 지원하지 않으므로 오프셋을 직접 빼서 UTC로 맞춥니다.
+    offset = np.timedelta64(0, "s")
+    if len(text) > 19 and text[-6] in "+-" and text[-3] == ":":
+        sign = 1 if text[-6] == "+" else -1
+        offset = np.timedelta64(sign * (int(text[-5:-3]) * 3600 + int(text[-2:]) * 60), "s")
+        text = text[:-6]
+    return np.datetime64(text, unit) - offset
+
+def build_frame(rows: Iterable[Dict[str, Any]]) -> TrainingFrame:
+    """sessions 행(created_at, total_volume, exercises)을 한 번 순회하여 TrainingFrame을 생성합니다."""
+    rows = sorted(rows, key=lambda row: str(row.get("created_at") or ""))
+    names: Dict[str, int] = {}
+    session_index, exercise_code, weight, reps, sets = [], [], [], [], []
+    for index, row in enumerate(rows):
+        for exercise in parse_exercises(row.get("exercises")):
+            session_index.append(index)
+            exercise_code.append(names.setdefault(exercise["name"], len(names)))
+            weight.append(exercise["weight"])
+            reps.append(exercise["reps"])
+            sets.append(exercise["sets"])
+
+    return TrainingFrame(
+        session_time=np.array([parse_created_at(row.get("created_at")) for row in rows], dtype="datetime64[s]"),
+        session_volume=np.array([float(row.get("total_volume") or 0) for row in rows], dtype=np.float64),
+        session_index=np.array(session_index, dtype=np.int64),
+        exercise_code=np.array(exercise_code, dtype=np.int64),
+        exercise_names=list(names),
+        weight=np.array(weight, dtype=np.float64),
+        reps=np.array(reps, dtype=np.float64),
+        sets=np.array(sets, dtype=np.float64),
+    )
+
+# --- 지표 계산 (벡터 연산) ---
+
+def estimated_1rm(weight: np.ndarray, reps: np.ndarray) -> np.ndarray:
+    """Epley 공식 추정 1RM: weight x (1 + reps / 30). 1회 이하 반복은 중량 그대로 사용합니다."""
+    return np.where(reps <= 1, weight, weight * (1 + reps / 30.0))
+
+def session_exercise_matrix(frame: TrainingFrame, values: np.ndarray, reduce: str = "sum") -> np.ndarray:
+    """
+    행별 값을 (운동 수, 세션 수) 행렬로 모읍니다.
+    reduce="sum"은 합계(기록 없는 칸 0), reduce="max"는 최댓값(기록 없는 칸 NaN)입니다.
+    """
+    shape = (len(frame.exercise_names), frame.session_count)
+    if reduce == "sum":
+        flat = np.bincount(frame.exercise_code * frame.session_count + frame.session_index,
+                           weights=values, minlength=shape[0] * shape[1])
+        return flat.reshape(shape)
+    matrix = np.full(shape, -np.inf)
+    np.maximum.at(matrix, (frame.exercise_code, frame.session_index), values)
+    matrix[np.isneginf(matrix)] = np.nan
+    return matrix
+
+def volume_series(frame: TrainingFrame, exercise: Optional[str] = None) -> Dict[str, Any]:
+    """
+    세션별 볼륨 시계열 (updateChart와 같은 값). exercise가 없으면 세션 총 볼륨,
+    있으면 해당 운동을 수행한 세션의 운동 볼륨만 반환합니다.
+    """
+    if exercise is None:
+        return {"dates": _dates(frame.session_time), "volumes": _numbers(frame.session_volume)}
+    code = frame.exercise_code_of(exercise)
+    if code is None:
+        return {"dates": [], "volumes": []}
+    mask = frame.exercise_code == code
+    per_session = np.bincount(frame.session_index[mask], weights=frame.volume[mask], minlength=frame.session_count)
+    performed = np.bincount(frame.session_index[mask], minlength=frame.session_count) > 0
+    return {"dates": _dates(frame.session_time[performed]), "volumes": _numbers(per_session[performed])}
+
+def weekly_aggregates(frame: TrainingFrame, weeks: Optional[int] = None) -> List[Dict[str, Any]]:
+    """주(월요일 시작) 단위 세션 수, 총 볼륨, 최고 세션 볼륨. weeks를 지정하면 최근 weeks개 주만 반환합니다."""
+    if frame.session_count == 0:
+        return []
+    week = (frame.session_time.astype("datetime64[D]") - _WEEK_ORIGIN) // _WEEK
+    buckets, inverse = np.unique(week, return_inverse=True)
+    sessions = np.bincount(inverse)
+    volume = np.bincount(inverse, weights=frame.session_volume)
+    best = np.full(len(buckets), -np.inf)
+    np.maximum.at(best, inverse, frame.session_volume)
+    start = _WEEK_ORIGIN + buckets * _WEEK
+    result = [
+        {"week_start": str(day), "sessions": int(count), "total_volume": _number(total), "best_session_volume": _number(top)}
+        for day, count, total, top in zip(start, sessions, volume, best)
+    ]
+    return result[-weeks:] if weeks else result
+
+def detect_prs(frame: TrainingFrame) -> List[Dict[str, Any]]:
+    """
+    운동별로 추정 1RM이 이전 최고치를 넘은 세션(PR)을 찾습니다. 각 운동의 첫 기록은 PR로 보지 않습니다.
+    반환값은 날짜 오름차순 [{exercise, date, estimated_1rm, previous_best}].
+    """
+    if frame.session_count == 0 or not frame.exercise_names:
+        return []
+    best = session_exercise_matrix(frame, estimated_1rm(frame.weight, frame.reps), reduce="max")
+    # 이전 세션까지의 누적 최고치 (기록 없는 세션은 NaN이므로 fmax로 건너뜀)
+    running = np.fmax.accumulate(best, axis=1)
+    previous = np.full_like(running, np.nan)
+    previous[:, 1:] = running[:, :-1]
+    with np.errstate(invalid="ignore"):
+        is_pr = best > previous  # NaN 비교는 False (첫 기록/기록 없는 세션 제외)
+    codes, sessions = np.nonzero(is_pr)
+    order = np.argsort(sessions, kind="stable")
+    return [
+        {
+            "exercise": frame.exercise_names[codes[i]],
+            "date": _date(frame.session_time[sessions[i]]),
+            "estimated_1rm": _number(best[codes[i], sessions[i]]),
+            "previous_best": _number(previous[codes[i], sessions[i]]),
+        }
+        for i in order
+    ]
+
+def detect_plateaus(frame: TrainingFrame, window: int = PLATEAU_WINDOW,
+                    min_gain_pct: float = PLATEAU_MIN_GAIN_PCT) -> List[Dict[str, Any]]:
+    """
+    운동별 최근 window번의 수행에서 최고 추정 1RM이 그 이전 최고 대비 min_gain_pct% 미만으로 늘었으면 정체로 판단합니다.
+    (판단에는 window * 2회 이상의 수행 기록이 필요합니다.)
+    """
+    if frame.session_count == 0 or not frame.exercise_names:
+        return []
+    best = session_exercise_matrix(frame, estimated_1rm(frame.weight, frame.reps), reduce="max")
+    performed = ~np.isnan(best)
+    counts = performed.sum(axis=1)
+    # 운동별 수행 순번(0부터)과 "최근 window회" 여부를 행렬 연산으로 계산
+    ordinal = np.cumsum(performed, axis=1) - 1
+    recent = performed & (ordinal >= (counts - window)[:, None])
+    earlier = performed & ~recent
+    recent_best = np.where(recent, best, -np.inf).max(axis=1)
+    earlier_best = np.where(earlier, best, -np.inf).max(axis=1)
+
+    eligible = counts >= window * 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gain = (recent_best - earlier_best) / earlier_best * 100
+    plateau = eligible & (gain < min_gain_pct)
+    return [
+        {
+            "exercise": frame.exercise_names[code],
+            "sessions_checked": int(window),
+            "recent_best_1rm": _number(recent_best[code]),
+            "previous_best_1rm": _number(earlier_best[code]),
+            "gain_pct": round(float(gain[code]), 1),
+        }
+        for code in np.nonzero(plateau)[0]
+    ]
+
+def exercise_summary(frame: TrainingFrame) -> Dict[str, Dict[str, Any]]:
+    """운동별 수행 세션 수, 총 볼륨, 최고 중량, 최고 추정 1RM과 최근 수행의 추정 1RM."""
+    if not frame.exercise_names:
+        return {}
+    volume = session_exercise_matrix(frame, frame.volume)
+    e1rm = session_exercise_matrix(frame, estimated_1rm(frame.weight, frame.reps), reduce="max")
+    top_weight = session_exercise_matrix(frame, frame.weight, reduce="max")
+    performed = ~np.isnan(e1rm)
+    # 운동별 마지막 수행 세션 인덱스
+    last = frame.session_count - 1 - np.argmax(performed[:, ::-1], axis=1)
+    codes = np.arange(len(frame.exercise_names))
+    return {
+        name: {
+            "sessions": int(performed[code].sum()),
+            "total_volume": _number(volume[code].sum()),
+            "best_weight": _number(np.nanmax(top_weight[code])),
+            "best_estimated_1rm": _number(np.nanmax(e1rm[code])),
+            "latest_estimated_1rm": _number(e1rm[code, last[code]]),
+            "last_performed": _date(frame.session_time[last[code]]),
+        }
+        for name, code in zip(frame.exercise_names, codes)
+    }
+
+def latest_comparison(frame: TrainingFrame) -> Optional[Dict[str, Any]]:
+    """최신 세션과 직전 세션의 총 볼륨 및 운동별 볼륨 비교 (updateComparisonCard와 같은 값)."""
+    if frame.session_count < 2:
+        return None
+    latest, previous = frame.session_count - 1, frame.session_count - 2
+    volume = session_exercise_matrix(frame, frame.volume)
+    performed = session_exercise_matrix(frame, np.ones_like(frame.weight)) > 0
+    codes = np.nonzero(performed[:, latest] | performed[:, previous])[0]
+    return {
+        "latest": {"date": _date(frame.session_time[latest]), "total_volume": _number(frame.session_volume[latest])},
+        "previous": {"date": _date(frame.session_time[previous]), "total_volume": _number(frame.session_volume[previous])},
+        "volume_change": _number(frame.session_volume[latest] - frame.session_volume[previous]),
+        "exercises": {
+            frame.exercise_names[code]: {
+                "latest_volume": _number(volume[code, latest]),
+                "previous_volume": _number(volume[code, previous]),
+            }
+            for code in codes
+        },
+    }
+
+def training_analytics(frame: TrainingFrame, exercise: Optional[str] = None, weeks: int = 12) -> Dict[str, Any]:
+    """get_training_analytics 도구와 /analytics API가 반환하는 전체 분석 결과."""
+    prs = detect_prs(frame)
+    if exercise is not None:
+        prs = [pr for pr in prs if pr["exercise"] == exercise]
+    return {
+        "session_count": frame.session_count,
+        "period": {"first": _date(frame.session_time[0]), "last": _date(frame.session_time[-1])} if frame.session_count else None,
+        "personal_best_volume": _number(frame.session_volume.max()) if frame.session_count else 0,
+        "volume_series": volume_series(frame, exercise),
+        "weekly": weekly_aggregates(frame, weeks),
+        "exercises": exercise_summary(frame),
+        "latest_comparison": latest_comparison(frame),
+        "recent_prs": prs[-RECENT_PR_COUNT:],
+        "plateaus": detect_plateaus(frame),
+    }
+
+# --- JSON 변환 ---
+
+def _number(value: Any) -> Any:
+    value = float(value)
+    if not np.isfinite(value):
+        return None
+    return int(value) if value.is_integer() else round(value, 1)
+
+def _numbers(values: np.ndarray) -> List[Any]:
+    return [_number(v) for v in values]
+
+def _date(value: np.datetime64) -> Optional[str]:
+    return None if np.isnat(value) else str(value.astype("datetime64[D]"))
+
+def _dates(values: np.ndarray) -> List[Optional[str]]:
+    return [_date(v) for v in values]
@@ -0,0 +1,81 @@
+# bench_startup.py
+
+"""
+에이전트 서비스의 콜드 스타트 시간을 측정합니다.
+
+측정 항목 (각 반복은 새 파이썬 프로세스에서 실행):
+    import_s        : `import graph_builder` 소요 시간 (네트워크/클라이언트 생성이 없어야 함)
+    startup_s       : FastAPI lifespan(warmup) 완료까지의 시간
+    first_request_s : 첫 요청 응답 시간 (기본 GET /stats, --question 지정 시 POST /invoke)
+
+사용 예:
+    python bench_startup.py --runs 5
+    python bench_startup.py --runs 3 --no-warmup --question "내 운동 기록을 조회해 줘"
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# 자식 프로세스에서 실행할 측정 코드. 결과는 마지막 줄에 JSON으로 출력합니다.
+_CHILD_CODE = r"""
+import sys, json, time
+t0 = time.perf_counter()
+import graph_builder
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+question = sys.argv[1] if len(sys.argv) > 1 else None
+client = TestClient(graph_builder.fastapi_app)
+client.__enter__()  # lifespan startup
+t2 = time.perf_counter()
+if question:
+    response = client.post("/invoke", json={"question": question})
+else:
+    response = client.get("/stats")
+t3 = time.perf_counter()
+client.__exit__(None, None, None)
+print(json.dumps({
+    "import_s": t1 - t0,
+    "startup_s": t2 - t1,
+    "first_request_s": t3 - t2,
+    "status_code": response.status_code,
+}))
+"""
+
+def run_once(question, warmup: bool) -> dict:
+    env = {**os.environ, "AGENT_WARMUP": "1" if warmup else "0"}
+    args = [sys.executable, "-c", _CHILD_CODE] + ([question] if question else [])
+    completed = subprocess.run(
+        args, cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def summarize(samples: list) -> dict:
+    summary = {}
+    for key in ("import_s", "startup_s", "first_request_s"):
+        values = [sample[key] for sample in samples]
+        summary[key] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    summary["status_codes"] = sorted({sample["status_code"] for sample in samples})
+    return summary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LangGraph Agent API 콜드 스타트 벤치마크")
+    parser.add_argument("--runs", type=int, default=5, help="반복 횟수 (각각 새 프로세스)")
+    parser.add_argument("--question", default=None, help="지정 시 첫 요청으로 POST /invoke 실행 (LLM/DB 호출 발생)")
+    parser.add_argument("--no-warmup", action="store_true", help="lifespan warmup 없이 첫 요청에서 지연 초기화")
+    args = parser.parse_args()
+
+    samples = [run_once(args.question, warmup=not args.no_warmup) for _ in range(args.runs)]
+    print(json.dumps({
+        "runs": args.runs,
+        "warmup": not args.no_warmup,
+        "first_request": "POST /invoke" if args.question else "GET /stats",
+        **summarize(samples),
+    }, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# cache.py
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+# ----------------------------------------------------
+# 사용자 단위 무효화가 가능한 TTL + LRU 캐시 (프로세스 내 메모리)
+# ----------------------------------------------------
+
+def estimate_size(value: Any) -> int:
+    """캐시 메모리 상한 계산용 크기 추정치 (JSON 직렬화 길이, 바이트 근사)."""
+    try:
+        return len(json.dumps(value, default=str, ensure_ascii=False).encode())
+    except (TypeError, ValueError):
+        return len(repr(value).encode())
+
+
+class UserTTLCache:
+    """
+    (user_id, key) 단위로 값을 저장하는 읽기 캐시.
+
+    - ttl_seconds 가 지난 항목은 조회 시 만료 처리됩니다.
+    - 항목 수(max_entries) 또는 추정 메모리(max_bytes)를 넘으면 가장 오래 사용하지 않은 항목부터 제거(LRU)합니다.
+    - invalidate(user_id)로 한 사용자의 모든 항목을 한 번에 제거할 수 있습니다. (쓰기 후 무효화)
+    - 동기/비동기 도구가 함께 사용하므로 스레드 안전합니다.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 1024, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, int, Any]]" = OrderedDict()
+        self._user_keys: Dict[str, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Any]:
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None."""
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove((user_id, key))
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self._counters["hits"] += 1
+            return value
+
+    def set(self, user_id: str, key: Hashable, value: Any) -> None:
+        """값을 저장합니다. 단일 항목이 max_bytes보다 크면 저장하지 않습니다."""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if (user_id, key) in self._entries:
+                self._remove((user_id, key))
+            self._entries[(user_id, key)] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._user_keys.setdefault(user_id, set()).add(key)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, user_id: str) -> int:
+        """한 사용자의 모든 항목을 제거하고 제거된 항목 수를 반환합니다."""
+        with self._lock:
+            keys = self._user_keys.pop(user_id, set())
+            for key in keys:
+                _, size, _ = self._entries.pop((user_id, key))
+                self._bytes -= size
+            if keys:
+                self._counters["invalidations"] += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 크기 산정을 위한 카운터와 현재 사용량."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    def _remove(self, entry_key: Tuple[str, Hashable]) -> None:
+        # 호출자가 _lock을 보유한 상태에서만 사용
+        _, size, _ = self._entries.pop(entry_key)
+        self._bytes -= size
+        user_id, key = entry_key
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+
+class UserDataVersions:
+    """
+    사용자별 데이터 버전 카운터. 사용자의 데이터가 바뀔 때(INSERT 성공) bump()로 증가시키며,
+    파생 캐시(의미 기반 답변 캐시 등)는 저장 시점의 버전과 비교하여 최신 여부를 판단합니다.
+    (프로세스 내 카운터이므로 다른 프로세스의 쓰기는 각 캐시의 TTL로 보완합니다.)
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Optional[str]) -> int:
+        if user_id is None:
+            return 0
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def bump(self, user_id: str) -> int:
+        with self._lock:
+            version = self._versions.get(user_id, 0) + 1
+            self._versions[user_id] = version
+            return version
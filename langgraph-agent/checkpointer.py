@@ -0,0 +1,386 @@
+# checkpointer.py
+
+import os
+import random
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+# ----------------------------------------------------
+# SQLite 체크포인터: 대화(thread_id)별 State 스냅샷을 증분 저장
+# ----------------------------------------------------
+#
+# 저장 방식 (InMemorySaver의 채널별 blob 구조를 SQLite 테이블로 옮긴 형태)
+#   checkpoints       : 체크포인트 메타 정보 (채널 값 제외), (thread_id, checkpoint_ns, step) 인덱스
+#   checkpoint_blobs  : 채널 값. put() 시 이번 step에서 바뀐 채널(new_versions)만 기록합니다.
+#                       messages처럼 뒤에 추가만 되는 리스트는 이전 버전 대비 추가된 항목(delta)만 저장하고,
+#                       MAX_DELTA_DEPTH마다 전체 값을 다시 저장하여 복원 비용을 제한합니다.
+#   checkpoint_writes : 노드별 중간 쓰기 (중단된 실행 재개용)
+#
+# 직렬화는 LangGraph 기본 serde(JsonPlusSerializer, msgpack)를 사용하며 pickle을 사용하지 않습니다.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    step INTEGER,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_thread_step ON checkpoints (thread_id, checkpoint_ns, step);
+
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    base_version TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# delta 체인 최대 길이. 이 길이에 도달하면 전체 값을 저장합니다.
+MAX_DELTA_DEPTH = 32
+# delta 기준으로 메모리에 보관할 리스트 채널 head 수 (대화 × 리스트 채널). 초과하면 가장 오래 사용하지 않은 대화부터 제거하며,
+# head가 없는 대화의 다음 저장은 전체 값으로 기록됩니다.
+MAX_LIST_HEADS = int(os.getenv("AGENT_CHECKPOINT_MAX_HEADS", "512"))
+
+
+def _is_append_of(previous: List[Any], value: Any) -> bool:
+    """value가 previous 뒤에 항목을 추가한 리스트인지 확인합니다. (대부분 같은 객체이므로 is 비교 우선)"""
+    if not isinstance(value, list) or len(value) <= len(previous):
+        return False
+    return all(a is b or a == b for a, b in zip(previous, value))
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """
+    WAL 모드 SQLite 파일에 체크포인트를 저장하는 LangGraph 체크포인터.
+
+    - 여러 스레드(동기 노드/스레드 풀)와 이벤트 루프(비동기 메서드)가 하나의 연결을 공유하며 _lock으로 직렬화합니다.
+    - 비동기 메서드는 asyncio.to_thread로 실행하여 이벤트 루프를 막지 않습니다.
+    """
+
+    def __init__(self, path: str, *, serde=None, max_list_heads: int = MAX_LIST_HEADS):
+        super().__init__(serde=serde)
+        self.path = path
+        self.max_list_heads = max(1, max_list_heads)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        # (thread_id, checkpoint_ns, channel) -> (마지막으로 저장/복원한 version, 값, delta depth). LRU 순서
+        self._list_heads: "OrderedDict[Tuple[str, str, str], Tuple[str, List[Any], int]]" = OrderedDict()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- 버전 ---
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # InMemorySaver와 같은 형식: 정렬 가능한 정수부 + 분기(fork) 시 충돌을 피하기 위한 난수부
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- 리스트 head (호출자가 _lock을 보유한 상태에서만 사용) ---
+
+    def _get_head(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, List[Any], int]]:
+        head = self._list_heads.get(key)
+        if head is not None:
+            self._list_heads.move_to_end(key)
+        return head
+
+    def _set_head(self, key: Tuple[str, str, str], head: Tuple[str, List[Any], int]) -> None:
+        self._list_heads[key] = head
+        self._list_heads.move_to_end(key)
+        while len(self._list_heads) > self.max_list_heads:
+            self._list_heads.popitem(last=False)
+
+    # --- 채널 값 저장/복원 ---
+
+    def _blob_row(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, values: Dict[str, Any]):
+        """checkpoint_blobs에 저장할 행과, 저장 후 갱신할 리스트 head 정보(리스트가 아니면 None)를 반환합니다."""
+        if channel not in values:
+            return (thread_id, checkpoint_ns, channel, version, "empty", None, None, 0), None
+
+        value = values[channel]
+        head = self._get_head((thread_id, checkpoint_ns, channel))
+        if head is not None and head[2] < MAX_DELTA_DEPTH and _is_append_of(head[1], value):
+            base_version, previous, depth = head
+            type_, blob = self.serde.dumps_typed(value[len(previous):])
+            row = (thread_id, checkpoint_ns, channel, version, type_, blob, base_version, depth + 1)
+        else:
+            type_, blob = self.serde.dumps_typed(value)
+            row = (thread_id, checkpoint_ns, channel, version, type_, blob, None, 0)
+        new_head = (version, list(value), row[7]) if isinstance(value, list) else None
+        return row, new_head
+
+    def _load_channel(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> Tuple[bool, Any]:
+        """(값 존재 여부, 값)을 반환합니다. delta 행은 base_version을 따라가 전체 리스트로 복원합니다."""
+        chain = []
+        current: Optional[str] = version
+        while current is not None:
+            row = self._conn.execute(
+                "SELECT type, blob, base_version, depth FROM checkpoint_blobs "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, current),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                if not chain:
+                    return False, None
+                raise ValueError(f"체크포인트 채널 '{channel}'의 기준 버전 {current}을(를) 찾을 수 없습니다.")
+            chain.append(row)
+            current = row[2]
+
+        value = self.serde.loads_typed((chain[-1][0], chain[-1][1]))
+        for type_, blob, _, _ in reversed(chain[:-1]):
+            value = value + self.serde.loads_typed((type_, blob))
+        if isinstance(value, list):
+            self._set_head((thread_id, checkpoint_ns, channel), (version, list(value), chain[0][3]))
+        return True, value
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values = {}
+        for channel, version in versions.items():
+            found, value = self._load_channel(thread_id, checkpoint_ns, channel, str(version))
+            if found:
+                channel_values[channel] = value
+        return channel_values
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM checkpoint_writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id,
+            }},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id,
+                }}
+                if parent_checkpoint_id else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((w_type, value)))
+                for task_id, channel, w_type, value in writes
+            ],
+        )
+
+    # --- BaseCheckpointSaver (동기) ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        select = ("SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                  "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    select + " AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                # checkpoint_id(uuid6)는 시간 순으로 정렬되므로 가장 큰 값이 최신 체크포인트
+                row = self._conn.execute(
+                    select + " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)
+                ).fetchone()
+            if row is None:
+                return None
+            return self._to_tuple(thread_id, checkpoint_ns, row)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            clauses.append("checkpoint_id < ?")
+            params.append(get_checkpoint_id(before))
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            results = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, row)
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                results.append(checkpoint_tuple)
+        yield from results
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_copy = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint_copy.pop("channel_values")
+        metadata = get_checkpoint_metadata(config, metadata)
+        type_, checkpoint_blob = self.serde.dumps_typed(checkpoint_copy)
+        metadata_type, metadata_blob = self.serde.dumps_typed(metadata)
+
+        with self._lock:
+            blob_rows, heads = [], {}
+            for channel, version in new_versions.items():
+                row, head = self._blob_row(thread_id, checkpoint_ns, channel, str(version), values)
+                blob_rows.append(row)
+                if head is not None:
+                    heads[(thread_id, checkpoint_ns, channel)] = head
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoint_blobs "
+                    "(thread_id, checkpoint_ns, channel, version, type, blob, base_version, depth) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    blob_rows,
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints "
+                    "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, step, type, checkpoint, "
+                    "metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                     metadata.get("step"), type_, checkpoint_blob, metadata_type, metadata_blob),
+                )
+            # 커밋된 버전만 이후 delta의 기준으로 사용
+            for key, head in heads.items():
+                self._set_head(key, head)
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"],
+        }}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        insert_rows, replace_rows = [], []
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            type_, blob = self.serde.dumps_typed(value)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, blob, task_path)
+            # 일반 쓰기는 이미 저장된 값을 유지하고, 특수 쓰기(에러/인터럽트 등)는 덮어씁니다. (InMemorySaver와 동일)
+            (insert_rows if write_idx >= 0 else replace_rows).append(row)
+
+        columns = "(thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path)"
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(f"INSERT OR IGNORE INTO checkpoint_writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", insert_rows)
+            self._conn.executemany(f"INSERT OR REPLACE INTO checkpoint_writes {columns} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", replace_rows)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            for key in [key for key in self._list_heads if key[0] == thread_id]:
+                del self._list_heads[key]
+
+    # --- BaseCheckpointSaver (비동기) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        results = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint_tuple in results:
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- 운영 정보 ---
+
+    def stats(self) -> Dict[str, Any]:
+        """저장된 대화/체크포인트/blob 수와 delta 저장 비율."""
+        with self._lock:
+            threads, checkpoints = self._conn.execute(
+                "SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints"
+            ).fetchone()
+            blobs, deltas, blob_bytes = self._conn.execute(
+                "SELECT COUNT(*), COUNT(base_version), COALESCE(SUM(LENGTH(blob)), 0) FROM checkpoint_blobs"
+            ).fetchone()
+            list_heads = len(self._list_heads)
+        return {
+            "path": self.path,
+            "threads": threads,
+            "checkpoints": checkpoints,
+            "blobs": blobs,
+            "delta_blobs": deltas,
+            "blob_bytes": blob_bytes,
+            "list_heads": list_heads,
+        }
@@ -0,0 +1,20 @@
+# conftest.py
+
+import pytest
+import tracing
+from resilience import OPENAI, SUPABASE
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """서킷 브레이커는 프로세스 전역이므로 앞선 테스트의 실패(실제 DB 연결 실패 등)가 다음 테스트에 영향을 주지 않도록 초기화합니다."""
+    OPENAI.reset()
+    SUPABASE.reset()
+    yield
+
+@pytest.fixture(autouse=True)
+def span_exporter(tmp_path, monkeypatch):
+    """테스트 중 기록되는 span은 저장소 안의 .agent_data 대신 테스트별 임시 파일로 내보냅니다."""
+    exporter = tracing.FileSpanExporter(str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr(tracing, "EXPORTER", exporter)
+    yield exporter
+    exporter.close()
@@ -0,0 +1,96 @@
+# deadline.py
+
+import os
+import time
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Awaitable, Optional
+
+# ----------------------------------------------------
+# 요청 단위 마감 시각(deadline): /invoke에서 정하고 State와 컨텍스트 변수로 노드·도구·HTTP 호출까지 전달
+# ----------------------------------------------------
+# 마감 시각은 체크포인트에 저장되어도 의미가 유지되도록 epoch 초(time.time())로 표현합니다.
+# 노드는 deadline_scope(state["deadline"]) 안에서 실행되며, 그 안의 HTTP 호출(http_pool)은 남은 시간으로
+# 제한 시간을 줄이고, 재시도(resilience)는 남은 시간보다 긴 백오프를 기다리지 않습니다.
+#
+# 환경 변수
+#   - AGENT_REQUEST_TIMEOUT      : 헤더가 없을 때 요청 하나의 기본 시간 예산(초)
+#   - AGENT_MAX_REQUEST_TIMEOUT  : X-Request-Timeout 헤더로 지정할 수 있는 최대값(초)
+#   - DEADLINE_MIN_LLM_SECONDS   : LLM 호출을 시작하기 위해 남아 있어야 하는 최소 시간(초). 부족하면 ErrorHandler로
+#   - DEADLINE_ANSWER_RESERVE    : 도구 실행 후 답변 생성을 위해 남겨 둘 시간(초)
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+DEFAULT_REQUEST_TIMEOUT = float(os.getenv("AGENT_REQUEST_TIMEOUT", "60"))
+MAX_REQUEST_TIMEOUT = float(os.getenv("AGENT_MAX_REQUEST_TIMEOUT", "300"))
+MIN_LLM_SECONDS = float(os.getenv("DEADLINE_MIN_LLM_SECONDS", "3"))
+ANSWER_RESERVE_SECONDS = float(os.getenv("DEADLINE_ANSWER_RESERVE", "5"))
+
+class DeadlineExceeded(TimeoutError):
+    """요청의 마감 시각이 지나 작업을 시작하거나 계속할 수 없음."""
+
+def parse_timeout_header(value: Optional[str]) -> Optional[float]:
+    """X-Request-Timeout 헤더(초)를 해석합니다. 없으면 None, 형식이 잘못되면 ValueError."""
+    if value is None or not value.strip():
+        return None
+    timeout = float(value)
+    if not timeout > 0:
+        raise ValueError(f"{REQUEST_TIMEOUT_HEADER}는 0보다 커야 합니다: {value!r}")
+    return timeout
+
+def request_deadline(timeout: Optional[float] = None, now: Optional[float] = None) -> float:
+    """지금부터 timeout초 뒤의 마감 시각. timeout이 없으면 기본값, 최대값을 넘으면 최대값을 사용합니다."""
+    budget = min(timeout if timeout is not None else DEFAULT_REQUEST_TIMEOUT, MAX_REQUEST_TIMEOUT)
+    return (time.time() if now is None else now) + budget
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """마감까지 남은 시간(초). 마감 시각이 없으면 None."""
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+def bounded_timeout(timeout: float, deadline: Optional[float], reserve: float = 0.0) -> float:
+    """timeout을 마감까지 남은 시간(reserve 제외)으로 줄입니다. 음수면 이미 시간이 부족한 것입니다."""
+    left = remaining(deadline)
+    return timeout if left is None else min(timeout, left - reserve)
+
+def has_time_for(deadline: Optional[float], seconds: float) -> bool:
+    """마감까지 seconds 이상 남았는지 여부. 마감 시각이 없으면 항상 True."""
+    left = remaining(deadline)
+    return left is None or left >= seconds
+
+# --- 컨텍스트 변수 (노드 → 도구 → HTTP 전송 계층) ---
+
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]):
+    """with 블록 안의 호출(스레드 풀에 복사된 컨텍스트 포함)이 마감 시각을 읽을 수 있도록 설정합니다."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def current_deadline() -> Optional[float]:
+    return _current_deadline.get()
+
+def current_remaining() -> Optional[float]:
+    return remaining(_current_deadline.get())
+
+def deadline_expired() -> bool:
+    left = current_remaining()
+    return left is not None and left <= 0
+
+async def run_within(deadline: Optional[float], awaitable: Awaitable[Any]) -> Any:
+    """마감 시각까지만 기다립니다. 시간이 지나면 작업을 취소하고 DeadlineExceeded를 발생시킵니다."""
+    left = remaining(deadline)
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=max(left, 0))
+    except asyncio.TimeoutError:
+        if remaining(deadline) > 0:
+            # 마감 전에 작업 자체가 발생시킨 TimeoutError는 그대로 전달
+            raise
+        raise DeadlineExceeded(f"요청 마감 시각을 {-remaining(deadline):.1f}s 초과했습니다.") from None
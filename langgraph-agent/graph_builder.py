@@ -2,41 +2,69 @@
 
 import os
 import sys
+import json
+import uuid
+import asyncio
+import threading
+from contextlib import asynccontextmanager
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import HumanMessage, AIMessage
-from typing import Literal
-from IPython.display import Image, display # Jupyter/Colab 환경을 위해 유지
+from langchain_core.runnables import RunnableLambda
+from typing import Literal, Optional
 from state import State # State 정의 임포트
+from checkpointer import SQLiteCheckpointer
+from single_flight import SingleFlight
+from http_pool import pool_stats, aclose_pools
+from admission import AdmissionController, AdmissionRejected
+from resilience import resilience_stats
+from tracing import TRACEPARENT_HEADER, current_span, flush_spans, start_span, tracing_stats
+from observability import get_logger, record_request_usage, render_metrics, METRICS_CONTENT_TYPE
+from deadline import (
+    DeadlineExceeded, REQUEST_TIMEOUT_HEADER,
+    current_deadline, deadline_scope, parse_timeout_header, request_deadline, run_within,
+)
+from semantic_cache import normalize_question, extract_user_id
+import node
+from supabase_tools import HISTORY_CACHE, HISTORY_FLIGHTS, AGGREGATES, SESSION_STORE, SESSION_WRITE_BUFFER, get_supabase, afetch_training_analytics
 from node import (
     agent_decision, 
     tool_executor, 
     result_processor, 
     error_handler, 
+    aagent_decision,
+    atool_executor,
+    aresult_processor,
+    aerror_handler,
     route_decision, 
-    TOOLS, 
-    agent_executor # AgentExecutor 초기화로 인해 임포트 필요
+    route_after_tools,
 ) 
 
 # FastAPI 및 관련 라이브러리 임포트
-from fastapi import FastAPI
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
 
 # ----------------------------------------------------
 # 1. Graph 정의 및 구축
 # ----------------------------------------------------
 
-def build_agent_graph():
-    """LangGraph StateGraph를 구축하고 컴파일합니다."""
+def build_agent_graph(checkpointer=None):
+    """
+    LangGraph StateGraph를 구축하고 컴파일합니다.
+    checkpointer를 지정하면 thread_id별로 State가 저장되어 다음 요청에서 대화를 이어갈 수 있습니다.
+    """
     
     # StateGraph 인스턴스 생성
     workflow = StateGraph(State)
     
     # 1. 노드 추가
-    workflow.add_node("AgentDecision", agent_decision)
-    workflow.add_node("ToolExecutor", tool_executor)
-    workflow.add_node("ResultProcessor", result_processor)
-    workflow.add_node("ErrorHandler", error_handler)
+    # 각 노드에 동기/비동기 구현을 함께 등록합니다. invoke()는 동기 구현을,
+    # ainvoke()/astream()은 비동기 구현을 사용하므로 하나의 그래프로 두 실행 모드를 지원합니다.
+    workflow.add_node("AgentDecision", RunnableLambda(agent_decision, afunc=aagent_decision))
+    workflow.add_node("ToolExecutor", RunnableLambda(tool_executor, afunc=atool_executor))
+    workflow.add_node("ResultProcessor", RunnableLambda(result_processor, afunc=aresult_processor))
+    workflow.add_node("ErrorHandler", RunnableLambda(error_handler, afunc=aerror_handler))
     
     # 2. 진입점 설정
     workflow.set_entry_point("AgentDecision")
@@ -55,15 +83,22 @@ def build_agent_graph():
     )
     
     # ToolExecutor -> ResultProcessor 또는 ErrorHandler (결과 처리는 ResultProcessor)
-    # ToolExecutor에서 에러가 반환될 경우 route_decision을 통해 ErrorHandler로 자동 분기됩니다.
-    workflow.add_edge("ToolExecutor", "ResultProcessor") 
+    # ToolExecutor에서 에러(TOOL_TIMEOUT 등)가 반환될 경우 route_after_tools를 통해 ErrorHandler로 분기됩니다.
+    workflow.add_conditional_edges(
+        "ToolExecutor",
+        route_after_tools,
+        {
+            "ResultProcessor": "ResultProcessor",
+            "ErrorHandler": "ErrorHandler"
+        }
+    )
     
     # 4. 종료점 설정
     workflow.add_edge("ResultProcessor", END)
     workflow.add_edge("ErrorHandler", END)
     
     # 5. 컴파일
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
     
     return app
 
@@ -71,8 +106,49 @@ def build_agent_graph():
 # 2. Graph 시각화 및 진단 (요청 사항)
 # ----------------------------------------------------
 
-# Graph 구축
-app = build_agent_graph()
+# Graph는 임포트 시점이 아닌 첫 사용 시점(또는 서버 시작 시 lifespan)에 한 번만 구축합니다.
+# langgraph.json의 "graph_builder:app"과 기존 코드의 graph_builder.app / langgraph_app 접근은
+# 모듈 __getattr__을 통해 같은 컴파일된 그래프를 반환합니다.
+_graph = None
+_graph_lock = threading.Lock()
+
+def get_agent_graph():
+    """컴파일된 LangGraph 앱을 반환합니다. (프로세스당 한 번만 구축)"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_agent_graph()
+    return _graph
+
+# FastAPI에서 사용하는 대화형 그래프: 같은 구조에 SQLite 체크포인터를 연결합니다.
+# (langgraph.json의 graph_builder:app은 LangGraph 서버가 자체 체크포인터를 사용하므로 체크포인터 없이 유지)
+CHECKPOINT_DB = os.getenv("AGENT_CHECKPOINT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".agent_data", "checkpoints.sqlite"))
+_checkpointer = None
+_conversation_graph = None
+
+def get_checkpointer() -> SQLiteCheckpointer:
+    global _checkpointer
+    if _checkpointer is None:
+        with _graph_lock:
+            if _checkpointer is None:
+                _checkpointer = SQLiteCheckpointer(CHECKPOINT_DB)
+    return _checkpointer
+
+def get_conversation_graph():
+    """thread_id 단위로 대화를 이어가는 체크포인터 연결 그래프를 반환합니다. (프로세스당 한 번만 구축)"""
+    global _conversation_graph
+    if _conversation_graph is None:
+        checkpointer = get_checkpointer()
+        with _graph_lock:
+            if _conversation_graph is None:
+                _conversation_graph = build_agent_graph(checkpointer=checkpointer)
+    return _conversation_graph
+
+def __getattr__(name: str):
+    if name in ("app", "langgraph_app"):
+        return get_agent_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def visualize_graph(app, filename="langgraph_flow.png"):
     """
@@ -96,6 +172,8 @@ def visualize_graph(app, filename="langgraph_flow.png"):
         # Jupyter/Colab 환경일 경우 이미지를 바로 출력
         if 'ipykernel' in sys.modules:
             print("✅ Jupyter 환경에서 이미지를 출력합니다.")
+            # IPython은 Jupyter/Colab에서만 필요하므로 서버 임포트 경로에서 제외
+            from IPython.display import Image, display
             display(Image(filename=filename))
         
     except Exception as e:
@@ -115,41 +193,356 @@ def visualize_graph(app, filename="langgraph_flow.png"):
 # 3. FastAPI 애플리케이션 정의
 # ----------------------------------------------------
 
-# LangGraph 앱을 전역적으로 한 번만 초기화하여 성능을 최적화합니다.
-langgraph_app = build_agent_graph()
-
 # Pydantic 모델로 요청 바디를 정의
 class AgentRequest(BaseModel):
     """
     API 요청에 사용될 데이터 모델.
     """
     question: str
+    user_id: Optional[str] = None # 지정 시 의미 기반 답변 캐시의 사용자 범위로 사용 (없으면 질문에 포함된 ID)
+    thread_id: Optional[str] = None # 이어갈 대화 ID. 없으면 새 대화를 시작하고 응답으로 ID를 반환
+
+# 엔드포인트는 라우터에 정의하고 create_app()에서 FastAPI 앱에 등록합니다.
+router = APIRouter()
+
+log = get_logger("api")
 
-# FastAPI 앱 인스턴스 생성. 이 변수가 웹 서버의 진입점이 됩니다.
-fastapi_app = FastAPI(title="LangGraph Agent API")
+# 서버 시작 시 LLM/프롬프트/AgentExecutor/Supabase 클라이언트를 미리 생성할지 여부 (AGENT_WARMUP=0이면 첫 요청 시 생성)
+WARMUP_ON_STARTUP = os.getenv("AGENT_WARMUP", "1") == "1"
 
-@fastapi_app.post("/invoke")
-async def invoke_agent_api(request: AgentRequest):
+def warmup() -> None:
+    """지연 초기화 대상을 모두 생성합니다. (프롬프트 파일 로드, 클라이언트 생성 등 블로킹 작업이므로 스레드에서 실행)"""
+    get_conversation_graph()
+    get_supabase()
+    node.warmup()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        try:
+            await asyncio.to_thread(warmup)
+        except Exception as e:
+            # warmup 실패 시에도 서버는 시작하고, 남은 초기화는 첫 요청에서 다시 시도합니다.
+            log.warning("warmup_failed", extra={"error": f"{type(e).__name__} - {str(e)}"})
+    else:
+        get_conversation_graph()
+    yield
+    # 종료 시 write-behind 버퍼에 남은 세션을 저장하고 체크포인트 DB와 공유 HTTP 연결 풀을 닫습니다.
+    await asyncio.to_thread(SESSION_WRITE_BUFFER.close)
+    if _checkpointer is not None:
+        _checkpointer.close()
+    await aclose_pools()
+    await asyncio.to_thread(flush_spans)
+
+def create_app() -> FastAPI:
+    """FastAPI 앱 팩토리. 무거운 초기화는 lifespan에서 한 번만 수행합니다."""
+    app = FastAPI(title="LangGraph Agent API", lifespan=lifespan)
+    app.include_router(router)
+    return app
+
+# 스트리밍 시 진행 이벤트를 전달할 그래프 노드 이름
+GRAPH_NODES = ("AgentDecision", "ToolExecutor", "ResultProcessor", "ErrorHandler")
+
+# 최종 답변 토큰을 생성하는 노드 (AgentDecision의 직접 답변 또는 ResultProcessor의 Tool 결과 기반 답변)
+ANSWER_NODES = ("AgentDecision", "ResultProcessor")
+
+def build_input(question: str, user_id: Optional[str] = None, deadline: Optional[float] = None,
+                traceparent: Optional[str] = None) -> dict:
     """
-    HTTP 요청을 받아 LangGraph 에이전트를 실행합니다.
+    LangGraph의 입력 형식에 맞게 데이터를 준비합니다.
+    deadline은 이번 턴의 마감 시각(epoch 초), traceparent는 노드 span의 부모가 될 요청 span입니다.
     """
-    # LangGraph의 입력 형식에 맞게 데이터를 준비합니다.
-    input_data = {
-        "question": request.question,
-        "messages": [HumanMessage(content=request.question)],
+    return {
+        "question": question,
+        "user_id": user_id,
+        "deadline": deadline,
+        "traceparent": traceparent,
+        # 체크포인트로 이어지는 대화에서는 이전 messages 뒤에 이번 질문만 추가됩니다.
+        "messages": [HumanMessage(content=question)],
         "loop_counter": 0,
-        "tool_outputs": [],
-        "intermediate_steps": []
+        # 이전 턴의 결정/에러/도구 결과가 이번 턴 라우팅에 영향을 주지 않도록 턴 단위 필드를 초기화
+        # (None은 State의 add_or_reset 리듀서에서 초기값으로 처리)
+        "tool_outputs": None,
+        "intermediate_steps": None,
+        "llm_calls": None,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "decision": None,
+        "error_info": None,
+        "answer_cache": None,
     }
+
+def thread_config(thread_id: Optional[str]) -> dict:
+    """대화 ID로 그래프 실행 설정을 생성합니다. thread_id가 없으면 새 ID를 발급합니다."""
+    return {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
+
+def final_answer_of(result: dict) -> str:
+    """최종 State에서 사용자에게 보여줄 마지막 메시지 내용을 추출합니다."""
+    return result.get("messages", [AIMessage(content="결과 없음.")])[-1].content
+
+def answer_cache_hit(result: dict) -> bool:
+    """최종 답변이 의미 기반 답변 캐시에서 왔는지 여부."""
+    return bool((result.get("answer_cache") or {}).get("hit"))
+
+# 동일한 /invoke 요청(재시도, 중복 클릭)이 동시에 들어오면 그래프를 한 번만 실행하고 결과를 공유합니다. (AGENT_COALESCE=0이면 비활성화)
+COALESCE_ENABLED = os.getenv("AGENT_COALESCE", "1") == "1"
+INVOKE_FLIGHTS = SingleFlight()
+
+def invoke_flight_key(request: AgentRequest) -> Optional[tuple]:
+    """
+    중복 요청 판별 키: 정규화한 질문 + 사용자 + 대화 ID. (정규화 시 제거되는 질문 속 사용자 ID는 따로 포함)
+    사용자와 대화 ID가 모두 없으면 None: 서로 다른 익명 클라이언트가 합쳐지면 run_invoke가 발급한 thread_id를
+    함께 받아 같은 대화(체크포인트)를 공유하게 되므로 합치지 않습니다.
+    """
+    user_id = request.user_id or extract_user_id(request.question)
+    if user_id is None and request.thread_id is None:
+        return None
+    return (normalize_question(request.question), user_id, request.thread_id)
+
+async def run_invoke(request: AgentRequest) -> dict:
+    """그래프를 한 번 실행하여 /invoke 응답을 생성합니다. (마감 시각은 invoke_agent_api의 deadline_scope에서 전달)"""
+    deadline = current_deadline()
+    span = current_span()
+    input_data = build_input(request.question, request.user_id, deadline, span.traceparent if span else None)
+    config = thread_config(request.thread_id)
     
-    # LangGraph 앱을 동기적으로 호출합니다.
-    result = langgraph_app.invoke(input_data)
-    
-    # 최종 메시지만 추출하여 반환
-    final_message_content = result.get("messages", [AIMessage(content="결과 없음.")])[-1].content
+    # LangGraph 앱을 비동기로 호출합니다. LLM/DB 대기 중에도 이벤트 루프가 다른 요청을 처리할 수 있습니다.
+    # 같은 thread_id의 이전 State는 체크포인터에서 복원되므로 클라이언트가 대화 기록을 다시 보낼 필요가 없습니다.
+    # 노드는 마감 전에 ErrorHandler로 빠지지만, 그래도 마감을 넘기면 실행을 취소하고 504를 반환합니다.
+    try:
+        result = await run_within(deadline, get_conversation_graph().ainvoke(input_data, config=config))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail={"error_code": "DEADLINE_EXCEEDED", "message": str(e)})
+    record_request_usage(result)
     
-    return {"result": final_message_content}
+    # 최종 메시지와 요청 처리에 사용된 LLM 호출 수, 답변 캐시 사용 여부, 대화 ID를 반환
+    return {
+        "result": final_answer_of(result),
+        "llm_calls": result.get("llm_calls", 0),
+        "cached": answer_cache_hit(result),
+        "thread_id": config["configurable"]["thread_id"],
+        "trace_id": span.trace_id if span else None,
+    }
 
+# 그래프 실행 승인 제어 (동시 실행 상한, 대기열, 사용자별 요청 속도). 설정은 admission.py의 환경 변수 참고
+ADMISSION = AdmissionController()
+
+def admission_key(request: AgentRequest, http_request: Optional[Request] = None) -> Optional[str]:
+    """사용자별 요청 속도 제한 키: user_id → 질문 속 사용자 ID → 클라이언트 IP 순."""
+    user_id = request.user_id or extract_user_id(request.question)
+    if user_id:
+        return f"user:{user_id}"
+    if http_request is not None and http_request.client is not None:
+        return f"ip:{http_request.client.host}"
+    return None
+
+def too_many_requests(e: AdmissionRejected) -> HTTPException:
+    """승인 거절을 429 응답으로 변환합니다."""
+    return HTTPException(
+        status_code=429,
+        detail={"reason": e.reason, "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def deadline_of(http_request: Optional[Request] = None) -> float:
+    """요청의 마감 시각: X-Request-Timeout 헤더(초)가 있으면 그 값, 없으면 AGENT_REQUEST_TIMEOUT. (최대 AGENT_MAX_REQUEST_TIMEOUT)"""
+    header = http_request.headers.get(REQUEST_TIMEOUT_HEADER) if http_request is not None else None
+    try:
+        return request_deadline(parse_timeout_header(header))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{REQUEST_TIMEOUT_HEADER} 헤더는 0보다 큰 초 단위 숫자여야 합니다.")
+
+# 클라이언트 연결 끊김을 확인하는 주기(초)
+DISCONNECT_POLL_SECONDS = float(os.getenv("AGENT_DISCONNECT_POLL", "0.5"))
+
+class ClientDisconnected(Exception):
+    """응답을 기다리던 클라이언트의 연결이 끊어짐."""
+
+async def cancel_on_disconnect(http_request: Optional[Request], awaitable):
+    """
+    awaitable을 실행하면서 클라이언트 연결 상태를 주기적으로 확인합니다.
+    연결이 끊어지면 실행을 취소하고(그래프 실행, LLM/DB 호출 포함) ClientDisconnected를 발생시킵니다.
+    """
+    task = asyncio.ensure_future(awaitable)
+    if http_request is None:
+        return await task
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+
+@router.post("/invoke")
+async def invoke_agent_api(request: AgentRequest, http_request: Request = None):
+    """
+    HTTP 요청을 받아 LangGraph 에이전트를 실행합니다.
+    실행 중인 동일 요청이 있으면 새로 실행하지 않고 그 결과를 함께 받습니다. (응답의 coalesced=true)
+    과부하(대기열 가득 참, 대기 시간 초과) 또는 사용자별 요청 속도 초과 시 429와 Retry-After를 반환합니다.
+    X-Request-Timeout 헤더(초)로 마감 시각을 지정할 수 있으며, 마감을 넘기면 504를 반환합니다.
+    클라이언트 연결이 끊어지면 실행을 취소합니다. (같은 요청을 기다리는 다른 호출자가 있으면 계속 실행)
+    traceparent 헤더가 있으면 그 trace를 이어서 기록하며, 응답의 trace_id로 요청의 span들을 찾을 수 있습니다.
+    """
+    deadline = deadline_of(http_request)
+    parent = http_request.headers.get(TRACEPARENT_HEADER) if http_request is not None else None
+    with start_span("POST /invoke", parent=parent, kind="server", attributes={"user.id": request.user_id}) as span:
+        try:
+            ADMISSION.admit(admission_key(request, http_request))
+        except AdmissionRejected as e:
+            raise too_many_requests(e)
+
+        # 이후 생성되는 Task(중복 요청 공유 실행 포함)는 컨텍스트를 복사하므로 run_invoke에서 마감 시각과 요청 span을 읽을 수 있습니다.
+        with deadline_scope(deadline):
+            try:
+                response = await cancel_on_disconnect(http_request, invoke_admitted(request))
+            except ClientDisconnected:
+                # 클라이언트가 받지 않는 응답 (nginx의 499 Client Closed Request 관례)
+                span.record_error("client disconnected")
+                return Response(status_code=499)
+        span.set_attribute("agent.coalesced", response["coalesced"])
+        return response
+
+async def invoke_admitted(request: AgentRequest) -> dict:
+    """승인된 /invoke 요청을 실행합니다. 동일 요청이 실행 중이면 그 결과를 공유합니다."""
+    async def run_admitted():
+        # 중복 요청은 그래프를 실행하지 않으므로 실행 슬롯은 실제 실행(leader)만 사용합니다.
+        try:
+            async with ADMISSION.slot():
+                return await run_invoke(request)
+        except AdmissionRejected as e:
+            raise too_many_requests(e)
+
+    key = invoke_flight_key(request) if COALESCE_ENABLED else None
+    if key is None:
+        return {**await run_admitted(), "coalesced": False}
+    started = []
+
+    async def run_once():
+        started.append(True)
+        return await run_admitted()
+
+    response = await INVOKE_FLIGHTS.arun(key, run_once)
+    return {**response, "coalesced": not started}
+
+
+def _sse(event: str, data: dict) -> dict:
+    """sse-starlette가 전송할 Server-Sent Event 한 건을 생성합니다."""
+    return {"event": event, "data": json.dumps(data, ensure_ascii=False, default=str)}
+
+async def stream_agent_events(input_data: dict, config: Optional[dict] = None, traceparent: Optional[str] = None):
+    """
+    astream_events(v2)로 그래프를 실행하며 노드 전환, 도구 시작/종료, 답변 토큰을 SSE 이벤트로 변환합니다.
+
+    이벤트 종류:
+        node_start / node_end : {"node": 노드 이름}
+        tool_start            : {"tool": 도구 이름, "input": 인자}
+        tool_end              : {"tool": 도구 이름, "status": 도구 반환 status}
+        token                 : {"node": 노드 이름, "content": 토큰 문자열}
+        answer                : {"result", "llm_calls", "cached", "thread_id", "trace_id"}  (/invoke 응답과 동일)
+        error                 : {"message": 에러 메시지}  (대기열 시간 초과 시 retry_after 포함)
+    """
+    config = config or thread_config(None)
+    try:
+        async with ADMISSION.slot():
+            with start_span("POST /invoke/stream", parent=traceparent, kind="server") as span:
+                input_data = {**input_data, "traceparent": span.traceparent}
+                async for event in get_conversation_graph().astream_events(input_data, config=config, version="v2"):
+                    kind = event["event"]
+                    node = event.get("metadata", {}).get("langgraph_node")
+                    name = event.get("name")
+
+                    if kind in ("on_chain_start", "on_chain_end") and name in GRAPH_NODES and name == node:
+                        yield _sse("node_start" if kind == "on_chain_start" else "node_end", {"node": name})
+
+                    elif kind == "on_tool_start":
+                        yield _sse("tool_start", {"tool": name, "input": event["data"].get("input")})
+
+                    elif kind == "on_tool_end":
+                        output = event["data"].get("output")
+                        status = output.get("status") if isinstance(output, dict) else None
+                        yield _sse("tool_end", {"tool": name, "status": status})
+
+                    elif kind == "on_chat_model_stream" and node in ANSWER_NODES:
+                        content = event["data"]["chunk"].content
+                        if content:
+                            yield _sse("token", {"node": node, "content": content})
+
+                    elif kind == "on_chain_end" and not event.get("parent_ids"):
+                        # 루트 그래프 실행 종료: 최종 State에서 답변을 추출
+                        output = event["data"]["output"]
+                        record_request_usage(output)
+                        yield _sse("answer", {
+                            "result": final_answer_of(output),
+                            "llm_calls": output.get("llm_calls", 0),
+                            "cached": answer_cache_hit(output),
+                            "thread_id": config["configurable"]["thread_id"],
+                            "trace_id": span.trace_id,
+                        })
+
+    except AdmissionRejected as e:
+        yield _sse("error", {"message": f"요청이 많아 처리할 수 없습니다: {e.reason}", "retry_after": e.retry_after})
+    except Exception as e:
+        yield _sse("error", {"message": f"{type(e).__name__} - {str(e)}"})
+
+@router.post("/invoke/stream")
+async def invoke_agent_stream_api(request: AgentRequest, http_request: Request = None):
+    """
+    /invoke와 같은 그래프를 실행하되, 진행 상황과 답변 토큰을 Server-Sent Events로 스트리밍합니다.
+    마감 시각은 State로 전달되며, 연결이 끊어지면 sse-starlette가 스트림(그래프 실행)을 취소합니다.
+    """
+    deadline = deadline_of(http_request)
+    try:
+        ADMISSION.admit(admission_key(request, http_request))
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+    parent = http_request.headers.get(TRACEPARENT_HEADER) if http_request is not None else None
+    return EventSourceResponse(stream_agent_events(
+        build_input(request.question, request.user_id, deadline), thread_config(request.thread_id), parent
+    ))
+
+@router.get("/analytics/{user_id}")
+async def training_analytics_api(user_id: str, exercise: Optional[str] = None, weeks: int = 12):
+    """
+    get_training_analytics 도구와 같은 분석 결과를 LLM 호출 없이 반환합니다. (웹 클라이언트 차트/비교 카드용)
+    """
+    try:
+        return await afetch_training_analytics(user_id, exercise, weeks)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"훈련 분석 실패: {type(e).__name__} - {str(e)}")
+
+@router.get("/stats")
+async def stats_api():
+    """
+    캐시 등 런타임 구성 요소의 카운터를 반환합니다. (용량 산정 및 운영 모니터링용)
+    """
+    return {
+        "history_cache": HISTORY_CACHE.stats(),
+        "history_flights": HISTORY_FLIGHTS.stats(),
+        "invoke_flights": INVOKE_FLIGHTS.stats(),
+        "answer_cache": node.ANSWER_CACHE.stats(),
+        "checkpoints": get_checkpointer().stats(),
+        "aggregates": AGGREGATES.stats(),
+        "session_store": SESSION_STORE.stats(),
+        "http_pools": pool_stats(),
+        "admission": ADMISSION.stats(),
+        "resilience": resilience_stats(),
+        "tracing": tracing_stats(),
+    }
+
+@router.get("/metrics")
+async def metrics_api():
+    """
+    Prometheus 형식의 메트릭 (노드 실행 시간, 도구/DB 지연 히스토그램, LLM 호출 수와 토큰 수). 항목은 observability.py 참고
+    """
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+# FastAPI 앱 인스턴스. 이 변수가 웹 서버의 진입점이 됩니다. (uvicorn graph_builder:fastapi_app)
+fastapi_app = create_app()
 
 
 # ----------------------------------------------------
@@ -162,28 +555,23 @@ if __name__ == "__main__":
     # 기존의 로컬 테스트 및 시각화 로직을 그대로 유지합니다.
     
     # Graph 시각화 및 구조 점검
+    langgraph_app = get_agent_graph()
     visualize_graph(langgraph_app)
     
     # 구조 확인 후, 최소 기능 통합 테스트 실행 (선택 사항)
     print("\n--- 최소 기능 Graph 실행 (테스트 입력) ---")
     try:
         test_question = f"내 운동 기록을 조회해 줘. 사용자 ID는 '7356cf0e-19c2-4aef-982b-2607fdc00752'야"
-        input_data = {
-            "question": test_question,
-            "messages": [HumanMessage(content=test_question)],
-            "loop_counter": 0,
-            "tool_outputs": [],
-            "intermediate_steps": []
-        }
+        input_data = build_input(test_question)
         
         # 실제 데이터베이스 연결 및 LLM 호출이 발생합니다.
         result = langgraph_app.invoke(input_data)
         
         print("\n--- Graph 실행 결과 (최종 State) ---")
         # 최종 메시지만 깔끔하게 출력
-        final_message_content = result.get("messages", [AIMessage(content="결과 없음.")])[-1].content
-        print(f"Answer: {final_message_content}")
+        print(f"Answer: {final_answer_of(result)}")
         print(f"Active Node: {result.get('active_node')}")
+        print(f"LLM Calls: {result.get('llm_calls', 0)}")
         
     except Exception as e:
         print(f"\n❌ Graph 실행 중 오류 발생 (DB/LLM 연결 문제일 수 있음): {type(e).__name__} - {str(e)}")
\ No newline at end of file
@@ -0,0 +1,147 @@
+# history.py
+
+import os
+import json
+import threading
+from typing import Callable, List, NamedTuple, Optional, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# ----------------------------------------------------
+# 대화 기록 압축: 토큰 예산 안의 최근 턴만 그대로 전달하고, 이전 턴은 누적 요약으로 대체
+# ----------------------------------------------------
+
+# 최근 턴에 사용할 토큰 예산 (요약 메시지 제외)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+# 누적 요약의 토큰 상한 (넘으면 가장 오래된 요약 줄부터 제거)
+SUMMARY_TOKEN_BUDGET = int(os.getenv("HISTORY_SUMMARY_TOKEN_BUDGET", "500"))
+# 예산 안에 남은 턴이라도 ToolMessage 하나가 차지할 수 있는 최대 토큰
+TOOL_MESSAGE_TOKEN_CAP = int(os.getenv("HISTORY_TOOL_MESSAGE_TOKEN_CAP", "800"))
+
+# 요약 줄에 남길 질문/답변 길이 (문자)
+_SUMMARY_QUESTION_CHARS = 150
+_SUMMARY_ANSWER_CHARS = 200
+# 메시지 하나당 역할/구분자 오버헤드 (OpenAI chat 포맷 기준 근사치)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# --- 토큰 계산 ---
+
+_encoding = None
+_encoding_failed = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """tiktoken 인코딩을 한 번만 로드합니다. 로드할 수 없으면(오프라인 등) None을 반환하고 근사치를 사용합니다."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        with _encoding_lock:
+            if _encoding is None and not _encoding_failed:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception:
+                    _encoding_failed = True
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """텍스트의 토큰 수. tiktoken을 사용할 수 없으면 ASCII 4자당 1토큰, 그 외 문자 1자당 1토큰으로 근사합니다."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+
+def message_tokens(message: BaseMessage) -> int:
+    """메시지 하나의 토큰 수 (내용 + tool_call 인자 + 오버헤드)."""
+    tokens = count_tokens(_content_text(message)) + _MESSAGE_OVERHEAD_TOKENS
+    if isinstance(message, AIMessage):
+        for call in message.tool_calls:
+            tokens += count_tokens(call["name"]) + count_tokens(json.dumps(call["args"], ensure_ascii=False))
+    return tokens
+
+def truncate_tool_message(message: BaseMessage, max_tokens: int = TOOL_MESSAGE_TOKEN_CAP) -> BaseMessage:
+    """ToolMessage 내용이 max_tokens를 넘으면 앞부분만 남깁니다. (다른 메시지는 그대로 반환)"""
+    if not isinstance(message, ToolMessage):
+        return message
+    text = _content_text(message)
+    tokens = count_tokens(text)
+    if tokens <= max_tokens:
+        return message
+    keep_chars = max(int(len(text) * max_tokens / tokens), 0)
+    return message.model_copy(update={"content": text[:keep_chars] + " …(이전 도구 결과 일부 생략)"})
+
+# --- 턴 분할 / 요약 ---
+
+def split_turns(messages: List[BaseMessage]) -> List[Tuple[int, int]]:
+    """HumanMessage를 시작으로 하는 턴 구간 [(start, end), ...]을 반환합니다."""
+    starts = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts
+    return [(start, end) for start, end in zip(starts, starts[1:] + [len(messages)]) if start < end]
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+def summarize_turns(previous_summary: Optional[str], messages: List[BaseMessage],
+                    max_tokens: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """
+    이전 요약에 새로 밀려난 턴들의 (질문, 최종 답변) 요약 줄을 추가합니다.
+    LLM을 호출하지 않는 추출식 요약이므로 AgentDecision 지연 시간에 영향을 주지 않으며,
+    max_tokens를 넘으면 가장 오래된 줄부터 제거하여 요약 크기를 일정하게 유지합니다.
+    """
+    lines = previous_summary.splitlines() if previous_summary else []
+    for start, end in split_turns(messages):
+        turn = messages[start:end]
+        question = next((_content_text(m) for m in turn if isinstance(m, HumanMessage)), "")
+        answer = next((_content_text(m) for m in reversed(turn) if isinstance(m, AIMessage) and m.content), "")
+        if question or answer:
+            lines.append(f"- 사용자: {_shorten(question, _SUMMARY_QUESTION_CHARS)} / 답변: {_shorten(answer, _SUMMARY_ANSWER_CHARS)}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def summary_message(summary: str) -> SystemMessage:
+    return SystemMessage(content=f"이전 대화 요약 (오래된 순):\n{summary}")
+
+# --- 압축 ---
+
+class CompactedHistory(NamedTuple):
+    messages: List[BaseMessage] # LLM에 전달할 chat_history (요약 메시지 + 예산 안의 최근 턴)
+    summary: Optional[str]      # 갱신된 누적 요약
+    cursor: int                 # 요약에 포함된 메시지 수 (history 기준 인덱스)
+
+def compact_history(history: List[BaseMessage], summary: Optional[str] = None, cursor: int = 0,
+                    budget: int = HISTORY_TOKEN_BUDGET,
+                    summarize: Callable[[Optional[str], List[BaseMessage]], str] = summarize_turns) -> CompactedHistory:
+    """
+    history(현재 질문 이전의 메시지)를 토큰 예산에 맞게 압축합니다.
+
+    - cursor 이전 메시지는 이미 summary에 반영되어 있으므로 다시 읽지 않습니다. (증분 요약)
+    - 최신 턴부터 거꾸로 예산 안에 들어가는 턴까지 그대로 유지하고(최신 턴 1개는 항상 유지),
+      예산 밖으로 밀려난 턴만 summarize()로 기존 요약에 합칩니다.
+    """
+    cursor = min(max(cursor, 0), len(history))
+    window = history[cursor:]
+    turns = split_turns(window)
+
+    keep_from = len(window)
+    used = 0
+    for start, end in reversed(turns):
+        turn_tokens = sum(message_tokens(truncate_tool_message(m)) for m in window[start:end])
+        if keep_from != len(window) and used + turn_tokens > budget:
+            break
+        used += turn_tokens
+        keep_from = start
+
+    if keep_from > 0:
+        summary = summarize(summary, window[:keep_from])
+        cursor += keep_from
+
+    kept = [truncate_tool_message(m) for m in history[cursor:]]
+    return CompactedHistory(([summary_message(summary)] if summary else []) + kept, summary, cursor)
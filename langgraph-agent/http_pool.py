@@ -0,0 +1,347 @@
+# http_pool.py
+
+import os
+import time
+import asyncio
+import threading
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from deadline import DeadlineExceeded, current_remaining
+
+# ----------------------------------------------------
+# 공유 HTTP 연결 풀: Supabase(PostgREST)와 OpenAI 호출이 keep-alive 연결을 재사용
+# ----------------------------------------------------
+# 의존성(supabase, openai)마다 이름 있는 풀(HTTPPool)을 하나씩 두고, 동기/비동기 httpx 클라이언트를
+# 프로세스당 한 번만 생성합니다. (postgrest는 전달받은 클라이언트의 base_url을 자기 URL로 바꾸므로
+# 서로 다른 서비스가 같은 클라이언트를 공유하지 않도록 의존성별로 분리합니다.)
+#
+# 환경 변수 (HTTP_POOL_<KEY>가 공통 값, HTTP_POOL_<NAME>_<KEY>가 의존성별 값. 예: HTTP_POOL_OPENAI_MAX_CONNECTIONS)
+#   - MAX_CONNECTIONS  : 풀 전체의 최대 동시 연결 수
+#   - MAX_KEEPALIVE    : 유휴 상태로 유지할 keep-alive 연결 수
+#   - KEEPALIVE_EXPIRY : 유휴 연결을 닫기까지의 시간(초)
+#   - MAX_PER_HOST     : 호스트별 동시 요청 수 상한 (초과 요청은 POOL_TIMEOUT까지 대기)
+#   - HTTP2            : "1"이면 h2 패키지가 설치된 경우 HTTP/2 사용
+#   - TIMEOUT / CONNECT_TIMEOUT / POOL_TIMEOUT : 요청 전체 / 연결 / 연결·슬롯 대기 제한 시간(초)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# 공통 기본값
+POOL_DEFAULTS: Dict[str, Any] = {
+    "MAX_CONNECTIONS": 100,
+    "MAX_KEEPALIVE": 20,
+    "KEEPALIVE_EXPIRY": 30.0,
+    "MAX_PER_HOST": 50,
+    "HTTP2": True,
+    "TIMEOUT": 60.0,
+    "CONNECT_TIMEOUT": 5.0,
+    "POOL_TIMEOUT": 10.0,
+}
+
+# 의존성별 기본값 (기존 postgrest_client_timeout=10 유지)
+DEPENDENCY_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "supabase": {"TIMEOUT": 10.0},
+    "openai": {"TIMEOUT": 120.0},
+}
+
+def _setting(name: str, key: str) -> Any:
+    default = DEPENDENCY_DEFAULTS.get(name, {}).get(key, POOL_DEFAULTS[key])
+    raw = os.getenv(f"HTTP_POOL_{name.upper()}_{key}", os.getenv(f"HTTP_POOL_{key}"))
+    if raw is None:
+        return default
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    return type(default)(raw)
+
+class PoolConfig:
+    """풀 하나의 설정. 값이 없으면 환경 변수 → 의존성별 기본값 → 공통 기본값 순으로 결정됩니다."""
+
+    def __init__(self, name: str, **overrides: Any):
+        values = {key: overrides.get(key.lower(), _setting(name, key)) for key in POOL_DEFAULTS}
+        self.max_connections = int(values["MAX_CONNECTIONS"])
+        self.max_keepalive = min(int(values["MAX_KEEPALIVE"]), self.max_connections)
+        self.keepalive_expiry = float(values["KEEPALIVE_EXPIRY"])
+        self.max_per_host = max(1, int(values["MAX_PER_HOST"]))
+        self.http2 = bool(values["HTTP2"]) and HTTP2_AVAILABLE
+        self.timeout = float(values["TIMEOUT"])
+        self.connect_timeout = float(values["CONNECT_TIMEOUT"])
+        self.pool_timeout = float(values["POOL_TIMEOUT"])
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    @property
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout, pool=self.pool_timeout)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "max_per_host": self.max_per_host,
+            "http2": self.http2,
+            "timeout": self.timeout,
+        }
+
+# ----------------------------------------------------
+# 1. 호스트별 동시 요청 제한 + 사용량 카운터
+# ----------------------------------------------------
+
+class _PoolCounters:
+    """동기/비동기 전송 계층이 함께 갱신하는 카운터. (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+        self.host_in_flight: Dict[str, int] = {}
+
+    def waiting_started(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def started(self, host: str, waited: float) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.requests += 1
+            self.wait_seconds += waited
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.host_in_flight[host] = self.host_in_flight.get(host, 0) + 1
+
+    def rejected(self) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.errors += 1
+
+    def finished(self, host: str, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.errors += int(failed)
+            remaining = self.host_in_flight.get(host, 1) - 1
+            if remaining:
+                self.host_in_flight[host] = remaining
+            else:
+                self.host_in_flight.pop(host, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "waiting": self.waiting,
+                "avg_wait_ms": round(self.wait_seconds / self.requests * 1000, 2) if self.requests else 0.0,
+                "hosts": dict(self.host_in_flight),
+            }
+
+def _apply_deadline(request: httpx.Request) -> Optional[float]:
+    """
+    요청 마감 시각(deadline.deadline_scope)이 있으면 이 요청의 connect/read/write/pool 제한 시간을 남은 시간으로 줄이고
+    남은 시간을 반환합니다. 이미 지났으면 연결하지 않고 DeadlineExceeded를 발생시킵니다.
+    """
+    left = current_remaining()
+    if left is None:
+        return None
+    if left <= 0:
+        raise DeadlineExceeded(f"{request.url.host} 요청 전에 마감 시각이 지났습니다.")
+    timeouts = dict(request.extensions.get("timeout") or {})
+    for key in ("connect", "read", "write", "pool"):
+        value = timeouts.get(key)
+        timeouts[key] = left if value is None else min(value, left)
+    request.extensions["timeout"] = timeouts
+    return left
+
+def _host_key(request: httpx.Request) -> str:
+    url = request.url
+    return f"{url.host}:{url.port}" if url.port else url.host
+
+def _connection_counts(pool: Any) -> Tuple[int, int]:
+    """httpcore 연결 풀의 (열린 연결 수, 유휴 연결 수). 내부 구조를 알 수 없으면 (0, 0)."""
+    connections = list(getattr(pool, "connections", None) or [])
+    idle = sum(1 for connection in connections if getattr(connection, "is_idle", lambda: False)())
+    return len(connections), idle
+
+class PooledTransport(httpx.HTTPTransport):
+    """호스트별 동시 요청 수를 MAX_PER_HOST로 제한하고 사용량을 기록하는 동기 전송 계층."""
+
+    def __init__(self, config: PoolConfig, counters: _PoolCounters):
+        super().__init__(limits=config.limits, http2=config.http2)
+        self._config = config
+        self._counters = counters
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._slots_lock:
+            slot = self._slots.get(host)
+            if slot is None:
+                slot = self._slots[host] = threading.BoundedSemaphore(self._config.max_per_host)
+            return slot
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        left = _apply_deadline(request)
+        host = _host_key(request)
+        slot = self._slot(host)
+        self._counters.waiting_started()
+        started = time.perf_counter()
+        if not slot.acquire(timeout=min(self._config.pool_timeout, left or self._config.pool_timeout)):
+            self._counters.rejected()
+            raise httpx.PoolTimeout(f"{host} 호스트별 동시 요청 상한({self._config.max_per_host}) 대기 시간 초과", request=request)
+        self._counters.started(host, time.perf_counter() - started)
+        failed = True
+        try:
+            response = super().handle_request(request)
+            failed = False
+            return response
+        finally:
+            # 응답 본문은 호출자가 읽으므로 슬롯은 요청 전송/헤더 수신까지만 점유합니다.
+            slot.release()
+            self._counters.finished(host, failed)
+
+    def connection_counts(self) -> Tuple[int, int]:
+        return _connection_counts(self._pool)
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """PooledTransport의 비동기 버전. 세마포어는 이벤트 루프별로 생성합니다."""
+
+    def __init__(self, config: PoolConfig, counters: _PoolCounters):
+        super().__init__(limits=config.limits, http2=config.http2)
+        self._config = config
+        self._counters = counters
+        self._slots: Dict[Tuple[int, str], asyncio.Semaphore] = {}
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        key = (id(asyncio.get_running_loop()), host)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = asyncio.Semaphore(self._config.max_per_host)
+        return slot
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        left = _apply_deadline(request)
+        host = _host_key(request)
+        slot = self._slot(host)
+        self._counters.waiting_started()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout=min(self._config.pool_timeout, left or self._config.pool_timeout))
+        except asyncio.TimeoutError:
+            self._counters.rejected()
+            raise httpx.PoolTimeout(f"{host} 호스트별 동시 요청 상한({self._config.max_per_host}) 대기 시간 초과", request=request)
+        except BaseException:
+            self._counters.rejected()
+            raise
+        self._counters.started(host, time.perf_counter() - started)
+        failed = True
+        try:
+            response = await super().handle_async_request(request)
+            failed = False
+            return response
+        finally:
+            slot.release()
+            self._counters.finished(host, failed)
+
+    def connection_counts(self) -> Tuple[int, int]:
+        return _connection_counts(self._pool)
+
+# ----------------------------------------------------
+# 2. 이름 있는 풀 (의존성별 동기/비동기 클라이언트)
+# ----------------------------------------------------
+
+class HTTPPool:
+    """
+    의존성 하나가 사용하는 동기/비동기 httpx 클라이언트를 지연 생성하여 공유합니다.
+
+    - client()       : 동기 호출 경로(스레드 풀 포함)가 공유하는 httpx.Client
+    - async_client() : 이벤트 루프 경로가 공유하는 httpx.AsyncClient
+    - stats()        : 설정값, 요청/대기/진행 중 카운터, 열린·유휴 연결 수, 사용률(in_flight / max_connections)
+    """
+
+    def __init__(self, name: str, config: Optional[PoolConfig] = None):
+        self.name = name
+        self.config = config or PoolConfig(name)
+        self._counters = _PoolCounters()
+        self._client: Optional[httpx.Client] = None
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+
+    def client(self) -> httpx.Client:
+        if self._client is None or self._client.is_closed:
+            with self._lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = httpx.Client(transport=PooledTransport(self.config, self._counters),
+                                                timeout=self.config.timeouts, follow_redirects=True)
+        return self._client
+
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None or self._async_client.is_closed:
+            with self._lock:
+                if self._async_client is None or self._async_client.is_closed:
+                    self._async_client = httpx.AsyncClient(transport=AsyncPooledTransport(self.config, self._counters),
+                                                           timeout=self.config.timeouts, follow_redirects=True)
+        return self._async_client
+
+    def stats(self) -> Dict[str, Any]:
+        counters = self._counters.snapshot()
+        open_connections = idle_connections = 0
+        for client in (self._client, self._async_client):
+            if client is not None and not client.is_closed:
+                opened, idle = client._transport.connection_counts()
+                open_connections += opened
+                idle_connections += idle
+        return {
+            **self.config.as_dict(),
+            **counters,
+            "open_connections": open_connections,
+            "idle_connections": idle_connections,
+            "utilization": round(counters["in_flight"] / self.config.max_connections, 3),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        with self._lock:
+            client, self._async_client = self._async_client, None
+        if client is not None:
+            await client.aclose()
+
+_pools: Dict[str, HTTPPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name: str) -> HTTPPool:
+    """이름(의존성)별 풀을 반환합니다. (프로세스당 한 번만 생성)"""
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = _pools[name] = HTTPPool(name)
+    return pool
+
+def pool_stats() -> Dict[str, Dict[str, Any]]:
+    """생성된 모든 풀의 사용량. (/stats의 http_pools)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+async def aclose_pools() -> None:
+    """서버 종료 시 모든 풀의 연결을 닫습니다."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        await pool.aclose()
@@ -1,31 +1,410 @@
 # node.py
 
+import os
 import json
+import time
+import logging
+import threading
+import asyncio
+import functools
+import contextvars
+import concurrent.futures
+from datetime import datetime
 from typing import Dict, Any, List, Literal, Union
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, BaseMessage
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain import hub
-from langchain.agents import create_tool_calling_agent, AgentExecutor
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables import RunnableConfig, ensure_config
 from state import State, AgentDecisionModel, ErrorInfo # state.py에서 정의된 클래스 임포트
-from supabase_tools import get_workout_history, add_workout_session # 실제 도구 임포트
+from tool_registry import ToolRegistry, ToolArgumentError
+from prompt_store import load_prompt
+from semantic_cache import SemanticAnswerCache, extract_user_id
+from history import CompactedHistory, compact_history, summary_message, truncate_tool_message
+from result_shaping import tool_message_content
+from http_pool import get_pool
+from resilience import OPENAI, USER_MESSAGES
+from tracing import current_span
+from observability import get_logger, observed_node, observe_tool, record_llm_call, record_llm_tokens, tool_scope
+from deadline import (
+    DeadlineExceeded, ANSWER_RESERVE_SECONDS, MIN_LLM_SECONDS,
+    bounded_timeout, deadline_expired, deadline_scope, has_time_for, run_within,
+)
+from supabase_tools import get_workout_history, add_workout_session, add_workout_sessions, get_training_analytics, get_training_stats, get_coaching_context # 실제 도구 임포트
+from supabase_tools import afetch_head_row, fetch_head_row, head_version
 
 # ----------------------------------------------------
 # 0. 초기 설정 및 도구 바인딩
 # ----------------------------------------------------
 
+log = get_logger("node")
+
 # AgentExecutor에서 사용할 전체 도구 목록
-TOOLS = [get_workout_history, add_workout_session]
+TOOLS = [get_workout_history, add_workout_session, add_workout_sessions, get_training_analytics, get_training_stats, get_coaching_context]
+
+# ToolExecutor에서 사용할 도구 레지스트리 (이름 인덱스와 인자 검증기를 시작 시 한 번만 생성)
+TOOL_REGISTRY = ToolRegistry(TOOLS)
+
+# AgentDecision 실행 모드 (환경 변수 AGENT_DECISION_MODE)
+#   - "executor"    : AgentExecutor 전체 루프로 결정하고, ResultProcessor에서 Agent를 다시 호출 (기존 방식)
+#   - "single_pass" : TOOLS를 바인딩한 LLM을 한 번 호출하여 tool_call/final_answer를 구조화된 응답으로 받고,
+#                     Tool 결과가 있을 때만 ResultProcessor에서 한 번 더 호출 (결정 1회 + 답변 1회)
+DECISION_MODE = os.getenv("AGENT_DECISION_MODE", "executor")
+
+# ----------------------------------------------------
+# 0-1. LLM / 프롬프트 / AgentExecutor 지연 초기화
+# ----------------------------------------------------
+# 모듈 임포트 시에는 네트워크 호출이나 클라이언트 생성을 하지 않고, 처음 사용할 때(또는 warmup()에서)
+# 한 번만 생성합니다. 생성된 객체는 모듈 전역(node.llm, node.agent_executor 등)에 저장되므로
+# 기존처럼 `from node import agent_executor` 또는 patch('node.agent_executor')로 접근할 수 있습니다.
+
+_init_lock = threading.RLock()
+
+def _lazy(name: str, factory):
+    """모듈 전역 name이 없으면 factory()로 한 번만 생성하여 저장하고 반환합니다. (스레드 안전)"""
+    value = globals().get(name)
+    if value is None:
+        with _init_lock:
+            value = globals().get(name)
+            if value is None:
+                value = factory()
+                globals()[name] = value
+    return value
+
+def _resilient_chat_model_class():
+    """
+    OpenAI 호출에 재시도/서킷 브레이커(resilience.OPENAI)를 적용한 ChatOpenAI 하위 클래스.
+    스트리밍 호출은 첫 토큰을 받기 전의 실패만 재시도합니다. (langchain_openai 임포트 비용도 첫 사용 시점으로 미룹니다.)
+    """
+    from langchain_openai import ChatOpenAI
+
+    class ResilientChatOpenAI(ChatOpenAI):
+        def _generate(self, *args, **kwargs):
+            return OPENAI.call(lambda: ChatOpenAI._generate(self, *args, **kwargs))
+
+        async def _agenerate(self, *args, **kwargs):
+            return await OPENAI.acall(lambda: ChatOpenAI._agenerate(self, *args, **kwargs))
+
+        def _stream(self, *args, **kwargs):
+            return OPENAI.stream(lambda: ChatOpenAI._stream(self, *args, **kwargs))
+
+        def _astream(self, *args, **kwargs):
+            return OPENAI.astream(lambda: ChatOpenAI._astream(self, *args, **kwargs))
+
+    return ResilientChatOpenAI
+
+def _build_chat_model():
+    chat_model_class = _lazy("ResilientChatOpenAI", _resilient_chat_model_class)
+    # LLM 초기화 (gpt-4가 추론 및 Tool Calling 성능이 더 좋으므로, 필요시 gpt-4o-mini로 변경 가능)
+    # 모든 ChatOpenAI 인스턴스가 공유 연결 풀(http_pool)의 keep-alive / HTTP/2 연결을 재사용합니다.
+    # 재시도는 resilience.OPENAI에서 한 번만 수행하도록 SDK 자체 재시도(max_retries)는 끕니다.
+    # 스트리밍 응답에서도 토큰 사용량(usage_metadata)을 받아 메트릭에 기록할 수 있도록 stream_usage를 켭니다.
+    pool = get_pool("openai")
+    return chat_model_class(model="gpt-4", temperature=0, max_retries=0, stream_usage=True,
+                            http_client=pool.client(), http_async_client=pool.async_client())
+
+# Agent 프롬프트 (system / chat_history / input / agent_scratchpad)
+# hub.pull 대신 prompts/에 버전 관리되는 로컬 사본을 사용합니다. (갱신: python prompt_store.py refresh <이름>)
+AGENT_PROMPT_NAME = os.getenv("AGENT_PROMPT_NAME", "hwchase17/openai-tools-agent")
 
-# LLM 초기화 (gpt-4가 추론 및 Tool Calling 성능이 더 좋으므로, 필요시 gpt-4o-mini로 변경 가능)
-llm = ChatOpenAI(model="gpt-4", temperature=0)
+def _load_agent_prompt():
+    return load_prompt(AGENT_PROMPT_NAME)
 
-# Decision 노드에서 사용할 LLM (gpt-4로 )
-llm_decision = ChatOpenAI(model="gpt-4", temperature=0)
+def _build_agent_executor():
+    from langchain.agents import create_tool_calling_agent, AgentExecutor
+    # Agent Executor 설정 (Tool 호출 로직 처리를 위해 필요)
+    agent = _lazy("agent", lambda: create_tool_calling_agent(get_llm(), TOOLS, get_agent_prompt()))
+    # 단계별 상세 출력(stdout)은 LOG_LEVEL=DEBUG일 때만 켭니다.
+    return AgentExecutor(agent=agent, tools=TOOLS, verbose=log.isEnabledFor(logging.DEBUG))
 
-# Agent Executor 설정 (Tool 호출 로직 처리를 위해 필요)
-agent = create_tool_calling_agent(llm, TOOLS, hub.pull("hwchase17/openai-tools-agent"))
-agent_executor = AgentExecutor(agent=agent, tools=TOOLS, verbose=True)
+def get_llm():
+    """답변 생성 및 AgentExecutor에서 사용할 LLM."""
+    return _lazy("llm", _build_chat_model)
+
+def get_llm_decision():
+    """Decision 노드에서 사용할 LLM."""
+    return _lazy("llm_decision", _build_chat_model)
+
+def get_agent_prompt():
+    return _lazy("AGENT_PROMPT", _load_agent_prompt)
+
+def get_agent_executor():
+    return _lazy("agent_executor", _build_agent_executor)
+
+def get_llm_with_tools():
+    """single_pass 모드 결정용 LLM: 도구 호출을 허용합니다."""
+    return _lazy("llm_with_tools", lambda: get_llm_decision().bind_tools(TOOLS))
+
+def get_llm_answer():
+    """single_pass 모드 답변용 LLM: 도구 호출을 막습니다."""
+    return _lazy("llm_answer", lambda: get_llm().bind_tools(TOOLS, tool_choice="none"))
+
+# 모듈 속성으로 접근 가능한 지연 객체 (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "llm_decision": get_llm_decision,
+    "AGENT_PROMPT": get_agent_prompt,
+    "agent": lambda: get_agent_executor().agent,
+    "agent_executor": get_agent_executor,
+    "llm_with_tools": get_llm_with_tools,
+    "llm_answer": get_llm_answer,
+}
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warmup() -> None:
+    """서버 시작 시(FastAPI lifespan) 모든 지연 객체를 미리 생성하여 첫 요청 지연을 없앱니다."""
+    for factory in _LAZY_ATTRIBUTES.values():
+        factory()
+
+# ToolExecutor 동시 실행 설정 (환경 변수로 조정)
+#   - TOOL_MAX_CONCURRENCY : 동시에 실행할 도구 호출 수 상한 (동기 경로의 공유 스레드 풀 크기)
+#   - TOOL_CALL_TIMEOUT    : 도구 호출별 제한 시간(초). 초과 시 TOOL_TIMEOUT 에러로 ErrorHandler에 전달
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "8"))
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "15"))
+_TOOL_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=TOOL_MAX_CONCURRENCY, thread_name_prefix="tool")
+
+# ----------------------------------------------------
+# 요청 마감 시각 (State.deadline): 노드 안의 LLM/도구/HTTP 호출이 남은 시간에 맞춰 제한 시간을 줄임
+# ----------------------------------------------------
+
+def _deadline_bound(node_fn):
+    """노드 함수가 state["deadline"]을 컨텍스트 변수로 설정한 채 실행되도록 감쌉니다. (동기/비동기 모두)"""
+    if asyncio.iscoroutinefunction(node_fn):
+        @functools.wraps(node_fn)
+        async def async_wrapper(state: State):
+            with deadline_scope(state.get("deadline")):
+                return await node_fn(state)
+        return async_wrapper
+
+    @functools.wraps(node_fn)
+    def wrapper(state: State):
+        with deadline_scope(state.get("deadline")):
+            return node_fn(state)
+    return wrapper
+
+def _is_deadline_error(e: BaseException) -> bool:
+    """마감 시각 초과로 발생한(또는 마감이 지난 뒤 발생한) 예외인지 여부."""
+    return isinstance(e, DeadlineExceeded) or deadline_expired()
+
+def _deadline_error(node_name: str) -> ErrorInfo:
+    # 남은 시간이 부족해 작업을 시작하지 않았거나 중단한 경우 (ErrorHandler로)
+    return ErrorInfo(
+        error_code="DEADLINE_EXCEEDED",
+        message=f"{node_name}: 요청 마감 시각까지 남은 시간이 부족하여 작업을 중단했습니다.",
+        user_message=USER_MESSAGES["DEADLINE_EXCEEDED"],
+        node=node_name
+    )
+
+# ----------------------------------------------------
+# LLM 호출 횟수 집계 (요청당 LLM 호출 수를 State.llm_calls에 누적)
+# ----------------------------------------------------
+
+class LLMCallCounter(BaseCallbackHandler):
+    """
+    하나의 노드 실행 동안 시작된 LLM 호출 수와 프롬프트/응답 토큰 수를 집계하는 콜백 핸들러.
+    node를 지정하면 노드별 LLM 호출/토큰 메트릭(observability)에도 기록합니다.
+    """
+    run_inline = True
+
+    def __init__(self, node: str = None):
+        self.node = node
+        self.count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _started(self) -> None:
+        self.count += 1
+        if self.node:
+            record_llm_call(self.node)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._started()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._started()
+
+    def on_llm_end(self, response, **kwargs):
+        prompt_tokens, completion_tokens = _token_usage(response)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if self.node:
+            record_llm_tokens(self.node, prompt_tokens, completion_tokens)
+
+    def usage(self) -> Dict[str, int]:
+        """State에 누적할 LLM 사용량 (llm_calls, prompt_tokens, completion_tokens)."""
+        return {"llm_calls": self.count, "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+def _token_usage(response) -> tuple:
+    """
+    LLMResult의 (프롬프트 토큰, 응답 토큰) 수.
+    메시지의 usage_metadata(스트리밍 포함)를 우선 사용하고, 없으면 llm_output["token_usage"]를 사용합니다.
+    """
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+    if prompt_tokens or completion_tokens:
+        return prompt_tokens, completion_tokens
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+def _counted_config(counter: LLMCallCounter) -> RunnableConfig:
+    """
+    현재 노드의 실행 설정(부모 콜백 포함)에 counter를 추가한 RunnableConfig를 반환합니다.
+    config={"callbacks": [...]}를 그대로 넘기면 부모 콜백(스트리밍/추적)이 대체되므로 병합합니다.
+    """
+    config = ensure_config()
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(counter, inherit=True)
+    else:
+        callbacks = list(callbacks or []) + [counter]
+    return {**config, "callbacks": callbacks}
+
+# ----------------------------------------------------
+# 0-3. 의미 기반 답변 캐시 (AgentDecision 앞단에서 조회, ResultProcessor에서 저장)
+# ----------------------------------------------------
+
+# 환경 변수 SEMANTIC_CACHE=0이면 비활성화
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") == "1"
+
+ANSWER_CACHE = SemanticAnswerCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9")),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2048")),
+    ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+)
+
+def _answer_cache_target(state: State) -> Union[Dict[str, Any], None]:
+    """
+    캐시 조회/저장에 사용할 범위(user_id, question)를 계산합니다.
+    이전 대화 맥락에 의존하는 후속 질문(HumanMessage가 2개 이상)은 캐시하지 않습니다.
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if sum(isinstance(m, HumanMessage) for m in state["messages"]) != 1:
+        return None
+    question = state.get("question") or extract_message_content(state["messages"][-1])
+    user_id = state.get("user_id") or extract_user_id(question)
+    return {"user_id": user_id, "question": question, "hit": False, "version": None, "started_at": time.time()}
+
+def _version_unavailable(e: Exception) -> None:
+    # 데이터 버전을 확인할 수 없으면 오래된 답변을 사용하지 않도록 이번 요청은 캐시를 건너뜁니다.
+    log.warning("answer_cache_skipped", extra={"error": f"{type(e).__name__} - {str(e)}"})
+
+def _answer_cache_scope(state: State) -> Union[Dict[str, Any], None]:
+    """
+    캐시 범위와 사용자 데이터 버전. 버전(DB 최신 행)은 캐시에 후보 답변이 있을 때만 조회해 hit을 검증하므로,
+    다른 프로세스의 쓰기(web/server.js 등) 이후에는 캐시된 답변이 사용되지 않고 후보가 없는 턴은 DB를 조회하지 않습니다.
+    후보가 없으면 version은 None이며, 답변을 저장할 때 조회합니다. (_store_cached_answer)
+    """
+    scope = _answer_cache_target(state)
+    if scope is None or not ANSWER_CACHE.probe(scope["user_id"], scope["question"]):
+        return scope
+    try:
+        version = head_version(fetch_head_row(scope["user_id"])) if scope["user_id"] else 0
+    except Exception as e:
+        return _version_unavailable(e)
+    return {**scope, "version": version}
+
+async def _aanswer_cache_scope(state: State) -> Union[Dict[str, Any], None]:
+    """_answer_cache_scope의 비동기 버전."""
+    scope = _answer_cache_target(state)
+    if scope is None or not ANSWER_CACHE.probe(scope["user_id"], scope["question"]):
+        return scope
+    try:
+        version = head_version(await afetch_head_row(scope["user_id"])) if scope["user_id"] else 0
+    except Exception as e:
+        return _version_unavailable(e)
+    return {**scope, "version": version}
+
+def _cached_decision(scope: Union[Dict[str, Any], None], current_loop: int) -> Union[Dict[str, Any], None]:
+    """캐시 hit이면 LLM 호출 없이 최종 답변으로 결정한 State 업데이트를, miss면 None을 반환합니다."""
+    if scope is None or scope["version"] is None:
+        return None
+    answer = ANSWER_CACHE.lookup(scope["user_id"], scope["question"], scope["version"])
+    if answer is None:
+        return None
+    return {
+        "active_node": "AgentDecision",
+        "loop_counter": current_loop + 1,
+        "decision": AgentDecisionModel(action_type="final_answer", final_answer=answer),
+        "answer_cache": {**scope, "hit": True},
+        "llm_calls": 0
+    }
+
+def _step_tool_name(step: Any) -> Union[str, None]:
+    # intermediate_steps 항목: (AgentAction, observation) 튜플
+    action = step[0] if isinstance(step, (tuple, list)) and step else step
+    return getattr(action, "tool", None)
+
+def _answer_is_cacheable(state: State) -> bool:
+    """읽기 전용 도구만 성공적으로 사용한 답변만 캐시합니다. (쓰기/오류 응답은 재사용하지 않음)"""
+    tool_names = [call["function"]["name"] for call in (state["decision"].tool_calls or [])]
+    tool_names += [_step_tool_name(step) for step in state.get("intermediate_steps", [])]
+    for name in tool_names:
+        entry = TOOL_REGISTRY.get(name) if name else None
+        if entry is None or not entry.read_only:
+            return False
+    for output in state.get("tool_outputs", []):
+        try:
+            if json.loads(output.content).get("status") != "success":
+                return False
+        except (TypeError, ValueError, AttributeError):
+            return False
+    return True
+
+def _written_after(created_at: Any, started_at: float) -> bool:
+    """DB 행의 created_at이 이번 턴 시작 이후인지 여부. 해석할 수 없으면 True. (저장하지 않는 쪽으로 판단)"""
+    try:
+        return datetime.fromisoformat(str(created_at).replace("Z", "+00:00")).timestamp() >= started_at
+    except ValueError:
+        return True
+
+def _version_at_store(scope: Dict[str, Any], head: Union[Dict[str, Any], None]) -> Union[int, None]:
+    # 저장 시점에 조회한 최신 행이 이번 턴 시작 이후에 기록되었다면, 답변은 그 이전 데이터로 만들어졌을 수 있으므로 저장하지 않습니다.
+    if head and _written_after(head.get("created_at"), scope["started_at"]):
+        return None
+    return head_version(head)
+
+def _cache_store_scope(state: State) -> Union[Dict[str, Any], None]:
+    scope = state.get("answer_cache")
+    if not scope or scope.get("hit") or not _answer_is_cacheable(state):
+        return None
+    return scope
+
+def _store_cached_answer(state: State, final_answer: str) -> None:
+    scope = _cache_store_scope(state)
+    if scope is None:
+        return
+    version = scope.get("version")
+    if version is None:
+        try:
+            version = _version_at_store(scope, fetch_head_row(scope["user_id"])) if scope["user_id"] else 0
+        except Exception as e:
+            return _version_unavailable(e)
+    if version is not None:
+        ANSWER_CACHE.store(scope["user_id"], scope["question"], final_answer, version)
+
+async def _astore_cached_answer(state: State, final_answer: str) -> None:
+    """_store_cached_answer의 비동기 버전."""
+    scope = _cache_store_scope(state)
+    if scope is None:
+        return
+    version = scope.get("version")
+    if version is None:
+        try:
+            version = _version_at_store(scope, await afetch_head_row(scope["user_id"])) if scope["user_id"] else 0
+        except Exception as e:
+            return _version_unavailable(e)
+    if version is not None:
+        ANSWER_CACHE.store(scope["user_id"], scope["question"], final_answer, version)
 
 # ----------------------------------------------------
 # A-2: AgentDecision 노드 구현 (Graph의 라우터 역할)
@@ -40,161 +419,275 @@ def extract_message_content(message):
     else:
         return str(message)
 
-def agent_decision(state: State) -> Dict[str, Union[AgentDecisionModel, str, int]]:
+def _chat_history(messages: List[BaseMessage]) -> List[BaseMessage]:
     """
-    사용자 질의를 분석하여 다음 행동(응답, 도구 호출, 최종 답변, 에러)을 결정합니다.
+    이전 턴 메시지에서 대응하는 tool_call(AIMessage)이 없는 ToolMessage를 제외합니다.
+    (executor 모드에서는 tool_call AIMessage가 messages에 기록되지 않으므로, 체크포인트로 이어진
+    대화의 ToolMessage를 그대로 전달하면 LLM API가 요청을 거부합니다.)
     """
-    print(f"--- Node: AgentDecision (Loop: {state.get('loop_counter', 0)}) ---")
-    
-    # 상태 업데이트: 현재 실행 노드와 루프 카운터 기록
-    current_loop = state.get('loop_counter', 0)
-    
-    # LLM이 도구 호출 또는 최종 답변을 결정하도록 유도하는 프롬프트
-    
-    # AgentExecutor를 사용하여 결정 로직을 간결하게 구현합니다.
+    call_ids = set()
+    history = []
+    for message in messages:
+        if isinstance(message, AIMessage):
+            call_ids.update(call["id"] for call in message.tool_calls)
+        elif isinstance(message, ToolMessage) and message.tool_call_id not in call_ids:
+            continue
+        history.append(message)
+    return history
+
+def _compact_state_history(state: State) -> CompactedHistory:
+    """
+    현재 질문 이전의 messages를 토큰 예산(HISTORY_TOKEN_BUDGET)에 맞게 압축합니다.
+    예산 밖으로 밀려난 턴은 State의 누적 요약(history_summary)에 합쳐지며, history_cursor 이전은 다시 읽지 않습니다.
+    """
+    return compact_history(state["messages"][:-1], state.get("history_summary"), state.get("history_cursor") or 0)
+
+def _history_update(compacted: CompactedHistory) -> Dict[str, Any]:
+    return {"history_summary": compacted.summary, "history_cursor": compacted.cursor}
+
+def _recent_history(state: State, upto: int) -> List[BaseMessage]:
+    """ResultProcessor용: AgentDecision에서 갱신한 요약/커서로 messages[:upto]를 압축된 chat_history로 변환합니다."""
+    cursor = min(state.get("history_cursor") or 0, upto)
+    summary = state.get("history_summary")
+    recent = _chat_history([truncate_tool_message(m) for m in state["messages"][cursor:upto]])
+    return ([summary_message(summary)] if summary else []) + recent
+
+def _build_agent_input(state: State, compacted: CompactedHistory) -> Dict[str, Any]:
+    """State의 마지막 메시지를 입력으로, 압축된 이전 대화를 chat_history로 하는 AgentExecutor 입력을 생성합니다."""
     # 메시지에서 content 추출 (dict 또는 Message 객체 모두 처리)
     if state["messages"]:
-        last_message = state["messages"][-1]
-        if hasattr(last_message, 'content'):
-            input_text = last_message.content
-        elif isinstance(last_message, dict) and 'content' in last_message:
-            input_text = last_message['content']
-        else:
-            input_text = str(last_message)
+        input_text = extract_message_content(state["messages"][-1])
     else:
         input_text = "안녕하세요"
     
-    agent_input = {
+    return {
         "input": input_text,
-        "chat_history": state["messages"][:-1],
+        "chat_history": _chat_history(compacted.messages),
         # "intermediate_steps": state.get("intermediate_steps", [])
     }
-    
-    # (Simplified approach for A-2): AgentExecutor를 활용하여 Tool 호출 여부 결정
-    try:
-        # **[!!! 핵심 수정 !!!] agent_executor.agent.invoke 대신, AgentExecutor 전체를 호출합니다.**
-        # AgentExecutor의 invoke는 AgentAction (Tool Call) 또는 AgentFinish (Final Answer)를 반환합니다.
-        # tools=[...]와 verbose=True 등의 설정은 이미 agent_executor 인스턴스에 포함되어 있습니다.
-        agent_outcome = agent_executor.invoke(agent_input) # <-- 이 부분을 수정했습니다!
+
+def _decision_from_outcome(agent_outcome: Dict[str, Any], current_loop: int) -> Dict[str, Any]:
+    """AgentExecutor의 실행 결과를 분석하여 State 업데이트를 생성합니다. (Tool Calling Agent 기준)"""
+    if agent_outcome.get("tool_calls"):
+        # Tool 호출을 결정한 경우 (AgentAction)
+        tool_calls = agent_outcome["tool_calls"]
+        decision_model = AgentDecisionModel(
+            action_type="tool_call",
+            tool_calls=tool_calls,
+            subgraph_id=None
+        )
+        # LangGraph에서는 AgentExecutor가 전체 실행을 책임지므로,
+        # LangGraph의 AgentDecision에서는 Tool Call만 감지하고 ToolExecutor로 라우팅합니다.
         
-        # AgentExecutor의 실행 결과를 분석 (Tool Calling Agent 기준)
-        if agent_outcome.get("tool_calls"):
-            # Tool 호출을 결정한 경우 (AgentAction)
-            tool_calls = agent_outcome["tool_calls"]
-            decision_model = AgentDecisionModel(
-                action_type="tool_call",
-                tool_calls=tool_calls,
-                subgraph_id=None
-            )
-            # LangGraph에서는 AgentExecutor가 전체 실행을 책임지므로,
-            # LangGraph의 AgentDecision에서는 Tool Call만 감지하고 ToolExecutor로 라우팅합니다.
-            
-        elif agent_outcome.get("output"):
-            # 최종 답변을 결정한 경우 (AgentFinish)
-            final_answer = agent_outcome["output"]
-            decision_model = AgentDecisionModel(
-                action_type="final_answer",
-                final_answer=final_answer
-            )
-        else:
-            # 예상치 못한 결과
-            raise ValueError("AgentExecutor가 Tool Call 또는 Final Answer를 반환하지 않았습니다.")
+    elif agent_outcome.get("output"):
+        # 최종 답변을 결정한 경우 (AgentFinish)
+        final_answer = agent_outcome["output"]
+        decision_model = AgentDecisionModel(
+            action_type="final_answer",
+            final_answer=final_answer
+        )
+    else:
+        # 예상치 못한 결과
+        raise ValueError("AgentExecutor가 Tool Call 또는 Final Answer를 반환하지 않았습니다.")
+
+    # 상태 업데이트
+    return {
+        "active_node": "AgentDecision",
+        "loop_counter": current_loop + 1,
+        "decision": decision_model,
+        "intermediate_steps": agent_outcome.get("intermediate_steps", []) # LangChain의 Intermediate Steps 반영
+    }
 
+def _single_pass_messages(agent_input: Dict[str, Any]) -> List[BaseMessage]:
+    """single_pass 모드에서 도구가 바인딩된 LLM에 전달할 메시지 목록을 생성합니다."""
+    return get_agent_prompt().format_messages(
+        input=agent_input["input"],
+        chat_history=agent_input["chat_history"],
+        agent_scratchpad=[]
+    )
 
-        # 상태 업데이트
+def _decision_from_message(ai_message: AIMessage, current_loop: int) -> Dict[str, Any]:
+    """도구가 바인딩된 LLM의 응답(AIMessage)을 AgentDecisionModel로 변환합니다."""
+    if ai_message.tool_calls:
+        # ToolExecutor가 사용하는 형식({"id", "function": {"name", "arguments"}})으로 변환
+        tool_calls = [
+            {
+                "id": call["id"],
+                "type": "function",
+                "function": {"name": call["name"], "arguments": json.dumps(call["args"])}
+            }
+            for call in ai_message.tool_calls
+        ]
         return {
             "active_node": "AgentDecision",
             "loop_counter": current_loop + 1,
-            "decision": decision_model,
-            "intermediate_steps": agent_outcome.get("intermediate_steps", []) # LangChain의 Intermediate Steps 반영
+            "decision": AgentDecisionModel(action_type="tool_call", tool_calls=tool_calls),
+            # 이후 ToolMessage가 이 tool_call 응답에 대응되도록 messages에 기록
+            "messages": [ai_message]
         }
 
-    except Exception as e:
-        # LLM 호출 실패 등 예외 발생 시 ErrorHandler로 전달 준비
-        error_info = ErrorInfo(
-            error_code="DECISION_LLM_FAILURE",
-            # 상세 에러 메시지를 포함하여 디버깅 용이성 확보
-            message=f"AgentDecision LLM 호출 실패: {type(e).__name__} - {str(e)}", 
-            user_message="죄송합니다. 현재 질문을 이해하는 데 문제가 발생했습니다.",
-            node="AgentDecision"
-        )
-        # ErrorHandler 노드로 라우팅하기 위해 error_info와 action_type을 설정
+    if ai_message.content:
         return {
             "active_node": "AgentDecision",
-            "error_info": error_info,
-            "decision": AgentDecisionModel(action_type="error", tool_calls=None, final_answer=None), # action_type="error" 명시
-            "loop_counter": current_loop + 1
+            "loop_counter": current_loop + 1,
+            "decision": AgentDecisionModel(action_type="final_answer", final_answer=ai_message.content)
         }
+
+    raise ValueError("LLM이 Tool Call 또는 Final Answer를 반환하지 않았습니다.")
+
+def _decision_failure(e: Exception, current_loop: int) -> Dict[str, Any]:
+    """LLM 호출 실패 등 예외 발생 시 ErrorHandler로 전달할 State 업데이트를 생성합니다."""
+    # 재시도 후에도 실패한 OpenAI 장애(429, 타임아웃, 서킷 열림)는 LLM_RATE_LIMIT 등 구체적인 코드로 보고합니다.
+    # 요청 마감 시각 때문에 줄어든 제한 시간으로 실패한 경우는 DEADLINE_EXCEEDED로 보고합니다.
+    error_code = "DEADLINE_EXCEEDED" if _is_deadline_error(e) else OPENAI.error_code(e, "DECISION_LLM_FAILURE")
+    error_info = ErrorInfo(
+        error_code=error_code,
+        # 상세 에러 메시지를 포함하여 디버깅 용이성 확보
+        message=f"AgentDecision LLM 호출 실패: {type(e).__name__} - {str(e)}", 
+        user_message=USER_MESSAGES.get(error_code, "죄송합니다. 현재 질문을 이해하는 데 문제가 발생했습니다."),
+        node="AgentDecision"
+    )
+    # ErrorHandler 노드로 라우팅하기 위해 error_info와 action_type을 설정
+    return {
+        "active_node": "AgentDecision",
+        "error_info": error_info,
+        "decision": AgentDecisionModel(action_type="error", tool_calls=None, final_answer=None), # action_type="error" 명시
+        "loop_counter": current_loop + 1
+    }
+
+@observed_node("AgentDecision")
+@_deadline_bound
+def agent_decision(state: State) -> Dict[str, Union[AgentDecisionModel, str, int]]:
+    """
+    사용자 질의를 분석하여 다음 행동(응답, 도구 호출, 최종 답변, 에러)을 결정합니다.
+    """
+    # 상태 업데이트: 현재 실행 노드와 루프 카운터 기록
+    current_loop = state.get('loop_counter', 0)
+    
+    # 같은 사용자의 거의 같은 질문에 대한 답변이 캐시되어 있으면 LLM을 호출하지 않습니다.
+    scope = _answer_cache_scope(state)
+    cached = _cached_decision(scope, current_loop)
+    if cached is not None:
+        return cached
+
+    # LLM 응답을 기다릴 시간이 남아 있지 않으면 호출하지 않고 바로 ErrorHandler로 보냅니다.
+    if not has_time_for(state.get("deadline"), MIN_LLM_SECONDS):
+        return _decision_failure(DeadlineExceeded("AgentDecision 시작 전 마감 시각 임박"), current_loop)
+
+    # AgentExecutor를 사용하여 결정 로직을 간결하게 구현합니다.
+    # 대화가 길어져도 프롬프트 크기가 일정하도록 이전 대화는 토큰 예산에 맞게 압축합니다.
+    compacted = _compact_state_history(state)
+    agent_input = _build_agent_input(state, compacted)
+    
+    counter = LLMCallCounter("AgentDecision")
+    try:
+        if DECISION_MODE == "single_pass":
+            # 도구가 바인딩된 LLM 1회 호출로 tool_call/final_answer를 결정
+            ai_message = get_llm_with_tools().invoke(_single_pass_messages(agent_input), config=_counted_config(counter))
+            update = _decision_from_message(ai_message, current_loop)
+        else:
+            # (Simplified approach for A-2): AgentExecutor를 활용하여 Tool 호출 여부 결정
+            # **[!!! 핵심 수정 !!!] agent_executor.agent.invoke 대신, AgentExecutor 전체를 호출합니다.**
+            # AgentExecutor의 invoke는 AgentAction (Tool Call) 또는 AgentFinish (Final Answer)를 반환합니다.
+            # tools=[...]와 verbose=True 등의 설정은 이미 agent_executor 인스턴스에 포함되어 있습니다.
+            agent_outcome = get_agent_executor().invoke(agent_input, config=_counted_config(counter))
+            update = _decision_from_outcome(agent_outcome, current_loop)
+
+    except Exception as e:
+        update = _decision_failure(e, current_loop)
+
+    return {**update, **_history_update(compacted), **counter.usage(), "answer_cache": scope}
+
+@observed_node("AgentDecision")
+@_deadline_bound
+async def aagent_decision(state: State) -> Dict[str, Union[AgentDecisionModel, str, int]]:
+    """
+    agent_decision의 비동기 버전. LLM 호출 동안 이벤트 루프를 점유하지 않습니다.
+    """
+    current_loop = state.get('loop_counter', 0)
+
+    scope = await _aanswer_cache_scope(state)
+    cached = _cached_decision(scope, current_loop)
+    if cached is not None:
+        return cached
+
+    deadline = state.get("deadline")
+    if not has_time_for(deadline, MIN_LLM_SECONDS):
+        return _decision_failure(DeadlineExceeded("AgentDecision 시작 전 마감 시각 임박"), current_loop)
+
+    compacted = _compact_state_history(state)
+    agent_input = _build_agent_input(state, compacted)
+    
+    counter = LLMCallCounter("AgentDecision")
+    try:
+        if DECISION_MODE == "single_pass":
+            ai_message = await run_within(deadline, get_llm_with_tools().ainvoke(_single_pass_messages(agent_input), config=_counted_config(counter)))
+            update = _decision_from_message(ai_message, current_loop)
+        else:
+            agent_outcome = await run_within(deadline, get_agent_executor().ainvoke(agent_input, config=_counted_config(counter)))
+            update = _decision_from_outcome(agent_outcome, current_loop)
+
+    except Exception as e:
+        update = _decision_failure(e, current_loop)
+
+    return {**update, **_history_update(compacted), **counter.usage(), "answer_cache": scope}
         
 # ----------------------------------------------------
 # A-3: ToolExecutor 노드 구현 (실제 도구 실행)
 # ----------------------------------------------------
 
-def tool_executor(state: State) -> Dict[str, Any]:
+def _missing_tool_calls() -> Dict[str, Any]:
+    # 예외 상황: decision이 tool_call인데 tool_calls가 없는 경우 (ErrorHandler로)
+    error_info = ErrorInfo(
+        error_code="TOOL_CALL_MISSING",
+        message="AgentDecision에서 tool_call이 결정되었으나 호출 목록이 비어있음.",
+        user_message="내부 시스템 오류로 도구 실행을 준비할 수 없습니다.",
+        node="ToolExecutor"
+    )
+    return {"active_node": "ToolExecutor", "error_info": error_info}
+
+def _resolve_tool_call(call: dict):
     """
-    AgentDecision에서 결정된 도구 호출을 실행하고 그 결과를 상태에 저장합니다.
+    LangChain 형식의 tool_call에서 (도구, 인자, tool_call_id)를 추출합니다.
+    도구가 없거나 인자가 시그니처와 맞지 않으면 DB I/O 전에 ErrorInfo를 반환합니다.
     """
-    print("--- Node: ToolExecutor ---")
+    tool_name = call['function']['name']
+    tool_id = call['id']
     
-    # A-2에서 결정된 Tool 호출 목록 가져오기
-    tool_calls = state["decision"].tool_calls
-    if not tool_calls:
-        # 예외 상황: decision이 tool_call인데 tool_calls가 없는 경우 (ErrorHandler로)
-        error_info = ErrorInfo(
-            error_code="TOOL_CALL_MISSING",
-            message="AgentDecision에서 tool_call이 결정되었으나 호출 목록이 비어있음.",
-            user_message="내부 시스템 오류로 도구 실행을 준비할 수 없습니다.",
+    # 레지스트리에서 이름으로 해당 도구 찾기 (O(1))
+    entry = TOOL_REGISTRY.get(tool_name)
+
+    if not entry:
+        # 등록되지 않은 도구 호출 시 (ErrorHandler로)
+        return ErrorInfo(
+            error_code="TOOL_NOT_FOUND",
+            message=f"요청된 도구 '{tool_name}'을 찾을 수 없습니다.",
+            user_message="요청하신 기능을 처리할 수 있는 도구가 없습니다.",
             node="ToolExecutor"
         )
-        return {"active_node": "ToolExecutor", "error_info": error_info}
-        
-    tool_outputs: List[ToolMessage] = []
-    
-    # 툴 호출 및 결과 수집
-    for call in tool_calls:
-        tool_name = call['function']['name']
-        tool_args = json.loads(call['function']['arguments']) # JSON 문자열을 Dict로 변환
-        tool_id = call['id']
-        
-        # TOOLS 목록에서 이름으로 해당 함수 찾기
-        selected_tool = next(
-            (t for t in TOOLS if t.name == tool_name),
-            None
-        )
 
-        if not selected_tool:
-            # 등록되지 않은 도구 호출 시 (ErrorHandler로)
-            error_info = ErrorInfo(
-                error_code="TOOL_NOT_FOUND",
-                message=f"요청된 도구 '{tool_name}'을 찾을 수 없습니다.",
-                user_message="요청하신 기능을 처리할 수 있는 도구가 없습니다.",
-                node="ToolExecutor"
-            )
-            return {"active_node": "ToolExecutor", "error_info": error_info}
+    try:
+        # JSON 문자열을 Dict로 변환하고 미리 생성된 검증기로 인자 확인
+        tool_args = entry.parse_arguments(call['function']['arguments'])
+    except ToolArgumentError as e:
+        return ErrorInfo(
+            error_code="TOOL_INVALID_ARGS",
+            message=f"도구 '{tool_name}' 인자 검증 실패: {str(e)}",
+            user_message="요청을 처리하는 데 필요한 정보가 올바르지 않습니다. 입력 내용을 확인해 주세요.",
+            node="ToolExecutor"
+        )
+    return entry.tool, tool_args, tool_id
 
-        # 실제 도구 실행 (supabase_tools.py의 함수 호출)
-        try:
-            # **S-2/S-3 표준화된 반환값**을 받습니다.
-            tool_output_data = selected_tool.func(**tool_args)
-            
-            # ToolMessage 형태로 결과 저장 (LLM이 해석할 수 있는 형식)
-            tool_outputs.append(
-                ToolMessage(
-                    content=json.dumps(tool_output_data), # 표준화된 Dict를 JSON 문자열로 변환
-                    tool_call_id=tool_id,
-                )
-            )
+def _tool_failure(tool_name: str, e: Exception) -> ErrorInfo:
+    # 도구 실행 중 예상치 못한 시스템 에러 발생 시 (ErrorHandler로)
+    return ErrorInfo(
+        error_code="TOOL_EXECUTION_FAILURE",
+        message=f"도구 '{tool_name}' 실행 중 시스템 오류 발생: {type(e).__name__} - {str(e)}",
+        user_message="도구 실행 과정에서 예상치 못한 오류가 발생했습니다. 개발팀에 문의해 주세요.",
+        node="ToolExecutor"
+    )
 
-        except Exception as e:
-            # 도구 실행 중 예상치 못한 시스템 에러 발생 시 (ErrorHandler로)
-            error_info = ErrorInfo(
-                error_code="TOOL_EXECUTION_FAILURE",
-                message=f"도구 '{tool_name}' 실행 중 시스템 오류 발생: {type(e).__name__} - {str(e)}",
-                user_message="도구 실행 과정에서 예상치 못한 오류가 발생했습니다. 개발팀에 문의해 주세요.",
-                node="ToolExecutor"
-            )
-            return {"active_node": "ToolExecutor", "error_info": error_info}
-        
+def _tool_success(tool_outputs: List[ToolMessage]) -> Dict[str, Any]:
     # 성공적으로 실행된 경우 결과 반환
     return {
         "active_node": "ToolExecutor",
@@ -202,68 +695,294 @@ def tool_executor(state: State) -> Dict[str, Any]:
         "messages": tool_outputs # messages에도 추가하여 다음 LLM 추론에 사용
     }
 
+def _tool_timeout(tool_name: str, timeout: float) -> ErrorInfo:
+    # 호출별 제한 시간 초과 시 (ErrorHandler로)
+    return ErrorInfo(
+        error_code="TOOL_TIMEOUT",
+        message=f"도구 '{tool_name}' 실행이 제한 시간({timeout:.1f}s)을 초과했습니다.",
+        user_message="데이터 조회가 지연되고 있습니다. 잠시 후 다시 시도해 주세요.",
+        node="ToolExecutor"
+    )
+
+def _resolve_tool_calls(tool_calls: List[dict]):
+    """모든 tool_call을 실행 전에 먼저 해석합니다. 하나라도 도구가 없으면 I/O 없이 ErrorInfo를 반환합니다."""
+    resolved_calls = []
+    for call in tool_calls:
+        resolved = _resolve_tool_call(call)
+        if isinstance(resolved, ErrorInfo):
+            return resolved
+        resolved_calls.append(resolved)
+    return resolved_calls
+
+def _collect_tool_results(results: List[Union[ToolMessage, ErrorInfo]]) -> Dict[str, Any]:
+    """tool_call 순서대로 정렬된 실행 결과를 State 업데이트로 변환합니다. (첫 번째 에러 우선)"""
+    for result in results:
+        if isinstance(result, ErrorInfo):
+            return {"active_node": "ToolExecutor", "error_info": result}
+    return _tool_success(results)
+
+def _tool_status(span, tool_output_data: Any) -> str:
+    """
+    도구 메트릭의 status 라벨: 표준 반환값의 status (success/error), 그 외 형식은 "unknown".
+    도구가 에러 형식으로 응답하면 span도 에러 상태(error_code)로 기록합니다.
+    """
+    status = tool_output_data.get("status", "unknown") if isinstance(tool_output_data, dict) else "unknown"
+    span.set_attribute("tool.status", status)
+    if status == "error":
+        span.record_error(tool_output_data.get("error_code") or "error")
+    return status
+
+def _run_tool_call(selected_tool, tool_args: dict, tool_id: str) -> Union[ToolMessage, ErrorInfo]:
+    """도구 하나를 실행하여 ToolMessage 또는 ErrorInfo를 반환합니다. (스레드 풀에서 실행)"""
+    started = time.perf_counter()
+    status = "exception"
+    # 실제 도구 실행 (supabase_tools.py의 함수 호출). 도구 안의 DB 호출 지연은 도구 이름별로 기록됩니다.
+    try:
+        # **S-2/S-3 표준화된 반환값**을 받습니다.
+        with tool_scope(selected_tool.name) as span:
+            tool_output_data = selected_tool.func(**tool_args)
+            status = _tool_status(span, tool_output_data)
+        
+        # ToolMessage 형태로 결과 저장 (LLM이 해석할 수 있는 형식)
+        return ToolMessage(
+            # 표준화된 Dict를 집계로 가공한 뒤 JSON 문자열로 변환 (include_raw=true일 때만 원본 행 포함)
+            content=tool_message_content(selected_tool.name, tool_args, tool_output_data),
+            tool_call_id=tool_id,
+        )
+
+    except Exception as e:
+        return _tool_failure(selected_tool.name, e)
+    finally:
+        observe_tool(selected_tool.name, status, time.perf_counter() - started)
+
+@observed_node("ToolExecutor")
+@_deadline_bound
+def tool_executor(state: State) -> Dict[str, Any]:
+    """
+    AgentDecision에서 결정된 도구 호출을 실행하고 그 결과를 상태에 저장합니다.
+    한 번의 결정에서 요청된 tool_call들은 서로 독립적이므로 공유 스레드 풀에서 동시에 실행하며,
+    결과 ToolMessage는 tool_call 순서를 유지합니다.
+    """
+    # A-2에서 결정된 Tool 호출 목록 가져오기
+    tool_calls = state["decision"].tool_calls
+    if not tool_calls:
+        return _missing_tool_calls()
+
+    resolved_calls = _resolve_tool_calls(tool_calls)
+    if isinstance(resolved_calls, ErrorInfo):
+        return {"active_node": "ToolExecutor", "error_info": resolved_calls}
+
+    # 도구 제한 시간은 답변 생성 시간을 남겨 두도록 요청 마감 시각에 맞춰 줄입니다.
+    timeout = bounded_timeout(TOOL_CALL_TIMEOUT, state.get("deadline"), ANSWER_RESERVE_SECONDS)
+    if timeout <= 0:
+        return {"active_node": "ToolExecutor", "error_info": _deadline_error("ToolExecutor")}
+    
+    # 툴 호출 및 결과 수집 (컨텍스트 변수를 유지한 채 스레드 풀에 제출)
+    started_at = time.monotonic()
+    futures = [
+        _TOOL_POOL.submit(contextvars.copy_context().run, _run_tool_call, *resolved)
+        for resolved in resolved_calls
+    ]
+
+    results: List[Union[ToolMessage, ErrorInfo]] = []
+    for (selected_tool, _, _), future in zip(resolved_calls, futures):
+        remaining = timeout - (time.monotonic() - started_at)
+        try:
+            results.append(future.result(timeout=max(remaining, 0)))
+        except concurrent.futures.TimeoutError:
+            # 실행 중인 스레드는 중단할 수 없으므로 결과를 버리고 타임아웃으로 보고합니다.
+            # (스레드 안의 HTTP 호출도 같은 마감 시각으로 제한 시간이 줄어 있어 곧 종료됩니다.)
+            future.cancel()
+            results.append(_tool_timeout(selected_tool.name, timeout) if timeout >= TOOL_CALL_TIMEOUT else _deadline_error("ToolExecutor"))
+        
+    return _collect_tool_results(results)
+
+async def _arun_tool_call(selected_tool, tool_args: dict, tool_id: str, semaphore: asyncio.Semaphore,
+                         timeout: float = TOOL_CALL_TIMEOUT) -> Union[ToolMessage, ErrorInfo]:
+    """도구 하나를 비동기로 실행합니다. 동시 실행 수는 semaphore로, 실행 시간은 timeout(기본 TOOL_CALL_TIMEOUT)으로 제한합니다."""
+    async with semaphore:
+        started = time.perf_counter()
+        status = "exception"
+        try:
+            # tool.ainvoke는 비동기 구현(coroutine)이 있으면 그것을, 없으면 스레드에서 동기 구현을 실행하며,
+            # on_tool_start/on_tool_end 콜백 이벤트를 발생시켜 /invoke/stream에서 도구 진행 상황을 전달할 수 있습니다.
+            with tool_scope(selected_tool.name) as span:
+                tool_output_data = await asyncio.wait_for(selected_tool.ainvoke(tool_args), timeout=timeout)
+                status = _tool_status(span, tool_output_data)
+            return ToolMessage(
+                content=tool_message_content(selected_tool.name, tool_args, tool_output_data),
+                tool_call_id=tool_id,
+            )
+
+        except asyncio.TimeoutError:
+            status = "timeout"
+            if timeout < TOOL_CALL_TIMEOUT:
+                return _deadline_error("ToolExecutor")
+            return _tool_timeout(selected_tool.name, timeout)
+        except Exception as e:
+            return _tool_failure(selected_tool.name, e)
+        finally:
+            observe_tool(selected_tool.name, status, time.perf_counter() - started)
+
+@observed_node("ToolExecutor")
+@_deadline_bound
+async def atool_executor(state: State) -> Dict[str, Any]:
+    """
+    tool_executor의 비동기 버전. 독립적인 tool_call들을 asyncio.gather로 동시에 실행하며,
+    도구 실행 중에도 이벤트 루프를 막지 않습니다.
+    """
+    tool_calls = state["decision"].tool_calls
+    if not tool_calls:
+        return _missing_tool_calls()
+
+    resolved_calls = _resolve_tool_calls(tool_calls)
+    if isinstance(resolved_calls, ErrorInfo):
+        return {"active_node": "ToolExecutor", "error_info": resolved_calls}
+
+    timeout = bounded_timeout(TOOL_CALL_TIMEOUT, state.get("deadline"), ANSWER_RESERVE_SECONDS)
+    if timeout <= 0:
+        return {"active_node": "ToolExecutor", "error_info": _deadline_error("ToolExecutor")}
+
+    # gather는 입력 순서대로 결과를 반환하므로 tool_call_id 순서가 유지됩니다.
+    semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+    results = await asyncio.gather(
+        *(_arun_tool_call(*resolved, semaphore, timeout) for resolved in resolved_calls)
+    )
+    return _collect_tool_results(list(results))
+
 # ----------------------------------------------------
 # B-2: ResultProcessor 노드 구현 (결과 가공)
 # ----------------------------------------------------
 
+def _result_agent_input(state: State) -> Dict[str, Any]:
+    """Tool 결과(ToolMessage)를 포함하여 최종 답변을 유도할 Agent 입력을 생성합니다."""
+    return {
+        "input": state["messages"][-2].content if len(state["messages"]) >= 2 else "", # 원본 HumanMessage
+        "chat_history": _recent_history(state, len(state["messages"]) - 2) + [state["messages"][-1]] if len(state["messages"]) >= 2 else [],
+        "intermediate_steps": state.get("intermediate_steps", [])
+    }
+    # Tool 호출 이후의 메시지 (ToolMessage)는 intermediate_steps에 포함되지 않고 messages에 추가되어야 합니다.
+
+def _single_pass_answer_messages(state: State) -> List[BaseMessage]:
+    """
+    single_pass 모드에서 최종 답변을 생성할 메시지 목록을 만듭니다.
+    [..., HumanMessage(질문), AIMessage(tool_calls), ToolMessage...] 구조에서
+    질문 이전을 chat_history로, tool_call 이후를 agent_scratchpad로 전달합니다.
+    """
+    messages = state["messages"]
+    call_index = max(
+        i for i, m in enumerate(messages) if isinstance(m, AIMessage) and m.tool_calls
+    )
+    return get_agent_prompt().format_messages(
+        input=extract_message_content(messages[call_index - 1]),
+        chat_history=_recent_history(state, call_index - 1),
+        agent_scratchpad=messages[call_index:]
+    )
+
+def _result_update(final_answer: str, counter: LLMCallCounter) -> Dict[str, Any]:
+    # 최종 결과 반환 (Graph 종료 준비)
+    final_message = AIMessage(content=final_answer)
+
+    # Graph 종료 시 answer와 messages, 이 노드의 LLM 사용량을 반환
+    return {
+        "active_node": "ResultProcessor",
+        "answer": final_answer,
+        "messages": [final_message],
+        **counter.usage()
+    }
+
+def _deadline_answer(state: State) -> Dict[str, Any]:
+    """답변을 생성할 시간이 부족할 때 ErrorHandler와 같은 형식의 최종 메시지로 종료합니다. (ResultProcessor는 END로 연결)"""
+    return {**_handle_error({**state, "error_info": _deadline_error("ResultProcessor")}), "active_node": "ResultProcessor"}
+
+# tool_call이었으나 tool_outputs이 없는 경우 (ErrorHandler로 가는 것이 맞으나, 여기서는 안전 종료)
+_RESULT_FALLBACK = "죄송합니다. 요청하신 정보 처리에 실패했지만, 에러 핸들러로 라우팅되지 않았습니다. (내부 로직 오류)"
+
+@observed_node("ResultProcessor")
+@_deadline_bound
 def result_processor(state: State) -> Dict[str, Any]:
     """
     ToolExecutor의 결과 또는 AgentDecision의 최종 답변을 받아 사용자에게 친화적인
     최종 메시지로 가공하고 Graph를 종료합니다.
     """
-    print("--- Node: ResultProcessor ---")
-    
     decision_type = state["decision"].action_type
 
+    counter = LLMCallCounter("ResultProcessor")
+
     if decision_type == "final_answer":
         # A-2에서 LLM이 최종 답변을 바로 준 경우
         final_answer = state["decision"].final_answer
         
     elif decision_type == "tool_call" and state.get("tool_outputs"):
         # A-3에서 Tool이 실행된 결과를 기반으로 답변을 생성해야 하는 경우
+        if not has_time_for(state.get("deadline"), MIN_LLM_SECONDS):
+            return _deadline_answer(state)
+        try:
+            if DECISION_MODE == "single_pass":
+                # Tool 결과(ToolMessage)를 포함하여 LLM 1회 호출로 최종 답변 생성
+                final_outcome = get_llm_answer().invoke(_single_pass_answer_messages(state), config=_counted_config(counter))
+            else:
+                # AgentExecutor에 Tool 호출 결과(ToolMessage)를 포함하여 최종 답변 유도
+                final_outcome = get_agent_executor().agent.invoke(_result_agent_input(state), config=_counted_config(counter))
+        except Exception as e:
+            if not _is_deadline_error(e):
+                raise
+            return _deadline_answer(state)
+        final_answer = final_outcome.content
         
-        # AgentExecutor의 실행을 사용하여 Tool 결과를 기반으로 최종 답변 생성
-        tool_output_messages = state["tool_outputs"] 
-        
-        # Tool 결과를 포함하여 AgentExecutor를 다시 실행
-        agent_input = {
-            "input": state["messages"][-2].content if len(state["messages"]) >= 2 else "", # 원본 HumanMessage
-            "chat_history": state["messages"][:-2] + [state["messages"][-1]] if len(state["messages"]) >= 2 else [],
-            "intermediate_steps": state.get("intermediate_steps", [])
-        }
-        
-        # Tool 호출 이후의 메시지 (ToolMessage)는 intermediate_steps에 포함되지 않고 messages에 추가되어야 합니다.
-        
-        # AgentExecutor에 Tool 호출 결과(ToolMessage)를 포함하여 최종 답변 유도
-        final_outcome = agent_executor.agent.invoke(agent_input)
+    else:
+        return _result_update(_RESULT_FALLBACK, counter)
+
+    _store_cached_answer(state, final_answer)
+    return _result_update(final_answer, counter)
+
+@observed_node("ResultProcessor")
+@_deadline_bound
+async def aresult_processor(state: State) -> Dict[str, Any]:
+    """
+    result_processor의 비동기 버전.
+    """
+    decision_type = state["decision"].action_type
+
+    counter = LLMCallCounter("ResultProcessor")
+
+    if decision_type == "final_answer":
+        final_answer = state["decision"].final_answer
         
+    elif decision_type == "tool_call" and state.get("tool_outputs"):
+        deadline = state.get("deadline")
+        if not has_time_for(deadline, MIN_LLM_SECONDS):
+            return _deadline_answer(state)
+        try:
+            if DECISION_MODE == "single_pass":
+                final_outcome = await run_within(deadline, get_llm_answer().ainvoke(_single_pass_answer_messages(state), config=_counted_config(counter)))
+            else:
+                final_outcome = await run_within(deadline, get_agent_executor().agent.ainvoke(_result_agent_input(state), config=_counted_config(counter)))
+        except Exception as e:
+            if not _is_deadline_error(e):
+                raise
+            return _deadline_answer(state)
         final_answer = final_outcome.content
         
     else:
-        # tool_call이었으나 tool_outputs이 없는 경우 (ErrorHandler로 가는 것이 맞으나, 여기서는 안전 종료)
-        final_answer = "죄송합니다. 요청하신 정보 처리에 실패했지만, 에러 핸들러로 라우팅되지 않았습니다. (내부 로직 오류)"
+        return _result_update(_RESULT_FALLBACK, counter)
 
-    # 최종 결과 반환 (Graph 종료 준비)
-    final_message = AIMessage(content=final_answer)
-
-    # Graph 종료 시 answer와 messages를 반환
-    return {
-        "active_node": "ResultProcessor",
-        "answer": final_answer,
-        "messages": [final_message]
-    }
+    await _astore_cached_answer(state, final_answer)
+    return _result_update(final_answer, counter)
 
 
 # ----------------------------------------------------
 # C-1: ErrorHandler 노드 구현 (에러 처리)
 # ----------------------------------------------------
 
+@observed_node("ErrorHandler")
 def error_handler(state: State) -> Dict[str, Any]:
     """
     에러 정보를 받아 사용자 친화적인 메시지를 생성하고 Graph를 안전하게 종료합니다.
     """
-    print("--- Node: ErrorHandler ---")
-    
+    return _handle_error(state)
+
+def _handle_error(state: State) -> Dict[str, Any]:
     # **수정: state["error_info"]가 딕셔너리일 경우 Pydantic 객체로 변환**
     error_info_raw = state.get("error_info")
     if isinstance(error_info_raw, dict):
@@ -281,28 +1000,52 @@ def error_handler(state: State) -> Dict[str, Any]:
             node="ErrorHandler"
         )
     
+    # 체크포인트에서 복원된 에러 등 trace ID가 없으면 현재 요청의 trace로 연결하고, ErrorHandler span을 에러로 표시
+    span = current_span()
+    if span is not None:
+        if not error_info.trace_id:
+            error_info = error_info.model_copy(update={"trace_id": span.trace_id})
+        span.record_error(error_info.error_code)
+
     # 1. 개발자용 로그 기록 
-    print(f"\n[SYSTEM ERROR LOG] Node: {error_info.node} | Code: {error_info.error_code}")
-    print(f"[SYSTEM ERROR LOG] Detail: {error_info.message}\n")
+    log.error("agent_error", extra={"node": error_info.node, "error_code": error_info.error_code,
+                                    "detail": error_info.message, "trace_id": error_info.trace_id})
     
-    # 2. 사용자에게 보여줄 최종 메시지 생성
+    # 2. 사용자에게 보여줄 최종 메시지 생성 (문의 시 추적할 수 있도록 trace ID 포함)
     user_friendly_message = error_info.user_message
+    trace_note = f", 추적 ID: {error_info.trace_id}" if error_info.trace_id else ""
 
     final_message = AIMessage(
-        content=f"🚨 오류 발생: {user_friendly_message}\n\n(오류 코드: {error_info.error_code})",
+        content=f"🚨 오류 발생: {user_friendly_message}\n\n(오류 코드: {error_info.error_code}{trace_note})",
     )
 
     # Graph 종료 시 answer와 messages를 반환
     return {
         "active_node": "ErrorHandler",
         "answer": final_message.content, # 최종 메시지 전체를 answer에 저장
-        "messages": state["messages"] + [final_message]
+        "messages": [final_message] # messages는 누적 필드이므로 새 메시지만 반환
     }
 
+@observed_node("ErrorHandler")
+async def aerror_handler(state: State) -> Dict[str, Any]:
+    """
+    error_handler의 비동기 버전. I/O가 없으므로 동기 구현을 그대로 호출합니다.
+    (ainvoke 시 별도 스레드로 넘기지 않기 위해 제공)
+    """
+    return _handle_error(state)
+
 # ----------------------------------------------------
 # Graph 라우팅 결정 함수 (Edge 결정에 사용)
 # ----------------------------------------------------
 
+def route_after_tools(state: State) -> Literal["ResultProcessor", "ErrorHandler"]:
+    """
+    ToolExecutor 이후의 다음 노드를 결정합니다. 도구 실행 에러(TOOL_TIMEOUT 등)는 ErrorHandler로 보냅니다.
+    """
+    if state.get("error_info"):
+        return "ErrorHandler"
+    return "ResultProcessor"
+
 def route_decision(state: State) -> Literal["ToolExecutor", "ResultProcessor", "ErrorHandler"]:
     """
     AgentDecision 노드가 반환한 decision 모델을 기반으로 다음 노드를 결정합니다.
@@ -0,0 +1,191 @@
+# observability.py
+
+import os
+import sys
+import time
+import logging
+import asyncio
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from pythonjsonlogger.json import JsonFormatter
+from tracing import Span, current_trace_id, start_span
+
+# ----------------------------------------------------
+# 관측: 구조화 로그(JSON) + Prometheus 메트릭 (/metrics)
+# ----------------------------------------------------
+# 노드마다 stdout에 print하던 진행 로그를 레벨을 지정할 수 있는 JSON 로거로 바꾸고, 집계가 필요한 값
+# (노드 실행 시간, 도구/DB 지연, LLM 호출 수와 토큰 수)은 Prometheus 히스토그램/카운터로 기록합니다.
+# 히스토그램 기록은 잠금 하나와 덧셈 몇 번이므로 요청 처리 경로에 두어도 부담이 없습니다.
+#
+# 환경 변수
+#   - LOG_LEVEL  : 로그 레벨 (DEBUG면 노드 시작/종료와 AgentExecutor 상세 로그까지 출력, 기본 INFO)
+#   - LOG_FORMAT : "json"(기본) 또는 "text"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# 에이전트 로거의 최상위 이름 (get_logger("node") → "agent.node")
+LOGGER_ROOT = "agent"
+
+# ----------------------------------------------------
+# 1. 구조화 로그
+# ----------------------------------------------------
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.Logger:
+    """
+    에이전트 로거에 stderr 핸들러를 설정합니다. 여러 번 호출하면 핸들러를 교체하므로 레벨/형식 변경에도 사용합니다.
+    extra={...}로 넘긴 필드는 JSON 로그의 최상위 필드가 됩니다.
+    """
+    root = logging.getLogger(LOGGER_ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stderr)
+    if (fmt or LOG_FORMAT) == "json":
+        handler.setFormatter(JsonFormatter("%(asctime)s %(levelname)s %(name)s %(message)s",
+                                           rename_fields={"levelname": "level", "name": "logger"},
+                                           json_ensure_ascii=False))
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    handler.addFilter(_add_trace_id)
+    root.addHandler(handler)
+    root.setLevel(level or LOG_LEVEL)
+    root.propagate = False
+    return root
+
+def _add_trace_id(record: logging.LogRecord) -> bool:
+    """요청 처리 중 기록된 로그에 trace_id 필드를 붙여 span과 연결할 수 있게 합니다."""
+    if not hasattr(record, "trace_id"):
+        trace_id = current_trace_id()
+        if trace_id:
+            record.trace_id = trace_id
+    return True
+
+def set_log_level(level: str) -> None:
+    """실행 중에 에이전트 로그 레벨을 바꿉니다. (예: "DEBUG")"""
+    logging.getLogger(LOGGER_ROOT).setLevel(level.upper())
+
+def get_logger(name: str) -> logging.Logger:
+    """모듈별 에이전트 로거. 처음 호출할 때 환경 변수 설정으로 핸들러를 구성합니다."""
+    if not logging.getLogger(LOGGER_ROOT).handlers:
+        configure_logging()
+    return logging.getLogger(f"{LOGGER_ROOT}.{name}")
+
+log = get_logger("observability")
+
+# ----------------------------------------------------
+# 2. Prometheus 메트릭
+# ----------------------------------------------------
+
+# 프로세스 기본 레지스트리와 분리하여 모듈을 다시 import하는 테스트에서도 중복 등록 오류가 나지 않게 합니다.
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+# 노드/LLM 구간은 수 초, DB 조회는 수십 ms 단위이므로 버킷을 나누어 둡니다.
+_NODE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60)
+_DB_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+NODE_LATENCY = Histogram("agent_node_duration_seconds", "그래프 노드 실행 시간(초)", ["node"],
+                         buckets=_NODE_BUCKETS, registry=REGISTRY)
+TOOL_LATENCY = Histogram("agent_tool_duration_seconds", "도구 호출 실행 시간(초)", ["tool", "status"],
+                         buckets=_NODE_BUCKETS, registry=REGISTRY)
+DEPENDENCY_LATENCY = Histogram("agent_dependency_duration_seconds",
+                               "외부 의존성 호출 시간(초, 재시도 포함). tool은 호출한 도구 이름 (도구 밖이면 \"-\")",
+                               ["dependency", "tool", "outcome"], buckets=_DB_BUCKETS, registry=REGISTRY)
+LLM_CALLS = Counter("agent_llm_calls", "노드별 LLM 호출 수", ["node"], registry=REGISTRY)
+LLM_TOKENS = Counter("agent_llm_tokens", "노드별 LLM 토큰 수", ["node", "kind"], registry=REGISTRY)
+REQUEST_LLM_CALLS = Histogram("agent_request_llm_calls", "요청 한 건의 LLM 호출 수",
+                              buckets=(0, 1, 2, 3, 4, 6, 8, 12), registry=REGISTRY)
+REQUEST_TOKENS = Histogram("agent_request_llm_tokens", "요청 한 건의 LLM 토큰 수", ["kind"],
+                           buckets=_TOKEN_BUCKETS, registry=REGISTRY)
+
+def render_metrics() -> bytes:
+    """/metrics 응답 본문 (Prometheus text exposition format)."""
+    return generate_latest(REGISTRY)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# --- 노드 ---
+
+def observed_node(name: str):
+    """
+    노드 함수의 실행 시간을 NODE_LATENCY에 기록하고 시작/종료를 DEBUG 로그로 남기는 데코레이터. (동기/비동기 모두)
+    노드 실행은 state["traceparent"](요청 span)의 자식 span으로 기록됩니다.
+    """
+    def decorator(node_fn: Callable):
+        if asyncio.iscoroutinefunction(node_fn):
+            @functools.wraps(node_fn)
+            async def async_wrapper(state):
+                with start_span(name, parent=state.get("traceparent"), attributes={"graph.node": name}):
+                    started = _node_started(name, state, "async")
+                    try:
+                        return await node_fn(state)
+                    finally:
+                        _node_finished(name, started)
+            return async_wrapper
+
+        @functools.wraps(node_fn)
+        def wrapper(state):
+            with start_span(name, parent=state.get("traceparent"), attributes={"graph.node": name}):
+                started = _node_started(name, state, "sync")
+                try:
+                    return node_fn(state)
+                finally:
+                    _node_finished(name, started)
+        return wrapper
+    return decorator
+
+_node_log = get_logger("node")
+
+def _node_started(name: str, state: Dict[str, Any], mode: str) -> float:
+    if _node_log.isEnabledFor(logging.DEBUG):
+        _node_log.debug("node_start", extra={"node": name, "mode": mode, "loop": state.get("loop_counter", 0)})
+    return time.perf_counter()
+
+def _node_finished(name: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    NODE_LATENCY.labels(node=name).observe(elapsed)
+    if _node_log.isEnabledFor(logging.DEBUG):
+        _node_log.debug("node_end", extra={"node": name, "duration_ms": round(elapsed * 1000, 2)})
+
+# --- 도구 / 외부 의존성 ---
+
+_current_tool: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_tool", default=None)
+
+@contextmanager
+def tool_scope(tool_name: str) -> Iterator[Span]:
+    """
+    도구 호출 하나의 span을 시작하고, with 블록 안의 의존성 호출(DB 조회)이 어느 도구에서 발생했는지
+    메트릭과 span 부모로 기록되도록 도구 이름을 설정합니다.
+    """
+    token = _current_tool.set(tool_name)
+    try:
+        with start_span(f"tool {tool_name}", attributes={"tool.name": tool_name}) as span:
+            yield span
+    finally:
+        _current_tool.reset(token)
+
+def observe_tool(tool_name: str, status: str, seconds: float) -> None:
+    TOOL_LATENCY.labels(tool=tool_name, status=status).observe(seconds)
+
+def observe_dependency(dependency: str, outcome: str, seconds: float) -> None:
+    DEPENDENCY_LATENCY.labels(dependency=dependency, tool=_current_tool.get() or "-", outcome=outcome).observe(seconds)
+
+# --- LLM 호출 / 토큰 ---
+
+def record_llm_call(node: str) -> None:
+    LLM_CALLS.labels(node=node).inc()
+
+def record_llm_tokens(node: str, prompt_tokens: int, completion_tokens: int) -> None:
+    if prompt_tokens:
+        LLM_TOKENS.labels(node=node, kind="prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(node=node, kind="completion").inc(completion_tokens)
+
+def record_request_usage(result: Dict[str, Any]) -> None:
+    """그래프 실행이 끝난 State(llm_calls, prompt_tokens, completion_tokens)로 요청 단위 히스토그램을 기록합니다."""
+    REQUEST_LLM_CALLS.observe(result.get("llm_calls") or 0)
+    REQUEST_TOKENS.labels(kind="prompt").observe(result.get("prompt_tokens") or 0)
+    REQUEST_TOKENS.labels(kind="completion").observe(result.get("completion_tokens") or 0)
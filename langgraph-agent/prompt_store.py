@@ -0,0 +1,223 @@
+# prompt_store.py
+
+"""
+버전 관리되는 로컬 프롬프트 저장소.
+
+hub.pull()은 프로세스 시작마다 네트워크 요청을 하고, Hub에 연결할 수 없으면 서버가 시작되지 않습니다.
+이 모듈은 프롬프트를 prompts/ 디렉터리의 JSON 파일로 저장해 두고 로컬에서만 불러옵니다.
+Hub 접근은 명시적인 refresh 명령에서만 발생합니다.
+
+디렉터리 구조:
+    prompts/manifest.json                        : {프롬프트 이름: 현재 버전 정보}
+    prompts/<owner>__<repo>/<sha256 앞 12자>.json : 버전별 프롬프트 (LangChain dumpd 직렬화)
+
+사용 예:
+    python prompt_store.py refresh hwchase17/openai-tools-agent   # Hub에서 받아 새 버전으로 저장
+    python prompt_store.py list                                   # 저장된 프롬프트와 해시 출력
+    python prompt_store.py verify                                 # 모든 버전 파일의 해시 검증
+"""
+
+import os
+import sys
+import json
+import hashlib
+import warnings
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from langchain_core.load import dumpd, load
+from langchain_core.prompts import BasePromptTemplate
+
+# 프롬프트 저장 위치 (환경 변수 AGENT_PROMPT_DIR로 변경 가능)
+PROMPT_DIR = os.getenv("AGENT_PROMPT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompts"))
+MANIFEST_FILE = "manifest.json"
+
+
+class PromptNotFoundError(FileNotFoundError):
+    """요청한 프롬프트가 로컬 저장소에 없을 때 발생하는 예외. (refresh 명령으로 추가)"""
+
+
+class PromptIntegrityError(ValueError):
+    """저장된 프롬프트 파일의 내용이 manifest의 해시와 다를 때 발생하는 예외."""
+
+
+# ----------------------------------------------------
+# 1. 직렬화 / 해시
+# ----------------------------------------------------
+
+def _canonical_json(data: Any) -> str:
+    """해시 계산용 정규화 JSON (키 정렬, 공백 제거)."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+def content_hash(serialized: Dict[str, Any]) -> str:
+    """직렬화된 프롬프트의 sha256 해시."""
+    return hashlib.sha256(_canonical_json(serialized).encode()).hexdigest()
+
+def _prompt_dir_name(name: str) -> str:
+    # "hwchase17/openai-tools-agent" -> "hwchase17__openai-tools-agent"
+    return name.replace("/", "__")
+
+def _read_json(path: str) -> Any:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_json(path: str, data: Any) -> None:
+    # 임시 파일에 쓴 뒤 교체하여 중간에 중단되어도 manifest가 깨지지 않도록 합니다.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------
+# 2. 저장소
+# ----------------------------------------------------
+
+class PromptStore:
+    """
+    prompts/ 디렉터리 기반 프롬프트 저장소.
+
+    - load(name)은 로컬 파일만 읽으며, 해시를 검증한 뒤 프로세스 내에 캐시합니다. (두 번째 호출부터 비용 없음)
+    - save(name, prompt)는 내용 해시로 버전 파일을 만들고 manifest의 현재 버전을 갱신합니다.
+      이전 버전 파일은 남겨 두므로 manifest만 되돌리면 롤백할 수 있습니다.
+    """
+
+    def __init__(self, root: str = PROMPT_DIR):
+        self.root = root
+        self._loaded: Dict[str, BasePromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        return _read_json(self.manifest_path)
+
+    def entry(self, name: str) -> Dict[str, Any]:
+        """manifest에서 프롬프트의 현재 버전 정보를 반환합니다."""
+        entry = self.manifest().get(name)
+        if entry is None:
+            raise PromptNotFoundError(
+                f"프롬프트 '{name}'이(가) 로컬 저장소({self.root})에 없습니다. "
+                f"'python prompt_store.py refresh {name}'로 추가하세요."
+            )
+        return entry
+
+    def _read_version(self, name: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        path = os.path.join(self.root, entry["file"])
+        if not os.path.exists(path):
+            raise PromptNotFoundError(f"프롬프트 '{name}'의 버전 파일이 없습니다: {path}")
+        serialized = _read_json(path)
+        actual = content_hash(serialized)
+        if actual != entry["sha256"]:
+            raise PromptIntegrityError(
+                f"프롬프트 '{name}'의 해시가 일치하지 않습니다. (manifest: {entry['sha256'][:12]}, 파일: {actual[:12]})"
+            )
+        return serialized
+
+    def load(self, name: str) -> BasePromptTemplate:
+        """로컬에 저장된 현재 버전의 프롬프트를 반환합니다. (네트워크 요청 없음)"""
+        prompt = self._loaded.get(name)
+        if prompt is None:
+            with self._lock:
+                prompt = self._loaded.get(name)
+                if prompt is None:
+                    serialized = self._read_version(name, self.entry(name))
+                    with warnings.catch_warnings():
+                        # langchain_core.load.load의 beta 경고는 매 시작마다 출력할 필요가 없음
+                        warnings.simplefilter("ignore")
+                        prompt = load(serialized)
+                    self._loaded[name] = prompt
+        return prompt
+
+    def save(self, name: str, prompt: BasePromptTemplate, source: Optional[str] = None) -> Dict[str, Any]:
+        """프롬프트를 새 버전으로 저장하고 manifest 항목을 반환합니다. 내용이 같으면 기존 버전을 유지합니다."""
+        serialized = dumpd(prompt)
+        sha256 = content_hash(serialized)
+        relative = os.path.join(_prompt_dir_name(name), f"{sha256[:12]}.json")
+        path = os.path.join(self.root, relative)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path):
+            _write_json(path, serialized)
+
+        manifest = self.manifest()
+        previous = manifest.get(name)
+        if previous is not None and previous["sha256"] == sha256:
+            return previous
+
+        entry = {
+            "file": relative,
+            "sha256": sha256,
+            "source": source or f"hub:{name}",
+            "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "previous_sha256": previous["sha256"] if previous else None,
+        }
+        manifest[name] = entry
+        _write_json(self.manifest_path, manifest)
+        with self._lock:
+            self._loaded.pop(name, None)
+        return entry
+
+    def refresh(self, name: str) -> Dict[str, Any]:
+        """Hub에서 프롬프트를 받아 저장합니다. (네트워크 요청은 이 명령에서만 발생)"""
+        from langchain import hub
+        return self.save(name, hub.pull(name), source=f"hub:{name}")
+
+    def verify(self) -> Dict[str, str]:
+        """manifest의 모든 프롬프트 해시를 검증하여 {이름: "ok" 또는 오류 메시지}를 반환합니다."""
+        results = {}
+        for name, entry in self.manifest().items():
+            try:
+                self._read_version(name, entry)
+                results[name] = "ok"
+            except (PromptNotFoundError, PromptIntegrityError) as e:
+                results[name] = str(e)
+        return results
+
+
+# 기본 저장소 (node.py에서 사용)
+PROMPT_STORE = PromptStore()
+
+def load_prompt(name: str) -> BasePromptTemplate:
+    """기본 저장소에서 프롬프트를 불러옵니다."""
+    return PROMPT_STORE.load(name)
+
+
+# ----------------------------------------------------
+# 3. 명령줄 인터페이스
+# ----------------------------------------------------
+
+def main(argv=None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="로컬 프롬프트 저장소 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = sub.add_parser("refresh", help="Hub에서 프롬프트를 받아 새 버전으로 저장")
+    refresh_parser.add_argument("names", nargs="+")
+    sub.add_parser("list", help="저장된 프롬프트와 현재 해시 출력")
+    sub.add_parser("verify", help="저장된 프롬프트 파일의 해시 검증")
+    args = parser.parse_args(argv)
+
+    if args.command == "refresh":
+        for name in args.names:
+            entry = PROMPT_STORE.refresh(name)
+            print(f"✅ {name}: {entry['sha256'][:12]} ({entry['file']})")
+        return 0
+
+    if args.command == "list":
+        for name, entry in sorted(PROMPT_STORE.manifest().items()):
+            print(f"{name}\t{entry['sha256'][:12]}\t{entry['updated_at']}\t{entry['source']}")
+        return 0
+
+    failed = 0
+    for name, result in PROMPT_STORE.verify().items():
+        print(f"{'✅' if result == 'ok' else '❌'} {name}: {result}")
+        failed += result != "ok"
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
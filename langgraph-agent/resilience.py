@@ -0,0 +1,385 @@
+# resilience.py
+
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+import httpx
+from deadline import DeadlineExceeded, current_remaining, deadline_expired
+from observability import observe_dependency
+from tracing import start_span
+
+# ----------------------------------------------------
+# 외부 의존성(OpenAI, Supabase) 호출 재시도 + 서킷 브레이커
+# ----------------------------------------------------
+# 일시적인 장애(429, 5xx, 연결 끊김, 타임아웃)는 지터가 있는 지수 백오프로 재시도하고, 같은 의존성의
+# 실패가 연속되면 서킷을 열어 일정 시간 동안 호출 없이 바로 CircuitOpenError를 발생시킵니다.
+# 최종 실패는 Dependency.error_code()로 ErrorInfo / 도구 응답의 에러 코드(LLM_RATE_LIMIT, TOOL_TIMEOUT 등)에 대응됩니다.
+#
+# 환경 변수 (RESILIENCE_<KEY>가 공통 값, RESILIENCE_<NAME>_<KEY>가 의존성별 값. 예: RESILIENCE_OPENAI_MAX_ATTEMPTS)
+#   - MAX_ATTEMPTS      : 최초 호출을 포함한 최대 시도 횟수 (1이면 재시도 없음)
+#   - BASE_DELAY        : 첫 재시도 전 최대 대기 시간(초). 시도마다 2배씩 증가 (full jitter)
+#   - MAX_DELAY         : 재시도 대기 시간 상한(초)
+#   - FAILURE_THRESHOLD : 서킷을 열기까지의 연속 실패 수
+#   - RESET_TIMEOUT     : 서킷을 연 뒤 시험 호출(half-open)을 허용하기까지의 시간(초)
+
+RETRY_DEFAULTS: Dict[str, Any] = {
+    "MAX_ATTEMPTS": 3,
+    "BASE_DELAY": 0.5,
+    "MAX_DELAY": 8.0,
+    "FAILURE_THRESHOLD": 5,
+    "RESET_TIMEOUT": 30.0,
+}
+
+# 의존성별 기본값 (DB 조회는 짧게 재시도하고 빨리 복구 시도)
+DEPENDENCY_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "supabase": {"BASE_DELAY": 0.1, "MAX_DELAY": 1.0, "RESET_TIMEOUT": 15.0},
+    "openai": {},
+}
+
+def _setting(name: str, key: str) -> Any:
+    default = DEPENDENCY_DEFAULTS.get(name, {}).get(key, RETRY_DEFAULTS[key])
+    raw = os.getenv(f"RESILIENCE_{name.upper()}_{key}", os.getenv(f"RESILIENCE_{key}"))
+    return default if raw is None else type(default)(raw)
+
+# ----------------------------------------------------
+# 1. 실패 분류
+# ----------------------------------------------------
+
+# 재시도 대상 실패 종류: rate_limit / timeout / unavailable. 그 외(잘못된 요청, 인증 오류 등)는 재시도하지 않음
+RATE_LIMIT, TIMEOUT, UNAVAILABLE = "rate_limit", "timeout", "unavailable"
+
+# langchain_openai/openai 임포트 비용을 피하기 위해 SDK 예외는 클래스 이름으로 구분합니다.
+_TIMEOUT_ERROR_NAMES = {"APITimeoutError"}
+_CONNECTION_ERROR_NAMES = {"APIConnectionError"}
+
+def failure_kind(e: BaseException) -> Optional[str]:
+    """예외를 재시도 대상 실패 종류로 분류합니다. 재시도하면 안 되는 예외는 None."""
+    names = {cls.__name__ for cls in type(e).__mro__}
+    if isinstance(e, (httpx.TimeoutException, TimeoutError, asyncio.TimeoutError)) or names & _TIMEOUT_ERROR_NAMES:
+        return TIMEOUT
+    if isinstance(e, (httpx.TransportError, ConnectionError)) or names & _CONNECTION_ERROR_NAMES:
+        return UNAVAILABLE
+    status = _http_status(e)
+    if status == 429:
+        return RATE_LIMIT
+    if status == 408:
+        return TIMEOUT
+    if isinstance(status, int) and status >= 500:
+        return UNAVAILABLE
+    return None
+
+def _http_status(e: BaseException) -> Optional[int]:
+    """
+    예외의 HTTP 상태 코드. openai SDK는 status_code, httpx는 response.status_code에 있고,
+    postgrest APIError는 code에 정수 또는 숫자 문자열로 있습니다. (PostgreSQL SQLSTATE 같은 5자리 코드는 제외)
+    """
+    status = getattr(e, "status_code", None)
+    if status is None and isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+    if status is None and "APIError" in {cls.__name__ for cls in type(e).__mro__}:
+        status = getattr(e, "code", None)
+    if isinstance(status, str) and status.isdigit():
+        status = int(status)
+    return status if isinstance(status, int) and 100 <= status <= 599 else None
+
+def _retry_after_header(e: BaseException) -> Optional[float]:
+    """429/503 응답의 Retry-After(초)가 있으면 반환합니다."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers is not None and headers.get("retry-after") else None
+    except (TypeError, ValueError):
+        return None
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 의존성을 호출하지 않고 실패함. retry_after: 시험 호출이 허용되기까지 남은 시간(초)."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        self.dependency = dependency
+        self.retry_after = retry_after
+        super().__init__(f"{dependency} 서킷이 열려 있습니다. ({retry_after:.1f}s 후 재시도)")
+
+# ----------------------------------------------------
+# 2. 서킷 브레이커
+# ----------------------------------------------------
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold에 도달하면 열리고(open), reset_timeout 후 시험 호출 하나만 허용합니다(half_open).
+    시험 호출이 성공하면 닫히고(closed), 실패하면 다시 reset_timeout 동안 열립니다. (스레드 안전)
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._counters = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> None:
+        """호출 전에 확인합니다. 열려 있거나 다른 시험 호출이 진행 중이면 CircuitOpenError."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            self._counters["rejected"] += 1
+            remaining = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+        raise CircuitOpenError(self.name, remaining)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self._counters["opened"] += 1
+                self._opened_at = self._clock()
+                self._probing = False
+
+    def release_probe(self) -> None:
+        """의존성 실패가 아닌 이유(잘못된 요청 등)로 끝난 시험 호출의 자리를 반납합니다."""
+        with self._lock:
+            self._probing = False
+
+    def reset(self) -> None:
+        """서킷을 닫힌 상태로 되돌립니다. (운영 중 수동 복구, 테스트 격리용)"""
+        self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures, **self._counters}
+
+# ----------------------------------------------------
+# 3. 의존성별 재시도 정책
+# ----------------------------------------------------
+
+class Dependency:
+    """
+    외부 의존성 하나의 재시도 정책과 서킷 브레이커.
+
+    - call(fn) / acall(coro_fn)       : 재시도 대상 실패는 백오프 후 다시 호출하고, 최종 실패는 원래 예외를 전달
+    - stream(fn) / astream(fn)        : 스트리밍 호출. 첫 청크를 받기 전의 실패만 재시도
+    - retry=False                     : 멱등이 아닌 호출(INSERT). 서킷 브레이커만 적용
+    - error_code(e, default)          : 최종 예외를 에러 코드로 변환
+    """
+
+    def __init__(self, name: str, error_codes: Dict[str, str], max_attempts: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None,
+                 failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.error_codes = error_codes
+        self.max_attempts = max(1, max_attempts if max_attempts is not None else _setting(name, "MAX_ATTEMPTS"))
+        self.base_delay = base_delay if base_delay is not None else _setting(name, "BASE_DELAY")
+        self.max_delay = max_delay if max_delay is not None else _setting(name, "MAX_DELAY")
+        self.breaker = CircuitBreaker(
+            name,
+            failure_threshold if failure_threshold is not None else _setting(name, "FAILURE_THRESHOLD"),
+            reset_timeout if reset_timeout is not None else _setting(name, "RESET_TIMEOUT"),
+        )
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "failures": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def backoff(self, attempt: int, e: BaseException) -> float:
+        """attempt번째 실패 후 대기 시간: [0, min(max_delay, base_delay * 2^(attempt-1))] 균등 분포 (full jitter)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = _retry_after_header(e)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def _failed(self, e: BaseException, attempt: int, retry: bool) -> Optional[float]:
+        """실패를 기록하고, 재시도할 경우 대기 시간을, 포기할 경우 None을 반환합니다."""
+        if failure_kind(e) is None or isinstance(e, DeadlineExceeded) or deadline_expired():
+            # 요청 마감으로 줄어든 제한 시간 때문에 실패한 것은 의존성 장애로 세지 않습니다.
+            self.breaker.release_probe()
+            return None
+        self.breaker.record_failure()
+        if not retry or attempt >= self.max_attempts or self.breaker.state == "open":
+            self._count("failures")
+            return None
+        delay = self.backoff(attempt, e)
+        left = current_remaining()
+        if left is not None and delay >= left:
+            # 백오프 후에는 마감 시각이 지나므로 재시도하지 않음
+            self._count("failures")
+            return None
+        self._count("retries")
+        return delay
+
+    def call(self, fn: Callable[[], Any], retry: bool = True) -> Any:
+        # 재시도를 포함한 전체 호출 시간을 의존성/도구별 지연 히스토그램과 client span으로 기록
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with start_span(f"{self.name} call", kind="client", attributes={"peer.service": self.name}):
+                result = self._call(fn, retry)
+            outcome = "ok"
+            return result
+        finally:
+            observe_dependency(self.name, outcome, time.perf_counter() - started)
+
+    async def acall(self, coro_fn: Callable[[], Awaitable[Any]], retry: bool = True) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with start_span(f"{self.name} call", kind="client", attributes={"peer.service": self.name}):
+                result = await self._acall(coro_fn, retry)
+            outcome = "ok"
+            return result
+        finally:
+            observe_dependency(self.name, outcome, time.perf_counter() - started)
+
+    def _call(self, fn: Callable[[], Any], retry: bool) -> Any:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, attempt, retry)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+            except BaseException:
+                # 취소/중단(GeneratorExit)은 의존성 실패가 아니므로 시험 호출 자리만 반납
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def _acall(self, coro_fn: Callable[[], Awaitable[Any]], retry: bool) -> Any:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                delay = self._failed(e, attempt, retry)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 취소/중단(GeneratorExit)은 의존성 실패가 아니므로 시험 호출 자리만 반납
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stream(self, fn: Callable[[], Iterator[Any]]) -> Iterator[Any]:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            started = False
+            try:
+                for chunk in fn():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                delay = self._failed(e, attempt, retry=not started)
+                if delay is None:
+                    raise
+                self._sleep(delay)
+            except BaseException:
+                # 취소/중단(GeneratorExit)은 의존성 실패가 아니므로 시험 호출 자리만 반납
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return
+
+    async def astream(self, fn: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        self._count("calls")
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.allow()
+            started = False
+            try:
+                async for chunk in fn():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                delay = self._failed(e, attempt, retry=not started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 취소/중단(GeneratorExit)은 의존성 실패가 아니므로 시험 호출 자리만 반납
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                return
+
+    def error_code(self, e: BaseException, default: str) -> str:
+        """최종 예외의 에러 코드. 서킷이 열려 있었으면 unavailable 코드, 분류되지 않는 예외는 default."""
+        if isinstance(e, CircuitOpenError):
+            return self.error_codes[UNAVAILABLE]
+        return self.error_codes.get(failure_kind(e), default)
+
+    def reset(self) -> None:
+        self.breaker.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {**counters, "circuit": self.breaker.stats()}
+
+# 에러 코드별 사용자 메시지 (ErrorHandler / 도구 응답의 user_message)
+USER_MESSAGES: Dict[str, str] = {
+    "LLM_RATE_LIMIT": "현재 요청이 많아 답변을 생성하지 못했습니다. 잠시 후 다시 시도해 주세요.",
+    "LLM_TIMEOUT": "답변 생성이 지연되고 있습니다. 잠시 후 다시 시도해 주세요.",
+    "LLM_UNAVAILABLE": "AI 서비스에 일시적인 문제가 있습니다. 잠시 후 다시 시도해 주세요.",
+    "TOOL_TIMEOUT": "데이터 조회가 지연되고 있습니다. 잠시 후 다시 시도해 주세요.",
+    "DB_UNAVAILABLE": "데이터베이스에 일시적으로 연결할 수 없습니다. 잠시 후 다시 시도해 주세요.",
+    "DEADLINE_EXCEEDED": "요청 처리 시간이 초과되었습니다. 질문을 나누어 다시 시도해 주세요.",
+}
+
+OPENAI = Dependency("openai", {RATE_LIMIT: "LLM_RATE_LIMIT", TIMEOUT: "LLM_TIMEOUT", UNAVAILABLE: "LLM_UNAVAILABLE"})
+SUPABASE = Dependency("supabase", {RATE_LIMIT: "DB_UNAVAILABLE", TIMEOUT: "TOOL_TIMEOUT", UNAVAILABLE: "DB_UNAVAILABLE"})
+
+def resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """/stats의 resilience 항목."""
+    return {dependency.name: dependency.stats() for dependency in (OPENAI, SUPABASE)}
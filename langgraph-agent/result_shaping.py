@@ -0,0 +1,169 @@
+# result_shaping.py
+
+import os
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+# ----------------------------------------------------
+# 도구 결과 가공: ToolExecutor → ResultProcessor 사이에서 원본 행을 LLM용 집계로 축약
+# ----------------------------------------------------
+# get_workout_history의 원본 행(exercises jsonb 포함)을 그대로 ToolMessage에 넣으면 기록이 많은 사용자는
+# 프롬프트가 수만 토큰이 됩니다. 가공기(shaper)가 등록된 도구는 Python에서 집계한 요약만 전달하고,
+# 도구 인자 include_raw=true로 요청한 경우에만 원본 행을 함께 전달합니다.
+
+# 도구 인자 중 원본 데이터 포함 여부를 나타내는 이름
+RAW_ARGUMENT = "include_raw"
+# 요약에 포함할 최근 세션 수
+RECENT_SESSION_COUNT = int(os.getenv("TOOL_RESULT_RECENT_SESSIONS", "5"))
+# 운동별 볼륨 추이에 남길 최근 값 개수
+VOLUME_TREND_POINTS = int(os.getenv("TOOL_RESULT_TREND_POINTS", "8"))
+
+# --- exercises 파싱 ---
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def parse_exercises(value: Any) -> List[Dict[str, Any]]:
+    """
+    sessions.exercises 값을 [{name, weight, reps, sets}, ...]로 변환합니다.
+    jsonb 리스트와 JSON 문자열(add_workout_session 입력)을 모두 허용하며, 해석할 수 없으면 빈 리스트를 반환합니다.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    exercises = []
+    for item in value:
+        if isinstance(item, dict) and item.get("name"):
+            exercises.append({
+                "name": str(item["name"]),
+                "weight": _number(item.get("weight")),
+                "reps": _number(item.get("reps")),
+                "sets": _number(item.get("sets")),
+            })
+    return exercises
+
+def exercise_volume(exercise: Dict[str, Any]) -> float:
+    """운동 하나의 볼륨 (weight x reps x sets, 웹 클라이언트와 같은 계산식)."""
+    return exercise["weight"] * exercise["reps"] * exercise["sets"]
+
+def _compact_number(value: float) -> Any:
+    return int(value) if float(value).is_integer() else round(value, 1)
+
+def _date(created_at: Any) -> Optional[str]:
+    return str(created_at)[:10] if created_at else None
+
+# --- 운동 기록 집계 ---
+
+def summarize_workout_rows(rows: List[Dict[str, Any]], recent: int = RECENT_SESSION_COUNT,
+                           trend_points: int = VOLUME_TREND_POINTS) -> Dict[str, Any]:
+    """
+    get_workout_history 행 목록(최신순)을 LLM에 전달할 집계로 변환합니다.
+
+    - session_count / period / total_volume : 세션 수, 기간, 총·평균 볼륨
+    - exercises : 운동별 세션 수, 총 볼륨, 최고 중량(PR)과 날짜, 최근 볼륨 추이와 직전 대비 변화율
+    - recent_sessions : 최근 N개 세션의 날짜, 총 볼륨, 운동 요약 문자열
+    """
+    ordered = sorted(rows, key=lambda row: (str(row.get("created_at") or ""), str(row.get("id") or "")))
+    volumes = [_number(row.get("total_volume")) for row in ordered]
+
+    exercises: Dict[str, Dict[str, Any]] = {}
+    for row in ordered:
+        date = _date(row.get("created_at"))
+        session_volumes: Dict[str, float] = {}
+        for exercise in parse_exercises(row.get("exercises")):
+            name = exercise["name"]
+            stats = exercises.setdefault(name, {"sessions": 0, "total_volume": 0.0, "best_weight": 0.0,
+                                                "best_weight_date": None, "trend": []})
+            session_volumes[name] = session_volumes.get(name, 0.0) + exercise_volume(exercise)
+            if exercise["weight"] > stats["best_weight"]:
+                stats["best_weight"], stats["best_weight_date"] = exercise["weight"], date
+        for name, volume in session_volumes.items():
+            stats = exercises[name]
+            stats["sessions"] += 1
+            stats["total_volume"] += volume
+            stats["trend"].append(volume)
+
+    exercise_summary = {}
+    for name, stats in sorted(exercises.items(), key=lambda item: -item[1]["total_volume"]):
+        trend = stats["trend"]
+        summary = {
+            "sessions": stats["sessions"],
+            "total_volume": _compact_number(stats["total_volume"]),
+            "best_weight": _compact_number(stats["best_weight"]),
+            "best_weight_date": stats["best_weight_date"],
+            "volume_trend": [_compact_number(v) for v in trend[-trend_points:]],
+        }
+        if len(trend) >= 2 and trend[-2] > 0:
+            summary["change_vs_previous_pct"] = round((trend[-1] - trend[-2]) / trend[-2] * 100, 1)
+        exercise_summary[name] = summary
+
+    recent_sessions = []
+    for row in reversed(ordered[-recent:] if recent > 0 else []):
+        recent_sessions.append({
+            "date": _date(row.get("created_at")),
+            "total_volume": _compact_number(_number(row.get("total_volume"))),
+            "exercises": ", ".join(
+                f"{e['name']} {_compact_number(e['weight'])}kg x{_compact_number(e['reps'])} x{_compact_number(e['sets'])}"
+                for e in parse_exercises(row.get("exercises"))
+            ),
+        })
+
+    return {
+        "session_count": len(ordered),
+        "period": {"first": _date(ordered[0].get("created_at")), "last": _date(ordered[-1].get("created_at"))} if ordered else None,
+        "total_volume": {
+            "sum": _compact_number(sum(volumes)),
+            "average": _compact_number(sum(volumes) / len(volumes)) if volumes else 0,
+            "max": _compact_number(max(volumes)) if volumes else 0,
+        },
+        "exercises": exercise_summary,
+        "recent_sessions": recent_sessions,
+    }
+
+def shape_workout_history(output: Dict[str, Any]) -> Dict[str, Any]:
+    """get_workout_history 성공 응답의 data(원본 행)를 summary(집계)로 교체합니다."""
+    rows = output.get("data") or []
+    shaped = {key: value for key, value in output.items() if key != "data"}
+    shaped["summary"] = summarize_workout_rows(rows)
+    shaped["raw_rows_omitted"] = len(rows)
+    return shaped
+
+def shape_coaching_context(output: Dict[str, Any]) -> Dict[str, Any]:
+    """get_coaching_context 응답 중 운동 세션 원본 행을 집계로 교체합니다. (영양 등 다른 테이블은 행 크기가 작아 그대로 전달)"""
+    context = dict(output.get("context") or {})
+    sessions = context.get("sessions")
+    if isinstance(sessions, dict) and sessions.get("status") == "success":
+        rows = sessions.get("data") or []
+        context["sessions"] = {"status": "success", "summary": summarize_workout_rows(rows), "raw_rows_omitted": len(rows)}
+    return {**output, "context": context}
+
+# 도구 이름 → 가공기. 가공기가 없는 도구의 결과는 그대로 전달됩니다.
+RESULT_SHAPERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "get_workout_history": shape_workout_history,
+    "get_coaching_context": shape_coaching_context,
+}
+
+def shape_tool_output(tool_name: str, tool_args: Dict[str, Any], output: Any) -> Any:
+    """
+    도구 결과를 LLM에 전달할 형태로 가공합니다.
+    성공 응답이 아니거나, 가공기가 없거나, include_raw=true로 원본을 요청한 경우 원본을 그대로 반환합니다.
+    """
+    shaper = RESULT_SHAPERS.get(tool_name)
+    if shaper is None or tool_args.get(RAW_ARGUMENT):
+        return output
+    if not isinstance(output, dict) or output.get("status") != "success":
+        return output
+    return shaper(output)
+
+def tool_message_content(tool_name: str, tool_args: Dict[str, Any], output: Any) -> str:
+    """ToolMessage.content로 사용할 JSON 문자열. (한글 운동명이 \\uXXXX로 늘어나지 않도록 ensure_ascii=False)"""
+    return json.dumps(shape_tool_output(tool_name, tool_args, output), ensure_ascii=False, default=str)
@@ -0,0 +1,267 @@
+# semantic_cache.py
+
+import re
+import time
+import zlib
+import threading
+import unicodedata
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+
+# ----------------------------------------------------
+# 의미 기반 답변 캐시: 정규화한 질문의 임베딩으로 최근접 이웃을 찾아 저장된 답변을 재사용
+# ----------------------------------------------------
+
+# 질문에 포함된 사용자 ID(UUID)는 캐시 범위(user_id)로 분리하고, 임베딩에서는 같은 토큰으로 치환합니다.
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+_PUNCTUATION = re.compile(r"[^\w\s<>]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+_NUMBER = re.compile(r"\d+")
+
+def normalize_question(question: str) -> str:
+    """유니코드 정규화(NFKC), 소문자화, 사용자 ID/문장부호 제거, 공백 정리."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    text = UUID_PATTERN.sub(" <user> ", text)
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+def literal_key(normalized: str) -> int:
+    """
+    정규화한 질문의 숫자(기간, 날짜, 횟수, 중량 등) 순서로 만든 키.
+    "최근 7일"과 "최근 30일"처럼 숫자만 다른 질문은 임베딩이 거의 같아도 답변이 다르므로, 이 키가 같을 때만 hit 입니다.
+    """
+    return zlib.crc32(" ".join(_NUMBER.findall(normalized)).encode())
+
+def extract_user_id(question: str) -> Optional[str]:
+    """질문에서 사용자 ID(UUID)를 찾습니다. 없으면 None."""
+    match = UUID_PATTERN.search(question)
+    return match.group(0).lower() if match else None
+
+
+class HashingEmbedder:
+    """
+    외부 모델 없이 로컬에서 계산하는 문자 n-gram 해싱 임베딩.
+
+    - 공백을 제거한 문자 bigram/trigram(한국어 띄어쓰기 차이에 강함)과 단어 unigram을 dim 차원에 해싱합니다.
+    - 부호 해싱으로 충돌 편향을 줄이고 L2 정규화하므로 내적이 곧 코사인 유사도입니다.
+    - 표현이 거의 같은 반복 질문을 찾기 위한 용도이며, 번역/의역 수준의 유사도가 필요하면
+      SemanticAnswerCache(embed_fn=...)로 다른 임베딩 함수를 주입할 수 있습니다.
+    """
+
+    def __init__(self, dim: int = 512, ngram_sizes=(2, 3)):
+        self.dim = dim
+        self.ngram_sizes = ngram_sizes
+
+    def _features(self, text: str) -> List[str]:
+        compact = text.replace(" ", "")
+        features = [f"w:{word}" for word in text.split()]
+        for n in self.ngram_sizes:
+            features.extend(f"c{n}:{compact[i:i + n]}" for i in range(max(len(compact) - n + 1, 0)))
+        return features
+
+    def __call__(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    (user_id, 질문 임베딩) → 답변 캐시. 벡터는 하나의 NumPy 행렬에 모아 두고 행렬-벡터 곱으로 최근접 이웃을 찾습니다.
+
+    - 같은 user_id 범위에서 질문의 숫자/날짜가 모두 같고(literal_key) 코사인 유사도가 threshold 이상이며, 저장 시점의
+      사용자 데이터 버전이 현재 버전과 같을 때만 hit 입니다. 버전이 다르면(그 사이 쓰기 발생) 항목을 제거합니다.
+    - ttl_seconds가 지난 항목은 만료되며, max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 제거(LRU)합니다.
+    - max_answer_chars보다 긴 답변은 저장하지 않습니다. (메모리 상한)
+    - 동기/비동기 노드가 함께 사용하므로 스레드 안전합니다.
+    """
+
+    def __init__(self, embed_fn: Optional[Callable[[str], np.ndarray]] = None, threshold: float = 0.9,
+                 max_entries: int = 2048, ttl_seconds: float = 3600.0, max_answer_chars: int = 8000,
+                 initial_capacity: int = 64):
+        self.embed_fn = embed_fn or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_answer_chars = max_answer_chars
+        self._initial_capacity = max(1, min(initial_capacity, max_entries))
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "expirations": 0, "evictions": 0, "stores": 0}
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors: Optional[np.ndarray] = None  # 첫 저장 시 임베딩 차원에 맞춰 할당
+        self._owners = np.zeros(0, dtype=np.int64)
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._literals = np.zeros(0, dtype=np.int64)
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._last_used = np.zeros(0, dtype=np.float64)
+        self._answers: List[Optional[str]] = []
+        self._user_codes: Dict[Optional[str], int] = {}
+        self._size = 0
+
+    # --- 조회 / 저장 ---
+
+    def probe(self, user_id: Optional[str], question: str) -> bool:
+        """
+        버전 확인 전에 만료되지 않은 후보 항목이 있는지 확인합니다. 호출자는 후보가 있을 때만 현재 데이터 버전을
+        조회해 lookup()으로 검증합니다. 후보가 없으면 이 조회를 miss로 집계합니다.
+        """
+        normalized = normalize_question(question)
+        query = self.embed_fn(normalized)
+        with self._lock:
+            if self._candidate(user_id, query, literal_key(normalized)) is None:
+                self._counters["misses"] += 1
+                return False
+            return True
+
+    def lookup(self, user_id: Optional[str], question: str, version: int) -> Optional[str]:
+        """캐시된 답변을 반환합니다. 유사한 질문이 없거나 만료/버전 불일치면 None."""
+        normalized = normalize_question(question)
+        query = self.embed_fn(normalized)
+        with self._lock:
+            index = self._candidate(user_id, query, literal_key(normalized))
+            if index is None:
+                self._counters["misses"] += 1
+                return None
+            if self._versions[index] != version:
+                self._remove(index)
+                self._counters["stale"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._last_used[index] = time.monotonic()
+            self._counters["hits"] += 1
+            return self._answers[index]
+
+    def store(self, user_id: Optional[str], question: str, answer: str, version: int) -> bool:
+        """답변을 저장합니다. 같은 범위에 거의 같은 질문이 있으면 그 항목을 갱신합니다."""
+        if not answer or len(answer) > self.max_answer_chars:
+            return False
+        normalized = normalize_question(question)
+        vector = self.embed_fn(normalized).astype(np.float32, copy=False)
+        literals = literal_key(normalized)
+        with self._lock:
+            index = self._nearest(user_id, vector, literals, threshold=0.999)
+            if index is None:
+                index = self._allocate(vector.shape[0])
+                self._owners[index] = self._user_code(user_id)
+                self._literals[index] = literals
+            now = time.monotonic()
+            self._vectors[index] = vector
+            self._versions[index] = version
+            self._expires[index] = now + self.ttl_seconds
+            self._last_used[index] = now
+            self._answers[index] = answer
+            self._counters["stores"] += 1
+            return True
+
+    def invalidate(self, user_id: Optional[str]) -> int:
+        """한 사용자 범위의 모든 항목을 제거하고 제거된 항목 수를 반환합니다."""
+        with self._lock:
+            code = self._user_codes.get(user_id)
+            if code is None:
+                return 0
+            indices = np.flatnonzero(self._owners[:self._size] == code)
+            # 뒤에서부터 제거해야 마지막 행과 교체해도 남은 인덱스가 유효합니다.
+            for index in indices[::-1]:
+                self._remove(int(index))
+            return len(indices)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def stats(self) -> Dict[str, Any]:
+        """hit-rate 등 캐시 효과 측정용 카운터와 현재 사용량."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            vector_bytes = 0 if self._vectors is None else int(self._vectors[:self._size].nbytes)
+            return {
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else 0.0,
+                "entries": self._size,
+                "bytes": vector_bytes + sum(len(a.encode()) for a in self._answers[:self._size] if a),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+    # --- 내부 구현 (호출자가 _lock을 보유한 상태에서만 사용) ---
+
+    def _user_code(self, user_id: Optional[str]) -> int:
+        code = self._user_codes.get(user_id)
+        if code is None:
+            code = self._user_codes[user_id] = len(self._user_codes)
+        return code
+
+    def _nearest(self, user_id: Optional[str], query: np.ndarray, literals: int,
+                 threshold: Optional[float] = None) -> Optional[int]:
+        code = self._user_codes.get(user_id)
+        if code is None or self._size == 0:
+            return None
+        scores = self._vectors[:self._size] @ query
+        scores[(self._owners[:self._size] != code) | (self._literals[:self._size] != literals)] = -np.inf
+        index = int(np.argmax(scores))
+        if scores[index] < (self.threshold if threshold is None else threshold):
+            return None
+        return index
+
+    def _candidate(self, user_id: Optional[str], query: np.ndarray, literals: int) -> Optional[int]:
+        # 최근접 항목이 만료되었으면 제거하고 None
+        index = self._nearest(user_id, query, literals)
+        if index is not None and self._expires[index] <= time.monotonic():
+            self._remove(index)
+            self._counters["expirations"] += 1
+            return None
+        return index
+
+    def _allocate(self, dim: int) -> int:
+        if self._vectors is None:
+            self._grow(self._initial_capacity, dim)
+        if self._size == self._vectors.shape[0]:
+            if self._size < self.max_entries:
+                self._grow(min(self._size * 2, self.max_entries), dim)
+            else:
+                self._evict_one()
+        index = self._size
+        self._size += 1
+        return index
+
+    def _grow(self, capacity: int, dim: int) -> None:
+        vectors = np.zeros((capacity, dim), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._owners = np.resize(self._owners, capacity)
+        self._versions = np.resize(self._versions, capacity)
+        self._literals = np.resize(self._literals, capacity)
+        self._expires = np.resize(self._expires, capacity)
+        self._last_used = np.resize(self._last_used, capacity)
+        self._answers.extend([None] * (capacity - len(self._answers)))
+
+    def _evict_one(self) -> None:
+        # 만료된 항목이 있으면 우선 제거하고, 없으면 가장 오래 사용하지 않은 항목을 제거
+        expired = np.flatnonzero(self._expires[:self._size] <= time.monotonic())
+        if len(expired):
+            self._remove(int(expired[0]))
+            self._counters["expirations"] += 1
+            return
+        self._remove(int(np.argmin(self._last_used[:self._size])))
+        self._counters["evictions"] += 1
+
+    def _remove(self, index: int) -> None:
+        # 마지막 행을 빈 자리로 옮겨 행렬을 연속으로 유지합니다. (O(dim))
+        last = self._size - 1
+        if index != last:
+            self._vectors[index] = self._vectors[last]
+            self._owners[index] = self._owners[last]
+            self._versions[index] = self._versions[last]
+            self._literals[index] = self._literals[last]
+            self._expires[index] = self._expires[last]
+            self._last_used[index] = self._last_used[last]
+            self._answers[index] = self._answers[last]
+        self._answers[last] = None
+        self._size = last
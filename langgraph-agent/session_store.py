@@ -0,0 +1,172 @@
+# session_store.py
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from result_shaping import parse_exercises
+from analytics import TrainingFrame, parse_created_at
+
+# ----------------------------------------------------
+# 로컬 열(columnar) 세션 저장소: 사용자별 append-only 바이너리 열 파일 + created_at/id 워터마크
+# ----------------------------------------------------
+# 분석 경로가 매번 전체 기록을 Supabase에서 다시 읽지 않도록, 한 번 받은 행은 열 단위 파일에 추가해 두고
+# 다음 요청에서는 워터마크 이후의 행(delta)만 조회하여 이어 붙입니다.
+# 읽기는 np.memmap으로 파일을 그대로 매핑하므로 TrainingFrame 생성 시 배열 복사가 없습니다.
+#
+# 파일 구성 (사용자별 디렉터리):
+#   meta.json          : 워터마크, 확정된 행 수, 운동 이름 목록
+#   <열 이름>.bin       : 열 하나의 원시 바이트 (dtype은 아래 표 참고)
+# meta.json의 행 수까지만 유효한 데이터로 보므로, 추가 도중 중단되어 남은 꼬리 바이트는 다음 추가 시 잘라냅니다.
+# (DB에서 수정/삭제된 행은 반영하지 않는 append-only 저장소입니다. 필요하면 reset()으로 다시 받습니다.)
+
+SESSION_STORE_DIR = os.getenv("AGENT_SESSION_STORE_DIR", os.path.join(".agent_data", "sessions"))
+
+# 세션 열 (세션 1개당 1행)
+SESSION_COLUMNS: Dict[str, np.dtype] = {
+    "session_time": np.dtype("int64"),      # created_at (UTC, epoch 초)
+    "session_volume": np.dtype("float64"),  # total_volume
+}
+# 운동 열 (exercises 항목 1개당 1행)
+EXERCISE_COLUMNS: Dict[str, np.dtype] = {
+    "session_index": np.dtype("int64"),
+    "exercise_code": np.dtype("int64"),
+    "weight": np.dtype("float64"),
+    "reps": np.dtype("float64"),
+    "sets": np.dtype("float64"),
+}
+
+def _row_key(created_at: Any, row_id: Any) -> Tuple[np.datetime64, Any]:
+    """행 순서 비교용 키 (created_at 마이크로초, id)."""
+    return parse_created_at(created_at, "us"), row_id
+
+
+class SessionStore:
+    """
+    사용자별 열 저장소.
+
+    - watermark(user_id): 마지막으로 저장한 행의 (created_at 원문, id). 없으면 None
+    - append(user_id, rows): created_at, id 오름차순 행을 이어 붙이고 워터마크를 갱신 (이미 받은 행은 건너뜀)
+    - frame(user_id): 저장된 열을 memmap한 TrainingFrame (analytics.py에서 그대로 사용)
+    """
+
+    def __init__(self, directory: str = SESSION_STORE_DIR):
+        self.directory = directory
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._counters = {"syncs": 0, "appended_rows": 0, "skipped_rows": 0}
+
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode()).hexdigest()[:32])
+
+    def _lock(self, user_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _load_meta(self, user_id: str) -> Dict[str, Any]:
+        meta = self._meta.get(user_id)
+        if meta is None:
+            try:
+                with open(os.path.join(self._user_dir(user_id), "meta.json"), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {"watermark": None, "sessions": 0, "entries": 0, "exercise_names": []}
+            self._meta[user_id] = meta
+        return meta
+
+    def watermark(self, user_id: str) -> Optional[Tuple[str, Any]]:
+        with self._lock(user_id):
+            watermark = self._load_meta(user_id)["watermark"]
+        return tuple(watermark) if watermark else None
+
+    def append(self, user_id: str, rows: List[Dict[str, Any]]) -> int:
+        """
+        워터마크 이후의 행만 열 파일 끝에 추가하고, 추가한 행 수를 반환합니다.
+        동시에 같은 delta를 받아 온 요청이 있어도 워터마크 비교로 중복 저장하지 않습니다.
+        """
+        with self._lock(user_id):
+            meta = dict(self._load_meta(user_id))
+            last = _row_key(*meta["watermark"]) if meta["watermark"] else None
+            names = {name: code for code, name in enumerate(meta["exercise_names"])}
+
+            sessions = {column: [] for column in SESSION_COLUMNS}
+            entries = {column: [] for column in EXERCISE_COLUMNS}
+            watermark = meta["watermark"]
+            for row in rows:
+                key = _row_key(row.get("created_at"), row.get("id"))
+                if np.isnat(key[0]) or (last is not None and key <= last):
+                    self._counters["skipped_rows"] += 1
+                    continue
+                last, watermark = key, [row["created_at"], row["id"]]
+                index = meta["sessions"] + len(sessions["session_time"])
+                sessions["session_time"].append(key[0].astype("datetime64[s]").astype(np.int64))
+                sessions["session_volume"].append(float(row.get("total_volume") or 0))
+                for exercise in parse_exercises(row.get("exercises")):
+                    entries["session_index"].append(index)
+                    entries["exercise_code"].append(names.setdefault(exercise["name"], len(names)))
+                    entries["weight"].append(exercise["weight"])
+                    entries["reps"].append(exercise["reps"])
+                    entries["sets"].append(exercise["sets"])
+
+            added = len(sessions["session_time"])
+            if added:
+                user_dir = self._user_dir(user_id)
+                os.makedirs(user_dir, exist_ok=True)
+                self._append_columns(user_dir, SESSION_COLUMNS, sessions, meta["sessions"])
+                self._append_columns(user_dir, EXERCISE_COLUMNS, entries, meta["entries"])
+                meta.update(
+                    watermark=watermark,
+                    sessions=meta["sessions"] + added,
+                    entries=meta["entries"] + len(entries["session_index"]),
+                    exercise_names=list(names),
+                )
+                # 열 파일을 모두 쓴 뒤 meta.json을 원자적으로 교체하여 행 수를 확정
+                path = os.path.join(user_dir, "meta.json")
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                os.replace(path + ".tmp", path)
+                self._meta[user_id] = meta
+            self._counters["syncs"] += 1
+            self._counters["appended_rows"] += added
+            return added
+
+    @staticmethod
+    def _append_columns(user_dir: str, columns: Dict[str, np.dtype], values: Dict[str, list], committed: int) -> None:
+        for column, dtype in columns.items():
+            path = os.path.join(user_dir, f"{column}.bin")
+            with open(path, "ab") as f:
+                f.truncate(committed * dtype.itemsize) # 확정되지 않은 꼬리 바이트 제거
+                f.write(np.asarray(values[column], dtype=dtype).tobytes())
+
+    def _column(self, user_dir: str, column: str, dtype: np.dtype, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(user_dir, f"{column}.bin"), dtype=dtype, mode="r", shape=(length,))
+
+    def frame(self, user_id: str) -> TrainingFrame:
+        """저장된 열을 복사 없이 매핑한 TrainingFrame을 반환합니다. (읽기 전용)"""
+        with self._lock(user_id):
+            meta = self._load_meta(user_id)
+            user_dir = self._user_dir(user_id)
+            session = {c: self._column(user_dir, c, d, meta["sessions"]) for c, d in SESSION_COLUMNS.items()}
+            entry = {c: self._column(user_dir, c, d, meta["entries"]) for c, d in EXERCISE_COLUMNS.items()}
+            names = list(meta["exercise_names"])
+        return TrainingFrame(
+            session_time=session["session_time"].view("datetime64[s]"),
+            session_volume=session["session_volume"],
+            exercise_names=names,
+            **entry,
+        )
+
+    def reset(self, user_id: str) -> None:
+        """사용자 저장소를 삭제합니다. 다음 동기화에서 전체 기록을 다시 받습니다."""
+        with self._lock(user_id):
+            self._meta.pop(user_id, None)
+            shutil.rmtree(self._user_dir(user_id), ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._counters, "users": len(self._meta), "directory": self.directory}
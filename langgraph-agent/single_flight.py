@@ -0,0 +1,91 @@
+# single_flight.py
+
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# ----------------------------------------------------
+# Single-flight: 같은 키로 동시에 들어온 요청은 한 번만 실행하고 결과를 공유
+# ----------------------------------------------------
+
+class SingleFlight:
+    """
+    진행 중인 실행을 키로 묶어 중복 실행을 막습니다. (결과를 저장하는 캐시가 아니며, 실행이 끝나면 키를 제거합니다.)
+
+    - run(key, fn)       : 동기 호출자용. 먼저 도착한 스레드(leader)가 fn()을 실행하고, 같은 키로 기다리던
+                           스레드는 같은 결과(또는 예외)를 받습니다.
+    - arun(key, coro_fn) : 비동기 호출자용. leader가 coro_fn()을 Task로 시작하고, 모든 호출자가 그 Task를 기다립니다.
+                           한 호출자가 취소되어도 Task는 취소되지 않으므로(asyncio.shield) 나머지 호출자는 결과를 받고,
+                           기다리는 호출자가 모두 취소되면(클라이언트 연결 끊김 등) Task도 취소합니다.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, concurrent.futures.Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._callers: Dict[asyncio.Task, int] = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0}
+
+    def run(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._calls[key] = future
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def arun(self, key: Hashable, coro_fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get(key)
+            # 다른 이벤트 루프(테스트의 asyncio.run 등)에서 시작된 Task는 공유하지 않음
+            if task is None or task.done() or task.get_loop() is not loop:
+                task = loop.create_task(coro_fn())
+                self._tasks[key] = task
+                task.add_done_callback(lambda done, key=key: self._finish(key, done))
+                self._counters["leaders"] += 1
+            else:
+                self._counters["coalesced"] += 1
+            self._callers[task] = self._callers.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            with self._lock:
+                callers = self._callers[task] - 1
+                if callers:
+                    self._callers[task] = callers
+                else:
+                    del self._callers[task]
+            if not callers and not task.done():
+                # 결과를 기다리는 호출자가 없으므로 실행을 계속할 이유가 없음
+                task.cancel()
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+        # 모든 호출자가 취소된 경우에도 "Task exception was never retrieved" 경고가 나지 않도록 예외를 확인
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls) + len(self._tasks)}
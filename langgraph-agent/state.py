@@ -4,6 +4,7 @@ from typing import TypedDict, List, Any, Optional, Union, Literal
 from langchain_core.messages import BaseMessage, ToolMessage
 from typing_extensions import Annotated
 from pydantic import BaseModel, Field
+from tracing import current_trace_id
 
 # ----------------------------------------------------
 # B-1 메시지 포맷 표준화: 노드 간 전달 정보를 구조화
@@ -11,11 +12,12 @@ from pydantic import BaseModel, Field
 
 class ErrorInfo(BaseModel):
     """오류 처리 노드(ErrorHandler)로 전달되는 구조화된 에러 정보."""
-    error_code: str = Field(..., description="내부 정의된 에러 코드 (e.g., TOOL_TIMEOUT, LLM_RATE_LIMIT)")
+    error_code: str = Field(..., description="내부 정의된 에러 코드 (e.g., TOOL_TIMEOUT, LLM_RATE_LIMIT, LLM_UNAVAILABLE, DB_UNAVAILABLE)")
     message: str = Field(..., description="개발자용 상세 에러 메시지")
     user_message: str = Field(..., description="사용자에게 친화적으로 표시할 메시지")
     node: str = Field(..., description="에러가 발생한 노드 이름")
-    trace_id: Optional[str] = None
+    # 에러가 발생한 요청의 trace ID (노드 span 안에서 생성되면 자동으로 채워짐)
+    trace_id: Optional[str] = Field(default_factory=current_trace_id, description="에러가 발생한 요청의 trace ID")
 
 class AgentDecisionModel(BaseModel):
     """AgentDecision 노드의 출력 표준화 모델."""
@@ -28,6 +30,17 @@ class AgentDecisionModel(BaseModel):
 # LangGraph State 정의
 # ----------------------------------------------------
 
+def add_or_reset(left, right):
+    """
+    operator.add와 같지만, right가 None이면 초기값(빈 리스트/0)으로 되돌립니다.
+    체크포인트로 이어지는 대화에서 새 턴을 시작할 때 턴 단위 누적 필드를 초기화하는 데 사용합니다.
+    """
+    if right is None:
+        return type(left)() if left is not None else left
+    if left is None:
+        return right
+    return operator.add(left, right)
+
 class State(TypedDict):
     """
     LangGraph의 상태를 정의하는 TypedDict. 
@@ -45,21 +58,38 @@ class State(TypedDict):
     
     # 누적되는 필드
     messages: Annotated[List[BaseMessage], operator.add]
-    intermediate_steps: Annotated[List[Any], operator.add]
+    intermediate_steps: Annotated[List[Any], add_or_reset] # 턴 단위 (새 턴 입력에서 None으로 초기화)
     
     # 2. 멀티노드 및 안정성 확보를 위한 추가 필드 (설계서 반영)
     active_node: Optional[str] # 현재 실행 중인 노드의 이름 (디버깅용)
     loop_counter: int # 루프 안전장치 카운터
+    llm_calls: Annotated[int, add_or_reset] # 요청 처리 중 발생한 LLM 호출 수 (노드별 호출 수를 누적, 턴 단위)
+    prompt_tokens: Annotated[int, add_or_reset] # 요청 처리 중 사용한 프롬프트 토큰 수 (턴 단위)
+    completion_tokens: Annotated[int, add_or_reset] # 요청 처리 중 생성된 응답 토큰 수 (턴 단위)
     
     # 3. 노드 간 데이터 전달 및 표준화 필드 (B-1 반영)
     # AgentDecision의 결과를 구조화하여 저장
     decision: Optional[AgentDecisionModel] 
     
     # ToolExecutor/JoinNode의 출력을 임시 저장
-    tool_outputs: Annotated[List[ToolMessage], operator.add] 
+    tool_outputs: Annotated[List[ToolMessage], add_or_reset] # 턴 단위
     
     # ErrorHandler 노드의 입력을 구조화하여 저장
     error_info: Optional[ErrorInfo]
     
     # 4. 서브그래프 호출 결과 (향후 D-1 확장 시 사용)
     subgraph_output: Optional[Any]
+
+    # 5. 의미 기반 답변 캐시
+    user_id: Optional[str] # 요청 사용자 ID (없으면 질문에 포함된 ID를 사용)
+    answer_cache: Optional[dict] # 캐시 조회 범위 {"user_id", "question", "version", "hit", "started_at"} (ResultProcessor에서 저장 시 사용)
+
+    # 6. 대화 기록 압축 (토큰 예산 밖으로 밀려난 이전 턴의 누적 요약, 체크포인트로 턴 간 유지)
+    history_summary: Optional[str]
+    history_cursor: int # 요약에 반영된 messages 수 (이 위치 이전은 다시 읽지 않음)
+
+    # 7. 요청 마감 시각 (epoch 초, /invoke에서 턴마다 설정. 노드·도구는 남은 시간에 맞춰 제한 시간을 줄임)
+    deadline: Optional[float]
+
+    # 8. 추적 컨텍스트 (W3C traceparent, /invoke 요청 span. 노드 span의 부모로 사용)
+    traceparent: Optional[str]
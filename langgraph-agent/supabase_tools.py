@@ -1,11 +1,28 @@
 # supabase_tools.py (최종 수정안)
 
 import os
+import json
+import zlib
+import base64
+import asyncio
+import threading
+import contextvars
+import concurrent.futures
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from supabase import create_client, Client
-from supabase.lib.client_options import ClientOptions
+from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase.lib.client_options import ClientOptions, AsyncClientOptions
 from langchain_core.tools import tool
-from typing import Dict, Any, Union
+from typing import Dict, Any, Union, Optional, List, NamedTuple, Tuple, Iterator, AsyncIterator
+from cache import UserTTLCache, UserDataVersions
+from write_buffer import WriteBehindBuffer
+from analytics import training_analytics
+from aggregates import AggregateStore
+from session_store import SessionStore
+from single_flight import SingleFlight
+from http_pool import get_pool
+from resilience import SUPABASE, USER_MESSAGES
+from deadline import current_remaining
 
 # ----------------------------------------------------
 # 1. Supabase 클라이언트 연결 안정화 및 환경 변수 체크
@@ -16,56 +33,466 @@ load_dotenv(override=True)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_ANON_KEY:
-    raise ValueError(
-        "Supabase 환경 변수(SUPABASE_URL, SUPABASE_ANON_KEY)가 .env 파일에 설정되지 않았습니다."
-    )
+def _check_supabase_env() -> None:
+    if not SUPABASE_URL or not SUPABASE_ANON_KEY:
+        raise ValueError(
+            "Supabase 환경 변수(SUPABASE_URL, SUPABASE_ANON_KEY)가 .env 파일에 설정되지 않았습니다."
+        )
+
+# 동기 클라이언트도 임포트 시점이 아닌 첫 사용 시점(또는 서버 시작 시 warmup)에 한 번만 생성합니다.
+# 생성된 클라이언트는 모듈 전역 supabase에 저장되며, supabase_tools.supabase로도 접근할 수 있습니다.
+_supabase_lock = threading.Lock()
+
+def get_supabase() -> Client:
+    """동기 Supabase 클라이언트를 지연 생성하여 반환합니다. (스레드 안전, 한 번만 생성)"""
+    client = globals().get("supabase")
+    if client is None:
+        with _supabase_lock:
+            client = globals().get("supabase")
+            if client is None:
+                _check_supabase_env()
+                try:
+                    # 공유 연결 풀(http_pool)의 keep-alive 클라이언트를 사용합니다. (제한 시간은 HTTP_POOL_SUPABASE_TIMEOUT, 기본 10초)
+                    client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY, options=ClientOptions(
+                        postgrest_client_timeout=10, httpx_client=get_pool("supabase").client()))
+                except Exception as e:
+                    # 초기화 오류는 치명적이므로 ConnectionError 발생
+                    raise ConnectionError(f"Supabase 클라이언트 초기화 중 치명적인 오류 발생: {e}")
+                globals()["supabase"] = client
+    return client
 
-# Supabase 클라이언트 전역 변수 초기화
-try:
-    # ClientOptions는 필수는 아니지만 안정성을 높일 수 있습니다.
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY, options=ClientOptions(postgrest_client_timeout=10))
-except Exception as e:
-    # 초기화 오류는 치명적이므로 ConnectionError 발생
-    raise ConnectionError(f"Supabase 클라이언트 초기화 중 치명적인 오류 발생: {e}")
+def __getattr__(name: str):
+    # 기존 코드/테스트의 supabase_tools.supabase 접근을 지연 생성으로 연결 (PEP 562)
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# 비동기 클라이언트는 이벤트 루프 안에서만 생성할 수 있으므로 첫 사용 시점에 한 번만 생성합니다.
+_async_supabase: Optional[AsyncClient] = None
+_async_supabase_lock = asyncio.Lock()
+
+async def get_async_supabase() -> AsyncClient:
+    """비동기 Supabase 클라이언트를 지연 생성하여 반환합니다. (FastAPI 이벤트 루프 공유)"""
+    global _async_supabase
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                _check_supabase_env()
+                try:
+                    _async_supabase = await acreate_client(
+                        SUPABASE_URL, SUPABASE_ANON_KEY,
+                        options=AsyncClientOptions(postgrest_client_timeout=10,
+                                                   httpx_client=get_pool("supabase").async_client())
+                    )
+                except Exception as e:
+                    raise ConnectionError(f"비동기 Supabase 클라이언트 초기화 중 치명적인 오류 발생: {e}")
+    return _async_supabase
 
 # ----------------------------------------------------
 # 2. 도구 정의 (실제 스키마: id, user_id, created_at, total_volume, exercises)
 # ----------------------------------------------------
 
+# 동기/비동기 구현이 같은 표준화된 반환값(S-2/S-3)을 사용하도록 응답 포맷을 한 곳에서 생성합니다.
+
+# 운동 기록 조회 시 사용할 컬럼 (select("*") 대신 명시적 projection)
+HISTORY_FIELDS = ("id", "user_id", "created_at", "total_volume", "exercises")
+# 커서 생성을 위해 항상 포함되는 키셋 컬럼
+HISTORY_KEY_FIELDS = ("created_at", "id")
+# 한 페이지에 반환할 최대 행 수 (프롬프트 크기와 전송량 상한)
+DEFAULT_HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+def _history_success(user_id: str, data: Any, next_cursor: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "action": "get_workout_history",
+        "user_id": user_id,
+        "data": data,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor
+    }
+
+def _history_error(e: Exception) -> Dict[str, Any]:
+    code = SUPABASE.error_code(e, "DB_QUERY_FAILURE")
+    return {
+        "status": "error",
+        "action": "get_workout_history",
+        "error_code": code,
+        "message": f"운동 기록 조회 실패: {type(e).__name__} - {str(e)}",
+        "user_message": USER_MESSAGES.get(code, "현재 사용자님의 운동 기록을 조회하는 데 문제가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+    }
+
+def _history_invalid_request(e: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "action": "get_workout_history",
+        "error_code": "INVALID_HISTORY_REQUEST",
+        "message": f"운동 기록 조회 요청 오류: {str(e)}",
+        "user_message": "운동 기록 조회 요청이 올바르지 않습니다. 처음부터 다시 조회해 주세요."
+    }
+
+# ----------------------------------------------------
+# 2-1. 키셋(created_at, id) 커서 페이지네이션
+# ----------------------------------------------------
+
+def encode_history_cursor(row: Dict[str, Any]) -> str:
+    """페이지의 마지막 행으로부터 다음 페이지 조회용 불투명(opaque) 커서를 생성합니다."""
+    payload = json.dumps([row["created_at"], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[str, Any]:
+    """커서를 (created_at, id)로 복원합니다. 형식이 잘못되면 ValueError를 발생시킵니다."""
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError(f"잘못된 커서입니다: {cursor!r}")
+    return created_at, row_id
+
+def _history_select(fields: Optional[List[str]]) -> str:
+    """요청된 필드를 허용된 컬럼으로 제한하고, 커서용 키 컬럼을 항상 포함한 select 문자열을 만듭니다."""
+    if not fields:
+        return ",".join(HISTORY_FIELDS)
+    unknown = set(fields) - set(HISTORY_FIELDS)
+    if unknown:
+        raise ValueError(f"조회할 수 없는 필드입니다: {sorted(unknown)} (허용: {list(HISTORY_FIELDS)})")
+    selected = list(HISTORY_KEY_FIELDS) + [f for f in fields if f not in HISTORY_KEY_FIELDS]
+    return ",".join(selected)
+
+def _history_query(client: Union[Client, AsyncClient], user_id: str, limit: int,
+                   cursor: Optional[str] = None, fields: Optional[List[str]] = None):
+    """
+    'sessions' 테이블에서 user_id의 기록을 최신순으로 한 페이지 조회하는 쿼리를 생성합니다.
+    다음 페이지 존재 여부를 알기 위해 limit + 1행을 요청합니다.
+    """
+    query = (
+        client.from_("sessions")
+        .select(_history_select(fields))
+        .eq("user_id", user_id)
+    )
+    if cursor:
+        created_at, row_id = decode_history_cursor(cursor)
+        # (created_at, id) < (커서) 인 행만 조회 (동일 created_at은 id로 구분)
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    return (
+        query
+        .order("created_at", desc=True) # created_at을 기준으로 정렬
+        .order("id", desc=True)
+        .limit(limit + 1)
+    )
+
+def _head_query(client: Union[Client, AsyncClient], user_id: str):
+    """
+    user_id의 가장 최근 행 하나의 키 컬럼(id, created_at)과 전체 행 수(count="exact")를 조회하는 쿼리.
+    최신 행만으로는 더 이른 created_at으로 저장된 행이나, 다른 프로세스의 INSERT 뒤에 이 프로세스가 더 최신 행을
+    저장한 경우를 알 수 없으므로 행 수도 함께 비교합니다.
+    """
+    return (
+        client.from_("sessions")
+        .select(",".join(HISTORY_KEY_FIELDS), count="exact")
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(1)
+    )
+
+def _head_row(response) -> Optional[Dict[str, Any]]:
+    # 응답의 행 수(Content-Range)를 session_count로 함께 반환
+    return {**response.data[0], "session_count": response.count} if response.data else None
+
+# DB 최신 행(head)은 HISTORY_CACHE를 거치지 않고 매번 조회합니다. 세션은 이 프로세스 밖(web/server.js, index.html)
+# 에서도 직접 INSERT되므로, 프로세스 내 캐시/버전으로는 그 쓰기를 알 수 없습니다. (인덱스를 타는 1행 조회)
+def fetch_head_row(user_id: str) -> Optional[Dict[str, Any]]:
+    """사용자의 DB 최신 행(id, created_at)과 전체 행 수(session_count). 기록이 없으면 None. (DB 예외는 호출자에게 전달)"""
+    response = SUPABASE.call(lambda: _head_query(get_supabase(), user_id).execute())
+    return _head_row(response)
+
+async def afetch_head_row(user_id: str) -> Optional[Dict[str, Any]]:
+    """fetch_head_row의 비동기 버전."""
+    client = await get_async_supabase()
+    response = await SUPABASE.acall(lambda: _head_query(client, user_id).execute())
+    return _head_row(response)
+
+def head_version(head: Optional[Dict[str, Any]]) -> int:
+    """DB 최신 행과 행 수로 만든 사용자 데이터 버전. 기록이 없으면 0. (sessions는 INSERT만 하므로 새 행이 생기면 바뀜)"""
+    if not head:
+        return 0
+    return zlib.crc32(f"{head.get('created_at')}|{head.get('id')}|{head.get('session_count')}".encode()) + 1
+
+# ----------------------------------------------------
+# 2-2. 사용자별 읽기 캐시 (get_workout_history 앞단, add_workout_session 성공 시 무효화)
+# ----------------------------------------------------
+
+HISTORY_CACHE = UserTTLCache(
+    ttl_seconds=float(os.getenv("HISTORY_CACHE_TTL", "60")),
+    max_entries=int(os.getenv("HISTORY_CACHE_MAX_ENTRIES", "1024")),
+    max_bytes=int(os.getenv("HISTORY_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+)
+
+# 사용자별 데이터 버전 (이 프로세스의 쓰기 성공 시 증가, 진행 중인 조회 결과가 쓰기 이후에 캐시되지 않도록 사용)
+USER_DATA_VERSIONS = UserDataVersions()
+
+# 사용자별 구체화 집계 (INSERT 시 증분 반영, get_training_stats에서 조회)
+AGGREGATES = AggregateStore()
+
+def mark_user_data_changed(user_id: str) -> None:
+    """사용자 데이터가 변경되었음을 기록합니다. 캐시된 기록을 무효화하고 데이터 버전을 올립니다."""
+    HISTORY_CACHE.invalidate(user_id)
+    USER_DATA_VERSIONS.bump(user_id)
+
+def record_inserted_rows(rows: List[Dict[str, Any]]) -> None:
+    """INSERT 응답의 저장된 행(id, created_at 포함)을 사용자별 집계에 증분 반영합니다."""
+    try:
+        AGGREGATES.record(rows)
+    except Exception:
+        # 집계 갱신 실패는 저장 결과에 영향을 주지 않고, 다음 조회 시 전체 재계산으로 복구합니다.
+        for user_id in {row.get("user_id") for row in rows if row.get("user_id")}:
+            AGGREGATES.mark_dirty(user_id)
+
+def _history_cache_key(limit: int, cursor: Optional[str], fields: Optional[List[str]]):
+    return (limit, cursor, tuple(fields) if fields else None)
+
+def _clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_HISTORY_PAGE_SIZE
+    return min(limit, MAX_HISTORY_PAGE_SIZE)
+
+def _split_page(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """limit + 1행 조회 결과를 (페이지 데이터, 다음 커서)로 나눕니다."""
+    if len(rows) > limit:
+        page = rows[:limit]
+        return page, encode_history_cursor(page[-1])
+    return rows, None
+
+# 캐시 miss 상태에서 같은 페이지를 동시에 요청하면 DB 조회는 한 번만 실행하고 결과를 공유합니다.
+# 키에 사용자 데이터 버전을 포함하므로, 쓰기 이후에 도착한 요청은 쓰기 이전에 시작된 조회에 합류하지 않습니다.
+HISTORY_FLIGHTS = SingleFlight()
+
+def _cache_history_page(user_id: str, version: int, cache_key, page) -> None:
+    # 조회 도중 쓰기가 있었다면(버전 변경) 이전 데이터가 무효화 이후에 캐시되지 않도록 저장하지 않음
+    if USER_DATA_VERSIONS.get(user_id) == version:
+        HISTORY_CACHE.set(user_id, cache_key, page)
+
+def fetch_history_page(user_id: str, limit: int = DEFAULT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                       fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """운동 기록 한 페이지와 다음 커서를 반환합니다. HISTORY_CACHE를 먼저 확인합니다. (DB 예외는 호출자에게 전달)"""
+    limit = _clamp_page_size(limit)
+    cache_key = _history_cache_key(limit, cursor, fields)
+    cached = HISTORY_CACHE.get(user_id, cache_key)
+    if cached is not None:
+        return cached
+
+    version = USER_DATA_VERSIONS.get(user_id)
+
+    def query_page():
+        response = SUPABASE.call(lambda: _history_query(get_supabase(), user_id, limit, cursor, fields).execute())
+        page = _split_page(response.data, limit)
+        _cache_history_page(user_id, version, cache_key, page)
+        return page
+
+    return HISTORY_FLIGHTS.run((user_id, version, cache_key), query_page)
+
+async def afetch_history_page(user_id: str, limit: int = DEFAULT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                              fields: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """fetch_history_page의 비동기 버전."""
+    limit = _clamp_page_size(limit)
+    cache_key = _history_cache_key(limit, cursor, fields)
+    cached = HISTORY_CACHE.get(user_id, cache_key)
+    if cached is not None:
+        return cached
+
+    version = USER_DATA_VERSIONS.get(user_id)
+
+    async def query_page():
+        client = await get_async_supabase()
+        response = await SUPABASE.acall(lambda: _history_query(client, user_id, limit, cursor, fields).execute())
+        page = _split_page(response.data, limit)
+        _cache_history_page(user_id, version, cache_key, page)
+        return page
+
+    return await HISTORY_FLIGHTS.arun((user_id, version, cache_key), query_page)
+
+def iter_workout_history(user_id: str, page_size: int = MAX_HISTORY_PAGE_SIZE,
+                         fields: Optional[List[str]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    전체 기록이 필요한 호출자를 위한 제너레이터. 최신순으로 한 페이지씩 조회하여 yield합니다.
+    전체 결과를 한 번에 메모리에 올리지 않으며, 필요한 만큼만 순회하면 이후 페이지는 조회하지 않습니다.
+    """
+    cursor = None
+    while True:
+        page, cursor = fetch_history_page(user_id, page_size, cursor, fields)
+        if page:
+            yield page
+        if cursor is None:
+            return
+
+async def aiter_workout_history(user_id: str, page_size: int = MAX_HISTORY_PAGE_SIZE,
+                                fields: Optional[List[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """iter_workout_history의 비동기 제너레이터 버전."""
+    cursor = None
+    while True:
+        page, cursor = await afetch_history_page(user_id, page_size, cursor, fields)
+        if page:
+            yield page
+        if cursor is None:
+            return
+
+def _session_row(user_id: str, total_volume: float, exercises: str) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "total_volume": total_volume,
+        "exercises": exercises
+        # 'date' 대신 'created_at'이 자동 생성되므로 수동 삽입에서 제외
+    }
+
+def _insert_success(user_id: str, data: Any) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "action": "add_workout_session",
+        "user_id": user_id,
+        "data": data
+    }
+
+def _insert_error(e: Exception) -> Dict[str, Any]:
+    code = SUPABASE.error_code(e, "DB_INSERT_FAILURE")
+    return {
+        "status": "error",
+        "action": "add_workout_session",
+        "error_code": code,
+        "message": f"운동 세션 추가 실패: {type(e).__name__} - {str(e)}",
+        "user_message": USER_MESSAGES.get(code, "죄송합니다. 새로운 운동 기록을 저장하지 못했습니다. 입력값을 확인해 주세요.")
+    }
+
+def _bulk_insert_success(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "action": "add_workout_sessions",
+        "inserted": len(rows),
+        "data": rows
+    }
+
+def _bulk_insert_error(e: Exception, error_code: str = "DB_INSERT_FAILURE") -> Dict[str, Any]:
+    code = SUPABASE.error_code(e, error_code)
+    return {
+        "status": "error",
+        "action": "add_workout_sessions",
+        "error_code": code,
+        "message": f"운동 세션 일괄 추가 실패: {type(e).__name__} - {str(e)}",
+        "user_message": USER_MESSAGES.get(code, "죄송합니다. 운동 기록을 한꺼번에 저장하지 못했습니다. 입력값을 확인해 주세요.")
+    }
+
+# ----------------------------------------------------
+# 2-3. 쓰기 경로: bulk INSERT와 선택적 write-behind 버퍼
+# ----------------------------------------------------
+
+# 한 번의 bulk INSERT 요청에 담을 수 있는 최대 행 수
+MAX_BULK_INSERT_ROWS = 500
+
+def _bulk_rows(sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """add_workout_sessions 입력을 검증하여 INSERT할 행 목록으로 변환합니다. (DB I/O 전 ValueError)"""
+    if not sessions:
+        raise ValueError("추가할 세션이 없습니다.")
+    if len(sessions) > MAX_BULK_INSERT_ROWS:
+        raise ValueError(f"한 번에 최대 {MAX_BULK_INSERT_ROWS}개까지 추가할 수 있습니다. (요청: {len(sessions)}개)")
+    rows = []
+    for index, session in enumerate(sessions):
+        if not isinstance(session, dict):
+            raise ValueError(f"sessions[{index}]는 객체여야 합니다.")
+        user_id, total_volume = session.get("user_id"), session.get("total_volume")
+        if not isinstance(user_id, str) or not user_id:
+            raise ValueError(f"sessions[{index}].user_id가 올바르지 않습니다.")
+        if isinstance(total_volume, bool) or not isinstance(total_volume, (int, float)):
+            raise ValueError(f"sessions[{index}].total_volume은 숫자여야 합니다.")
+        if "exercises" not in session:
+            raise ValueError(f"sessions[{index}].exercises가 없습니다.")
+        rows.append(_session_row(user_id, float(total_volume), session["exercises"]))
+    return rows
+
+def _invalidate_users(rows: List[Dict[str, Any]]) -> None:
+    for user_id in {row["user_id"] for row in rows}:
+        mark_user_data_changed(user_id)
+
+def insert_session_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """여러 행을 한 번의 INSERT 요청으로 저장하고, 저장된 행을 입력 순서대로 반환합니다."""
+    # INSERT는 멱등이 아니므로 재시도하지 않고 서킷 브레이커만 적용합니다.
+    response = SUPABASE.call(lambda: get_supabase().from_("sessions").insert(rows).execute(), retry=False)
+    _invalidate_users(rows)
+    record_inserted_rows(response.data)
+    return response.data
+
+async def ainsert_session_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """insert_session_rows의 비동기 버전."""
+    client = await get_async_supabase()
+    response = await SUPABASE.acall(lambda: client.from_("sessions").insert(rows).execute(), retry=False)
+    _invalidate_users(rows)
+    record_inserted_rows(response.data)
+    return response.data
+
+# 동시 요청의 단건 INSERT를 모아서 저장하는 write-behind 버퍼 (SESSION_WRITE_BEHIND=1 일 때 사용)
+#   - SESSION_WRITE_BATCH_SIZE : 이 개수가 모이면 즉시 flush
+#   - SESSION_WRITE_MAX_DELAY  : 첫 행 이후 최대 대기 시간(초)
+#   - SESSION_WRITE_TIMEOUT    : 호출자가 자신의 행 저장 결과를 기다리는 최대 시간(초)
+WRITE_BEHIND_ENABLED = os.getenv("SESSION_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_TIMEOUT = float(os.getenv("SESSION_WRITE_TIMEOUT", "10"))
+SESSION_WRITE_BUFFER = WriteBehindBuffer(
+    insert_session_rows,
+    max_batch=int(os.getenv("SESSION_WRITE_BATCH_SIZE", "50")),
+    max_delay=float(os.getenv("SESSION_WRITE_MAX_DELAY", "0.05")),
+)
+
+def buffered_insert(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    write-behind 버퍼로 행 하나를 저장하고 저장된 행을 반환합니다. WRITE_BEHIND_TIMEOUT 안에 저장되지 않으면
+    버퍼의 행을 취소하고 TimeoutError를 전달합니다. 워커가 이미 저장 중이라 취소할 수 없으면 저장 결과를 끝까지
+    기다립니다. (실패로 보고한 행이 나중에 저장되면 사용자/LLM의 재시도로 같은 세션이 두 번 저장됨)
+    """
+    future = SESSION_WRITE_BUFFER.submit(row)
+    try:
+        return future.result(timeout=WRITE_BEHIND_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        if future.cancel():
+            raise
+        return future.result()
+
+async def abuffered_insert(row: Dict[str, Any]) -> Dict[str, Any]:
+    """buffered_insert의 비동기 버전. 호출한 Task가 취소되면(연결 끊김, 마감) 아직 저장 전인 행도 취소합니다."""
+    future = SESSION_WRITE_BUFFER.submit(row)
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=WRITE_BEHIND_TIMEOUT)
+    except asyncio.TimeoutError:
+        if future.cancel():
+            raise
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
 @tool
-def get_workout_history(user_id: str) -> Union[Dict[str, Any], str]:
+def get_workout_history(user_id: str, limit: int = DEFAULT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                        fields: Optional[List[str]] = None, include_raw: bool = False) -> Union[Dict[str, Any], str]:
     """
-    특정 사용자의 운동 기록을 가져옵니다. 
+    특정 사용자의 운동 기록을 최신순으로 한 페이지씩 가져옵니다. 
     반환값은 항상 구조화된 JSON/Dict 형태를 따릅니다.
+    
+    Args:
+        user_id (str): 사용자 ID.
+        limit (int): 페이지 크기 (기본 20, 최대 100).
+        cursor (str, optional): 이전 응답의 next_cursor. 생략하면 가장 최근 기록부터 조회합니다.
+        fields (list, optional): 조회할 컬럼 (id, user_id, created_at, total_volume, exercises 중 선택).
+        include_raw (bool): 기본적으로 에이전트에는 운동별 볼륨 추이/PR/최근 세션 등 집계만 전달됩니다.
+            사용자가 원본 기록 자체를 요청한 경우에만 true로 지정하세요.
     """
+    # include_raw는 ToolExecutor의 결과 가공 단계(result_shaping.py)에서 사용하며, 조회 결과에는 영향이 없습니다.
     try:
-        # 'sessions' 테이블에서 user_id에 해당하는 데이터를 조회
-        response = (
-            supabase.from_("sessions")
-            .select("*") # total_volume, exercises 포함
-            .eq("user_id", user_id)
-            .order("created_at", desc=True) # created_at을 기준으로 정렬
-            .execute()
-        )
-        
-        # 성공 시 표준화된 Dict 반환
-        return {
-            "status": "success",
-            "action": "get_workout_history",
-            "user_id": user_id,
-            "data": response.data
-        }
+        data, next_cursor = fetch_history_page(user_id, limit, cursor, fields)
+        # 성공 시 표준화된 Dict 반환 (has_more가 true이면 next_cursor로 다음 페이지 조회)
+        return _history_success(user_id, data, next_cursor)
     
+    except ValueError as e:
+        return _history_invalid_request(e)
     except Exception as e:
-        # 에러 메시지 포맷 수정 (type(e).__name__은 올바른 사용법입니다. 이전 오류는 캐시 때문일 가능성이 높음)
-        return {
-            "status": "error",
-            "action": "get_workout_history",
-            "error_code": "DB_QUERY_FAILURE",
-            "message": f"운동 기록 조회 실패: {type(e).__name__} - {str(e)}",
-            "user_message": "현재 사용자님의 운동 기록을 조회하는 데 문제가 발생했습니다. 잠시 후 다시 시도해 주세요."
-        }
+        return _history_error(e)
 
 @tool
 def add_workout_session(user_id: str, total_volume: float, exercises: str) -> Union[Dict[str, Any], str]:
@@ -77,36 +504,413 @@ def add_workout_session(user_id: str, total_volume: float, exercises: str) -> Un
         total_volume (float): 운동의 총 볼륨 (kg).
         exercises (str): 수행한 운동 목록 및 상세 내용 (JSON 문자열 형태 권장).
     """
-    data_to_insert = {
-        "user_id": user_id,
-        "total_volume": total_volume,
-        "exercises": exercises
-        # 'date' 대신 'created_at'이 자동 생성되므로 수동 삽입에서 제외
-    }
-    
+    row = _session_row(user_id, total_volume, exercises)
     try:
-        # 'sessions' 테이블에 데이터 삽입
-        response = (
-            supabase.from_("sessions")
-            .insert(data_to_insert)
-            .execute()
-        )
+        if WRITE_BEHIND_ENABLED:
+            # 동시 요청의 INSERT와 묶어서 저장하고, 이 행의 저장 결과만 기다림 (캐시 무효화는 flush 시 수행)
+            data = [buffered_insert(row)]
+        else:
+            # 'sessions' 테이블에 데이터 삽입
+            response = SUPABASE.call(lambda: get_supabase().from_("sessions").insert(row).execute(), retry=False)
+            data = response.data
+            
+            # 같은 사용자의 캐시된 기록은 더 이상 최신이 아니므로 무효화하고, 집계에는 새 행만 반영
+            mark_user_data_changed(user_id)
+            record_inserted_rows(data)
         
         # 성공 시 표준화된 Dict 반환
-        return {
-            "status": "success",
-            "action": "add_workout_session",
-            "user_id": user_id,
-            "data": response.data
-        }
+        return _insert_success(user_id, data)
         
     except Exception as e:
-        # 에러 메시지 포맷 수정
+        return _insert_error(e)
+
+@tool
+def add_workout_sessions(sessions: List[dict]) -> Union[Dict[str, Any], str]:
+    """
+    여러 운동 세션을 한 번의 요청으로 데이터베이스에 추가합니다. (일주일치 기록 등 일괄 입력용)
+    
+    Args:
+        sessions (list): 추가할 세션 목록. 각 항목은 {"user_id": str, "total_volume": float, "exercises": 운동 목록}.
+    """
+    try:
+        rows = _bulk_rows(sessions)
+    except ValueError as e:
+        return _bulk_insert_error(e, "INVALID_SESSION_ROWS")
+    try:
+        return _bulk_insert_success(insert_session_rows(rows))
+    except Exception as e:
+        return _bulk_insert_error(e)
+
+# ----------------------------------------------------
+# 2-4. 로컬 열 저장소 동기화 (워터마크 이후 행만 조회하여 append)
+# ----------------------------------------------------
+
+# 분석에 필요한 컬럼만 조회 (id는 워터마크/커서용)
+ANALYTICS_FIELDS = ["created_at", "total_volume", "exercises"]
+DEFAULT_ANALYTICS_WEEKS = 12
+# delta 조회 한 번에 받을 최대 행 수 (처음 동기화하는 사용자는 여러 번 나누어 받음)
+DELTA_SYNC_PAGE_SIZE = int(os.getenv("SESSION_DELTA_PAGE_SIZE", "1000"))
+
+SESSION_STORE = SessionStore()
+
+def _delta_query(client: Union[Client, AsyncClient], user_id: str, watermark: Optional[Tuple[str, Any]], limit: int):
+    """
+    워터마크(created_at, id) 이후의 행을 오래된 순으로 조회하는 쿼리를 생성합니다.
+    created_at이 같은 행은 id로 구분합니다. (워터마크가 없으면 처음부터)
+    """
+    query = (
+        client.from_("sessions")
+        .select(",".join(["id"] + ANALYTICS_FIELDS))
+        .eq("user_id", user_id)
+    )
+    if watermark:
+        created_at, row_id = watermark
+        query = query.or_(
+            f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt."{row_id}")'
+        )
+    return query.order("created_at").order("id").limit(limit)
+
+def sync_session_store(user_id: str) -> int:
+    """새 행만 받아 SESSION_STORE에 이어 붙이고, 추가된 행 수를 반환합니다. (DB 예외는 호출자에게 전달)"""
+    added = 0
+    while True:
+        rows = SUPABASE.call(
+            lambda: _delta_query(get_supabase(), user_id, SESSION_STORE.watermark(user_id), DELTA_SYNC_PAGE_SIZE).execute()
+        ).data
+        added += SESSION_STORE.append(user_id, rows)
+        if len(rows) < DELTA_SYNC_PAGE_SIZE:
+            return added
+
+async def async_session_store(user_id: str) -> int:
+    """sync_session_store의 비동기 버전."""
+    client = await get_async_supabase()
+    added = 0
+    while True:
+        rows = (await SUPABASE.acall(
+            lambda: _delta_query(client, user_id, SESSION_STORE.watermark(user_id), DELTA_SYNC_PAGE_SIZE).execute()
+        )).data
+        added += SESSION_STORE.append(user_id, rows)
+        if len(rows) < DELTA_SYNC_PAGE_SIZE:
+            return added
+
+# ----------------------------------------------------
+# 2-5. 훈련 분석 도구 (로컬 열 저장소를 memmap하여 analytics.py에서 벡터 연산)
+# ----------------------------------------------------
+
+def _analytics_success(user_id: str, analytics: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "action": "get_training_analytics",
+        "user_id": user_id,
+        "analytics": analytics
+    }
+
+def _analytics_error(e: Exception) -> Dict[str, Any]:
+    code = SUPABASE.error_code(e, "DB_QUERY_FAILURE")
+    return {
+        "status": "error",
+        "action": "get_training_analytics",
+        "error_code": code,
+        "message": f"훈련 분석 실패: {type(e).__name__} - {str(e)}",
+        "user_message": USER_MESSAGES.get(code, "현재 사용자님의 훈련 기록을 분석하는 데 문제가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+    }
+
+# 요청 마감까지 남은 시간이 이보다 적고 로컬 저장소에 이미 데이터가 있으면 delta 동기화를 건너뜀 (결과에 stale=true)
+ANALYTICS_SYNC_MIN_SECONDS = float(os.getenv("ANALYTICS_SYNC_MIN_SECONDS", "2"))
+
+def _skip_analytics_sync(user_id: str) -> bool:
+    """요청 마감 시각이 임박했고 이전에 동기화한 데이터가 있으면 DB 조회 없이 로컬 데이터로 분석합니다."""
+    left = current_remaining()
+    return left is not None and left < ANALYTICS_SYNC_MIN_SECONDS and SESSION_STORE.watermark(user_id) is not None
+
+def _analytics_of(user_id: str, exercise: Optional[str], weeks: int, stale: bool) -> Dict[str, Any]:
+    analytics = training_analytics(SESSION_STORE.frame(user_id), exercise, weeks)
+    return {**analytics, "stale": True} if stale else analytics
+
+def fetch_training_analytics(user_id: str, exercise: Optional[str] = None,
+                             weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Dict[str, Any]:
+    """새 행만 동기화한 뒤 로컬 열 저장소로 분석 결과를 계산합니다. (DB 예외는 호출자에게 전달)"""
+    stale = _skip_analytics_sync(user_id)
+    if not stale:
+        sync_session_store(user_id)
+    return _analytics_of(user_id, exercise, weeks, stale)
+
+async def afetch_training_analytics(user_id: str, exercise: Optional[str] = None,
+                                    weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Dict[str, Any]:
+    """fetch_training_analytics의 비동기 버전."""
+    stale = _skip_analytics_sync(user_id)
+    if not stale:
+        await async_session_store(user_id)
+    return _analytics_of(user_id, exercise, weeks, stale)
+
+@tool
+def get_training_analytics(user_id: str, exercise: Optional[str] = None,
+                           weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Union[Dict[str, Any], str]:
+    """
+    사용자의 전체 운동 기록을 분석합니다. 볼륨 추이, 운동별 추정 1RM, 주간 집계, 최신/이전 세션 비교,
+    최근 PR(개인 최고 기록 갱신)과 정체 구간을 반환합니다. 성장/정체/비교 등 분석 질문에는 이 도구를 사용하세요.
+
+    Args:
+        user_id (str): 사용자 ID.
+        exercise (str, optional): 볼륨 추이와 PR을 특정 운동으로 한정할 때의 운동 이름.
+        weeks (int): 주간 집계에 포함할 최근 주 수 (기본 12).
+    """
+    try:
+        return _analytics_success(user_id, fetch_training_analytics(user_id, exercise, weeks))
+    except Exception as e:
+        return _analytics_error(e)
+
+# ----------------------------------------------------
+# 2-6. 구체화 집계 조회 도구 (최신 행 1개로 동기화 여부만 확인하고, 어긋난 경우에만 전체 재계산)
+# ----------------------------------------------------
+
+def _stats_success(user_id: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "status": "success",
+        "action": "get_training_stats",
+        "user_id": user_id,
+        "stats": stats
+    }
+
+def _stats_error(e: Exception) -> Dict[str, Any]:
+    code = SUPABASE.error_code(e, "DB_QUERY_FAILURE")
+    return {
+        "status": "error",
+        "action": "get_training_stats",
+        "error_code": code,
+        "message": f"훈련 통계 조회 실패: {type(e).__name__} - {str(e)}",
+        "user_message": USER_MESSAGES.get(code, "현재 사용자님의 훈련 통계를 조회하는 데 문제가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+    }
+
+def fetch_training_stats(user_id: str, weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Dict[str, Any]:
+    """구체화 집계를 반환합니다. DB 최신 행과 워터마크가 다를 때만 전체 기록을 읽습니다. (DB 예외는 호출자에게 전달)"""
+    aggregates = AGGREGATES.get(
+        user_id, lambda: fetch_head_row(user_id),
+        lambda: [row for page in iter_workout_history(user_id, fields=ANALYTICS_FIELDS) for row in page]
+    )
+    return aggregates.snapshot(weeks)
+
+async def afetch_training_stats(user_id: str, weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Dict[str, Any]:
+    """fetch_training_stats의 비동기 버전."""
+    async def load_rows():
+        return [row async for page in aiter_workout_history(user_id, fields=ANALYTICS_FIELDS) for row in page]
+
+    aggregates = await AGGREGATES.aget(user_id, lambda: afetch_head_row(user_id), load_rows)
+    return aggregates.snapshot(weeks)
+
+@tool
+def get_training_stats(user_id: str, weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Union[Dict[str, Any], str]:
+    """
+    미리 계산된 사용자 훈련 통계를 가져옵니다. 총 세션 수/총 볼륨, 운동별 최고 중량·최고 볼륨,
+    주간 세션 수와 볼륨, 연속 운동 일수/주수(streak)를 기록 전체를 읽지 않고 즉시 반환합니다.
+    누적 통계나 꾸준함에 대한 질문에 사용하세요.
+
+    Args:
+        user_id (str): 사용자 ID.
+        weeks (int): 반환할 최근 주간 집계 수 (기본 12).
+    """
+    try:
+        return _stats_success(user_id, fetch_training_stats(user_id, weeks))
+    except Exception as e:
+        return _stats_error(e)
+
+# ----------------------------------------------------
+# 2-7. 코칭 컨텍스트 도구 (여러 테이블을 한 번에 동시 조회)
+# ----------------------------------------------------
+# 코칭 답변에 필요한 운동/영양 기록을 LLM이 도구를 여러 번 나누어 호출하지 않도록, 등록된 테이블을
+# 한 단계에서 병렬로 조회합니다. 새 테이블(sleep, supplements 등)은 CONTEXT_SOURCES에 항목만 추가하면 됩니다.
+
+class ContextSource(NamedTuple):
+    table: str               # Supabase 테이블 이름
+    fields: Tuple[str, ...]  # 조회할 컬럼 (projection)
+    default_limit: int       # 기본 최근 행 수
+
+CONTEXT_SOURCES: Dict[str, ContextSource] = {
+    "sessions": ContextSource("sessions", ("id", "created_at", "total_volume", "exercises"), 10),
+    "nutrition": ContextSource("nutrition", ("id", "created_at", "carbs", "protein", "fat", "bcaa", "creatine", "glutamine"), 7),
+}
+DEFAULT_CONTEXT_SOURCES = ("sessions", "nutrition")
+DEFAULT_CONTEXT_DAYS = 30
+MAX_CONTEXT_LIMIT = 50
+
+# 동기 경로에서 테이블별 조회를 동시에 실행할 스레드 풀
+_CONTEXT_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("CONTEXT_FETCH_CONCURRENCY", "4")), thread_name_prefix="context"
+)
+
+def _context_sources(sources: Optional[List[str]]) -> List[str]:
+    """요청된 테이블을 검증합니다. 등록되지 않은 이름이 있으면 ValueError. (DB I/O 전)"""
+    names = list(dict.fromkeys(sources or DEFAULT_CONTEXT_SOURCES))
+    unknown = [name for name in names if name not in CONTEXT_SOURCES]
+    if unknown:
+        raise ValueError(f"조회할 수 없는 컨텍스트입니다: {unknown} (허용: {list(CONTEXT_SOURCES)})")
+    return names
+
+def _context_query(client: Union[Client, AsyncClient], source: ContextSource, user_id: str,
+                   since: Optional[str], limit: Optional[int]):
+    """테이블 하나에서 user_id의 최근 행을 최신순으로 조회하는 쿼리를 생성합니다."""
+    query = client.from_(source.table).select(",".join(source.fields)).eq("user_id", user_id)
+    if since:
+        query = query.gte("created_at", since)
+    limit = min(limit or source.default_limit, MAX_CONTEXT_LIMIT)
+    return query.order("created_at", desc=True).limit(limit)
+
+def _context_since(days: Optional[int]) -> Optional[str]:
+    if not days or days < 1:
+        return None
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+def _context_part(rows: Any = None, error: Optional[Exception] = None) -> Dict[str, Any]:
+    if error is not None:
+        return {"status": "error", "error_code": SUPABASE.error_code(error, "DB_QUERY_FAILURE"),
+                "message": f"{type(error).__name__} - {str(error)}"}
+    return {"status": "success", "count": len(rows), "data": rows}
+
+def _context_result(user_id: str, names: List[str], parts: List[Dict[str, Any]], days: Optional[int]) -> Dict[str, Any]:
+    """테이블별 결과를 합칩니다. 일부 테이블만 실패하면 나머지는 그대로 전달하고, 모두 실패하면 에러를 반환합니다."""
+    if all(part["status"] == "error" for part in parts):
+        code = parts[0]["error_code"]
         return {
             "status": "error",
-            "action": "add_workout_session",
-            "error_code": "DB_INSERT_FAILURE",
-            # e는 예외 객체이므로 type(e).__name__은 정상 작동해야 합니다.
-            "message": f"운동 세션 추가 실패: {type(e).__name__} - {str(e)}",
-            "user_message": "죄송합니다. 새로운 운동 기록을 저장하지 못했습니다. 입력값을 확인해 주세요."
-        }
\ No newline at end of file
+            "action": "get_coaching_context",
+            "error_code": code,
+            "message": "코칭 컨텍스트 조회 실패: " + "; ".join(f"{n}: {p['message']}" for n, p in zip(names, parts)),
+            "user_message": USER_MESSAGES.get(code, "현재 사용자님의 기록을 불러오는 데 문제가 발생했습니다. 잠시 후 다시 시도해 주세요.")
+        }
+    return {
+        "status": "success",
+        "action": "get_coaching_context",
+        "user_id": user_id,
+        "days": days,
+        "context": dict(zip(names, parts))
+    }
+
+def _context_invalid_request(e: Exception) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "action": "get_coaching_context",
+        "error_code": "INVALID_CONTEXT_REQUEST",
+        "message": f"코칭 컨텍스트 요청 오류: {str(e)}",
+        "user_message": "요청하신 기록 종류를 조회할 수 없습니다."
+    }
+
+def _fetch_context_part(source: ContextSource, user_id: str, since: Optional[str], limit: Optional[int]) -> Dict[str, Any]:
+    try:
+        return _context_part(SUPABASE.call(lambda: _context_query(get_supabase(), source, user_id, since, limit).execute()).data)
+    except Exception as e:
+        return _context_part(error=e)
+
+async def _afetch_context_part(source: ContextSource, user_id: str, since: Optional[str], limit: Optional[int]) -> Dict[str, Any]:
+    try:
+        client = await get_async_supabase()
+        return _context_part((await SUPABASE.acall(lambda: _context_query(client, source, user_id, since, limit).execute())).data)
+    except Exception as e:
+        return _context_part(error=e)
+
+@tool
+def get_coaching_context(user_id: str, sources: Optional[List[str]] = None, days: int = DEFAULT_CONTEXT_DAYS,
+                         limit: Optional[int] = None, include_raw: bool = False) -> Union[Dict[str, Any], str]:
+    """
+    코칭/조언 답변에 필요한 사용자 기록(운동 세션, 영양 등)을 한 번에 동시 조회합니다.
+    운동과 식단을 함께 봐야 하는 질문에는 도구를 여러 번 호출하지 말고 이 도구를 한 번 사용하세요.
+
+    Args:
+        user_id (str): 사용자 ID.
+        sources (list, optional): 조회할 기록 종류 (sessions, nutrition). 생략하면 모두 조회합니다.
+        days (int): 최근 며칠의 기록만 조회할지 (기본 30, 0이면 기간 제한 없음).
+        limit (int, optional): 종류별 최대 행 수 (기본: sessions 10, nutrition 7, 최대 50).
+        include_raw (bool): 운동 세션은 기본적으로 집계만 전달됩니다. 원본 기록이 필요할 때만 true로 지정하세요.
+    """
+    try:
+        names = _context_sources(sources)
+    except ValueError as e:
+        return _context_invalid_request(e)
+    since = _context_since(days)
+    # 요청 마감 시각, 메트릭의 도구 이름, 부모 span(컨텍스트 변수)이 풀 스레드에서도 유지되도록 컨텍스트를 복사하여 실행
+    futures = [
+        _CONTEXT_POOL.submit(contextvars.copy_context().run, _fetch_context_part, CONTEXT_SOURCES[name], user_id, since, limit)
+        for name in names
+    ]
+    return _context_result(user_id, names, [future.result() for future in futures], days)
+
+# ----------------------------------------------------
+# 3. 비동기 도구 구현 (ainvoke 경로에서 이벤트 루프를 막지 않도록 AsyncClient 사용)
+# ----------------------------------------------------
+
+async def _aget_workout_history(user_id: str, limit: int = DEFAULT_HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                                fields: Optional[List[str]] = None, include_raw: bool = False) -> Union[Dict[str, Any], str]:
+    """get_workout_history의 비동기 구현."""
+    try:
+        data, next_cursor = await afetch_history_page(user_id, limit, cursor, fields)
+        return _history_success(user_id, data, next_cursor)
+    except ValueError as e:
+        return _history_invalid_request(e)
+    except Exception as e:
+        return _history_error(e)
+
+async def _aadd_workout_session(user_id: str, total_volume: float, exercises: str) -> Union[Dict[str, Any], str]:
+    """add_workout_session의 비동기 구현."""
+    row = _session_row(user_id, total_volume, exercises)
+    try:
+        if WRITE_BEHIND_ENABLED:
+            return _insert_success(user_id, [await abuffered_insert(row)])
+        client = await get_async_supabase()
+        response = await SUPABASE.acall(lambda: client.from_("sessions").insert(row).execute(), retry=False)
+        mark_user_data_changed(user_id)
+        record_inserted_rows(response.data)
+        return _insert_success(user_id, response.data)
+    except Exception as e:
+        return _insert_error(e)
+
+async def _aadd_workout_sessions(sessions: List[dict]) -> Union[Dict[str, Any], str]:
+    """add_workout_sessions의 비동기 구현."""
+    try:
+        rows = _bulk_rows(sessions)
+    except ValueError as e:
+        return _bulk_insert_error(e, "INVALID_SESSION_ROWS")
+    try:
+        return _bulk_insert_success(await ainsert_session_rows(rows))
+    except Exception as e:
+        return _bulk_insert_error(e)
+
+async def _aget_training_analytics(user_id: str, exercise: Optional[str] = None,
+                                  weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Union[Dict[str, Any], str]:
+    """get_training_analytics의 비동기 구현."""
+    try:
+        return _analytics_success(user_id, await afetch_training_analytics(user_id, exercise, weeks))
+    except Exception as e:
+        return _analytics_error(e)
+
+async def _aget_training_stats(user_id: str, weeks: int = DEFAULT_ANALYTICS_WEEKS) -> Union[Dict[str, Any], str]:
+    """get_training_stats의 비동기 구현."""
+    try:
+        return _stats_success(user_id, await afetch_training_stats(user_id, weeks))
+    except Exception as e:
+        return _stats_error(e)
+
+async def _aget_coaching_context(user_id: str, sources: Optional[List[str]] = None, days: int = DEFAULT_CONTEXT_DAYS,
+                                 limit: Optional[int] = None, include_raw: bool = False) -> Union[Dict[str, Any], str]:
+    """get_coaching_context의 비동기 구현. 테이블별 조회를 asyncio.gather로 동시에 실행합니다."""
+    try:
+        names = _context_sources(sources)
+    except ValueError as e:
+        return _context_invalid_request(e)
+    since = _context_since(days)
+    parts = await asyncio.gather(
+        *(_afetch_context_part(CONTEXT_SOURCES[name], user_id, since, limit) for name in names)
+    )
+    return _context_result(user_id, names, list(parts), days)
+
+# @tool로 생성된 StructuredTool에 비동기 구현을 연결합니다. (tool.ainvoke / tool.coroutine 사용 가능)
+get_workout_history.coroutine = _aget_workout_history
+add_workout_session.coroutine = _aadd_workout_session
+add_workout_sessions.coroutine = _aadd_workout_sessions
+get_training_analytics.coroutine = _aget_training_analytics
+get_training_stats.coroutine = _aget_training_stats
+get_coaching_context.coroutine = _aget_coaching_context
+
+# 데이터를 변경하지 않는 도구 표시 (tool_registry.ToolRegistry가 read_only 여부로 사용)
+get_workout_history.metadata = {"read_only": True}
+get_training_analytics.metadata = {"read_only": True}
+get_training_stats.metadata = {"read_only": True}
+get_coaching_context.metadata = {"read_only": True}
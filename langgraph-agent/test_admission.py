@@ -0,0 +1,107 @@
+# test_admission.py
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from admission import AdmissionController, AdmissionRejected, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# --- 1. 사용자별 토큰 버킷 ---
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+    assert bucket.take(0.0) == 0 and bucket.take(0.0) == 0
+    assert bucket.take(0.0) == pytest.approx(1.0)
+    assert bucket.take(1.0) == 0
+
+def test_user_rate_limit_is_per_user_with_retry_after():
+    clock = FakeClock()
+    admission = AdmissionController(user_rate_per_min=6, user_burst=2, clock=clock)
+    admission.admit("u1")
+    admission.admit("u1")
+    with pytest.raises(AdmissionRejected) as excinfo:
+        admission.admit("u1")
+    assert excinfo.value.reason == "rate_limited" and excinfo.value.retry_after == 10
+    admission.admit("u2")  # 다른 사용자는 영향 없음
+
+    clock.now = 10.0
+    admission.admit("u1")
+    assert admission.stats()["rate_limited"] == 1
+
+# --- 2. 동시 실행 상한 / 대기열 ---
+
+def test_concurrency_cap_queues_then_rejects_when_full():
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1, user_rate_per_min=0)
+    running, peak = [], []
+
+    async def run():
+        async with admission.slot():
+            running.append(1)
+            peak.append(len(running))
+            await asyncio.sleep(0.05)
+            running.pop()
+        return "ok"
+
+    async def main():
+        first = asyncio.ensure_future(run())
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(run())
+        await asyncio.sleep(0)
+        assert admission.stats()["queue_depth"] == 1
+        # 대기열이 가득 차면 도착 시점에 즉시 거절
+        with pytest.raises(AdmissionRejected) as excinfo:
+            admission.admit("u3")
+        assert excinfo.value.reason == "queue_full" and excinfo.value.retry_after >= 1
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(main()) == ["ok", "ok"]
+    stats = admission.stats()
+    assert max(peak) == 1 and stats["admitted"] == 2 and stats["in_flight"] == 0
+    assert stats["peak_queue_depth"] == 1 and stats["wait_ms"]["p99"] >= 40
+
+def test_queue_timeout_and_cancelled_waiter_free_their_place():
+    admission = AdmissionController(max_concurrency=1, max_queue=2, queue_timeout=0.05, user_rate_per_min=0)
+
+    async def hold(seconds):
+        async with admission.slot():
+            await asyncio.sleep(seconds)
+
+    async def main():
+        holder = asyncio.ensure_future(hold(0.2))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(hold(0))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await hold(0)
+        await holder
+        return excinfo.value.reason
+
+    assert asyncio.run(main()) == "queue_timeout"
+    stats = admission.stats()
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0 and stats["queue_timeout"] == 1
+
+# --- 3. /invoke 429 응답 ---
+
+def test_invoke_returns_429_with_retry_after_when_rate_limited():
+    from fastapi.testclient import TestClient
+    import graph_builder
+
+    async def fake_run(request):
+        return {"result": "답변", "llm_calls": 1, "cached": False, "thread_id": "t1"}
+
+    admission = AdmissionController(user_rate_per_min=1, user_burst=1)
+    with patch.object(graph_builder, "ADMISSION", admission), \
+         patch.object(graph_builder, "run_invoke", side_effect=fake_run):
+        client = TestClient(graph_builder.create_app())
+        assert client.post("/invoke", json={"question": "안녕", "user_id": "u1"}).status_code == 200
+        response = client.post("/invoke", json={"question": "안녕", "user_id": "u1"})
+
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
+    assert response.json()["detail"]["reason"] == "rate_limited"
@@ -0,0 +1,136 @@
+# test_aggregates.py
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from aggregates import AggregateStore, UserAggregates
+
+def make_row(row_id: int, day: str, squat_weight: float = 100, user_id: str = "u1"):
+    exercises = [{"name": "스쿼트", "weight": squat_weight, "reps": 5, "sets": 5}]
+    return {"id": row_id, "user_id": user_id, "created_at": f"{day}T09:00:00+00:00",
+            "total_volume": squat_weight * 25, "exercises": exercises}
+
+ROWS = [
+    make_row(1, "2024-01-01", 100),
+    make_row(2, "2024-01-02", 110),
+    make_row(3, "2024-01-03", 105),
+    make_row(4, "2024-01-10", 120),
+]
+
+def head(index: int):
+    """fetch_head_row 응답: index번째 행까지 저장된 DB의 최신 행과 전체 행 수."""
+    return {"id": ROWS[index]["id"], "created_at": ROWS[index]["created_at"], "session_count": index + 1}
+
+# --- 1. 누적 집계 ---
+
+def test_incremental_apply_matches_full_rebuild(tmp_path):
+    store = AggregateStore(str(tmp_path))
+    store.rebuild("u1", ROWS[:2])
+    store.record(ROWS[2:])
+
+    incremental = store.cached("u1").snapshot()
+    assert incremental == AggregateStore(str(tmp_path / "other")).rebuild("u1", ROWS).snapshot()
+    assert incremental["session_count"] == 4
+    assert incremental["exercises"]["스쿼트"]["max_weight"] == 120
+    assert incremental["exercises"]["스쿼트"]["max_volume"] == 3000
+    assert [w["sessions"] for w in incremental["weekly"]] == [3, 1]
+    assert store.stats()["incremental_rows"] == 2
+
+def test_streaks():
+    aggregates = UserAggregates()
+    for row in ROWS:
+        aggregates.apply(row)
+    snapshot = aggregates.snapshot()
+    assert snapshot["day_streak"] == {"current": 1, "longest": 3, "last": "2024-01-10"}
+    assert snapshot["week_streak"] == {"current": 2, "longest": 2, "last": "2024-01-08"}
+
+def test_duplicate_row_is_ignored_and_past_row_is_rejected():
+    aggregates = UserAggregates()
+    assert aggregates.apply(ROWS[1]) is True
+    assert aggregates.apply(ROWS[1]) is True and aggregates.data["session_count"] == 1
+    assert aggregates.apply(ROWS[0]) is False
+
+# --- 2. 동기화 확인 / 재계산 ---
+
+def test_reconcile_only_when_out_of_sync(tmp_path):
+    store = AggregateStore(str(tmp_path))
+    load_rows = MagicMock(return_value=ROWS[:3])
+    store.get("u1", lambda: head(2), load_rows)
+    store.get("u1", lambda: head(2), load_rows)
+    assert load_rows.call_count == 1  # 워터마크가 같으면 전체 기록을 읽지 않음
+
+    # 다른 경로(웹 서버 등)로 추가된 행 때문에 최신 행이 바뀌면 재계산
+    load_rows.return_value = ROWS
+    assert store.get("u1", lambda: head(3), load_rows).data["session_count"] == 4
+    assert load_rows.call_count == 2
+
+def test_out_of_order_insert_marks_dirty(tmp_path):
+    store = AggregateStore(str(tmp_path))
+    store.rebuild("u1", [ROWS[0], ROWS[2]])
+    store.record([ROWS[1]])  # 워터마크 이전 행
+    assert not store.is_in_sync("u1", ROWS[2])
+    load_rows = MagicMock(return_value=ROWS[:3])
+    assert store.get("u1", lambda: head(2), load_rows).data["session_count"] == 3
+
+def test_row_from_another_process_before_local_insert_triggers_rebuild(tmp_path):
+    """웹 앱이 행 W를 저장한 뒤 에이전트가 더 최신 행 A를 저장하면, 워터마크가 최신 행과 같아도 행 수로 W 누락을 감지하는지 확인."""
+    store = AggregateStore(str(tmp_path))
+    store.rebuild("u1", ROWS[:2])
+    store.record([ROWS[3]])  # W(ROWS[2])는 다른 프로세스가 저장하여 이 프로세스는 모름
+    load_rows = MagicMock(return_value=ROWS)
+    aggregates = store.get("u1", lambda: head(3), load_rows)
+    assert load_rows.call_count == 1
+    assert aggregates.data["session_count"] == 4
+    assert aggregates.data["total_volume"] == sum(row["total_volume"] for row in ROWS)
+
+def test_aggregates_persist_across_restart(tmp_path):
+    AggregateStore(str(tmp_path)).rebuild("u1", ROWS)
+    store = AggregateStore(str(tmp_path))
+    load_rows = MagicMock()
+    assert store.get("u1", lambda: head(3), load_rows).data["session_count"] == 4
+    load_rows.assert_not_called()
+    # 집계가 없는 사용자의 INSERT는 건너뛰고 첫 조회 시 전체 계산
+    store.record([make_row(9, "2024-02-01", user_id="u2")])
+    assert not store.is_in_sync("u2", make_row(9, "2024-02-01", user_id="u2"))
+
+# --- 3. 도구 연동 ---
+
+def test_tool_reads_precomputed_stats_after_insert(tmp_path):
+    import supabase_tools
+    from supabase_tools import get_training_stats, insert_session_rows
+
+    store = AggregateStore(str(tmp_path))
+    store.rebuild("u1", ROWS[:3])
+    client = MagicMock()
+    client.from_.return_value.insert.return_value.execute.return_value.data = [ROWS[3]]
+    with patch.object(supabase_tools, "AGGREGATES", store), \
+         patch('supabase_tools.get_supabase', return_value=client), \
+         patch('supabase_tools.fetch_head_row', return_value=head(3)), \
+         patch('supabase_tools.iter_workout_history') as mock_iter:
+        insert_session_rows([{"user_id": "u1", "total_volume": 3000.0, "exercises": ROWS[3]["exercises"]}])
+        result = get_training_stats.invoke({"user_id": "u1"})
+
+    mock_iter.assert_not_called()
+    assert result["status"] == "success" and result["stats"]["session_count"] == 4
+
+def test_sync_and_async_stats_detect_writes_from_other_processes(tmp_path):
+    """다른 프로세스(웹 앱)의 INSERT는 이 프로세스의 기록 캐시에 남아 있는 최신 행이 아니라 DB 최신 행으로 감지하는지 확인."""
+    import supabase_tools
+
+    store = AggregateStore(str(tmp_path))
+    store.rebuild("u1", ROWS[:3])
+    supabase_tools.HISTORY_CACHE.set("u1", supabase_tools._history_cache_key(1, None, ["created_at"]), ([ROWS[2]], None))
+    with patch.object(supabase_tools, "AGGREGATES", store), \
+         patch('supabase_tools.fetch_head_row', return_value=head(3)) as mock_head, \
+         patch('supabase_tools.iter_workout_history', return_value=iter([ROWS])):
+        assert supabase_tools.fetch_training_stats("u1")["session_count"] == 4
+    mock_head.assert_called_once_with("u1")
+
+    async def pages(user_id, fields=None):
+        yield ROWS
+
+    with patch.object(supabase_tools, "AGGREGATES", store), \
+         patch('supabase_tools.afetch_head_row', AsyncMock(return_value=head(3))), \
+         patch('supabase_tools.aiter_workout_history', side_effect=pages) as mock_pages:
+        assert asyncio.run(supabase_tools.afetch_training_stats("u1"))["session_count"] == 4
+    mock_pages.assert_not_called()  # 동기 경로에서 이미 동기화됨
+    supabase_tools.HISTORY_CACHE.clear()
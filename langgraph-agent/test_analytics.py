@@ -0,0 +1,110 @@
+# test_analytics.py
+
+import time
+import numpy as np
+from unittest.mock import MagicMock, patch
+from analytics import (
+    build_frame, detect_plateaus, detect_prs, estimated_1rm, latest_comparison, training_analytics,
+    volume_series, weekly_aggregates,
+)
+
+def make_session(day: int, squat_weight: float, bench_weight: float = 50, created_at: str = None):
+    exercises = [
+        {"name": "스쿼트", "weight": squat_weight, "reps": 5, "sets": 5, "rest": 90},
+        {"name": "벤치프레스", "weight": bench_weight, "reps": 8, "sets": 3, "rest": 60},
+    ]
+    return {
+        "id": day,
+        "created_at": created_at or str(np.datetime64("2024-01-01") + np.timedelta64(day, "D")) + "T09:00:00+00:00",
+        "total_volume": sum(e["weight"] * e["reps"] * e["sets"] for e in exercises),
+        "exercises": exercises,
+    }
+
+# --- 1. 기본 지표 ---
+
+def test_frame_flattens_and_sorts_sessions():
+    rows = [make_session(2, 70), make_session(0, 60), make_session(1, 65)]
+    frame = build_frame(rows)
+
+    assert frame.session_count == 3 and frame.exercise_names == ["스쿼트", "벤치프레스"]
+    assert len(frame.weight) == 6
+    assert volume_series(frame, "스쿼트") == {"dates": ["2024-01-01", "2024-01-02", "2024-01-03"],
+                                            "volumes": [1500, 1625, 1750]}
+    assert volume_series(frame)["volumes"] == [2700, 2825, 2950]
+    assert volume_series(frame, "데드리프트") == {"dates": [], "volumes": []}
+
+def test_estimated_1rm_epley():
+    assert np.allclose(estimated_1rm(np.array([100.0, 100.0]), np.array([1.0, 10.0])), [100.0, 100 * (1 + 10 / 30)])
+
+def test_weekly_aggregates_start_on_monday():
+    # 2024-01-01은 월요일: 0~6일은 1주차, 7일은 2주차
+    frame = build_frame([make_session(0, 60), make_session(3, 60), make_session(7, 60)])
+    weekly = weekly_aggregates(frame)
+    assert [w["week_start"] for w in weekly] == ["2024-01-01", "2024-01-08"]
+    assert [w["sessions"] for w in weekly] == [2, 1]
+    assert weekly[0]["total_volume"] == 5400
+    assert weekly_aggregates(frame, weeks=1) == weekly[-1:]
+
+def test_created_at_offset_is_normalized_to_utc():
+    frame = build_frame([make_session(0, 60, created_at="2024-01-08T01:00:00+09:00")])
+    assert weekly_aggregates(frame)[0]["week_start"] == "2024-01-01"  # UTC 기준 1월 7일 (일요일)
+
+# --- 2. PR / 정체 / 비교 ---
+
+def test_detect_prs_and_plateaus():
+    # 스쿼트는 꾸준히 증가, 벤치프레스는 8세션 동안 같은 중량 (정체)
+    rows = [make_session(day, 60 + 5 * day) for day in range(8)]
+    frame = build_frame(rows)
+
+    prs = detect_prs(frame)
+    assert [pr["exercise"] for pr in prs] == ["스쿼트"] * 7  # 첫 기록은 PR 아님
+    assert prs[-1]["date"] == "2024-01-08" and prs[-1]["previous_best"] < prs[-1]["estimated_1rm"]
+
+    plateaus = detect_plateaus(frame, window=4)
+    assert [p["exercise"] for p in plateaus] == ["벤치프레스"]
+    assert plateaus[0]["gain_pct"] == 0.0
+
+def test_latest_comparison_matches_web_card():
+    frame = build_frame([make_session(0, 60), make_session(1, 70, bench_weight=40)])
+    comparison = latest_comparison(frame)
+    assert comparison["latest"]["date"] == "2024-01-02"
+    assert comparison["volume_change"] == (1750 + 960) - (1500 + 1200)
+    assert comparison["exercises"]["스쿼트"] == {"latest_volume": 1750, "previous_volume": 1500}
+    assert latest_comparison(build_frame([make_session(0, 60)])) is None
+
+def test_empty_history():
+    result = training_analytics(build_frame([]))
+    assert result["session_count"] == 0 and result["period"] is None
+    assert result["weekly"] == [] and result["recent_prs"] == [] and result["latest_comparison"] is None
+
+# --- 3. 성능 / 도구 ---
+
+def test_years_of_history_in_milliseconds():
+    """3년치(하루 1세션) 기록을 평탄화한 뒤 전체 분석이 수십 ms 안에 끝나는지 테스트."""
+    frame = build_frame([make_session(day, 60 + day % 40) for day in range(365 * 3)])
+    started = time.perf_counter()
+    result = training_analytics(frame, weeks=52)
+    elapsed = time.perf_counter() - started
+    assert result["session_count"] == 365 * 3 and len(result["weekly"]) == 52
+    assert elapsed < 0.1
+
+def test_get_training_analytics_tool_syncs_local_store(tmp_path):
+    """도구가 로컬 열 저장소를 워터마크 이후 행으로 동기화한 뒤 분석하는지 테스트."""
+    import supabase_tools
+    from supabase_tools import get_training_analytics
+    from session_store import SessionStore
+
+    deltas = [[make_session(0, 60), make_session(1, 65), make_session(2, 70)], []]
+    with patch.object(supabase_tools, "SESSION_STORE", SessionStore(str(tmp_path))), \
+         patch('supabase_tools._delta_query') as mock_query, patch('supabase_tools.get_supabase'):
+        mock_query.return_value.execute.side_effect = lambda: MagicMock(data=deltas.pop(0))
+        first = get_training_analytics.invoke({"user_id": "u1", "exercise": "스쿼트"})
+        second = get_training_analytics.invoke({"user_id": "u1", "exercise": "스쿼트"})
+
+    assert first["status"] == "success" and first["action"] == "get_training_analytics"
+    assert first["analytics"]["session_count"] == 3
+    assert first["analytics"]["volume_series"]["volumes"] == [1500, 1625, 1750]
+    assert second["analytics"] == first["analytics"]
+    # 두 번째 요청은 마지막 행을 워터마크로 delta만 조회
+    assert mock_query.call_args_list[0].args[2] is None
+    assert mock_query.call_args_list[1].args[2] == (make_session(2, 70)["created_at"], 2)
@@ -0,0 +1,89 @@
+# test_cache.py
+
+import time
+from unittest.mock import patch
+from cache import UserTTLCache
+
+# --- 1. 기본 동작 (hit/miss) ---
+
+def test_cache_hit_and_miss_counters():
+    """저장된 값은 hit, 없는 값은 miss로 집계되는지 테스트."""
+    cache = UserTTLCache(ttl_seconds=60)
+    assert cache.get("u1", "page") is None
+    cache.set("u1", "page", {"data": [1, 2, 3]})
+    assert cache.get("u1", "page") == {"data": [1, 2, 3]}
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["entries"] == 1 and stats["bytes"] > 0
+    
+    print("✅ hit/miss 집계 확인")
+
+# --- 2. TTL / LRU / 메모리 상한 ---
+
+def test_cache_ttl_expiration():
+    """TTL이 지난 항목은 만료 처리되는지 테스트."""
+    cache = UserTTLCache(ttl_seconds=0.05)
+    cache.set("u1", "page", [1])
+    time.sleep(0.06)
+    assert cache.get("u1", "page") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_cache_lru_eviction_by_entries_and_bytes():
+    """항목 수/메모리 상한을 넘으면 가장 오래 사용하지 않은 항목부터 제거되는지 테스트."""
+    cache = UserTTLCache(max_entries=2)
+    cache.set("u1", "a", 1)
+    cache.set("u2", "b", 2)
+    cache.get("u1", "a")          # u1 항목을 최근 사용으로 갱신
+    cache.set("u3", "c", 3)       # u2 항목이 제거되어야 함
+    assert cache.get("u2", "b") is None
+    assert cache.get("u1", "a") == 1
+    assert cache.stats()["evictions"] == 1
+
+    small = UserTTLCache(max_bytes=50)
+    small.set("u1", "a", "x" * 30)
+    small.set("u1", "b", "y" * 30)
+    assert small.get("u1", "a") is None
+    assert small.stats()["bytes"] <= 50
+
+    small.set("u1", "huge", "z" * 100)   # 상한보다 큰 단일 항목은 저장하지 않음
+    assert small.get("u1", "huge") is None
+
+# --- 3. 사용자 단위 무효화 ---
+
+def test_cache_invalidate_user():
+    """invalidate(user_id)가 해당 사용자의 항목만 제거하는지 테스트."""
+    cache = UserTTLCache()
+    cache.set("u1", "p1", 1)
+    cache.set("u1", "p2", 2)
+    cache.set("u2", "p1", 3)
+
+    assert cache.invalidate("u1") == 2
+    assert cache.get("u1", "p1") is None
+    assert cache.get("u2", "p1") == 3
+    assert cache.stats()["invalidations"] == 1
+
+# --- 4. get_workout_history 읽기 캐시 연동 ---
+
+def test_history_cache_read_through_and_write_invalidation():
+    """반복 조회는 DB를 다시 호출하지 않고, 같은 사용자의 기록 추가 후에는 다시 조회하는지 테스트."""
+    import supabase_tools
+    from supabase_tools import get_workout_history, add_workout_session, HISTORY_CACHE
+
+    HISTORY_CACHE.clear()
+    rows = [{"id": 1, "created_at": "2025-09-01T10:00:00+00:00", "total_volume": 100.0, "exercises": []}]
+    with patch("supabase_tools._history_query") as mock_query, \
+         patch("supabase_tools.supabase") as mock_client:
+        mock_query.return_value.execute.return_value.data = rows
+        mock_client.from_.return_value.insert.return_value.execute.return_value.data = [rows[0]]
+
+        first = get_workout_history.invoke({"user_id": "cache-user"})
+        second = get_workout_history.invoke({"user_id": "cache-user"})
+        assert first["data"] == second["data"] == rows
+        assert mock_query.call_count == 1
+
+        add_workout_session.invoke({"user_id": "cache-user", "total_volume": 100.0, "exercises": "[]"})
+        get_workout_history.invoke({"user_id": "cache-user"})
+        assert mock_query.call_count == 2
+    
+    print("✅ 읽기 캐시 및 쓰기 무효화 확인")
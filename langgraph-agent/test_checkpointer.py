@@ -0,0 +1,129 @@
+# test_checkpointer.py
+
+import asyncio
+import operator
+import sqlite3
+from typing import List
+from typing_extensions import Annotated, TypedDict
+from langgraph.graph import StateGraph, END
+from checkpointer import SQLiteCheckpointer, MAX_DELTA_DEPTH
+from state import add_or_reset
+
+# --- 테스트용 최소 그래프: 누적 리스트(messages) + 턴 단위 카운터(calls) ---
+
+class ChatState(TypedDict):
+    messages: Annotated[List[str], operator.add]
+    calls: Annotated[int, add_or_reset]
+
+def reply(state: ChatState) -> dict:
+    return {"messages": [f"answer:{state['messages'][-1]}"], "calls": 1}
+
+def build_graph(checkpointer):
+    workflow = StateGraph(ChatState)
+    workflow.add_node("reply", reply)
+    workflow.set_entry_point("reply")
+    workflow.add_edge("reply", END)
+    return workflow.compile(checkpointer=checkpointer)
+
+def thread(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+def turn(question: str) -> dict:
+    return {"messages": [question], "calls": None}
+
+# --- 1. 대화 이어가기 ---
+
+def test_conversation_resumes_from_checkpoint(tmp_path):
+    """같은 thread_id의 다음 요청은 이전 messages에 이어지고, 턴 단위 필드는 초기화되는지 테스트."""
+    graph = build_graph(SQLiteCheckpointer(str(tmp_path / "ck.sqlite")))
+    graph.invoke(turn("q1"), thread("t1"))
+    result = graph.invoke(turn("q2"), thread("t1"))
+
+    assert result["messages"] == ["q1", "answer:q1", "q2", "answer:q2"]
+    assert result["calls"] == 1
+    # 다른 thread_id는 독립된 대화
+    assert graph.invoke(turn("x"), thread("t2"))["messages"] == ["x", "answer:x"]
+
+    print("✅ thread_id별 대화 이어가기 확인")
+
+def test_state_survives_restart(tmp_path):
+    """새 체크포인터 인스턴스(프로세스 재시작)에서도 같은 파일로 대화를 복원하는지 테스트."""
+    path = str(tmp_path / "ck.sqlite")
+    first = SQLiteCheckpointer(path)
+    build_graph(first).invoke(turn("q1"), thread("t1"))
+    first.close()
+
+    graph = build_graph(SQLiteCheckpointer(path))
+    result = graph.invoke(turn("q2"), thread("t1"))
+    assert result["messages"] == ["q1", "answer:q1", "q2", "answer:q2"]
+
+# --- 2. 증분 저장 ---
+
+def test_append_only_channel_is_stored_as_delta(tmp_path):
+    """messages는 추가된 항목만 delta로 저장되고, MAX_DELTA_DEPTH마다 전체 값을 다시 저장하는지 테스트."""
+    path = str(tmp_path / "ck.sqlite")
+    checkpointer = SQLiteCheckpointer(path)
+    graph = build_graph(checkpointer)
+    turns = MAX_DELTA_DEPTH // 2 + 2
+    for i in range(turns):
+        graph.invoke(turn(f"q{i}"), thread("t1"))
+
+    rows = sqlite3.connect(path).execute(
+        "SELECT base_version IS NOT NULL, depth FROM checkpoint_blobs WHERE channel = 'messages'"
+    ).fetchall()
+    assert sum(is_delta for is_delta, _ in rows) > 0
+    assert max(depth for _, depth in rows) <= MAX_DELTA_DEPTH
+    assert checkpointer.stats()["delta_blobs"] > 0
+
+    # delta 체인을 따라 전체 기록이 복원됨
+    state = build_graph(SQLiteCheckpointer(path)).get_state(thread("t1"))
+    assert len(state.values["messages"]) == turns * 2
+    assert state.values["messages"][-1] == f"answer:q{turns - 1}"
+
+def test_list_heads_are_capped_and_evicted_thread_falls_back_to_full_blob(tmp_path):
+    """delta 기준 head는 max_list_heads개만 유지하고, 제거된 대화의 다음 저장은 전체 값으로 기록되는지 테스트."""
+    path = str(tmp_path / "ck.sqlite")
+    checkpointer = SQLiteCheckpointer(path, max_list_heads=2)
+    graph = build_graph(checkpointer)
+    for thread_id in ("t1", "t2", "t3"):
+        graph.invoke(turn("q1"), thread(thread_id))
+    assert checkpointer.stats()["list_heads"] == 2
+    assert {key[0] for key in checkpointer._list_heads} == {"t2", "t3"}  # 가장 오래 사용하지 않은 t1 제거
+
+    def deltas(thread_id):
+        return sqlite3.connect(path).execute(
+            "SELECT COUNT(base_version) FROM checkpoint_blobs WHERE thread_id = ? AND channel = 'messages'", (thread_id,)
+        ).fetchone()[0]
+
+    row, _ = checkpointer._blob_row("t1", "", "messages", "v", {"messages": ["q1", "answer:q1", "q2"]})
+    assert row[6] is None and row[7] == 0  # head가 없으면 전체 값(base_version 없음)
+
+    before = deltas("t1")
+    graph.invoke(turn("q2"), thread("t1"))
+    # 다음 턴 시작 시 복원한 값이 head가 되어 이후 저장은 다시 delta로 기록됨
+    assert deltas("t1") > before
+    assert graph.get_state(thread("t1")).values["messages"] == ["q1", "answer:q1", "q2", "answer:q2"]
+    assert checkpointer.stats()["list_heads"] == 2
+
+# --- 3. 조회 / 삭제 / 비동기 ---
+
+def test_list_and_delete_thread(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "ck.sqlite"))
+    graph = build_graph(checkpointer)
+    graph.invoke(turn("q1"), thread("t1"))
+    graph.invoke(turn("q2"), thread("t1"))
+
+    history = list(checkpointer.list(thread("t1")))
+    assert history and history[0].checkpoint["id"] > history[-1].checkpoint["id"]  # 최신순
+    assert len(list(checkpointer.list(thread("t1"), limit=2))) == 2
+    assert len(list(checkpointer.list(thread("t1"), before=history[0].config))) == len(history) - 1
+
+    checkpointer.delete_thread("t1")
+    assert checkpointer.get_tuple(thread("t1")) is None
+
+def test_async_graph_uses_same_store(tmp_path):
+    """ainvoke 경로(aget_tuple/aput/aput_writes)로 저장한 대화를 동기 경로에서 이어갈 수 있는지 테스트."""
+    graph = build_graph(SQLiteCheckpointer(str(tmp_path / "ck.sqlite")))
+    asyncio.run(graph.ainvoke(turn("q1"), thread("t1")))
+    result = graph.invoke(turn("q2"), thread("t1"))
+    assert result["messages"] == ["q1", "answer:q1", "q2", "answer:q2"]
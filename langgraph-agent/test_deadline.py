@@ -0,0 +1,173 @@
+# test_deadline.py
+
+import time
+import asyncio
+import httpx
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_core.messages import HumanMessage
+from deadline import (
+    DeadlineExceeded, bounded_timeout, current_deadline, deadline_scope, has_time_for,
+    parse_timeout_header, request_deadline, run_within,
+)
+from single_flight import SingleFlight
+
+# --- 1. 마감 시각 계산 ---
+
+def test_timeout_header_and_deadline_arithmetic():
+    assert parse_timeout_header(None) is None and parse_timeout_header("2.5") == 2.5
+    for invalid in ("abc", "0", "-1"):
+        with pytest.raises(ValueError):
+            parse_timeout_header(invalid)
+
+    assert request_deadline(10, now=100.0) == 110.0
+    assert request_deadline(10_000, now=0.0) == 300.0  # AGENT_MAX_REQUEST_TIMEOUT으로 제한
+    deadline = time.time() + 4
+    assert bounded_timeout(15, None) == 15 and 3 < bounded_timeout(15, deadline) <= 4
+    assert bounded_timeout(15, deadline, reserve=5) < 0
+    assert has_time_for(None, 100) and not has_time_for(deadline, 5)
+
+def test_run_within_cancels_work_at_deadline():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run_within(time.time() + 0.05, slow()))
+    assert cancelled == [True]
+
+# --- 2. 호출자가 모두 떠나면 공유 실행 취소 ---
+
+def test_shared_task_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        callers = [asyncio.ensure_future(flights.arun("k", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled  # 아직 기다리는 호출자가 있음
+        callers[1].cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert cancelled == [True] and flights.stats()["in_flight"] == 0
+
+# --- 3. HTTP 제한 시간 / 재시도 ---
+
+def test_pooled_transport_shrinks_timeouts_to_remaining_time():
+    from http_pool import _apply_deadline
+
+    request = httpx.Request("GET", "http://db.local/rest/v1/sessions",
+                            extensions={"timeout": {"connect": 5.0, "read": 10.0, "write": 10.0, "pool": 10.0}})
+    with deadline_scope(time.time() + 2):
+        _apply_deadline(request)
+    assert all(0 < value <= 2 for value in request.extensions["timeout"].values())
+
+    with deadline_scope(time.time() - 1), pytest.raises(DeadlineExceeded):
+        _apply_deadline(httpx.Request("GET", "http://db.local/"))
+
+def test_no_retry_or_breaker_failure_past_deadline():
+    from resilience import Dependency
+
+    sleeps = []
+    dependency = Dependency("test", {"unavailable": "DB_UNAVAILABLE"}, max_attempts=3, base_delay=5.0, max_delay=5.0,
+                            failure_threshold=1, reset_timeout=30.0, sleep=sleeps.append)
+    down = MagicMock(side_effect=httpx.ConnectError("refused"))
+    with patch("resilience.random.uniform", side_effect=lambda low, high: high), \
+         deadline_scope(time.time() + 1), pytest.raises(httpx.ConnectError):
+        dependency.call(down)
+    assert down.call_count == 1 and sleeps == []  # 백오프(5s)가 남은 시간보다 길어 재시도하지 않음
+
+    dependency.breaker.reset()
+    with deadline_scope(time.time() - 1), pytest.raises(DeadlineExceeded):
+        dependency.call(MagicMock(side_effect=DeadlineExceeded("late")))
+    assert dependency.breaker.state == "closed"  # 마감 초과는 의존성 장애로 세지 않음
+
+# --- 4. 노드: 시간이 부족하면 ErrorHandler로 ---
+
+def test_decision_goes_to_error_handler_when_time_is_short():
+    import node
+
+    state = {"question": "안녕", "messages": [HumanMessage(content="안녕")], "loop_counter": 0,
+             "deadline": time.time() + 1}
+    with patch("node.agent_executor") as mock_agent_executor:
+        update = node.agent_decision(state)
+        aupdate = asyncio.run(node.aagent_decision(state))
+
+    mock_agent_executor.invoke.assert_not_called()
+    mock_agent_executor.ainvoke.assert_not_called()
+    for result in (update, aupdate):
+        assert result["decision"].action_type == "error" and result["error_info"].error_code == "DEADLINE_EXCEEDED"
+    assert node.route_decision({**state, **update}) == "ErrorHandler"
+
+def test_tool_executor_reserves_time_for_the_answer():
+    import node
+    from state import AgentDecisionModel
+
+    tool_call = {"id": "c1", "function": {"name": "get_workout_history", "arguments": '{"user_id": "u1"}'}}
+    state = {"decision": AgentDecisionModel(action_type="tool_call", tool_calls=[tool_call]),
+             "deadline": time.time() + node.ANSWER_RESERVE_SECONDS - 1}
+    with patch("supabase_tools.get_workout_history.func") as mock_history:
+        update = node.tool_executor(state)
+    mock_history.assert_not_called()
+    assert update["error_info"].error_code == "DEADLINE_EXCEEDED"
+
+def test_analytics_skips_sync_when_deadline_is_near(tmp_path):
+    import supabase_tools
+    from session_store import SessionStore
+
+    session = {"id": 1, "created_at": "2024-01-01T09:00:00+00:00", "total_volume": 1500,
+               "exercises": [{"name": "스쿼트", "weight": 60, "reps": 5, "sets": 5, "rest": 90}]}
+    with patch.object(supabase_tools, "SESSION_STORE", SessionStore(str(tmp_path))), \
+         patch('supabase_tools._delta_query') as mock_query, patch('supabase_tools.get_supabase'):
+        mock_query.return_value.execute.return_value = MagicMock(data=[session])
+        fresh = supabase_tools.fetch_training_analytics("u1")
+        with deadline_scope(time.time() + 1):
+            stale = supabase_tools.fetch_training_analytics("u1")
+
+    assert mock_query.call_count == 1  # 두 번째 요청은 동기화를 건너뜀
+    assert "stale" not in fresh and stale["stale"] is True
+    assert stale["session_count"] == fresh["session_count"] == 1
+
+# --- 5. /invoke 헤더, 504 ---
+
+def test_invoke_header_sets_deadline_and_graph_is_cut_off():
+    from fastapi.testclient import TestClient
+    import graph_builder
+
+    seen = []
+
+    async def fake_run(request):
+        seen.append(current_deadline())
+        return {"result": "답변", "llm_calls": 1, "cached": False, "thread_id": "t1"}
+
+    slow_graph = MagicMock()
+    slow_graph.ainvoke.side_effect = lambda *args, **kwargs: asyncio.sleep(1)
+
+    client = TestClient(graph_builder.create_app())
+    with patch.object(graph_builder, "run_invoke", side_effect=fake_run):
+        started = time.time()
+        assert client.post("/invoke", json={"question": "안녕", "user_id": "d1"},
+                           headers={"X-Request-Timeout": "7"}).status_code == 200
+        bad = client.post("/invoke", json={"question": "안녕", "user_id": "d2"}, headers={"X-Request-Timeout": "soon"})
+    assert started + 6 < seen[0] <= time.time() + 7 and bad.status_code == 400
+
+    with patch.object(graph_builder, "get_conversation_graph", return_value=slow_graph):
+        response = client.post("/invoke", json={"question": "느린 질문", "user_id": "d3"},
+                               headers={"X-Request-Timeout": "0.1"})
+    assert response.status_code == 504 and response.json()["detail"]["error_code"] == "DEADLINE_EXCEEDED"
+    assert slow_graph.ainvoke.call_args.args[0]["deadline"] is not None
@@ -0,0 +1,88 @@
+# test_history.py
+
+import json
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
+from history import (
+    compact_history, count_tokens, message_tokens, split_turns, summarize_turns, truncate_tool_message,
+)
+
+def make_turn(i: int, tool_rows: int = 0):
+    """질문 → (선택) 도구 결과 → 답변으로 이루어진 한 턴."""
+    turn = [HumanMessage(content=f"질문 {i}: 내 운동 기록 보여줘")]
+    if tool_rows:
+        rows = [{"id": n, "total_volume": 100 + n, "exercises": "squat 5x5"} for n in range(tool_rows)]
+        turn.append(ToolMessage(content=json.dumps({"status": "success", "data": rows}), tool_call_id=f"call_{i}"))
+    turn.append(AIMessage(content=f"답변 {i}: 최근 기록을 요약했습니다."))
+    return turn
+
+def make_history(turns: int, tool_rows: int = 0):
+    return [m for i in range(turns) for m in make_turn(i, tool_rows)]
+
+# --- 1. 토큰 계산 / 턴 분할 ---
+
+def test_count_tokens_is_positive_and_monotonic():
+    assert count_tokens("") == 0
+    assert 0 < count_tokens("hello") < count_tokens("hello " * 50)
+    assert count_tokens("내 운동 기록") > 0
+
+def test_split_turns_starts_at_human_messages():
+    history = make_history(3, tool_rows=1)
+    assert split_turns(history) == [(0, 3), (3, 6), (6, 9)]
+
+def test_truncate_tool_message_caps_large_results():
+    message = make_turn(0, tool_rows=300)[1]
+    truncated = truncate_tool_message(message, max_tokens=100)
+    assert message_tokens(truncated) < message_tokens(message)
+    assert truncated.tool_call_id == message.tool_call_id
+    # 작은 메시지와 ToolMessage가 아닌 메시지는 그대로
+    small = make_turn(0)[0]
+    assert truncate_tool_message(small, max_tokens=100) is small
+
+# --- 2. 압축 ---
+
+def test_short_history_is_kept_as_is():
+    history = make_history(2)
+    compacted = compact_history(history, budget=10_000)
+    assert compacted.messages == history
+    assert compacted.summary is None and compacted.cursor == 0
+
+def test_long_history_keeps_recent_turns_within_budget():
+    """예산을 넘는 이전 턴은 요약으로 대체되고, 최근 턴만 원문으로 남는지 테스트."""
+    history = make_history(40, tool_rows=5)
+    compacted = compact_history(history, budget=400)
+
+    summary, *recent = compacted.messages
+    # 가장 최근에 밀려난 턴의 답변이 요약 끝에 포함됨
+    assert isinstance(summary, SystemMessage) and history[compacted.cursor - 1].content in summary.content
+    assert recent == history[compacted.cursor:]
+    assert isinstance(recent[0], HumanMessage)  # 턴 경계에서 자름
+    assert sum(message_tokens(m) for m in recent) <= 400
+    assert recent[-1].content == "답변 39: 최근 기록을 요약했습니다."
+
+def test_newest_turn_is_always_kept():
+    history = make_history(3, tool_rows=50)
+    compacted = compact_history(history, budget=1)
+    assert compacted.messages[-1].content == "답변 2: 최근 기록을 요약했습니다."
+    assert compacted.cursor == 6
+
+def test_summary_is_incremental():
+    """이미 요약된 구간(cursor 이전)은 다시 요약하지 않고, 새로 밀려난 턴만 요약에 합치는지 테스트."""
+    calls = []
+    def recording_summarize(previous, messages):
+        calls.append(len(messages))
+        return summarize_turns(previous, messages)
+
+    history = make_history(10)
+    first = compact_history(history, budget=150, summarize=recording_summarize)
+    history += make_turn(10) + make_turn(11)
+    second = compact_history(history, first.summary, first.cursor, budget=150, summarize=recording_summarize)
+
+    assert second.cursor > first.cursor
+    assert calls[1] == second.cursor - first.cursor  # 새로 밀려난 메시지만 요약
+    assert second.summary.startswith(first.summary)
+
+def test_summary_size_is_bounded():
+    """요약이 SUMMARY 토큰 상한을 넘으면 가장 오래된 줄부터 제거되는지 테스트."""
+    summary = summarize_turns(None, make_history(200), max_tokens=200)
+    assert count_tokens(summary) <= 200
+    assert "질문 199" in summary and "질문 0:" not in summary
@@ -0,0 +1,102 @@
+# test_http_pool.py
+
+import time
+import asyncio
+import threading
+import concurrent.futures
+import http.server
+import httpx
+import pytest
+from http_pool import HTTPPool, PoolConfig, get_pool
+
+class SlowHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    SlowHandler.delay = 0.0
+
+# --- 1. 설정 ---
+
+def test_config_reads_common_and_dependency_env(monkeypatch):
+    monkeypatch.setenv("HTTP_POOL_MAX_CONNECTIONS", "40")
+    monkeypatch.setenv("HTTP_POOL_OPENAI_MAX_CONNECTIONS", "8")
+    monkeypatch.setenv("HTTP_POOL_MAX_KEEPALIVE", "100")
+    monkeypatch.setenv("HTTP_POOL_HTTP2", "0")
+
+    assert PoolConfig("supabase").max_connections == 40 and PoolConfig("supabase").timeout == 10.0
+    openai = PoolConfig("openai")
+    assert openai.max_connections == 8 and openai.max_keepalive == 8  # keep-alive 수는 최대 연결 수를 넘지 않음
+    assert openai.http2 is False
+
+# --- 2. 연결 재사용 / 사용량 ---
+
+def test_sync_client_is_shared_and_reuses_connections(server):
+    pool = HTTPPool("test", PoolConfig("test", http2=False))
+    assert pool.client() is pool.client()
+    for _ in range(5):
+        assert pool.client().get(server + "/").text == "ok"
+
+    stats = pool.stats()
+    assert stats["requests"] == 5 and stats["in_flight"] == 0 and stats["errors"] == 0
+    # keep-alive: 순차 요청 5번이 연결 하나를 재사용
+    assert stats["open_connections"] == 1 and stats["idle_connections"] == 1
+    pool.close()
+    assert pool.stats()["open_connections"] == 0
+
+def test_per_host_limit_caps_concurrent_requests(server):
+    SlowHandler.delay = 0.1
+    pool = HTTPPool("test", PoolConfig("test", http2=False, max_per_host=2))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+        responses = list(executor.map(lambda _: pool.client().get(server + "/"), range(6)))
+
+    stats = pool.stats()
+    assert all(r.status_code == 200 for r in responses)
+    assert stats["peak_in_flight"] == 2 and stats["avg_wait_ms"] > 0
+    pool.close()
+
+def test_per_host_wait_times_out_with_pool_timeout(server):
+    SlowHandler.delay = 0.3
+    pool = HTTPPool("test", PoolConfig("test", http2=False, max_per_host=1, pool_timeout=0.05))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(pool.client().get, server + "/") for _ in range(2)]
+        outcomes = [f.exception() for f in futures]
+
+    assert sum(isinstance(e, httpx.PoolTimeout) for e in outcomes) == 1
+    assert pool.stats()["errors"] == 1
+    pool.close()
+
+def test_async_client_shares_counters(server):
+    SlowHandler.delay = 0.05
+    pool = HTTPPool("test", PoolConfig("test", http2=False, max_per_host=3))
+
+    async def main():
+        client = pool.async_client()
+        responses = await asyncio.gather(*(client.get(server + "/") for _ in range(6)))
+        await pool.aclose()
+        return responses
+
+    assert [r.text for r in asyncio.run(main())] == ["ok"] * 6
+    stats = pool.stats()
+    assert stats["requests"] == 6 and stats["peak_in_flight"] <= 3
+
+def test_named_pools_are_singletons():
+    assert get_pool("supabase") is get_pool("supabase")
+    assert get_pool("supabase") is not get_pool("openai")
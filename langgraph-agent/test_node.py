@@ -1,13 +1,17 @@
 # test_node.py (수정 최종 버전)
 
 import json
+import time
+from datetime import datetime, timezone
+import asyncio
 import pytest
 from typing import Dict, Any, List
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 # 'state', 'node', 'supabase_tools' 모듈이 동일 경로에 있다고 가정
 from state import State, AgentDecisionModel, ErrorInfo 
 from node import agent_decision, tool_executor, error_handler, route_decision, result_processor,TOOLS 
+from node import aagent_decision, atool_executor, aresult_processor
 from supabase_tools import get_workout_history, add_workout_session
 
 # --- 기본 설정 ---
@@ -249,5 +253,350 @@ def test_error_handler_tool_call_missing():
     print("✅ Test 5 통과: ErrorHandler 메시지 생성 확인")
 
 
+# --- 5. 비동기 실행 경로 테스트 (ainvoke) ---
+
+def test_atool_executor_uses_coroutine(state_after_decision_tool_call):
+    """비동기 ToolExecutor가 도구의 비동기 구현(coroutine)을 사용하는지 테스트."""
+    print("\n--- Test 6: ToolExecutor [async] ---")
+    mock_tool_output = {"status": "success", "action": "get_workout_history", "user_id": TEST_USER_ID, "data": []}
+    mock_coroutine = AsyncMock(return_value=mock_tool_output)
+
+    with patch('supabase_tools.get_workout_history.coroutine', mock_coroutine), \
+         patch('supabase_tools.get_workout_history.func') as mock_func:
+        new_state_updates = asyncio.run(atool_executor(state_after_decision_tool_call))
+
+    mock_coroutine.assert_awaited_once_with(user_id=TEST_USER_ID)
+    mock_func.assert_not_called()
+    assert new_state_updates.get("error_info") is None
+    assert json.loads(new_state_updates["tool_outputs"][0].content)["status"] == "success"
+    
+    print("✅ Test 6 통과: 비동기 도구 구현 사용 확인")
+
+
+@patch('node.agent_executor')
+def test_async_decision_and_result(mock_agent_executor, state_after_tool_success):
+    """비동기 AgentDecision/ResultProcessor가 ainvoke 경로를 사용하는지 테스트."""
+    print("\n--- Test 7: AgentDecision/ResultProcessor [async] ---")
+    mock_agent_executor.ainvoke = AsyncMock(return_value={"output": "비동기 답변"})
+    mock_agent_executor.agent.ainvoke = AsyncMock(return_value=AIMessage(content="비동기 최종 답변"))
+
+    decision_updates = asyncio.run(aagent_decision(create_initial_state("안녕")))
+    assert decision_updates["decision"].action_type == "final_answer"
+    assert decision_updates["decision"].final_answer == "비동기 답변"
+    mock_agent_executor.invoke.assert_not_called()
+
+    result_updates = asyncio.run(aresult_processor(state_after_tool_success))
+    assert result_updates["answer"] == "비동기 최종 답변"
+    
+    print("✅ Test 7 통과: 비동기 노드 실행 확인")
+
+
+# --- 6. single_pass 결정 모드 테스트 (LLM 호출 수 절감) ---
+
+def test_single_pass_mode_uses_one_llm_call_per_step():
+    """single_pass 모드에서 결정 1회 + 답변 1회, 총 2회의 LLM 호출로 처리되는지 테스트."""
+    print("\n--- Test 8: single_pass 결정 모드 ---")
+    from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+
+    question = f"내 운동 기록을 조회해 줘. 사용자 ID는 '{TEST_USER_ID}'야"
+    state = create_initial_state(question)
+    decision_llm = FakeMessagesListChatModel(responses=[
+        AIMessage(content="", tool_calls=[{"id": "call_1", "name": "get_workout_history", "args": {"user_id": TEST_USER_ID}}])
+    ])
+    answer_llm = FakeMessagesListChatModel(responses=[AIMessage(content="기록 1건을 찾았습니다.")])
+    mock_tool_output = {"status": "success", "action": "get_workout_history", "user_id": TEST_USER_ID, "data": []}
+
+    with patch('node.DECISION_MODE', "single_pass"), \
+         patch('node.llm_with_tools', decision_llm), \
+         patch('node.llm_answer', answer_llm), \
+         patch('node.agent_executor') as mock_agent_executor, \
+         patch('supabase_tools.get_workout_history.func', return_value=mock_tool_output):
+        decision_updates = agent_decision(state)
+        state = {**state, **decision_updates, "messages": state["messages"] + decision_updates["messages"]}
+
+        # 검증 1: 구조화된 tool_call 결정이 ToolExecutor 형식으로 변환되었는지 확인
+        assert route_decision(state) == "ToolExecutor"
+        call = state["decision"].tool_calls[0]
+        assert call["function"]["name"] == "get_workout_history"
+        assert json.loads(call["function"]["arguments"]) == {"user_id": TEST_USER_ID}
+
+        tool_updates = tool_executor(state)
+        state = {**state, **tool_updates, "messages": state["messages"] + tool_updates["messages"]}
+        result_updates = result_processor(state)
+
+        mock_agent_executor.invoke.assert_not_called()
+
+    # 검증 2: 최종 답변 및 LLM 호출 수 (결정 1회 + 답변 1회)
+    assert result_updates["answer"] == "기록 1건을 찾았습니다."
+    assert decision_updates["llm_calls"] + result_updates["llm_calls"] == 2
+    
+    print("✅ Test 8 통과: single_pass 모드 LLM 호출 2회 확인")
+
+
+# --- 7. 다중 도구 호출 동시 실행 테스트 ---
+
+def create_multi_call_state(user_ids: List[str]) -> State:
+    """여러 사용자의 기록 조회를 한 번에 결정한 State를 생성합니다."""
+    state = create_initial_state("여러 사용자 기록 비교")
+    state["decision"] = AgentDecisionModel(
+        action_type="tool_call",
+        tool_calls=[
+            {
+                "id": f"call_{user_id}",
+                "function": {"name": "get_workout_history", "arguments": json.dumps({"user_id": user_id})},
+                "type": "function"
+            }
+            for user_id in user_ids
+        ]
+    )
+    return state
+
+def slow_history(user_id: str):
+    # 첫 번째 호출이 가장 늦게 끝나도록 하여 순서 보존을 검증
+    time.sleep(0.3 if user_id == "u1" else 0.1)
+    return {"status": "success", "action": "get_workout_history", "user_id": user_id, "data": []}
+
+async def aslow_history(user_id: str):
+    await asyncio.sleep(0.3 if user_id == "u1" else 0.1)
+    return {"status": "success", "action": "get_workout_history", "user_id": user_id, "data": []}
+
+def test_tool_executor_runs_calls_concurrently_in_order():
+    """독립적인 tool_call들이 동시에 실행되고 결과가 tool_call 순서를 유지하는지 테스트."""
+    print("\n--- Test 9: ToolExecutor 동시 실행 ---")
+    state = create_multi_call_state(["u1", "u2", "u3"])
+
+    with patch('supabase_tools.get_workout_history.func', side_effect=slow_history):
+        started = time.monotonic()
+        updates = tool_executor(state)
+        elapsed = time.monotonic() - started
+
+    assert updates.get("error_info") is None
+    assert [m.tool_call_id for m in updates["tool_outputs"]] == ["call_u1", "call_u2", "call_u3"]
+    assert elapsed < 0.5, f"순차 실행으로 보입니다: {elapsed:.2f}s"
+
+    with patch('supabase_tools.get_workout_history.coroutine', aslow_history):
+        started = time.monotonic()
+        updates = asyncio.run(atool_executor(state))
+        elapsed = time.monotonic() - started
+
+    assert [m.tool_call_id for m in updates["tool_outputs"]] == ["call_u1", "call_u2", "call_u3"]
+    assert elapsed < 0.5, f"순차 실행으로 보입니다: {elapsed:.2f}s"
+    
+    print("✅ Test 9 통과: 동시 실행 및 순서 보존 확인")
+
+
+def test_tool_executor_timeout_reports_tool_timeout():
+    """호출별 제한 시간을 넘기면 TOOL_TIMEOUT 에러로 ErrorHandler에 라우팅되는지 테스트."""
+    print("\n--- Test 10: ToolExecutor 타임아웃 ---")
+    from node import route_after_tools
+    state = create_multi_call_state(["u1", "u2"])
+
+    with patch('node.TOOL_CALL_TIMEOUT', 0.2), \
+         patch('supabase_tools.get_workout_history.func', side_effect=slow_history):
+        updates = tool_executor(state)
+
+    assert updates["error_info"].error_code == "TOOL_TIMEOUT"
+    assert route_after_tools({**state, **updates}) == "ErrorHandler"
+
+    with patch('node.TOOL_CALL_TIMEOUT', 0.2), \
+         patch('supabase_tools.get_workout_history.coroutine', aslow_history):
+        updates = asyncio.run(atool_executor(state))
+
+    assert updates["error_info"].error_code == "TOOL_TIMEOUT"
+    
+    print("✅ Test 10 통과: TOOL_TIMEOUT 보고 확인")
+
+
+def test_tool_executor_rejects_invalid_args_before_io():
+    """인자가 도구 시그니처와 맞지 않으면 도구를 실행하지 않고 TOOL_INVALID_ARGS를 반환하는지 테스트."""
+    print("\n--- Test 11: ToolExecutor 인자 검증 ---")
+    state = create_multi_call_state(["u1"])
+    state["decision"].tool_calls.append({
+        "id": "call_bad",
+        "function": {"name": "add_workout_session", "arguments": json.dumps({"user_id": "u1", "total_volume": "많이"})},
+        "type": "function"
+    })
+
+    with patch('supabase_tools.get_workout_history.func') as mock_history, \
+         patch('supabase_tools.add_workout_session.func') as mock_insert:
+        updates = tool_executor(state)
+
+    assert updates["error_info"].error_code == "TOOL_INVALID_ARGS"
+    mock_history.assert_not_called()
+    mock_insert.assert_not_called()
+    
+    print("✅ Test 11 통과: 잘못된 인자 사전 거부 확인")
+
+
+def test_lazy_objects_are_built_once_under_concurrency():
+    """지연 초기화 대상이 동시에 처음 요청되어도 factory가 한 번만 실행되는지 테스트."""
+    print("\n--- Test 12: 지연 초기화 1회 생성 ---")
+    import node
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+    def slow_factory():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    with patch.dict(node.__dict__):
+        node.__dict__.pop("agent_executor", None)
+        with patch('node._build_agent_executor', side_effect=slow_factory):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                built = list(pool.map(lambda _: node.get_agent_executor(), range(8)))
+
+        assert len(calls) == 1
+        assert all(obj is built[0] for obj in built)
+        # 생성된 객체는 모듈 속성으로도 같은 인스턴스가 노출됨
+        assert node.agent_executor is built[0]
+    
+    print("✅ Test 12 통과: 지연 초기화 1회 생성 확인")
+
+
+def test_semantic_answer_cache_skips_llm_on_repeat_question():
+    """같은 사용자의 반복 질문은 LLM 없이 캐시된 답변을 사용하고, DB에 새 기록이 생기면 다시 호출하는지 테스트."""
+    print("\n--- Test 13: 의미 기반 답변 캐시 ---")
+    import node
+    node.ANSWER_CACHE.clear()
+    user_id = "7356cf0e-19c2-4aef-982b-2607fdc00752"
+    state = create_initial_state(f"운동 루틴 추천해 줘. 사용자 ID는 '{user_id}'야")
+    head = {"id": 1, "created_at": "2024-01-01T09:00:00+00:00"}
+
+    with patch('node.agent_executor') as mock_agent_executor, \
+         patch('node.fetch_head_row', side_effect=lambda uid: head) as mock_head:
+        mock_agent_executor.invoke.return_value = {"output": "3분할 루틴을 추천합니다."}
+
+        first = agent_decision(state)
+        result_processor({**state, **first})
+        second = agent_decision(create_initial_state(f"운동 루틴 추천해줘! 사용자 ID는 '{user_id}'야"))
+
+        assert mock_agent_executor.invoke.call_count == 1
+        assert second["answer_cache"]["hit"] is True
+        assert second["llm_calls"] == 0
+        assert second["decision"].final_answer == "3분할 루틴을 추천합니다."
+        mock_head.assert_called_with(user_id)
+
+        # 다른 프로세스(웹 앱)가 새 세션을 저장하면 DB 최신 행이 바뀌어 캐시된 답변을 사용하지 않음
+        head = {"id": 2, "created_at": "2024-01-02T09:00:00+00:00"}
+        third = agent_decision(state)
+        assert mock_agent_executor.invoke.call_count == 2
+        assert third["answer_cache"]["hit"] is False
+
+        # 최신 행을 확인할 수 없으면 캐시를 사용하지 않음
+        result_processor({**state, **third})
+        mock_head.side_effect = ConnectionError("db down")
+        assert agent_decision(state)["answer_cache"] is None
+        assert mock_agent_executor.invoke.call_count == 3
+    
+    print("✅ Test 13 통과: 답변 캐시 hit/버전 무효화 확인")
+
+
+def test_answer_cache_queries_head_only_for_candidates():
+    """캐시에 후보 답변이 없으면 LLM 호출 전에 DB 최신 행을 조회하지 않고, 턴 도중 기록된 행이 있으면 저장하지 않는지 테스트."""
+    print("\n--- Test 13-1: 답변 캐시 버전 지연 조회 ---")
+    import node
+    node.ANSWER_CACHE.clear()
+    user_id = "7356cf0e-19c2-4aef-982b-2607fdc00752"
+    state = create_initial_state(f"운동 루틴 추천해 줘. 사용자 ID는 '{user_id}'야")
+    old_head = {"id": 1, "created_at": "2024-01-01T09:00:00+00:00", "session_count": 1}
+
+    with patch('node.agent_executor') as mock_agent_executor, \
+         patch('node.fetch_head_row', return_value=old_head) as mock_head:
+        mock_agent_executor.invoke.return_value = {"output": "3분할 루틴을 추천합니다."}
+
+        first = agent_decision(state)
+        assert mock_head.call_count == 0 and first["answer_cache"]["version"] is None
+
+        # 답변 생성 도중 다른 프로세스가 새 세션을 기록했다면 이전 데이터로 만든 답변은 저장하지 않음
+        mock_head.return_value = {"id": 2, "created_at": datetime.now(timezone.utc).isoformat(), "session_count": 2}
+        result_processor({**state, **first})
+        assert mock_head.call_count == 1 and node.ANSWER_CACHE.stats()["entries"] == 0
+
+        # 턴 시작 전 데이터면 저장 시점에 버전을 조회해 저장하고, 다음 요청은 후보가 있으므로 버전을 확인한 뒤 사용
+        mock_head.return_value = old_head
+        result_processor({**state, **agent_decision(state)})
+        second = agent_decision(state)
+        assert second["answer_cache"]["hit"] is True and mock_head.call_count == 3
+        assert mock_agent_executor.invoke.call_count == 2
+
+    print("✅ Test 13-1 통과: 후보가 없을 때 최신 행 조회 생략 확인")
+
+
+def test_async_answer_cache_queries_head_only_for_candidates():
+    """비동기 노드도 후보가 없을 때는 저장 시점에만 최신 행을 조회하는지 테스트."""
+    import node
+    node.ANSWER_CACHE.clear()
+    user_id = "7356cf0e-19c2-4aef-982b-2607fdc00752"
+    state = create_initial_state(f"운동 루틴 추천해 줘. 사용자 ID는 '{user_id}'야")
+    head = {"id": 1, "created_at": "2024-01-01T09:00:00+00:00", "session_count": 1}
+
+    async def run():
+        first = await aagent_decision(state)
+        assert mock_head.await_count == 0
+        await aresult_processor({**state, **first})
+        return await aagent_decision(state)
+
+    with patch('node.agent_executor') as mock_agent_executor, \
+         patch('node.afetch_head_row', new_callable=AsyncMock, return_value=head) as mock_head:
+        mock_agent_executor.ainvoke = AsyncMock(return_value={"output": "3분할 루틴을 추천합니다."})
+        second = asyncio.run(run())
+
+    assert second["answer_cache"]["hit"] is True and mock_head.await_count == 2
+    assert mock_agent_executor.ainvoke.await_count == 1
+
+
+def test_agent_decision_compacts_long_history():
+    """긴 대화에서 AgentDecision이 토큰 예산 안의 최근 턴과 요약만 전달하고, 요약 커서를 State에 기록하는지 테스트."""
+    print("\n--- Test 14: 대화 기록 압축 ---")
+    from langchain_core.messages import SystemMessage
+    history = []
+    for i in range(30):
+        rows = [{"id": n, "total_volume": 100 + n} for n in range(20)]
+        history += [
+            HumanMessage(content=f"질문 {i}"),
+            AIMessage(content="", tool_calls=[{"id": f"call_{i}", "name": "get_workout_history", "args": {"user_id": "u1"}}]),
+            ToolMessage(content=json.dumps({"status": "success", "data": rows}), tool_call_id=f"call_{i}"),
+            AIMessage(content=f"답변 {i}"),
+        ]
+    state = create_initial_state("마지막 질문")
+    state["messages"] = history + state["messages"]
+
+    from history import compact_history
+    with patch('node.agent_executor') as mock_agent_executor, \
+         patch('node.compact_history', side_effect=lambda *a, **k: compact_history(*a, budget=500)):
+        mock_agent_executor.invoke.return_value = {"output": "최종 답변"}
+        updates = agent_decision(state)
+
+    chat_history = mock_agent_executor.invoke.call_args.args[0]["chat_history"]
+    assert isinstance(chat_history[0], SystemMessage) and "질문 0" in chat_history[0].content
+    assert len(chat_history) < len(history)
+    assert updates["history_cursor"] > 0 and updates["history_summary"]
+    assert chat_history[-1].content == "답변 29"
+    
+    print("✅ Test 14 통과: 대화 기록 압축 확인")
+
+
+def test_tool_executor_shapes_history_rows(state_after_tool_success):
+    """ToolExecutor가 get_workout_history의 원본 행 대신 집계(summary)를 ToolMessage에 담는지 테스트."""
+    print("\n--- Test 15: 도구 결과 가공 ---")
+    content = json.loads(state_after_tool_success["tool_outputs"][0].content)
+
+    assert "data" not in content and content["raw_rows_omitted"] == 1
+    assert content["summary"]["session_count"] == 1
+    assert content["summary"]["total_volume"]["sum"] == 1000
+
+    # include_raw=true로 요청하면 원본 행을 그대로 전달
+    state = dict(state_after_tool_success)
+    call = state["decision"].tool_calls[0]
+    raw_call = {**call, "function": {**call["function"], "arguments": json.dumps({"user_id": TEST_USER_ID, "include_raw": True})}}
+    state["decision"] = AgentDecisionModel(action_type="tool_call", tool_calls=[raw_call])
+    with patch('supabase_tools.get_workout_history.func', return_value={"status": "success", "data": [{"id": 1}]}):
+        updates = tool_executor(state)
+    assert json.loads(updates["tool_outputs"][0].content)["data"] == [{"id": 1}]
+
+    print("✅ Test 15 통과: 도구 결과 집계 확인")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
\ No newline at end of file
@@ -0,0 +1,120 @@
+# test_observability.py
+
+import io
+import json
+import asyncio
+import logging
+from unittest.mock import MagicMock, patch
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from observability import REGISTRY, configure_logging, get_logger, observed_node, set_log_level, tool_scope
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+# --- 1. 구조화 로그 ---
+
+def test_logger_writes_json_with_extra_fields_and_level_can_change():
+    stream = io.StringIO()
+    configure_logging(level="INFO")
+    logging.getLogger("agent").handlers[0].setStream(stream)
+    try:
+        logger = get_logger("test")
+        logger.debug("hidden")
+        logger.error("agent_error", extra={"node": "ToolExecutor", "error_code": "TOOL_TIMEOUT"})
+        set_log_level("DEBUG")
+        logger.debug("visible")
+    finally:
+        configure_logging()
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["message"] for r in records] == ["agent_error", "visible"]
+    assert records[0]["level"] == "ERROR" and records[0]["error_code"] == "TOOL_TIMEOUT"
+    assert records[0]["logger"] == "agent.test"
+
+# --- 2. 노드 / 도구 / DB 지연 ---
+
+def test_observed_node_records_sync_and_async_wall_time():
+    @observed_node("TestNode")
+    def sync_node(state):
+        return {"active_node": "TestNode"}
+
+    @observed_node("TestNode")
+    async def async_node(state):
+        await asyncio.sleep(0.01)
+        return {"active_node": "TestNode"}
+
+    before = sample("agent_node_duration_seconds_count", node="TestNode")
+    sum_before = sample("agent_node_duration_seconds_sum", node="TestNode")
+    assert sync_node({}) == asyncio.run(async_node({}))
+    assert sample("agent_node_duration_seconds_count", node="TestNode") == before + 2
+    assert sample("agent_node_duration_seconds_sum", node="TestNode") - sum_before >= 0.01
+
+def test_db_latency_is_labelled_with_the_calling_tool():
+    from resilience import SUPABASE
+
+    labels = {"dependency": "supabase", "tool": "get_workout_history", "outcome": "ok"}
+    before = sample("agent_dependency_duration_seconds_count", **labels)
+    with tool_scope("get_workout_history"):
+        SUPABASE.call(lambda: "rows")
+    SUPABASE.call(lambda: "rows")  # 도구 밖 호출은 tool="-"
+    assert sample("agent_dependency_duration_seconds_count", **labels) == before + 1
+    assert sample("agent_dependency_duration_seconds_count", dependency="supabase", tool="-", outcome="ok") >= 1
+
+def test_tool_executor_records_tool_latency_by_status():
+    import node
+    from state import AgentDecisionModel
+
+    tool_call = {"id": "c1", "function": {"name": "get_workout_history", "arguments": '{"user_id": "u1"}'}}
+    state = {"decision": AgentDecisionModel(action_type="tool_call", tool_calls=[tool_call])}
+    labels = {"tool": "get_workout_history", "status": "success"}
+    before = sample("agent_tool_duration_seconds_count", **labels)
+    with patch("supabase_tools.get_workout_history.func", return_value={"status": "success", "action": "get_history", "data": []}):
+        node.tool_executor(state)
+    assert sample("agent_tool_duration_seconds_count", **labels) == before + 1
+    assert sample("agent_node_duration_seconds_count", node="ToolExecutor") >= 1
+
+# --- 3. LLM 호출 / 토큰 ---
+
+def test_llm_counter_collects_token_usage_per_node():
+    from node import LLMCallCounter
+
+    message = AIMessage(content="답변", usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150})
+    counter = LLMCallCounter("ResultProcessor")
+    before = sample("agent_llm_tokens_total", node="ResultProcessor", kind="prompt")
+    counter.on_chat_model_start({}, [[]])
+    counter.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+    # usage_metadata가 없으면 llm_output의 token_usage 사용
+    counter.on_llm_end(LLMResult(generations=[[ChatGeneration(message=AIMessage(content="x"))]],
+                                 llm_output={"token_usage": {"prompt_tokens": 10, "completion_tokens": 5}}))
+
+    assert counter.usage() == {"llm_calls": 1, "prompt_tokens": 130, "completion_tokens": 35}
+    assert sample("agent_llm_tokens_total", node="ResultProcessor", kind="prompt") == before + 130
+    assert sample("agent_llm_calls_total", node="ResultProcessor") >= 1
+
+# --- 4. /metrics ---
+
+def test_metrics_endpoint_exposes_prometheus_text_and_request_usage():
+    from fastapi.testclient import TestClient
+    import graph_builder
+
+    graph = MagicMock()
+
+    async def ainvoke(input_data, config=None):
+        return {"messages": [AIMessage(content="답변")], "llm_calls": 2, "prompt_tokens": 900, "completion_tokens": 100}
+
+    graph.ainvoke.side_effect = ainvoke
+    before = sample("agent_request_llm_tokens_count", kind="prompt")
+    sum_before = sample("agent_request_llm_tokens_sum", kind="prompt")
+    client = TestClient(graph_builder.create_app())
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph):
+        assert client.post("/invoke", json={"question": "안녕", "user_id": "m1"}).status_code == 200
+    response = client.get("/metrics")
+
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for name in ("agent_node_duration_seconds", "agent_tool_duration_seconds", "agent_dependency_duration_seconds",
+                 "agent_llm_calls_total", "agent_llm_tokens_total", "agent_request_llm_calls"):
+        assert f"# TYPE {name.removesuffix('_total')}" in body
+    assert sample("agent_request_llm_tokens_count", kind="prompt") == before + 1
+    assert sample("agent_request_llm_tokens_sum", kind="prompt") == sum_before + 900
@@ -0,0 +1,76 @@
+# test_prompt_store.py
+
+import json
+import os
+import pytest
+from unittest.mock import patch
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from prompt_store import PromptStore, PromptNotFoundError, PromptIntegrityError, PROMPT_STORE
+
+PROMPT_NAME = "owner/test-prompt"
+
+def make_prompt(system: str = "You are a helpful assistant") -> ChatPromptTemplate:
+    return ChatPromptTemplate.from_messages([
+        ("system", system),
+        MessagesPlaceholder("chat_history", optional=True),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+
+# --- 1. 저장 / 로드 ---
+
+def test_save_and_load_roundtrip(tmp_path):
+    """저장한 프롬프트를 네트워크 없이 같은 내용으로 다시 불러오는지 테스트."""
+    store = PromptStore(str(tmp_path))
+    entry = store.save(PROMPT_NAME, make_prompt())
+
+    assert os.path.exists(tmp_path / entry["file"])
+    assert entry["file"].endswith(f"{entry['sha256'][:12]}.json")
+    assert PromptStore(str(tmp_path)).load(PROMPT_NAME) == make_prompt()
+
+    print("✅ 저장/로드 왕복 확인")
+
+def test_save_same_content_keeps_version(tmp_path):
+    """내용이 같으면 버전이 바뀌지 않고, 내용이 바뀌면 이전 해시를 기록하는지 테스트."""
+    store = PromptStore(str(tmp_path))
+    first = store.save(PROMPT_NAME, make_prompt())
+    assert store.save(PROMPT_NAME, make_prompt()) == first
+
+    second = store.save(PROMPT_NAME, make_prompt("You are a fitness coach"))
+    assert second["sha256"] != first["sha256"]
+    assert second["previous_sha256"] == first["sha256"]
+    # 이전 버전 파일은 롤백을 위해 유지
+    assert os.path.exists(tmp_path / first["file"])
+    assert store.load(PROMPT_NAME) == make_prompt("You are a fitness coach")
+
+# --- 2. 오류 처리 ---
+
+def test_missing_prompt_raises(tmp_path):
+    """저장소에 없는 프롬프트는 refresh 안내와 함께 PromptNotFoundError를 발생시키는지 테스트."""
+    with pytest.raises(PromptNotFoundError, match="refresh"):
+        PromptStore(str(tmp_path)).load(PROMPT_NAME)
+
+def test_tampered_prompt_fails_hash_check(tmp_path):
+    """버전 파일 내용이 manifest 해시와 다르면 PromptIntegrityError를 발생시키는지 테스트."""
+    store = PromptStore(str(tmp_path))
+    entry = store.save(PROMPT_NAME, make_prompt())
+    path = tmp_path / entry["file"]
+    data = json.loads(path.read_text())
+    data["kwargs"]["input_variables"].append("injected")
+    path.write_text(json.dumps(data))
+
+    with pytest.raises(PromptIntegrityError):
+        PromptStore(str(tmp_path)).load(PROMPT_NAME)
+    assert store.verify()[PROMPT_NAME] != "ok"
+
+# --- 3. 배포된 기본 프롬프트 ---
+
+def test_bundled_agent_prompt_loads_without_hub():
+    """저장소에 포함된 에이전트 프롬프트가 hub.pull 없이 로드되고 해시 검증을 통과하는지 테스트."""
+    with patch("langchain.hub.pull", side_effect=AssertionError("hub.pull이 호출되면 안 됩니다.")):
+        prompt = PromptStore(PROMPT_STORE.root).load("hwchase17/openai-tools-agent")
+
+    assert set(prompt.input_variables) == {"input", "agent_scratchpad"}
+    assert all(result == "ok" for result in PROMPT_STORE.verify().values())
+
+    print("✅ 기본 프롬프트 오프라인 로드 확인")
@@ -0,0 +1,166 @@
+# test_resilience.py
+
+import asyncio
+import httpx
+import openai
+import pytest
+from unittest.mock import MagicMock, patch
+from postgrest.exceptions import APIError
+from resilience import CircuitBreaker, CircuitOpenError, Dependency, failure_kind, OPENAI, SUPABASE
+
+def openai_error(status_code: int, retry_after: str = None) -> openai.APIStatusError:
+    """OpenAI SDK가 HTTP 오류 응답에 대해 발생시키는 예외 (status_code, response.headers)."""
+    response = httpx.Response(status_code, headers={"retry-after": retry_after} if retry_after else {},
+                              request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    return openai.APIStatusError(f"HTTP {status_code}", response=response, body=None)
+
+def supabase_error(code) -> APIError:
+    """postgrest가 발생시키는 예외. HTTP 상태는 code에 정수(본문이 JSON이 아닐 때) 또는 문자열로 들어옴."""
+    return APIError({"code": code, "message": f"HTTP {code}", "hint": None, "details": None})
+
+class APITimeoutError(Exception):
+    pass
+
+def make_dependency(**kwargs):
+    sleeps = []
+    options = {"max_attempts": 3, "base_delay": 0.1, "max_delay": 1.0, "failure_threshold": 3, "reset_timeout": 30.0}
+    dependency = Dependency("test", {"rate_limit": "LLM_RATE_LIMIT", "timeout": "LLM_TIMEOUT", "unavailable": "LLM_UNAVAILABLE"},
+                            sleep=sleeps.append, **{**options, **kwargs})
+    return dependency, sleeps
+
+# --- 1. 실패 분류 / 에러 코드 ---
+
+def test_failure_kind_and_error_codes():
+    assert failure_kind(openai_error(429)) == "rate_limit"
+    assert failure_kind(openai_error(503)) == "unavailable"
+    assert failure_kind(supabase_error(503)) == "unavailable" and failure_kind(supabase_error("429")) == "rate_limit"
+    # PostgreSQL SQLSTATE(고유 제약 위반)와 PostgREST 코드는 HTTP 상태가 아님
+    assert failure_kind(supabase_error("23505")) is None and failure_kind(supabase_error("PGRST116")) is None
+    assert failure_kind(httpx.ReadTimeout("slow")) == "timeout"
+    assert failure_kind(APITimeoutError()) == "timeout"
+    assert failure_kind(httpx.ConnectError("refused")) == "unavailable"
+    assert failure_kind(openai_error(400)) is None and failure_kind(ValueError("bad")) is None
+
+    assert OPENAI.error_code(openai_error(429), "DECISION_LLM_FAILURE") == "LLM_RATE_LIMIT"
+    assert OPENAI.error_code(ValueError("bad"), "DECISION_LLM_FAILURE") == "DECISION_LLM_FAILURE"
+    assert SUPABASE.error_code(httpx.ReadTimeout("slow"), "DB_QUERY_FAILURE") == "TOOL_TIMEOUT"
+    assert SUPABASE.error_code(supabase_error(502), "DB_QUERY_FAILURE") == "DB_UNAVAILABLE"
+    assert SUPABASE.error_code(CircuitOpenError("supabase", 3), "DB_QUERY_FAILURE") == "DB_UNAVAILABLE"
+
+# --- 2. 재시도 / 백오프 ---
+
+def test_transient_failures_are_retried_with_jittered_backoff():
+    dependency, sleeps = make_dependency()
+    fn = MagicMock(side_effect=[openai_error(503), openai_error(429, retry_after="0.5"), "ok"])
+
+    assert dependency.call(fn) == "ok" and fn.call_count == 3
+    assert 0 <= sleeps[0] <= 0.1 and 0.5 <= sleeps[1] <= 1.0  # 두 번째는 Retry-After 반영
+    assert dependency.stats()["retries"] == 2 and dependency.breaker.state == "closed"
+
+def test_non_retryable_errors_and_inserts_fail_immediately():
+    dependency, sleeps = make_dependency()
+    with pytest.raises(ValueError):
+        dependency.call(MagicMock(side_effect=ValueError("bad request")))
+    insert = MagicMock(side_effect=httpx.ReadTimeout("slow"))
+    with pytest.raises(httpx.ReadTimeout):
+        dependency.call(insert, retry=False)
+    assert insert.call_count == 1 and sleeps == []
+
+def test_async_retry():
+    dependency, _ = make_dependency()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise httpx.ConnectError("reset")
+        return "ok"
+
+    with patch("resilience.asyncio.sleep", side_effect=lambda delay: asyncio.sleep(0)):
+        assert asyncio.run(dependency.acall(flaky)) == "ok"
+    assert len(calls) == 2
+
+# --- 3. 서킷 브레이커 ---
+
+def test_breaker_opens_fails_fast_and_recovers_after_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.allow()
+    assert excinfo.value.retry_after == 10
+
+    now[0] = 10.0
+    breaker.allow()  # half-open 시험 호출 하나만 허용
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.stats()["opened"] == 1
+
+def test_open_circuit_skips_calls_until_reset():
+    dependency, _ = make_dependency(max_attempts=1, failure_threshold=2)
+    down = MagicMock(side_effect=supabase_error(502))
+    for _ in range(2):
+        with pytest.raises(APIError):
+            dependency.call(down)
+    with pytest.raises(CircuitOpenError):
+        dependency.call(down)
+    assert down.call_count == 2 and dependency.stats()["circuit"]["rejected"] == 1
+
+def test_stream_retries_only_before_first_chunk():
+    dependency, _ = make_dependency()
+    attempts = []
+
+    def chunks():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise openai_error(503)
+        yield "a"
+        if len(attempts) == 2:
+            raise openai_error(503)
+
+    with pytest.raises(openai.APIStatusError):
+        list(dependency.stream(chunks))
+    assert len(attempts) == 2  # 첫 청크 이후 실패는 재시도하지 않음 (중복 토큰 방지)
+
+# --- 4. LLM / DB 연동 ---
+
+def test_chat_model_retries_rate_limit_and_decision_reports_code():
+    import node
+    from langchain_core.messages import AIMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+    from langchain_openai import ChatOpenAI
+
+    llm = node._build_chat_model()
+    assert llm.max_retries == 0
+    result = ChatResult(generations=[ChatGeneration(message=AIMessage(content="안녕하세요"))])
+    with patch.object(ChatOpenAI, "_generate", side_effect=[openai_error(429), result]) as generate, \
+         patch.object(OPENAI, "_sleep"):
+        assert llm.invoke("안녕").content == "안녕하세요"
+    assert generate.call_count == 2
+
+    update = node._decision_failure(CircuitOpenError("openai", 12), 0)
+    assert update["error_info"].error_code == "LLM_UNAVAILABLE"
+    assert "일시적인 문제" in update["error_info"].user_message
+
+def test_history_tool_retries_then_reports_timeout_code():
+    import supabase_tools
+    supabase_tools.HISTORY_CACHE.clear()
+    with patch("supabase_tools._history_query") as mock_query, patch("supabase_tools.get_supabase"), \
+         patch.object(SUPABASE, "_sleep"):
+        mock_query.return_value.execute.side_effect = httpx.ReadTimeout("slow")
+        result = supabase_tools.get_workout_history.func(user_id="resilience-user")
+    assert mock_query.return_value.execute.call_count == SUPABASE.max_attempts
+    assert result["error_code"] == "TOOL_TIMEOUT"
+
+def test_supabase_api_error_5xx_is_retried_and_reported_as_unavailable():
+    import supabase_tools
+    supabase_tools.HISTORY_CACHE.clear()
+    with patch("supabase_tools._history_query") as mock_query, patch("supabase_tools.get_supabase"), \
+         patch.object(SUPABASE, "_sleep"):
+        mock_query.return_value.execute.side_effect = supabase_error(503)
+        result = supabase_tools.get_workout_history.func(user_id="resilience-user")
+    assert mock_query.return_value.execute.call_count == SUPABASE.max_attempts
+    assert result["error_code"] == "DB_UNAVAILABLE"
+    assert SUPABASE.breaker.stats()["consecutive_failures"] == SUPABASE.max_attempts
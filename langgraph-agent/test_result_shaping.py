@@ -0,0 +1,83 @@
+# test_result_shaping.py
+
+import json
+from result_shaping import parse_exercises, shape_tool_output, summarize_workout_rows, tool_message_content
+
+def make_rows(count: int):
+    """최신순 get_workout_history 행. 스쿼트 중량이 세션마다 5kg씩 증가합니다."""
+    rows = []
+    for i in range(count):
+        exercises = [
+            {"name": "스쿼트", "weight": 60 + 5 * i, "reps": 5, "sets": 5, "rest": 90},
+            {"name": "벤치프레스", "weight": 50, "reps": 8, "sets": 3, "rest": 60},
+        ]
+        rows.append({
+            "id": i + 1,
+            "user_id": "u1",
+            "created_at": f"2024-05-{i + 1:02d}T09:00:00+00:00",
+            "total_volume": sum(e["weight"] * e["reps"] * e["sets"] for e in exercises),
+            "exercises": exercises,
+        })
+    return list(reversed(rows))
+
+def history_output(rows):
+    return {"status": "success", "action": "get_workout_history", "user_id": "u1",
+            "data": rows, "has_more": False, "next_cursor": None}
+
+# --- 1. 집계 ---
+
+def test_parse_exercises_accepts_json_string_and_skips_invalid():
+    assert parse_exercises('[{"name": "데드리프트", "weight": "100", "reps": 5, "sets": 1}]') == [
+        {"name": "데드리프트", "weight": 100.0, "reps": 5.0, "sets": 1.0}
+    ]
+    assert parse_exercises("스쿼트 5x5") == []
+    assert parse_exercises([{"weight": 10}, None]) == []
+
+def test_summary_has_trend_pr_and_recent_sessions():
+    summary = summarize_workout_rows(make_rows(10), recent=3, trend_points=4)
+
+    assert summary["session_count"] == 10
+    assert summary["period"] == {"first": "2024-05-01", "last": "2024-05-10"}
+    squat = summary["exercises"]["스쿼트"]
+    assert squat["sessions"] == 10
+    assert squat["best_weight"] == 105 and squat["best_weight_date"] == "2024-05-10"
+    assert squat["volume_trend"] == [2250, 2375, 2500, 2625]  # 오래된 순, 최근 4개
+    assert squat["change_vs_previous_pct"] == 5.0
+    assert "change_vs_previous_pct" in summary["exercises"]["벤치프레스"]
+    # 최근 세션은 최신순
+    assert [s["date"] for s in summary["recent_sessions"]] == ["2024-05-10", "2024-05-09", "2024-05-08"]
+    assert summary["recent_sessions"][0]["exercises"].startswith("스쿼트 105kg x5 x5")
+
+def test_empty_history_summary():
+    summary = summarize_workout_rows([])
+    assert summary["session_count"] == 0 and summary["period"] is None
+    assert summary["exercises"] == {} and summary["recent_sessions"] == []
+
+# --- 2. 도구 결과 가공 ---
+
+def test_history_output_is_shaped_and_much_smaller():
+    output = history_output(make_rows(200))
+    shaped = shape_tool_output("get_workout_history", {"user_id": "u1"}, output)
+
+    assert "data" not in shaped and shaped["raw_rows_omitted"] == 200
+    assert shaped["status"] == "success" and shaped["has_more"] is False
+    assert len(tool_message_content("get_workout_history", {"user_id": "u1"}, output)) * 5 < len(json.dumps(output))
+
+def test_raw_rows_only_on_request_and_other_outputs_untouched():
+    output = history_output(make_rows(3))
+    assert shape_tool_output("get_workout_history", {"user_id": "u1", "include_raw": True}, output) is output
+
+    error = {"status": "error", "action": "get_workout_history", "error_code": "DB_QUERY_FAILURE"}
+    assert shape_tool_output("get_workout_history", {"user_id": "u1"}, error) is error
+    inserted = {"status": "success", "action": "add_workout_session", "data": [{"id": 1}]}
+    assert shape_tool_output("add_workout_session", {}, inserted) is inserted
+
+def test_coaching_context_sessions_are_shaped():
+    output = {"status": "success", "action": "get_coaching_context", "context": {
+        "sessions": {"status": "success", "count": 3, "data": make_rows(3)},
+        "nutrition": {"status": "success", "count": 1, "data": [{"protein": 150}]},
+    }}
+    shaped = shape_tool_output("get_coaching_context", {"user_id": "u1"}, output)
+    assert shaped["context"]["sessions"]["summary"]["session_count"] == 3
+    assert "data" not in shaped["context"]["sessions"]
+    assert shaped["context"]["nutrition"] == output["context"]["nutrition"]
@@ -0,0 +1,119 @@
+# test_semantic_cache.py
+
+import time
+from semantic_cache import SemanticAnswerCache, HashingEmbedder, normalize_question, extract_user_id
+
+USER_ID = "7356cf0e-19c2-4aef-982b-2607fdc00752"
+
+# --- 1. 정규화 / 임베딩 ---
+
+def test_normalize_question_strips_user_id_and_punctuation():
+    """사용자 ID와 문장부호, 대소문자/공백 차이가 정규화되는지 테스트."""
+    question = f"내 운동 기록 보여줘!!  사용자 ID는 '{USER_ID.upper()}'야"
+    assert normalize_question(question) == "내 운동 기록 보여줘 사용자 id는 <user> 야"
+    assert extract_user_id(question) == USER_ID
+    assert extract_user_id("스쿼트 자세 알려줘") is None
+
+def test_hashing_embedder_is_normalized_and_stable():
+    """임베딩이 L2 정규화되고 같은 입력에 같은 벡터를 반환하는지 테스트."""
+    embed = HashingEmbedder(dim=256)
+    a, b = embed("내 운동 기록 보여줘"), embed("내 운동 기록 보여줘")
+    assert a.shape == (256,)
+    assert abs(float(a @ a) - 1.0) < 1e-5
+    assert (a == b).all()
+
+# --- 2. 조회 / 저장 ---
+
+def test_near_duplicate_question_hits():
+    """표현이 거의 같은 질문은 hit, 다른 질문은 miss로 집계되는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store(USER_ID, "내 운동 기록 보여줘", "최근 3회 운동 기록입니다.", version=0)
+
+    assert cache.lookup(USER_ID, "내 운동기록 보여줘!", version=0) == "최근 3회 운동 기록입니다."
+    assert cache.lookup(USER_ID, "스쿼트 자세 알려줘", version=0) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5 and stats["entries"] == 1
+
+def test_questions_differing_only_in_numbers_do_not_match():
+    """기간/날짜 숫자만 다른 질문은 임베딩이 비슷해도 다른 질문으로 취급하는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store(USER_ID, "show my squat history for the last 7 days", "7일 기록", version=0)
+    cache.store(USER_ID, "2024-05-01 운동 기록 보여줘", "5월 1일 기록", version=0)
+
+    assert cache.lookup(USER_ID, "show my squat history for the last 30 days", version=0) is None
+    assert cache.lookup(USER_ID, "2024-05-02 운동 기록 보여줘", version=0) is None
+    assert cache.lookup(USER_ID, "Show my squat history for the last 7 days!", version=0) == "7일 기록"
+    assert cache.stats()["entries"] == 2
+
+def test_lookup_is_scoped_per_user():
+    """같은 질문이라도 다른 사용자의 답변은 반환하지 않는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store("u1", "내 운동 기록 보여줘", "u1의 기록", version=0)
+    assert cache.lookup("u2", "내 운동 기록 보여줘", version=0) is None
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=0) == "u1의 기록"
+
+def test_data_version_mismatch_is_stale():
+    """저장 이후 사용자 데이터 버전이 바뀌면 항목을 제거하고 miss로 처리하는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store("u1", "내 운동 기록 보여줘", "이전 기록", version=1)
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=2) is None
+    assert cache.stats()["stale"] == 1 and cache.stats()["entries"] == 0
+
+def test_probe_reports_candidate_without_checking_version():
+    """후보 항목이 있는지만 확인하고, 후보가 없을 때만 miss로 집계하는지 테스트."""
+    cache = SemanticAnswerCache()
+    assert cache.probe("u1", "내 운동 기록 보여줘") is False
+    cache.store("u1", "내 운동 기록 보여줘", "이전 기록", version=1)
+    assert cache.probe("u1", "내 운동기록 보여줘!") is True
+    assert cache.probe("u2", "내 운동 기록 보여줘") is False
+    assert cache.stats()["misses"] == 2 and cache.stats()["entries"] == 1
+
+def test_store_same_question_updates_entry():
+    """같은 질문을 다시 저장하면 항목을 새로 만들지 않고 갱신하는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store("u1", "내 운동 기록 보여줘", "이전 답변", version=0)
+    cache.store("u1", "내 운동 기록 보여줘", "새 답변", version=1)
+    assert cache.stats()["entries"] == 1
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=1) == "새 답변"
+
+# --- 3. 만료 / 용량 / 무효화 ---
+
+def test_ttl_expiration():
+    cache = SemanticAnswerCache(ttl_seconds=0.05)
+    cache.store("u1", "내 운동 기록 보여줘", "답변", version=0)
+    time.sleep(0.06)
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=0) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_size_cap_evicts_least_recently_used():
+    """max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 제거하는지 테스트."""
+    cache = SemanticAnswerCache(max_entries=3, initial_capacity=2)
+    for user in ("u1", "u2", "u3"):
+        cache.store(user, "내 운동 기록 보여줘", f"{user} 답변", version=0)
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=0) == "u1 답변"  # u1 최근 사용
+
+    cache.store("u4", "내 운동 기록 보여줘", "u4 답변", version=0)
+
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 1
+    assert cache.lookup("u2", "내 운동 기록 보여줘", version=0) is None
+    assert cache.lookup("u1", "내 운동 기록 보여줘", version=0) == "u1 답변"
+    assert cache.lookup("u4", "내 운동 기록 보여줘", version=0) == "u4 답변"
+
+def test_oversized_answer_is_not_stored():
+    cache = SemanticAnswerCache(max_answer_chars=10)
+    assert cache.store("u1", "내 운동 기록 보여줘", "x" * 11, version=0) is False
+    assert cache.stats()["entries"] == 0
+
+def test_invalidate_user():
+    """한 사용자의 항목만 제거되고, 남은 항목은 계속 조회되는지 테스트."""
+    cache = SemanticAnswerCache()
+    cache.store("u1", "내 운동 기록 보여줘", "u1 기록", version=0)
+    cache.store("u1", "스쿼트 자세 알려줘", "u1 자세", version=0)
+    cache.store("u2", "내 운동 기록 보여줘", "u2 기록", version=0)
+
+    assert cache.invalidate("u1") == 2
+    assert cache.lookup("u1", "스쿼트 자세 알려줘", version=0) is None
+    assert cache.lookup("u2", "내 운동 기록 보여줘", version=0) == "u2 기록"
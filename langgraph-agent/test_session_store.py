@@ -0,0 +1,63 @@
+# test_session_store.py
+
+import os
+import numpy as np
+from session_store import SessionStore
+from analytics import build_frame, training_analytics
+
+def make_row(row_id: int, day: int, weight: float = 100, created_at: str = None):
+    exercises = [{"name": "스쿼트", "weight": weight, "reps": 5, "sets": 5},
+                 {"name": "벤치프레스", "weight": 60, "reps": 8, "sets": 3}]
+    return {"id": row_id, "created_at": created_at or f"2024-03-{day:02d}T09:00:00.000001+00:00",
+            "total_volume": weight * 25 + 1440, "exercises": exercises}
+
+ROWS = [make_row(i + 1, i + 1, 100 + i) for i in range(6)]
+
+# --- 1. append / 워터마크 ---
+
+def test_append_updates_watermark_and_skips_seen_rows(tmp_path):
+    store = SessionStore(str(tmp_path))
+    assert store.watermark("u1") is None
+    assert store.append("u1", ROWS[:4]) == 4
+    assert store.watermark("u1") == (ROWS[3]["created_at"], 4)
+
+    # 동시 요청이 같은 delta를 다시 가져와도 새 행만 추가
+    assert store.append("u1", ROWS[2:]) == 2
+    assert store.frame("u1").session_count == 6
+    assert store.stats()["skipped_rows"] == 2
+
+def test_same_created_at_is_ordered_by_id(tmp_path):
+    store = SessionStore(str(tmp_path))
+    same = "2024-03-01T09:00:00+00:00"
+    store.append("u1", [make_row(1, 1, created_at=same)])
+    assert store.append("u1", [make_row(1, 1, created_at=same), make_row(2, 1, created_at=same)]) == 1
+
+# --- 2. memmap 프레임 ---
+
+def test_frame_is_memory_mapped_and_matches_rows(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.append("u1", ROWS[:3])
+    store.append("u1", ROWS[3:])
+    frame = store.frame("u1")
+
+    assert isinstance(frame.weight, np.memmap) and isinstance(frame.session_time.base, np.memmap)
+    assert training_analytics(frame) == training_analytics(build_frame(ROWS))
+
+def test_store_survives_restart_and_ignores_uncommitted_tail(tmp_path):
+    SessionStore(str(tmp_path)).append("u1", ROWS[:3])
+    store = SessionStore(str(tmp_path))
+    user_dir = store._user_dir("u1")
+    # meta.json에 확정되지 않은 꼬리 바이트 (추가 도중 중단된 경우)
+    with open(os.path.join(user_dir, "weight.bin"), "ab") as f:
+        f.write(np.zeros(5).tobytes())
+
+    assert store.frame("u1").session_count == 3 and len(store.frame("u1").weight) == 6
+    store.append("u1", ROWS[3:])
+    frame = store.frame("u1")
+    assert len(frame.weight) == 12 and frame.weight[-2] == 105
+
+def test_reset_drops_user_data(tmp_path):
+    store = SessionStore(str(tmp_path))
+    store.append("u1", ROWS)
+    store.reset("u1")
+    assert store.watermark("u1") is None and store.frame("u1").session_count == 0
@@ -0,0 +1,144 @@
+# test_single_flight.py
+
+import time
+import asyncio
+import threading
+import concurrent.futures
+import pytest
+from unittest.mock import MagicMock, patch
+from single_flight import SingleFlight
+
+# --- 1. 동기 호출 ---
+
+def test_concurrent_sync_calls_run_once():
+    flights = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(1)
+        return {"rows": 3}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flights.run, "k", slow) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1 and all(r is results[0] for r in results)
+    assert flights.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+    # 실행이 끝나면 키가 제거되어 다음 호출은 다시 실행
+    flights.run("k", slow)
+    assert len(calls) == 2
+
+def test_sync_exception_is_shared_and_not_cached():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.run("k", MagicMock(side_effect=ValueError("db down")))
+    assert flights.run("k", lambda: "ok") == "ok"
+
+# --- 2. 비동기 호출 ---
+
+def test_concurrent_async_calls_share_one_task():
+    flights = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        results = await asyncio.gather(*(flights.arun(("q", "u1"), slow) for _ in range(3)),
+                                       flights.arun(("other", "u1"), slow))
+        return results
+
+    assert asyncio.run(main()) == ["answer"] * 4
+    assert len(calls) == 2 and flights.stats()["coalesced"] == 2
+
+def test_cancelled_caller_does_not_cancel_shared_task():
+    """먼저 요청한 클라이언트가 끊어져도(취소) 같은 요청을 기다리는 다른 호출자는 결과를 받는지 테스트."""
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flights.arun("k", slow))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.arun("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+
+# --- 3. /invoke 및 DB 조회 중복 제거 ---
+
+def test_duplicate_invoke_requests_run_graph_once():
+    import graph_builder
+    from graph_builder import AgentRequest, invoke_agent_api
+
+    async def fake_run(request):
+        await asyncio.sleep(0.05)
+        return {"result": "답변", "llm_calls": 2, "cached": False, "thread_id": "t1"}
+
+    async def main():
+        # 공백/문장부호만 다른 동일 질문 + 같은 사용자/대화
+        return await asyncio.gather(
+            invoke_agent_api(AgentRequest(question="내 기록 보여줘", user_id="u1", thread_id="t1")),
+            invoke_agent_api(AgentRequest(question="내 기록  보여줘!", user_id="u1", thread_id="t1")),
+            invoke_agent_api(AgentRequest(question="내 기록 보여줘", user_id="u2", thread_id="t1")),
+        )
+
+    with patch.object(graph_builder, "run_invoke", side_effect=fake_run) as mock_run:
+        first, duplicate, other_user = asyncio.run(main())
+
+    assert mock_run.call_count == 2
+    assert first["coalesced"] is False and duplicate["coalesced"] is True
+    assert duplicate["result"] == first["result"] and other_user["coalesced"] is False
+
+def test_anonymous_clients_are_not_coalesced():
+    """사용자와 대화 ID가 없는 두 클라이언트의 같은 질문은 합치지 않고, 각자 다른 대화(thread_id)를 받는지 테스트."""
+    import graph_builder
+    from graph_builder import AgentRequest, invoke_agent_api
+
+    async def fake_run(request):
+        await asyncio.sleep(0.05)
+        return {"result": "답변", "llm_calls": 1, "cached": False,
+                "thread_id": graph_builder.thread_config(request.thread_id)["configurable"]["thread_id"]}
+
+    async def main():
+        return await asyncio.gather(
+            invoke_agent_api(AgentRequest(question="스쿼트 자세 알려줘")),
+            invoke_agent_api(AgentRequest(question="스쿼트 자세 알려줘")),
+        )
+
+    with patch.object(graph_builder, "run_invoke", side_effect=fake_run) as mock_run:
+        first, second = asyncio.run(main())
+
+    assert mock_run.call_count == 2
+    assert first["coalesced"] is False and second["coalesced"] is False
+    assert first["thread_id"] != second["thread_id"]
+
+def test_concurrent_history_page_queries_are_deduplicated():
+    import supabase_tools
+    supabase_tools.HISTORY_CACHE.clear()
+    release = threading.Event()
+
+    def slow_execute():
+        release.wait(1)
+        return MagicMock(data=[{"id": 1, "created_at": "2025-09-01"}])
+
+    with patch("supabase_tools._history_query") as mock_query, patch("supabase_tools.get_supabase"):
+        mock_query.return_value.execute.side_effect = slow_execute
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(supabase_tools.fetch_history_page, "flight-user") for _ in range(4)]
+            time.sleep(0.1)
+            release.set()
+            pages = [f.result() for f in futures]
+
+    assert mock_query.return_value.execute.call_count == 1
+    assert all(page == pages[0] for page in pages)
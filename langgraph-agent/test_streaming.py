@@ -0,0 +1,167 @@
+# test_streaming.py
+
+import json
+import asyncio
+import pytest
+from unittest.mock import patch
+from sse_starlette.sse import AppStatus
+from langchain_core.messages import AIMessage, AIMessageChunk
+from admission import AdmissionController
+import graph_builder
+from graph_builder import stream_agent_events
+
+@pytest.fixture(autouse=True)
+def reset_sse_exit_event():
+    """sse-starlette는 종료 신호 Event를 처음 사용한 이벤트 루프에 묶어 두므로, TestClient마다 새 루프에서 다시 만들도록 비웁니다."""
+    AppStatus.should_exit_event = None
+    yield
+    AppStatus.should_exit_event = None
+
+class FakeGraph:
+    """astream_events(v2)가 내보내는 이벤트를 그대로 재생하는 그래프 대역."""
+
+    def __init__(self, events):
+        self.events = events
+        self.inputs = []
+
+    async def astream_events(self, input_data, config=None, version=None):
+        self.inputs.append((input_data, config, version))
+        for event in self.events:
+            yield event
+
+def node_event(kind, name, **extra):
+    return {"event": kind, "name": name, "metadata": {"langgraph_node": name}, "parent_ids": ["root"], "data": {}, **extra}
+
+FINAL_STATE = {"messages": [AIMessage(content="스쿼트 3세트를 추천합니다.")], "llm_calls": 2}
+
+GRAPH_EVENTS = [
+    {"event": "on_chain_start", "name": "LangGraph", "metadata": {}, "parent_ids": [], "data": {}},
+    node_event("on_chain_start", "AgentDecision"),
+    # 노드 내부의 하위 체인은 노드 이벤트로 내보내지 않음
+    {"event": "on_chain_start", "name": "RunnableSequence", "metadata": {"langgraph_node": "AgentDecision"},
+     "parent_ids": ["root"], "data": {}},
+    node_event("on_chain_end", "AgentDecision"),
+    node_event("on_chain_start", "ToolExecutor"),
+    {"event": "on_tool_start", "name": "get_workout_history", "metadata": {"langgraph_node": "ToolExecutor"},
+     "parent_ids": ["root"], "data": {"input": {"user_id": "u1"}}},
+    {"event": "on_tool_end", "name": "get_workout_history", "metadata": {"langgraph_node": "ToolExecutor"},
+     "parent_ids": ["root"], "data": {"output": {"status": "success", "data": []}}},
+    node_event("on_chain_end", "ToolExecutor"),
+    node_event("on_chain_start", "ResultProcessor"),
+    {"event": "on_chat_model_stream", "name": "ChatOpenAI", "metadata": {"langgraph_node": "ResultProcessor"},
+     "parent_ids": ["root"], "data": {"chunk": AIMessageChunk(content="스쿼트")}},
+    # 빈 청크(도구 호출 델타 등)는 토큰으로 내보내지 않음
+    {"event": "on_chat_model_stream", "name": "ChatOpenAI", "metadata": {"langgraph_node": "ResultProcessor"},
+     "parent_ids": ["root"], "data": {"chunk": AIMessageChunk(content="")}},
+    {"event": "on_chat_model_stream", "name": "ChatOpenAI", "metadata": {"langgraph_node": "ResultProcessor"},
+     "parent_ids": ["root"], "data": {"chunk": AIMessageChunk(content=" 3세트")}},
+    node_event("on_chain_end", "ResultProcessor"),
+    {"event": "on_chain_end", "name": "LangGraph", "metadata": {}, "parent_ids": [], "data": {"output": FINAL_STATE}},
+]
+
+def collect(stream):
+    async def run():
+        return [(event["event"], json.loads(event["data"])) async for event in stream]
+    return asyncio.run(run())
+
+def parse_sse(body: str):
+    """SSE 응답 본문을 (event, data) 목록으로 변환합니다."""
+    events = []
+    for block in body.replace("\r\n", "\n").strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if ": " in line)
+        if "event" in fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+# --- 1. 그래프 이벤트 → SSE 이벤트 변환 ---
+
+def test_stream_emits_node_tool_token_and_answer_events():
+    graph = FakeGraph(GRAPH_EVENTS)
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph), \
+         patch.object(graph_builder, "ADMISSION", AdmissionController()):
+        events = collect(stream_agent_events(graph_builder.build_input("스쿼트 추천해줘", "u1"),
+                                             graph_builder.thread_config("t1")))
+
+    assert events[:-1] == [
+        ("node_start", {"node": "AgentDecision"}),
+        ("node_end", {"node": "AgentDecision"}),
+        ("node_start", {"node": "ToolExecutor"}),
+        ("tool_start", {"tool": "get_workout_history", "input": {"user_id": "u1"}}),
+        ("tool_end", {"tool": "get_workout_history", "status": "success"}),
+        ("node_end", {"node": "ToolExecutor"}),
+        ("node_start", {"node": "ResultProcessor"}),
+        ("token", {"node": "ResultProcessor", "content": "스쿼트"}),
+        ("token", {"node": "ResultProcessor", "content": " 3세트"}),
+        ("node_end", {"node": "ResultProcessor"}),
+    ]
+    kind, answer = events[-1]
+    assert kind == "answer"
+    assert answer["result"] == "스쿼트 3세트를 추천합니다."
+    assert answer["llm_calls"] == 2 and answer["cached"] is False and answer["thread_id"] == "t1"
+    assert len(answer["trace_id"]) == 32
+    # 그래프 입력에는 요청 span의 traceparent가 실려 노드 span의 부모가 됨
+    input_data, config, version = graph.inputs[0]
+    assert answer["trace_id"] in input_data["traceparent"]
+    assert config == {"configurable": {"thread_id": "t1"}} and version == "v2"
+
+def test_invoke_stream_endpoint_sends_events_over_sse():
+    from fastapi.testclient import TestClient
+
+    graph = FakeGraph(GRAPH_EVENTS)
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph), \
+         patch.object(graph_builder, "ADMISSION", AdmissionController()):
+        client = TestClient(graph_builder.create_app())
+        response = client.post("/invoke/stream", json={"question": "스쿼트 추천해줘", "user_id": "u1", "thread_id": "t1"})
+
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [kind for kind, _ in events].count("token") == 2
+    assert events[-1][0] == "answer" and events[-1][1]["thread_id"] == "t1"
+    assert graph.inputs[0][0]["question"] == "스쿼트 추천해줘" and graph.inputs[0][0]["user_id"] == "u1"
+
+# --- 2. 실패 시 error 이벤트 ---
+
+def test_stream_emits_error_event_when_admission_queue_times_out():
+    graph = FakeGraph(GRAPH_EVENTS)
+    admission = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=0.05, user_rate_per_min=0)
+
+    async def main():
+        async with admission.slot():  # 실행 슬롯을 점유해 스트림 요청이 대기열에서 시간 초과되도록 함
+            return [(event["event"], json.loads(event["data"])) async for event in stream_agent_events(
+                graph_builder.build_input("안녕", "u1"), graph_builder.thread_config("t1"))]
+
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph), \
+         patch.object(graph_builder, "ADMISSION", admission):
+        events = asyncio.run(main())
+
+    assert len(events) == 1
+    kind, data = events[0]
+    assert kind == "error" and "queue_timeout" in data["message"] and data["retry_after"] >= 1
+    assert graph.inputs == []  # 거절된 요청은 그래프를 실행하지 않음
+
+def test_stream_emits_error_event_when_graph_fails():
+    class FailingGraph(FakeGraph):
+        async def astream_events(self, input_data, config=None, version=None):
+            yield node_event("on_chain_start", "AgentDecision")
+            raise RuntimeError("checkpoint store unavailable")
+
+    with patch.object(graph_builder, "get_conversation_graph", return_value=FailingGraph([])), \
+         patch.object(graph_builder, "ADMISSION", AdmissionController()):
+        events = collect(stream_agent_events(graph_builder.build_input("안녕", "u1")))
+
+    assert events == [("node_start", {"node": "AgentDecision"}),
+                      ("error", {"message": "RuntimeError - checkpoint store unavailable"})]
+
+def test_invoke_stream_endpoint_returns_429_when_rate_limited():
+    from fastapi.testclient import TestClient
+
+    graph = FakeGraph(GRAPH_EVENTS)
+    admission = AdmissionController(user_rate_per_min=1, user_burst=1)
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph), \
+         patch.object(graph_builder, "ADMISSION", admission):
+        client = TestClient(graph_builder.create_app())
+        assert client.post("/invoke/stream", json={"question": "안녕", "user_id": "u1"}).status_code == 200
+        response = client.post("/invoke/stream", json={"question": "안녕", "user_id": "u1"})
+
+    assert response.status_code == 429 and response.json()["detail"]["reason"] == "rate_limited"
+    assert len(graph.inputs) == 1
@@ -4,7 +4,8 @@ import pytest
 import os
 import json
 from unittest.mock import patch, MagicMock
-from supabase_tools import get_workout_history, add_workout_session, supabase, SUPABASE_URL, SUPABASE_ANON_KEY
+from supabase_tools import get_workout_history, add_workout_session, add_workout_sessions, supabase, SUPABASE_URL, SUPABASE_ANON_KEY
+import supabase_tools
 from datetime import datetime, timedelta
 
 # --- 1. 전역 설정 테스트 (Graph 시작 전 환경 체크) ---
@@ -205,5 +206,169 @@ def test_tool_return_format_consistency():
         except Exception as e:
             print(f"❌ {case['name']}: 테스트 중 예외 발생 - {e}")
 
+# --- 4. 커서 페이지네이션 테스트 (DB 호출 Mocking) ---
+
+def make_rows(count, start_id=100):
+    """최신순으로 정렬된 테스트용 sessions 행을 생성합니다."""
+    return [
+        {"id": start_id - i, "created_at": f"2025-09-{28 - i:02d}T10:00:00+00:00", "total_volume": 1000.0, "exercises": []}
+        for i in range(count)
+    ]
+
+def test_history_cursor_roundtrip():
+    """커서가 마지막 행의 (created_at, id)를 보존하고, 잘못된 커서는 거부되는지 확인."""
+    row = {"id": 42, "created_at": "2025-09-01T10:00:00.123+00:00"}
+    cursor = supabase_tools.encode_history_cursor(row)
+    assert supabase_tools.decode_history_cursor(cursor) == ("2025-09-01T10:00:00.123+00:00", 42)
+
+    with pytest.raises(ValueError):
+        supabase_tools.decode_history_cursor("not-a-cursor")
+
+def test_history_query_projection_and_keyset_filter():
+    """명시적 컬럼 projection, 키셋 필터, limit + 1 조회가 쿼리에 반영되는지 확인."""
+    cursor = supabase_tools.encode_history_cursor({"id": 42, "created_at": "2025-09-01T10:00:00+00:00"})
+    query = supabase_tools._history_query(supabase, "u1", 20, cursor, ["total_volume"])
+    params = dict(query.params)
+
+    assert params["select"] == "created_at,id,total_volume"
+    assert params["limit"] == "21"
+    assert params["order"] == "created_at.desc,id.desc"
+    assert "created_at.lt." in params["or"] and "id.lt." in params["or"]
+
+    with pytest.raises(ValueError):
+        supabase_tools._history_select(["password"])
+
+def test_head_query_returns_latest_row_and_exact_count():
+    """최신 행 조회가 키 컬럼 1행과 전체 행 수(count=exact)를 요청하고, 응답의 count를 session_count로 전달하는지 확인."""
+    query = supabase_tools._head_query(supabase, "u1")
+    params = dict(query.params)
+    assert params["select"] == "created_at,id" and params["limit"] == "1"
+    assert params["order"] == "created_at.desc,id.desc"
+    assert "count=exact" in query.headers["prefer"]
+
+    row = {"id": 3, "created_at": "2025-09-01T10:00:00+00:00"}
+    assert supabase_tools._head_row(MagicMock(data=[row], count=7)) == {**row, "session_count": 7}
+    assert supabase_tools._head_row(MagicMock(data=[], count=0)) is None
+
+def test_get_workout_history_page_and_cap():
+    """페이지 크기 상한과 has_more/next_cursor 응답 형식을 확인."""
+    supabase_tools.HISTORY_CACHE.clear()
+    rows = make_rows(supabase_tools.MAX_HISTORY_PAGE_SIZE + 1)
+    with patch("supabase_tools._history_query") as mock_query:
+        mock_query.return_value.execute.return_value = MagicMock(data=rows)
+        result = get_workout_history.invoke({"user_id": "u1", "limit": 1000})
+
+    assert mock_query.call_args.args[2] == supabase_tools.MAX_HISTORY_PAGE_SIZE
+    assert len(result["data"]) == supabase_tools.MAX_HISTORY_PAGE_SIZE
+    assert result["has_more"] is True
+    assert supabase_tools.decode_history_cursor(result["next_cursor"])[1] == rows[-2]["id"]
+
+def test_iter_workout_history_streams_pages():
+    """제너레이터가 next_cursor를 따라 모든 페이지를 순서대로 yield하는지 확인."""
+    pages = {None: (make_rows(2, 100), "c1"), "c1": (make_rows(2, 98), "c2"), "c2": (make_rows(1, 96), None)}
+
+    def fake_fetch(user_id, limit, cursor, fields):
+        return pages[cursor]
+
+    with patch("supabase_tools.fetch_history_page", side_effect=fake_fetch):
+        streamed = list(supabase_tools.iter_workout_history("u1", page_size=2))
+
+    assert [len(page) for page in streamed] == [2, 2, 1]
+    assert [row["id"] for page in streamed for row in page] == [100, 99, 98, 97, 96]
+
+# --- 5. 일괄 추가(bulk insert) 테스트 (DB 호출 Mocking) ---
+
+def test_add_workout_sessions_single_request():
+    """여러 세션이 한 번의 INSERT 요청으로 저장되는지 확인."""
+    sessions = [
+        {"user_id": "bulk-user", "total_volume": 1000 + i, "exercises": [{"name": "스쿼트", "weight": 100, "reps": 5, "sets": 5}]}
+        for i in range(7)
+    ]
+    with patch("supabase_tools.supabase") as mock_client:
+        mock_client.from_.return_value.insert.return_value.execute.return_value.data = sessions
+        result = add_workout_sessions.invoke({"sessions": sessions})
+
+    assert result["status"] == "success"
+    assert result["inserted"] == 7
+    assert mock_client.from_.return_value.insert.call_count == 1
+    inserted_rows = mock_client.from_.return_value.insert.call_args.args[0]
+    assert len(inserted_rows) == 7 and isinstance(inserted_rows[0]["total_volume"], float)
+
+def test_add_workout_sessions_rejects_invalid_rows():
+    """잘못된 행이 있으면 DB 호출 없이 INVALID_SESSION_ROWS를 반환하는지 확인."""
+    with patch("supabase_tools.supabase") as mock_client:
+        result = add_workout_sessions.invoke({"sessions": [{"user_id": "u1", "total_volume": "많이", "exercises": []}]})
+
+    assert result["status"] == "error"
+    assert result["error_code"] == "INVALID_SESSION_ROWS"
+    mock_client.from_.assert_not_called()
+
+# --- 6. 코칭 컨텍스트 동시 조회 테스트 (DB 호출 Mocking) ---
+
+def test_coaching_context_query_projection_and_recency():
+    """테이블별 projection, 기간 필터, 최신순 limit이 쿼리에 반영되는지 확인."""
+    source = supabase_tools.CONTEXT_SOURCES["nutrition"]
+    params = dict(supabase_tools._context_query(supabase, source, "u1", "2025-09-01T00:00:00+00:00", 500).params)
+
+    assert params["select"] == ",".join(source.fields)
+    assert params["created_at"] == "gte.2025-09-01T00:00:00+00:00"
+    assert params["order"] == "created_at.desc"
+    assert params["limit"] == str(supabase_tools.MAX_CONTEXT_LIMIT)
+
+def test_coaching_context_fetches_tables_concurrently():
+    """sessions/nutrition 조회가 직렬이 아니라 동시에 실행되고, 일부 실패는 해당 테이블에만 표시되는지 확인."""
+    import time
+
+    def slow_part(source, user_id, since, limit):
+        time.sleep(0.2)
+        if source.table == "nutrition":
+            return supabase_tools._context_part(error=TimeoutError("nutrition timeout"))
+        return supabase_tools._context_part([{"id": 1}])
+
+    with patch("supabase_tools._fetch_context_part", side_effect=slow_part):
+        started = time.monotonic()
+        result = supabase_tools.get_coaching_context.invoke({"user_id": "u1"})
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 0.35
+    assert result["status"] == "success" and list(result["context"]) == ["sessions", "nutrition"]
+    assert result["context"]["sessions"]["count"] == 1
+    assert result["context"]["nutrition"]["status"] == "error"
+
+def test_coaching_context_threads_keep_request_context():
+    """풀 스레드의 조회가 요청 마감 시각과 도구 span을 이어받는지 확인."""
+    import time
+    from deadline import current_deadline, deadline_scope
+    from observability import tool_scope
+    from tracing import current_span
+
+    seen = []
+
+    def part(source, user_id, since, limit):
+        seen.append((current_deadline(), current_span()))
+        return supabase_tools._context_part([])
+
+    deadline = time.time() + 5
+    with patch("supabase_tools._fetch_context_part", side_effect=part), deadline_scope(deadline), \
+         tool_scope("get_coaching_context") as span:
+        supabase_tools.get_coaching_context.invoke({"user_id": "u1"})
+    assert seen == [(deadline, span), (deadline, span)]
+
+def test_coaching_context_async_and_invalid_source():
+    import asyncio
+
+    async def part(source, user_id, since, limit):
+        return supabase_tools._context_part([{"table": source.table}])
+
+    with patch("supabase_tools._afetch_context_part", side_effect=part):
+        result = asyncio.run(supabase_tools.get_coaching_context.ainvoke({"user_id": "u1", "sources": ["nutrition"], "days": 0}))
+    assert result["context"] == {"nutrition": {"status": "success", "count": 1, "data": [{"table": "nutrition"}]}}
+    assert result["days"] == 0
+
+    with patch("supabase_tools._fetch_context_part") as mock_part:
+        invalid = supabase_tools.get_coaching_context.invoke({"user_id": "u1", "sources": ["passwords"]})
+    assert invalid["error_code"] == "INVALID_CONTEXT_REQUEST"
+    mock_part.assert_not_called()
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
\ No newline at end of file
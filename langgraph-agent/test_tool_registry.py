@@ -0,0 +1,77 @@
+# test_tool_registry.py
+
+import pytest
+from typing import Optional, List
+from langchain_core.tools import tool
+from tool_registry import ToolRegistry, ToolArgumentError, compile_validator
+
+# --- 테스트용 도구 ---
+
+@tool
+def sample_lookup(user_id: str, limit: int = 20, cursor: Optional[str] = None) -> dict:
+    """테스트용 조회 도구."""
+    return {"user_id": user_id, "limit": limit, "cursor": cursor}
+
+@tool
+def sample_insert(user_id: str, total_volume: float, exercises: List[dict]) -> dict:
+    """테스트용 삽입 도구."""
+    return {"user_id": user_id}
+
+sample_lookup.metadata = {"read_only": True}
+
+
+# --- 1. 레지스트리 인덱스 테스트 ---
+
+def test_registry_lookup_and_read_only_flag():
+    """이름으로 도구를 조회하고 metadata의 read_only 표시를 반영하는지 테스트."""
+    registry = ToolRegistry([sample_lookup, sample_insert])
+
+    assert len(registry) == 2
+    assert "sample_lookup" in registry
+    assert registry.get("unknown_tool") is None
+    assert registry.get("sample_lookup").read_only is True
+    assert registry.get("sample_insert").read_only is False
+    assert registry.tools == [sample_lookup, sample_insert]
+
+    with pytest.raises(ValueError):
+        registry.register(sample_lookup)
+    
+    print("✅ 레지스트리 조회 및 read_only 확인")
+
+
+# --- 2. 인자 검증 테스트 ---
+
+def test_parse_arguments_accepts_valid_json():
+    """올바른 인자는 통과하고, float 인자의 정수는 float으로 변환되는지 테스트."""
+    registry = ToolRegistry([sample_lookup, sample_insert])
+
+    assert registry.get("sample_lookup").parse_arguments('{"user_id": "u1"}') == {"user_id": "u1"}
+    assert registry.get("sample_lookup").parse_arguments({"user_id": "u1", "cursor": None}) == {"user_id": "u1", "cursor": None}
+
+    args = registry.get("sample_insert").parse_arguments('{"user_id": "u1", "total_volume": 100, "exercises": []}')
+    assert args["total_volume"] == 100.0 and isinstance(args["total_volume"], float)
+    
+    print("✅ 올바른 인자 검증 통과")
+
+
+@pytest.mark.parametrize("raw_arguments", [
+    '{"user_id": "u1"',                                   # JSON 파싱 실패
+    '["u1"]',                                             # 객체가 아님
+    '{}',                                                 # 필수 인자 누락
+    '{"user_id": "u1", "unknown": 1}',                    # 정의되지 않은 인자
+    '{"user_id": 123}',                                   # 타입 불일치
+    '{"user_id": "u1", "limit": true}',                   # bool은 int로 허용하지 않음
+    '{"user_id": null}',                                  # null 불가
+])
+def test_parse_arguments_rejects_invalid(raw_arguments):
+    """잘못된 인자는 도구 실행 전에 ToolArgumentError로 거부되는지 테스트."""
+    registry = ToolRegistry([sample_lookup])
+    with pytest.raises(ToolArgumentError):
+        registry.get("sample_lookup").parse_arguments(raw_arguments)
+
+
+def test_compile_validator_rejects_wrong_container_type():
+    """제네릭 컨테이너 어노테이션은 컨테이너 타입을 검사하는지 테스트."""
+    validate = compile_validator(sample_insert.func)
+    with pytest.raises(ToolArgumentError):
+        validate({"user_id": "u1", "total_volume": 1.0, "exercises": "squat"})
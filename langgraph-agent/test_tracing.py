@@ -0,0 +1,150 @@
+# test_tracing.py
+
+import json
+import time
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from langchain_core.messages import AIMessage
+from tracing import SpanContext, current_trace_id, parse_traceparent, start_span
+
+INCOMING_TRACE = "4bf92f3577b34da6a3ce929d0e0e4736"
+INCOMING_PARENT = "00f067aa0ba902b7"
+INCOMING = f"00-{INCOMING_TRACE}-{INCOMING_PARENT}-01"
+
+def exported_spans(exporter) -> list:
+    """OTLP/JSON lines 파일에서 span 목록을 읽습니다."""
+    exporter.flush()
+    spans = []
+    with open(exporter.path, encoding="utf-8") as f:
+        for line in f:
+            for resource in json.loads(line)["resourceSpans"]:
+                assert resource["resource"]["attributes"][0]["key"] == "service.name"
+                for scope in resource["scopeSpans"]:
+                    spans.extend(scope["spans"])
+    return spans
+
+def by_name(spans: list) -> dict:
+    return {span["name"]: span for span in spans}
+
+# --- 1. traceparent ---
+
+def test_traceparent_parsing():
+    context = parse_traceparent(INCOMING)
+    assert context == SpanContext(INCOMING_TRACE, INCOMING_PARENT, True)
+    assert context.traceparent == INCOMING
+    assert parse_traceparent(f"00-{INCOMING_TRACE}-{INCOMING_PARENT}-00").sampled is False
+    for invalid in (None, "", "garbage", f"ff-{INCOMING_TRACE}-{INCOMING_PARENT}-01", f"00-{'0' * 32}-{INCOMING_PARENT}-01"):
+        assert parse_traceparent(invalid) is None
+
+# --- 2. span 계층 / 내보내기 ---
+
+def test_nested_spans_share_trace_and_export_otlp_json(span_exporter):
+    with start_span("root", kind="server") as root:
+        with start_span("child", attributes={"tool.name": "get_workout_history", "rows": 3}):
+            assert current_trace_id() == root.trace_id
+        with pytest.raises(ValueError):
+            with start_span("failing"):
+                raise ValueError("boom")
+    assert current_trace_id() is None
+
+    spans = by_name(exported_spans(span_exporter))
+    assert {span["traceId"] for span in spans.values()} == {root.trace_id}
+    assert "parentSpanId" not in spans["root"] and spans["root"]["kind"] == 2
+    assert spans["child"]["parentSpanId"] == spans["root"]["spanId"]
+    assert {"key": "rows", "value": {"intValue": "3"}} in spans["child"]["attributes"]
+    assert spans["failing"]["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert int(spans["root"]["endTimeUnixNano"]) >= int(spans["child"]["endTimeUnixNano"])
+
+def test_root_span_is_written_by_background_thread(span_exporter):
+    writers = []
+    write = span_exporter._write
+
+    def recording_write(spans):
+        writers.append(threading.current_thread().name)
+        write(spans)
+
+    with patch.object(span_exporter, "_write", side_effect=recording_write):
+        with start_span("root"):
+            with start_span("child"):
+                pass
+        deadline = time.monotonic() + 2
+        while span_exporter.stats()["exported"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    # 루트 span을 끝낸 스레드(요청 처리 경로)가 아니라 내보내기 스레드가 파일에 기록
+    assert writers == ["trace-export"] and span_exporter.stats()["exported"] == 2
+    assert set(by_name(exported_spans(span_exporter))) == {"root", "child"}
+
+def test_unsampled_incoming_trace_is_not_exported(span_exporter):
+    with start_span("ignored", parent=f"00-{INCOMING_TRACE}-{INCOMING_PARENT}-00") as span:
+        assert span.trace_id == INCOMING_TRACE
+    span_exporter.flush()
+    assert span_exporter.stats()["exported"] == 0
+
+# --- 3. 노드 / 도구 / DB span, ErrorInfo.trace_id ---
+
+def test_tool_executor_spans_link_node_tool_and_db_query(span_exporter):
+    import node
+    from resilience import SUPABASE
+    from state import AgentDecisionModel
+
+    tool_call = {"id": "c1", "function": {"name": "get_workout_history", "arguments": '{"user_id": "u1"}'}}
+    state = {"decision": AgentDecisionModel(action_type="tool_call", tool_calls=[tool_call]), "traceparent": INCOMING}
+
+    def history(**kwargs):
+        SUPABASE.call(lambda: MagicMock(data=[]))
+        return {"status": "success", "action": "get_history", "data": []}
+
+    with patch("supabase_tools.get_workout_history.func", side_effect=history):
+        node.tool_executor(state)
+
+    spans = by_name(exported_spans(span_exporter))
+    assert spans["ToolExecutor"]["traceId"] == INCOMING_TRACE
+    assert spans["ToolExecutor"]["parentSpanId"] == INCOMING_PARENT
+    assert spans["tool get_workout_history"]["parentSpanId"] == spans["ToolExecutor"]["spanId"]
+    assert spans["supabase call"]["parentSpanId"] == spans["tool get_workout_history"]["spanId"]
+    assert spans["supabase call"]["kind"] == 3
+
+def test_error_info_carries_trace_id_to_error_handler():
+    import node
+
+    state = {"question": "안녕", "messages": [], "loop_counter": 0, "traceparent": INCOMING}
+    with patch("node._answer_cache_scope", return_value=None), \
+         patch("node._compact_state_history"), patch("node._build_agent_input"), patch("node._history_update", return_value={}), \
+         patch("node.agent_executor") as mock_agent_executor:
+        mock_agent_executor.invoke.side_effect = ValueError("LLM 응답 형식 오류")
+        update = node.agent_decision(state)
+
+    assert update["error_info"].trace_id == INCOMING_TRACE
+    result = node.error_handler({**state, **update})
+    assert INCOMING_TRACE in result["answer"]
+
+# --- 4. /invoke ---
+
+def test_invoke_continues_incoming_trace_and_returns_trace_id(span_exporter):
+    from fastapi.testclient import TestClient
+    import graph_builder
+    from observability import observed_node
+
+    @observed_node("AgentDecision")
+    async def fake_node(state):
+        return {}
+
+    async def ainvoke(input_data, config=None):
+        await fake_node(input_data)
+        return {"messages": [AIMessage(content="답변")], "llm_calls": 1}
+
+    graph = MagicMock()
+    graph.ainvoke.side_effect = ainvoke
+    with patch.object(graph_builder, "get_conversation_graph", return_value=graph):
+        response = TestClient(graph_builder.create_app()).post(
+            "/invoke", json={"question": "안녕", "user_id": "t1"}, headers={"traceparent": INCOMING})
+
+    assert response.status_code == 200 and response.json()["trace_id"] == INCOMING_TRACE
+    spans = by_name(exported_spans(span_exporter))
+    request_span = spans["POST /invoke"]
+    assert request_span["parentSpanId"] == INCOMING_PARENT and request_span["kind"] == 2
+    assert spans["AgentDecision"]["parentSpanId"] == request_span["spanId"]
+    # 노드에는 State.traceparent로 요청 span이 전달됨
+    assert graph.ainvoke.call_args.args[0]["traceparent"] == f"00-{INCOMING_TRACE}-{request_span['spanId']}-01"
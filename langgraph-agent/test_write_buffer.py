@@ -0,0 +1,155 @@
+# test_write_buffer.py
+
+import time
+import asyncio
+import threading
+import httpx
+import pytest
+from unittest.mock import patch
+from write_buffer import WriteBehindBuffer
+
+# --- 헬퍼: flush 호출을 기록하는 가짜 저장 함수 ---
+
+class RecordingStore:
+    """flush_fn 호출을 기록하고, fail_on에 포함된 값이 있으면 해당 배치를 실패시킵니다."""
+    def __init__(self, fail_on=(), error=RuntimeError("insert failed")):
+        self.calls = []
+        self.fail_on = set(fail_on)
+        self.error = error
+        self.lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self.lock:
+            self.calls.append([row["value"] for row in rows])
+        if any(row["value"] in self.fail_on for row in rows):
+            raise self.error
+        return [{**row, "id": row["value"]} for row in rows]
+
+
+# --- 1. 크기 임계값으로 묶어서 저장 ---
+
+def test_concurrent_submits_are_batched():
+    """동시에 들어온 행들이 한 번의 flush로 저장되고 각 호출자가 자신의 결과를 받는지 테스트."""
+    store = RecordingStore()
+    buffer = WriteBehindBuffer(store, max_batch=5, max_delay=1.0)
+
+    futures = [buffer.submit({"value": i}) for i in range(5)]
+    results = [f.result(timeout=2) for f in futures]
+
+    assert [r["id"] for r in results] == [0, 1, 2, 3, 4]
+    assert store.calls == [[0, 1, 2, 3, 4]]
+    buffer.close()
+    
+    print("✅ 크기 임계값 batch 저장 확인")
+
+
+# --- 2. 시간 임계값으로 저장 ---
+
+def test_partial_batch_flushes_after_delay():
+    """max_batch에 못 미쳐도 max_delay 후 저장되는지 테스트."""
+    store = RecordingStore()
+    buffer = WriteBehindBuffer(store, max_batch=100, max_delay=0.05)
+
+    result = buffer.submit({"value": 7}).result(timeout=2)
+    assert result["id"] == 7
+    assert store.calls == [[7]]
+    buffer.close()
+
+
+# --- 3. 행 단위 실패 전달 ---
+
+def test_failed_row_is_reported_only_to_its_caller():
+    """bulk 저장 실패 시 행 단위로 재시도하여 실패한 행의 호출자만 예외를 받는지 테스트."""
+    store = RecordingStore(fail_on={2})
+    buffer = WriteBehindBuffer(store, max_batch=3, max_delay=1.0)
+
+    futures = [buffer.submit({"value": i}) for i in range(3)]
+
+    assert futures[0].result(timeout=2)["id"] == 0
+    assert futures[1].result(timeout=2)["id"] == 1
+    with pytest.raises(RuntimeError):
+        futures[2].result(timeout=2)
+    assert buffer.stats["failed_rows"] == 1
+    buffer.close()
+
+
+def test_unknown_outcome_is_not_reinserted_row_by_row():
+    """타임아웃처럼 커밋 여부를 알 수 없는 실패는 행 단위로 다시 저장하지 않는지(중복 행 방지) 테스트."""
+    store = RecordingStore(fail_on={1}, error=httpx.ReadTimeout("slow"))
+    buffer = WriteBehindBuffer(store, max_batch=2, max_delay=1.0)
+
+    futures = [buffer.submit({"value": i}) for i in range(2)]
+    for future in futures:
+        with pytest.raises(httpx.ReadTimeout):
+            future.result(timeout=2)
+    assert store.calls == [[0, 1]] and buffer.stats["fallback_rows"] == 0
+    buffer.close()
+
+
+# --- 4. 취소된 호출자 ---
+
+def test_cancelled_submit_does_not_kill_the_worker():
+    """asyncio 타임아웃으로 취소된 행은 저장하지 않고, 워커는 다음 행을 계속 저장하는지 테스트."""
+    store = RecordingStore()
+    buffer = WriteBehindBuffer(store, max_batch=100, max_delay=0.1)
+
+    async def give_up():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.wrap_future(buffer.submit({"value": 1})), timeout=0.01)
+
+    asyncio.run(give_up())
+    assert buffer.submit({"value": 2}).result(timeout=2)["id"] == 2
+    assert store.calls == [[2]] and buffer.stats["cancelled_rows"] == 1
+    assert buffer._worker.is_alive()
+    buffer.close()
+
+
+def test_tool_timeout_while_flushing_reports_the_saved_row_once():
+    """저장 중인 행은 호출자 제한 시간이 지나도 취소하지 않고 결과를 기다려, 실패 보고 후 중복 저장되지 않는지 테스트."""
+    import supabase_tools
+
+    inserted = []
+
+    def slow_flush(rows):
+        time.sleep(0.2)  # WRITE_BEHIND_TIMEOUT보다 오래 걸리는 INSERT
+        inserted.extend(rows)
+        return [{**row, "id": len(inserted)} for row in rows]
+
+    buffer = WriteBehindBuffer(slow_flush, max_batch=1, max_delay=0.01)
+    with patch.object(supabase_tools, "WRITE_BEHIND_ENABLED", True), \
+         patch.object(supabase_tools, "WRITE_BEHIND_TIMEOUT", 0.05), \
+         patch.object(supabase_tools, "SESSION_WRITE_BUFFER", buffer):
+        result = supabase_tools.add_workout_session.func(user_id="u1", total_volume=100, exercises="[]")
+        assert result["status"] == "success" and len(inserted) == 1
+        async_result = asyncio.run(supabase_tools.add_workout_session.coroutine(user_id="u1", total_volume=200, exercises="[]"))
+        assert async_result["status"] == "success" and len(inserted) == 2
+
+    buffer.close()
+    assert [row["total_volume"] for row in inserted] == [100, 200]  # 호출마다 정확히 한 번씩 저장
+
+
+def test_tool_timeout_before_flush_cancels_the_row():
+    """워커가 아직 가져가지 않은 행은 제한 시간이 지나면 취소되어 저장되지 않는지 테스트."""
+    import supabase_tools
+
+    inserted = []
+    buffer = WriteBehindBuffer(lambda rows: inserted.extend(rows) or rows, max_batch=100, max_delay=0.3)
+    with patch.object(supabase_tools, "WRITE_BEHIND_ENABLED", True), \
+         patch.object(supabase_tools, "WRITE_BEHIND_TIMEOUT", 0.05), \
+         patch.object(supabase_tools, "SESSION_WRITE_BUFFER", buffer):
+        result = supabase_tools.add_workout_session.func(user_id="u1", total_volume=100, exercises="[]")
+
+    assert result["status"] == "error"
+    buffer.close()
+    assert inserted == [] and buffer.stats["cancelled_rows"] == 1
+
+
+def test_close_flushes_pending_rows():
+    """close() 시 남아 있는 행을 저장하는지 테스트."""
+    store = RecordingStore()
+    buffer = WriteBehindBuffer(store, max_batch=100, max_delay=10.0)
+    future = buffer.submit({"value": 1})
+    buffer.close()
+    assert future.result(timeout=2)["id"] == 1
+    with pytest.raises(RuntimeError):
+        buffer.submit({"value": 2})
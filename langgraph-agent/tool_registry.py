@@ -0,0 +1,173 @@
+# tool_registry.py
+
+import json
+import inspect
+import typing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from langchain_core.tools import BaseTool
+
+# ----------------------------------------------------
+# 도구 레지스트리: 이름 → 도구 인덱스와 도구별 인자 검증기를 시작 시점에 한 번만 생성
+# ----------------------------------------------------
+
+class ToolArgumentError(ValueError):
+    """tool_call 인자가 도구 시그니처와 맞지 않을 때 발생하는 예외. (DB I/O 이전에 발생)"""
+
+
+# 어노테이션 → 허용 타입 변환표. float 인자에는 JSON 정수도 허용합니다.
+_SCALAR_TYPES: Dict[Any, Tuple[type, ...]] = {
+    str: (str,),
+    int: (int,),
+    float: (int, float),
+    bool: (bool,),
+    dict: (dict,),
+    list: (list,),
+}
+
+def _accepted_types(annotation: Any) -> Tuple[Optional[Tuple[type, ...]], bool]:
+    """
+    어노테이션에서 (허용 타입 튜플, None 허용 여부)를 계산합니다.
+    허용 타입이 None이면 타입 검사를 생략합니다. (Any 또는 해석할 수 없는 타입)
+    """
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return None, True
+
+    origin = typing.get_origin(annotation)
+    if origin is Union:
+        members = typing.get_args(annotation)
+        nullable = type(None) in members
+        accepted: Tuple[type, ...] = ()
+        for member in members:
+            if member is type(None):
+                continue
+            member_types, _ = _accepted_types(member)
+            if member_types is None:
+                return None, nullable
+            accepted += member_types
+        return accepted, nullable
+
+    if origin is not None:
+        # List[dict], Dict[str, Any] 등 제네릭은 컨테이너 타입만 검사합니다.
+        annotation = origin
+
+    if annotation in _SCALAR_TYPES:
+        return _SCALAR_TYPES[annotation], False
+    return None, False
+
+def compile_validator(func: Callable) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    함수 시그니처로부터 인자 검증 함수를 생성합니다.
+    검증 함수는 인자 dict를 받아 누락/미정의/타입 오류가 있으면 ToolArgumentError를 발생시키고,
+    통과하면 (float 인자의 정수 → float 변환을 적용한) dict를 반환합니다.
+    """
+    signature = inspect.signature(func)
+    hints = typing.get_type_hints(func)
+
+    specs = []
+    required = set()
+    for name, param in signature.parameters.items():
+        if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        types, nullable = _accepted_types(hints.get(name, param.annotation))
+        is_float = types == _SCALAR_TYPES[float]
+        specs.append((name, types, nullable, is_float))
+        if param.default is inspect.Parameter.empty:
+            required.add(name)
+
+    allowed = frozenset(name for name, *_ in specs)
+    required = frozenset(required)
+    func_name = getattr(func, "__name__", "tool")
+
+    def validate(args: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(args, dict):
+            raise ToolArgumentError(f"{func_name}: 인자는 JSON 객체여야 합니다. (받은 타입: {type(args).__name__})")
+        missing = required - args.keys()
+        if missing:
+            raise ToolArgumentError(f"{func_name}: 필수 인자 누락 {sorted(missing)}")
+        unknown = args.keys() - allowed
+        if unknown:
+            raise ToolArgumentError(f"{func_name}: 정의되지 않은 인자 {sorted(unknown)}")
+
+        validated = dict(args)
+        for name, types, nullable, is_float in specs:
+            if name not in validated or types is None:
+                continue
+            value = validated[name]
+            if value is None:
+                if not nullable:
+                    raise ToolArgumentError(f"{func_name}: 인자 '{name}'은(는) null일 수 없습니다.")
+                continue
+            # bool은 int의 하위 타입이므로 숫자 인자에서는 별도로 거부합니다.
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                expected = "/".join(t.__name__ for t in types)
+                raise ToolArgumentError(
+                    f"{func_name}: 인자 '{name}'의 타입이 올바르지 않습니다. (기대: {expected}, 실제: {type(value).__name__})"
+                )
+            if is_float:
+                validated[name] = float(value)
+        return validated
+
+    return validate
+
+
+class RegisteredTool:
+    """레지스트리에 등록된 도구와 미리 생성된 인자 검증기."""
+    __slots__ = ("tool", "name", "read_only", "validate")
+
+    def __init__(self, tool: BaseTool, read_only: bool):
+        self.tool = tool
+        self.name = tool.name
+        self.read_only = read_only
+        self.validate = compile_validator(getattr(tool, "func", None) or getattr(tool, "coroutine"))
+
+    def parse_arguments(self, raw_arguments: Union[str, Dict[str, Any], None]) -> Dict[str, Any]:
+        """tool_call의 arguments(JSON 문자열 또는 dict)를 파싱하고 검증합니다."""
+        if raw_arguments is None or raw_arguments == "":
+            args: Any = {}
+        elif isinstance(raw_arguments, str):
+            try:
+                args = json.loads(raw_arguments)
+            except json.JSONDecodeError as e:
+                raise ToolArgumentError(f"{self.name}: 인자 JSON 파싱 실패 - {e}")
+        else:
+            args = raw_arguments
+        return self.validate(args)
+
+
+class ToolRegistry:
+    """
+    이름으로 O(1) 조회가 가능한 도구 레지스트리.
+    도구 수가 늘어나도 조회 비용은 일정하며, 인자 검증기는 등록 시 한 번만 생성됩니다.
+    """
+
+    def __init__(self, tools: Iterable[BaseTool] = ()):
+        self._index: Dict[str, RegisteredTool] = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool: BaseTool, read_only: Optional[bool] = None) -> RegisteredTool:
+        """
+        도구를 등록합니다. read_only를 생략하면 도구의 metadata["read_only"]를 사용합니다.
+        (read_only 도구는 데이터를 변경하지 않으므로 결과 캐싱 등에 사용할 수 있습니다.)
+        """
+        if tool.name in self._index:
+            raise ValueError(f"도구 '{tool.name}'이(가) 이미 등록되어 있습니다.")
+        if read_only is None:
+            read_only = bool((tool.metadata or {}).get("read_only", False))
+        entry = RegisteredTool(tool, read_only)
+        self._index[tool.name] = entry
+        return entry
+
+    def get(self, name: str) -> Optional[RegisteredTool]:
+        return self._index.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def tools(self) -> List[BaseTool]:
+        """등록 순서대로의 도구 목록 (LLM 바인딩/AgentExecutor용)."""
+        return [entry.tool for entry in self._index.values()]
@@ -0,0 +1,284 @@
+# tracing.py
+
+import os
+import re
+import json
+import time
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Union
+
+# ----------------------------------------------------
+# 분산 추적: /invoke 요청 → 노드 → 도구 → 외부 의존성(Supabase/OpenAI) 호출을 하나의 trace로 연결
+# ----------------------------------------------------
+# 추적 컨텍스트는 W3C Trace Context(traceparent 헤더) 형식을 따르며, /invoke에서 새로 만들거나 들어온
+# traceparent 헤더를 이어받아 State.traceparent로 노드에 전달합니다. 노드/도구/의존성 호출은 각각 span을
+# 남기고, 끝난 span은 OTLP/JSON(ExportTraceServiceRequest) 형식으로 파일에 한 줄씩 기록합니다.
+# (OpenTelemetry Collector의 otlpjsonfile 수신기나 같은 형식을 읽는 도구로 그대로 가져갈 수 있습니다.)
+#
+# 환경 변수
+#   - TRACING            : "0"이면 span을 기록하지 않음 (trace ID는 계속 발급하여 에러 정보에 포함)
+#   - TRACE_EXPORT_PATH  : span을 기록할 파일 경로 (기본 .agent_data/traces.jsonl)
+#   - TRACE_SERVICE_NAME : resource의 service.name
+#   - TRACE_BATCH_SIZE   : 요청(루트 span)이 끝나기 전이라도 이만큼 쌓이면 파일에 기록
+
+TRACING_ENABLED = os.getenv("TRACING", "1") == "1"
+TRACE_EXPORT_PATH = os.getenv(
+    "TRACE_EXPORT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".agent_data", "traces.jsonl")
+)
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "langgraph-agent")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "512"))
+
+TRACEPARENT_HEADER = "traceparent"
+
+# OTLP SpanKind / StatusCode 값
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+STATUS_OK, STATUS_ERROR = 1, 2
+
+# ----------------------------------------------------
+# 1. 추적 컨텍스트 (W3C traceparent)
+# ----------------------------------------------------
+
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+class SpanContext(NamedTuple):
+    trace_id: str # 16바이트 hex (32자)
+    span_id: str # 8바이트 hex (16자)
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """traceparent 헤더를 해석합니다. 없거나 형식이 잘못되면 None (새 trace를 시작)."""
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 0x01))
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+def new_span_id() -> str:
+    return secrets.token_hex(8)
+
+# ----------------------------------------------------
+# 2. Span
+# ----------------------------------------------------
+
+class Span:
+    """시작/종료 시각(ns), 부모 span, 속성, 상태를 가진 작업 구간 하나."""
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_OK
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        # 같은 프로세스 안에서 부모가 없는 span (요청 단위 루트). 끝날 때 쌓인 span을 파일에 기록합니다.
+        self.is_local_root = False
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    @property
+    def traceparent(self) -> str:
+        return self.context.traceparent
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: Union[BaseException, str]) -> None:
+        self.status = STATUS_ERROR
+        if isinstance(error, BaseException):
+            self.status_message = f"{type(error).__name__}: {error}"
+            self.attributes.setdefault("error.type", type(error).__name__)
+        else:
+            self.status_message = error
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span 표현."""
+        span = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            "status": {"code": self.status, **({"message": self.status_message} if self.status_message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+# ----------------------------------------------------
+# 3. 파일 내보내기 (OTLP/JSON lines)
+# ----------------------------------------------------
+
+class FileSpanExporter:
+    """
+    끝난 span을 모아 두었다가 루트 span이 끝나거나 batch_size만큼 쌓이면 ExportTraceServiceRequest 한 줄로 기록합니다.
+    요청 처리 경로(이벤트 루프 포함)에서는 메모리에 추가만 하고, 파일 쓰기는 백그라운드 스레드가 수행합니다.
+    """
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME, batch_size: int = TRACE_BATCH_SIZE):
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self._pending: List[Span] = []
+        self._cond = threading.Condition()
+        # 백그라운드 스레드와 flush()의 파일 쓰기를 직렬화 (flush()는 진행 중인 쓰기가 끝날 때까지 기다림)
+        self._write_lock = threading.Lock()
+        self._requested = False
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+        self._counters = {"exported": 0, "dropped": 0}
+
+    def export(self, span: Span) -> None:
+        with self._cond:
+            self._pending.append(span)
+            if span.is_local_root or len(self._pending) >= self.batch_size:
+                self._ensure_worker()
+                self._requested = True
+                self._cond.notify()
+
+    def flush(self) -> None:
+        """대기 중인 span을 호출한 스레드에서 바로 기록합니다. (서버 종료 시)"""
+        self._write_pending()
+
+    def close(self) -> None:
+        """남은 span을 기록하고 백그라운드 스레드를 종료합니다."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def _ensure_worker(self) -> None:
+        # 호출자가 _cond를 보유한 상태에서만 사용 (첫 루트 span 종료 시 지연 시작)
+        if self._worker is None and not self._closed:
+            self._worker = threading.Thread(target=self._run, name="trace-export", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._requested or self._closed)
+                if self._closed:
+                    return
+                self._requested = False
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        with self._write_lock:
+            with self._cond:
+                spans, self._pending = self._pending, []
+            if spans:
+                self._write(spans)
+
+    def _write(self, spans: List[Span]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self._request(spans), ensure_ascii=False) + "\n")
+            outcome = "exported"
+        except Exception:
+            # 추적 기록 실패가 요청 처리나 백그라운드 스레드에 영향을 주지 않도록 버립니다.
+            outcome = "dropped"
+        with self._cond:
+            self._counters[outcome] += len(spans)
+
+    def _request(self, spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "langgraph-agent.tracing"}, "spans": [span.to_otlp() for span in spans]}],
+        }]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"path": self.path, "pending": len(self._pending), **self._counters}
+
+EXPORTER: Optional[FileSpanExporter] = FileSpanExporter(TRACE_EXPORT_PATH) if TRACING_ENABLED else None
+
+# ----------------------------------------------------
+# 4. 현재 span (컨텍스트 변수: 스레드 풀/Task에 복사된 컨텍스트에서도 부모 span을 찾음)
+# ----------------------------------------------------
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+@contextmanager
+def start_span(name: str, parent: Union[str, SpanContext, None] = None, kind: str = "internal",
+               attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """
+    span을 시작하고 with 블록 동안 현재 span으로 설정합니다. 블록에서 예외가 나면 에러 상태로 기록합니다.
+    parent(traceparent 문자열 또는 SpanContext)가 없으면 현재 span의 자식이 되고, 현재 span도 없으면 새 trace를 시작합니다.
+    """
+    if isinstance(parent, str):
+        parent = parse_traceparent(parent)
+    local_parent = _current_span.get()
+    if parent is None and local_parent is not None:
+        parent = local_parent.context
+
+    context = SpanContext(parent.trace_id if parent else new_trace_id(), new_span_id(), parent.sampled if parent else True)
+    span = Span(name, context, parent.span_id if parent else None, kind, attributes)
+    span.is_local_root = local_parent is None
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+        exporter = EXPORTER
+        if exporter is not None and context.sampled:
+            exporter.export(span)
+
+def flush_spans() -> None:
+    """기록 대기 중인 span을 파일에 씁니다. (서버 종료 시)"""
+    if EXPORTER is not None:
+        EXPORTER.flush()
+
+def tracing_stats() -> Dict[str, Any]:
+    return EXPORTER.stats() if EXPORTER is not None else {"enabled": False}
@@ -0,0 +1,140 @@
+# write_buffer.py
+
+import threading
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from resilience import failure_kind
+
+# ----------------------------------------------------
+# Write-behind 버퍼: 동시 요청의 단건 INSERT를 모아 한 번의 bulk INSERT로 전송
+# ----------------------------------------------------
+
+def rejected_without_commit(e: BaseException) -> bool:
+    """
+    bulk INSERT가 저장 전에 거부되었는지 판단합니다. (제약 조건/검증 오류 등 재시도 대상이 아닌 4xx)
+    PostgREST는 bulk INSERT를 한 트랜잭션으로 처리하므로 이 경우 저장된 행이 없습니다.
+    타임아웃/5xx/연결 끊김은 커밋 여부를 알 수 없으므로 False.
+    """
+    return failure_kind(e) is None
+
+class WriteBehindBuffer:
+    """
+    여러 호출자가 submit()한 행을 모아 flush_fn(rows) 한 번으로 저장합니다.
+
+    - max_batch 개가 모이거나, 첫 행이 들어온 뒤 max_delay 초가 지나면 flush 합니다.
+    - submit()은 Future를 반환하며, 각 호출자는 자신의 행에 대한 결과(저장된 행) 또는 예외를 받습니다.
+    - bulk 저장이 거부되면(is_rejected) 행 단위로 다시 저장하여 어떤 행이 실패했는지 해당 호출자에게만 전달합니다.
+      저장 여부를 알 수 없는 실패(타임아웃, 5xx)는 INSERT가 멱등이 아니므로 다시 저장하지 않고 모든 호출자에게 전달합니다.
+    - 저장 전에 취소된 Future(asyncio 타임아웃/취소)의 행은 저장하지 않습니다.
+    - flush_fn은 입력과 같은 순서로 저장된 행 목록을 반환해야 합니다. (PostgREST insert 응답 순서)
+    """
+
+    def __init__(self, flush_fn: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                 max_batch: int = 50, max_delay: float = 0.05,
+                 is_rejected: Callable[[BaseException], bool] = rejected_without_commit):
+        self.flush_fn = flush_fn
+        self.is_rejected = is_rejected
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._pending: List[Tuple[Dict[str, Any], concurrent.futures.Future]] = []
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {"rows": 0, "batches": 0, "fallback_rows": 0, "failed_rows": 0, "cancelled_rows": 0}
+
+    def submit(self, row: Dict[str, Any]) -> concurrent.futures.Future:
+        """행을 버퍼에 추가하고 결과 Future를 반환합니다. (비동기 호출자는 asyncio.wrap_future 사용)"""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindBuffer가 이미 종료되었습니다.")
+            self._ensure_worker()
+            self._pending.append((row, future))
+            self._cond.notify()
+        return future
+
+    def flush(self) -> None:
+        """대기 중인 행을 즉시 저장합니다."""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        self._write(batch)
+
+    def close(self) -> None:
+        """남은 행을 저장하고 백그라운드 스레드를 종료합니다."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def _ensure_worker(self) -> None:
+        # 호출자가 _cond를 보유한 상태에서만 사용 (첫 submit 시 지연 시작)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                # 첫 행 도착 후 max_delay 동안 또는 max_batch가 찰 때까지 추가 행을 기다림
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch or self._closed, timeout=self.max_delay)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            try:
+                self._write(batch)
+            except Exception as e:
+                # 워커 스레드가 종료되면 이후의 모든 submit이 시간 초과되므로, 예상하지 못한 오류는 이 배치의 호출자에게만 전달
+                self._fail(batch, e)
+
+    def _claim(self, batch: List[Tuple[Dict[str, Any], concurrent.futures.Future]]
+               ) -> List[Tuple[Dict[str, Any], concurrent.futures.Future]]:
+        """
+        저장할 행의 Future를 실행 중 상태로 바꿉니다. 이미 취소된 Future의 행은 제외합니다.
+        실행 중인 Future는 더 이상 취소되지 않으므로 이후 set_result/set_exception이 실패하지 않습니다.
+        """
+        claimed = [(row, future) for row, future in batch if future.set_running_or_notify_cancel()]
+        self.stats["cancelled_rows"] += len(batch) - len(claimed)
+        return claimed
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], concurrent.futures.Future]]) -> None:
+        batch = self._claim(batch)
+        if not batch:
+            return
+        rows = [row for row, _ in batch]
+        self.stats["rows"] += len(rows)
+        self.stats["batches"] += 1
+        try:
+            saved = self.flush_fn(rows)
+        except Exception as e:
+            if self.is_rejected(e):
+                # 저장 전에 거부됨: 행 단위로 다시 저장하여 실패한 행만 해당 호출자에게 예외로 전달
+                self._write_individually(batch)
+            else:
+                # 저장 여부를 알 수 없음: 다시 저장하면 중복 행이 생길 수 있으므로 모든 호출자에게 전달
+                self._fail(batch, e)
+            return
+        if len(saved) != len(rows):
+            # 이미 커밋된 응답이므로 다시 저장하지 않음
+            self._fail(batch, RuntimeError(f"저장된 행 수({len(saved)})가 요청 행 수({len(rows)})와 다릅니다."))
+            return
+        for (_, future), saved_row in zip(batch, saved):
+            future.set_result(saved_row)
+
+    def _write_individually(self, batch: List[Tuple[Dict[str, Any], concurrent.futures.Future]]) -> None:
+        for row, future in batch:
+            self.stats["fallback_rows"] += 1
+            try:
+                future.set_result(self.flush_fn([row])[0])
+            except Exception as e:
+                self.stats["failed_rows"] += 1
+                future.set_exception(e)
+
+    def _fail(self, batch: List[Tuple[Dict[str, Any], concurrent.futures.Future]], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                self.stats["failed_rows"] += 1
+                future.set_exception(error)